@@ -2,6 +2,11 @@ import sys
 import time
 import os
 import json
+import math
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime
 from PyQt5.QtCore import QRectF
 
@@ -12,6 +17,9 @@ try:
 except ImportError:
     HAS_CV2 = False
 
+# 未安装的可选依赖（日志初始化后记录）
+_missing_optional = []
+
 # 设备检测库导入（可选）
 # 如果需要更好的音频设备检测，可以安装 pycaw: pip install pycaw
 try:
@@ -19,7 +27,7 @@ try:
     HAS_PYCAW = True
 except ImportError:
     HAS_PYCAW = False
-    print("DEBUG: pycaw 未安装，无法检测音频设备")
+    _missing_optional.append("pycaw 未安装，无法检测音频设备")
 
 # 添加音频录制相关导入
 try:
@@ -27,7 +35,7 @@ try:
     HAS_PYAUDIO_WPATCH = True
 except ImportError:
     HAS_PYAUDIO_WPATCH = False
-    print("DEBUG: pyaudiowpatch 未安装，无法录制系统音频")
+    _missing_optional.append("pyaudiowpatch 未安装，无法录制系统音频")
 
 # 添加全局快捷键相关导入
 try:
@@ -35,10 +43,91 @@ try:
     HAS_PYNPUT = True
 except ImportError:
     HAS_PYNPUT = False
-    print("DEBUG: pynput 未安装，无法使用全局快捷键")
+    _missing_optional.append("pynput 未安装，无法使用全局快捷键")
+
+# 进程资源统计（可选，Linux 下未安装时读取 /proc）
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
 
 import subprocess
 import threading
+import socket
+import logging
+import logging.handlers
+import queue
+
+# 日志：按子系统分级（lingg.capture / lingg.audio / ...），写入由后台线程完成，采集与音频线程不会阻塞在文件I/O上
+LOG_NAMESPACE = 'lingg'
+logging.getLogger(LOG_NAMESPACE).addHandler(logging.NullHandler())
+_log_listener = None
+
+
+def get_logger(subsystem):
+    """获取子系统日志器"""
+    return logging.getLogger(f'{LOG_NAMESPACE}.{subsystem}')
+
+
+def setup_logging(spec=None, log_dir=None):
+    """初始化日志：队列处理器 + 后台线程写入滚动文件（以及可用时的标准错误输出）
+
+    spec 形如 "INFO,audio=DEBUG,capture=WARNING"，默认取环境变量 LINGG_LOG_LEVEL，未设置时为 INFO。
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return _log_listener
+    spec = spec if spec is not None else os.environ.get('LINGG_LOG_LEVEL', 'INFO')
+    root = logging.getLogger(LOG_NAMESPACE)
+    root.setLevel(logging.INFO)
+    for part in [p.strip() for p in spec.split(',') if p.strip()]:
+        name, _, level = part.rpartition('=')
+        level_value = logging.getLevelName(level.upper())
+        if not isinstance(level_value, int):
+            continue
+        (logging.getLogger(f'{LOG_NAMESPACE}.{name}') if name else root).setLevel(level_value)
+    
+    handlers = []
+    file_error = None
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s')
+    try:
+        log_dir = log_dir or os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具', 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, 'recorder.log'), maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except Exception as e:
+        file_error = e
+    # 打包为无控制台程序时 sys.stderr 为 None
+    if sys.stderr is not None:
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+    
+    log_queue = queue.Queue(-1)  # 不限长度，写日志永不阻塞
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.propagate = False
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    import atexit
+    atexit.register(_log_listener.stop)
+    if file_error is not None:
+        root.warning("无法创建日志文件: %s", file_error)
+    for message in _missing_optional:
+        root.info(message)
+    return _log_listener
+
+
+capture_log = get_logger('capture')
+audio_log = get_logger('audio')
+stream_log = get_logger('stream')
+export_log = get_logger('export')
+ui_log = get_logger('ui')
+library_log = get_logger('library')
+config_log = get_logger('config')
+control_log = get_logger('control')
 
 # Windows API 相关导入（用于实现点击穿透和窗口枚举）
 if sys.platform == 'win32':
@@ -70,12 +159,15 @@ if sys.platform == 'win32':
 # PyQt5 相关导入
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton,
-    QVBoxLayout, QHBoxLayout, QFrame, QTableWidget, QTableWidgetItem,
+    QVBoxLayout, QHBoxLayout, QFrame,
     QHeaderView, QAbstractItemView, QFileDialog, QMessageBox, QDesktopWidget,
     QCheckBox, QComboBox, QLineEdit, QGroupBox, QSpinBox, QScrollArea,
-    QMenu, QAction, QKeySequenceEdit, QFormLayout, QSizePolicy, QDialog
+    QMenu, QAction, QKeySequenceEdit, QFormLayout, QSizePolicy, QDialog, QTableView
+)
+from PyQt5.QtCore import (
+    Qt, QPoint, QTimer, QSettings, pyqtSignal, pyqtSlot, QThread, QRect, QObject,
+    QAbstractTableModel, QModelIndex, QFileSystemWatcher, QEvent, QSize
 )
-from PyQt5.QtCore import Qt, QPoint, QTimer, QSettings, pyqtSignal, QThread, QRect
 from PyQt5.QtGui import QIcon, QPixmap, QPainter, QPainterPath, QKeySequence, QImage, QPen, QBrush, QColor, QCursor, QRegion
 
 
@@ -794,16 +886,1304 @@ class RegionSelectorWindow(QWidget):
                 painter.drawEllipse(move_button_x, move_button_y, move_button_size, move_button_size)
 
 
-class RecordingThread(QThread):
-    """录屏线程 - 使用 FFmpeg 实现，类似 ShareX"""
-    recording_failed = pyqtSignal(str)  # 录制失败信号，传递错误信息
-    video_processing_complete = pyqtSignal(str, int)  # 视频处理完成信号，传递文件路径和文件大小
-    merge_progress = pyqtSignal(str, int, int)  # 合并进度信号，传递消息、当前进度、总进度
+def enumerate_monitors():
+    """枚举所有显示器，返回 [{index, name, primary, left, top, width, height, dpi, scale}]
+
+    坐标为桌面物理像素（与 gdigrab/x11grab 的偏移一致），scale 为该屏幕的设备像素比。
+    Qt5 的 QScreen.geometry() 左上角保持原生坐标、只有尺寸按该屏幕的缩放比换算，
+    所以偏移直接使用，只把尺寸乘回缩放比；混合 DPI 时各屏幕的偏移不会被不同的比例放大而错位。
+    """
+    monitors = []
+    app = QApplication.instance()
+    if app is None:
+        return monitors
+    primary = app.primaryScreen()
+    for index, screen in enumerate(app.screens()):
+        geometry = screen.geometry()
+        scale = screen.devicePixelRatio() or 1.0
+        monitors.append({
+            'index': index,
+            'name': screen.name(),
+            'primary': screen is primary,
+            'left': geometry.x(),
+            'top': geometry.y(),
+            'width': int(round(geometry.width() * scale)),
+            'height': int(round(geometry.height() * scale)),
+            'dpi': round(screen.logicalDotsPerInch() * scale, 1),
+            'scale': scale,
+        })
+    return monitors
+
+
+def virtual_desktop_region(monitors):
+    """所有显示器组成的虚拟桌面外接矩形"""
+    if not monitors:
+        return None
+    left = min(m['left'] for m in monitors)
+    top = min(m['top'] for m in monitors)
+    right = max(m['left'] + m['width'] for m in monitors)
+    bottom = max(m['top'] + m['height'] for m in monitors)
+    return {'top': top, 'left': left, 'width': right - left, 'height': bottom - top}
+
+
+def resolve_capture_regions(capture_monitor, monitors=None):
+    """按全屏录制的显示器设置返回 [(名称, 区域)]
+
+    capture_monitor：'primary'（主显示器）、'all'（整个虚拟桌面）、
+    'each'（每个显示器单独录制）或显示器序号字符串。
+    """
+    if monitors is None:
+        monitors = enumerate_monitors()
+    if not monitors:
+        return []
+    region_of = lambda m: {'top': m['top'], 'left': m['left'], 'width': m['width'], 'height': m['height']}
+    if capture_monitor == 'all':
+        return [('desktop', virtual_desktop_region(monitors))]
+    if capture_monitor == 'each':
+        return [(f"monitor{m['index'] + 1}", region_of(m)) for m in monitors]
+    if str(capture_monitor).isdigit() and int(capture_monitor) < len(monitors):
+        monitor = monitors[int(capture_monitor)]
+        return [(f"monitor{monitor['index'] + 1}", region_of(monitor))]
+    primary = next((m for m in monitors if m['primary']), monitors[0])
+    return [('primary', region_of(primary))]
+
+
+class UiThreadCall(QObject):
+    """把函数转交界面线程执行（对象需移动到界面线程，信号按队列连接投递）"""
+    requested = pyqtSignal(object)
+    
+    def __init__(self):
+        super().__init__()
+        self.requested.connect(self._run, Qt.QueuedConnection)
+    
+    @pyqtSlot(object)
+    def _run(self, task):
+        task()
+
+
+class ScreenGrabber:
+    """进程内截取屏幕区域 - 不启动 FFmpeg，单帧只需几十毫秒，可以在任意线程调用
+
+    Windows 使用 GDI（BitBlt 到 DIB，与 gdigrab 的数据来源相同，可选绘制鼠标指针），
+    Linux 使用 Xlib 的 XGetImage（与 x11grab 相同），都通过 ctypes 调用，不需要额外依赖；
+    其他平台用 QScreen 截取，只能在界面线程中执行，其他线程调用时转交界面线程并等待结果。
+    返回 QImage（RGB32），编码可以放到后台线程。
+    """
+    SRCCOPY = 0x00CC0020
+    CAPTUREBLT = 0x40000000  # 包含分层窗口（半透明窗口、提示框等）
+    UI_THREAD_TIMEOUT = 5.0  # 等待界面线程完成 QScreen 截图的时间（秒）
+    _gdi = None
+    _xlib = None
+    _ui_call = None
+    _ui_call_lock = threading.Lock()
+    
+    @classmethod
+    def grab(cls, region, show_cursor=False):
+        width, height = int(region['width']), int(region['height'])
+        if width <= 0 or height <= 0:
+            raise ValueError(f"截图区域无效: {region}")
+        if sys.platform == 'win32':
+            return cls._grab_gdi(int(region['left']), int(region['top']), width, height, show_cursor)
+        if os.environ.get('DISPLAY'):
+            return cls._grab_x11(int(region['left']), int(region['top']), width, height)
+        if QApplication.instance() is None:
+            raise RuntimeError('当前平台需要界面（QApplication）才能截图')
+        left, top = int(region['left']), int(region['top'])
+        if threading.current_thread() is threading.main_thread():
+            return cls._grab_qscreen(left, top, width, height)
+        return cls._run_in_ui_thread(lambda: cls._grab_qscreen(left, top, width, height))
+    
+    @staticmethod
+    def _grab_qscreen(left, top, width, height):
+        pixmap = QApplication.instance().primaryScreen().grabWindow(0, left, top, width, height)
+        if pixmap.isNull():
+            raise RuntimeError('QScreen 截图失败（当前平台不支持截取屏幕）')
+        return pixmap.toImage().convertToFormat(QImage.Format_RGB32)
+    
+    @classmethod
+    def _run_in_ui_thread(cls, task):
+        """在界面线程中执行 task 并等待结果；界面线程没有运行事件循环（或一直忙）时超时报错，不会死锁"""
+        with cls._ui_call_lock:
+            if cls._ui_call is None:
+                cls._ui_call = UiThreadCall()
+                cls._ui_call.moveToThread(QApplication.instance().thread())
+        done = threading.Event()
+        outcome = {}
+        
+        def run():
+            try:
+                outcome['result'] = task()
+            except Exception as e:
+                outcome['error'] = e
+            done.set()
+        
+        cls._ui_call.requested.emit(run)
+        if not done.wait(cls.UI_THREAD_TIMEOUT):
+            raise RuntimeError(f'界面线程 {cls.UI_THREAD_TIMEOUT:g} 秒内没有完成截图（没有运行事件循环或界面忙）')
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+    
+    @classmethod
+    def _gdi_api(cls):
+        """独立的 user32/gdi32 实例并声明参数类型（句柄在64位系统上不能按 int 截断），不影响其他调用"""
+        if cls._gdi is None:
+            u32, g32 = ctypes.WinDLL('user32'), ctypes.WinDLL('gdi32')
+            u32.GetDC.restype = wintypes.HDC
+            u32.GetDC.argtypes = [wintypes.HWND]
+            u32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+            u32.DrawIconEx.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.HICON, ctypes.c_int,
+                                       ctypes.c_int, wintypes.UINT, wintypes.HBRUSH, wintypes.UINT]
+            g32.CreateCompatibleDC.restype = wintypes.HDC
+            g32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+            g32.CreateDIBSection.restype = wintypes.HBITMAP
+            g32.CreateDIBSection.argtypes = [wintypes.HDC, ctypes.c_void_p, wintypes.UINT,
+                                             ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD]
+            g32.SelectObject.restype = wintypes.HGDIOBJ
+            g32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+            g32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                   wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+            g32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+            g32.DeleteDC.argtypes = [wintypes.HDC]
+            cls._gdi = (u32, g32)
+        return cls._gdi
+    
+    @classmethod
+    def _grab_gdi(cls, left, top, width, height, show_cursor):
+        u32, g32 = cls._gdi_api()
+        
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [('biSize', wintypes.DWORD), ('biWidth', wintypes.LONG), ('biHeight', wintypes.LONG),
+                        ('biPlanes', wintypes.WORD), ('biBitCount', wintypes.WORD), ('biCompression', wintypes.DWORD),
+                        ('biSizeImage', wintypes.DWORD), ('biXPelsPerMeter', wintypes.LONG),
+                        ('biYPelsPerMeter', wintypes.LONG), ('biClrUsed', wintypes.DWORD),
+                        ('biClrImportant', wintypes.DWORD)]
+        
+        header = BITMAPINFOHEADER()
+        header.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        header.biWidth = width
+        header.biHeight = -height  # 负值表示自上而下，与 QImage 的行顺序一致
+        header.biPlanes = 1
+        header.biBitCount = 32
+        screen_dc = u32.GetDC(None)
+        memory_dc = g32.CreateCompatibleDC(screen_dc)
+        bits = ctypes.c_void_p()
+        bitmap = g32.CreateDIBSection(screen_dc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+        previous = g32.SelectObject(memory_dc, bitmap)
+        try:
+            if not bitmap or not g32.BitBlt(memory_dc, 0, 0, width, height, screen_dc, left, top,
+                                            cls.SRCCOPY | cls.CAPTUREBLT):
+                raise OSError('BitBlt 截图失败')
+            if show_cursor:
+                cls._draw_cursor(u32, memory_dc, left, top)
+            data = ctypes.string_at(bits, width * height * 4)
+        finally:
+            g32.SelectObject(memory_dc, previous)
+            g32.DeleteObject(bitmap)
+            g32.DeleteDC(memory_dc)
+            u32.ReleaseDC(None, screen_dc)
+        # QImage 不持有 bytes 的内存，copy() 后再返回
+        return QImage(data, width, height, width * 4, QImage.Format_RGB32).copy()
+    
+    @staticmethod
+    def _draw_cursor(u32, memory_dc, left, top):
+        """把当前鼠标指针画到截图上（按热点对齐）"""
+        class CURSORINFO(ctypes.Structure):
+            _fields_ = [('cbSize', wintypes.DWORD), ('flags', wintypes.DWORD), ('hCursor', wintypes.HANDLE),
+                        ('ptScreenPos', wintypes.POINT)]
+        
+        class ICONINFO(ctypes.Structure):
+            _fields_ = [('fIcon', wintypes.BOOL), ('xHotspot', wintypes.DWORD), ('yHotspot', wintypes.DWORD),
+                        ('hbmMask', wintypes.HBITMAP), ('hbmColor', wintypes.HBITMAP)]
+        
+        info = CURSORINFO()
+        info.cbSize = ctypes.sizeof(CURSORINFO)
+        if not u32.GetCursorInfo(ctypes.byref(info)) or not info.flags & 0x1:  # CURSOR_SHOWING
+            return
+        icon = ICONINFO()
+        hotspot_x = hotspot_y = 0
+        if u32.GetIconInfo(info.hCursor, ctypes.byref(icon)):
+            hotspot_x, hotspot_y = icon.xHotspot, icon.yHotspot
+            _, g32 = ScreenGrabber._gdi_api()
+            for handle in (icon.hbmMask, icon.hbmColor):
+                if handle:
+                    g32.DeleteObject(handle)
+        u32.DrawIconEx(memory_dc, info.ptScreenPos.x - left - hotspot_x, info.ptScreenPos.y - top - hotspot_y,
+                       info.hCursor, 0, 0, 0, None, 0x0003)  # DI_NORMAL
+    
+    @classmethod
+    def _grab_x11(cls, left, top, width, height):
+        import ctypes
+        import ctypes.util
+        
+        class XImage(ctypes.Structure):
+            # 只声明用到的前几个字段
+            _fields_ = [('width', ctypes.c_int), ('height', ctypes.c_int), ('xoffset', ctypes.c_int),
+                        ('format', ctypes.c_int), ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int),
+                        ('bitmap_unit', ctypes.c_int), ('bitmap_bit_order', ctypes.c_int),
+                        ('bitmap_pad', ctypes.c_int), ('depth', ctypes.c_int), ('bytes_per_line', ctypes.c_int),
+                        ('bits_per_pixel', ctypes.c_int)]
+        
+        if cls._xlib is None:
+            path = ctypes.util.find_library('X11')
+            if not path:
+                raise RuntimeError('未找到 libX11，无法截图')
+            xlib = ctypes.cdll.LoadLibrary(path)
+            xlib.XOpenDisplay.restype = ctypes.c_void_p
+            xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+            xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+            xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+            xlib.XGetImage.restype = ctypes.POINTER(XImage)
+            xlib.XGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int, ctypes.c_uint,
+                                       ctypes.c_uint, ctypes.c_ulong, ctypes.c_int]
+            xlib.XDestroyImage.argtypes = [ctypes.c_void_p]
+            xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+            cls._xlib = xlib
+        xlib = cls._xlib
+        # 每次截图使用自己的连接，不同线程同时截图互不影响
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            raise RuntimeError('无法连接 X 显示服务器')
+        try:
+            image = xlib.XGetImage(display, xlib.XDefaultRootWindow(display), left, top, width, height,
+                                   0xFFFFFFFF, 2)  # AllPlanes, ZPixmap
+            if not image:
+                raise OSError('XGetImage 截图失败')
+            try:
+                if image.contents.bits_per_pixel != 32:
+                    raise RuntimeError(f"不支持 {image.contents.bits_per_pixel} 位色深的截图")
+                stride = image.contents.bytes_per_line
+                data = ctypes.string_at(image.contents.data, stride * height)
+            finally:
+                xlib.XDestroyImage(image)
+        finally:
+            xlib.XCloseDisplay(display)
+        return QImage(data, width, height, stride, QImage.Format_RGB32).copy()
+
+
+class ScreenshotService:
+    """截图与连拍 - 按截止时间在后台线程中截取，PNG/JPEG/WebP 编码交给线程池，界面线程不等待
+
+    capture() 立即返回 Future，结果为 {'files': [...], 'grab_ms': [...], ...}；
+    连拍时编码与下一帧的截取并行进行，不会拖慢间隔。
+    """
+    # 格式 -> (扩展名, QImage 写入格式)
+    FORMATS = {'PNG': ('.png', 'PNG'), 'JPEG': ('.jpg', 'JPG'), 'WebP': ('.webp', 'WEBP')}
+    ENCODE_WORKERS = 2
+    
+    def __init__(self):
+        self.encoder = ThreadPoolExecutor(max_workers=self.ENCODE_WORKERS, thread_name_prefix='screenshot_encode')
+    
+    def capture(self, region, output_dir, count=1, interval=0.5, image_format='PNG', quality=90, show_cursor=True,
+                prefix='screenshot'):
+        from concurrent.futures import Future
+        if image_format not in self.FORMATS:
+            raise ValueError(f"截图格式应为 {'/'.join(self.FORMATS)}: {image_format}")
+        future = Future()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        threading.Thread(
+            target=self._run, name='screenshot_burst', daemon=True,
+            args=(future, dict(region), output_dir, max(1, int(count)), max(0.0, float(interval or 0)),
+                  image_format, int(quality), show_cursor, f'{prefix}_{timestamp}')
+        ).start()
+        return future
+    
+    def _run(self, future, region, output_dir, count, interval, image_format, quality, show_cursor, stem):
+        extension, writer_format = self.FORMATS[image_format]
+        grab_ms = []
+        encodes = []
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            started = time.perf_counter()
+            wait_event = threading.Event()
+            for index in range(count):
+                # 按第一帧的时间计算每帧的截止时间，截取耗时不会累积到间隔里
+                delay = started + index * interval - time.perf_counter()
+                if delay > 0:
+                    wait_event.wait(delay)
+                grab_start = time.perf_counter()
+                image = ScreenGrabber.grab(region, show_cursor)
+                grab_ms.append(round((time.perf_counter() - grab_start) * 1000, 2))
+                name = f'{stem}_{index + 1:03d}{extension}' if count > 1 else f'{stem}{extension}'
+                path = os.path.join(output_dir, name)
+                encodes.append(self.encoder.submit(self._encode, image, path, writer_format,
+                                                   -1 if image_format == 'PNG' else quality))
+            files = [encode.result() for encode in encodes]
+        except Exception as e:
+            capture_log.exception("截图失败: %s", e)
+            future.set_exception(e)
+            return
+        result = {
+            'files': files,
+            'format': image_format,
+            'region': region,
+            'grab_ms': grab_ms,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        capture_log.info("截图完成，共 %s 张，单帧截取 %.1f ms 以内", len(files), max(grab_ms))
+        future.set_result(result)
+    
+    @staticmethod
+    def _encode(image, path, writer_format, quality):
+        # PNG 的 quality 为压缩级别，-1 使用默认值
+        if not image.save(path, writer_format, quality):
+            raise OSError(f"保存截图失败（{writer_format}）: {path}")
+        return path
+
+
+def read_process_usage(pid):
+    """读取进程累计CPU时间（秒）、常驻内存与累计写入字节数，无法读取时返回 None"""
+    try:
+        if HAS_PSUTIL:
+            process = psutil.Process(pid)
+            cpu_times = process.cpu_times()
+            try:
+                write_bytes = process.io_counters().write_bytes
+            except (AttributeError, psutil.Error):
+                write_bytes = None
+            return {'cpu': cpu_times.user + cpu_times.system, 'rss': process.memory_info().rss,
+                    'write_bytes': write_bytes}
+        stat_path = f'/proc/{pid}/stat'
+        if os.path.exists(stat_path):
+            with open(stat_path, 'r') as f:
+                data = f.read()
+            # 进程名可能含空格，从最后一个 ')' 之后开始按字段解析
+            fields = data[data.rindex(')') + 2:].split()
+            ticks = os.sysconf('SC_CLK_TCK')
+            write_bytes = None
+            try:
+                with open(f'/proc/{pid}/io', 'r') as f:
+                    for line in f:
+                        if line.startswith('write_bytes:'):
+                            write_bytes = int(line.split()[1])
+                            break
+            except OSError:
+                pass
+            return {
+                'cpu': (int(fields[11]) + int(fields[12])) / ticks,
+                'rss': int(fields[21]) * os.sysconf('SC_PAGE_SIZE'),
+                'write_bytes': write_bytes,
+            }
+    except Exception:
+        pass
+    return None
+
+
+class ResourceSampler:
+    """资源采样 - 定期采样本进程与各 FFmpeg 子进程的CPU、常驻内存与写入字节数，超过阈值时发出警告"""
+    HISTORY = 600  # 保留的采样数量
+    CPU_SATURATION = 0.9  # 编码器占用全部核心的比例达到此值视为饱和
+    APP_CPU_LIMIT = 0.9  # 本进程（音频/界面线程）占用单核的比例
+    SATURATION_SAMPLES = 3  # 连续超过阈值的采样次数
+    STALL_SECONDS = 5.0  # 录制中输出停止增长多久视为磁盘写入跟不上
+    RSS_LIMIT = 2 * 1024 * 1024 * 1024  # 本进程常驻内存上限
+    WARNING_COOLDOWN = 60.0  # 同类警告的最小间隔（秒）
+    
+    def __init__(self, session, interval=1.0):
+        self.session = session
+        self.interval = interval
+        self.samples = deque(maxlen=self.HISTORY)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.previous = {}  # pid -> (时间, 累计CPU)
+        self.cpu_totals = {}  # pid -> 累计CPU（秒）
+        self.app_baseline = None
+        self.peak_rss = 0
+        self.over_counts = {}
+        self.last_warning = {}
+        self.warnings = []
+        self.last_growth = (None, 0)  # (时间, 输出字节数)
+    
+    def start(self):
+        if self.thread is not None:
+            return
+        usage = read_process_usage(os.getpid())
+        self.app_baseline = usage['cpu'] if usage else None
+        self.thread = threading.Thread(target=self._loop, name='resource_sampler', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                capture_log.debug("资源采样失败: %s", e)
+    
+    def _process_sample(self, pid, now):
+        usage = read_process_usage(pid)
+        if usage is None:
+            return None
+        previous = self.previous.get(pid)
+        cpu_percent = None
+        if previous and now > previous[0]:
+            cpu_percent = round((usage['cpu'] - previous[1]) / (now - previous[0]) * 100, 1)
+        self.previous[pid] = (now, usage['cpu'])
+        self.cpu_totals[pid] = max(self.cpu_totals.get(pid, 0.0), usage['cpu'])
+        return {'pid': pid, 'cpu_percent': cpu_percent, 'rss': usage['rss'], 'write_bytes': usage['write_bytes']}
+    
+    def sample(self):
+        """采样一次并检查阈值"""
+        session = self.session
+        now = time.time()
+        with session.ffmpeg_process_lock:
+            encoder_pids = [p.pid for p in session.ffmpeg_processes if p.poll() is None]
+        app = self._process_sample(os.getpid(), now)
+        encoders = [sample for sample in (self._process_sample(pid, now) for pid in encoder_pids) if sample]
+        for pid in list(self.previous):
+            if pid != os.getpid() and pid not in encoder_pids:
+                del self.previous[pid]
+        total_rss = (app['rss'] if app else 0) + sum(e['rss'] for e in encoders)
+        self.peak_rss = max(self.peak_rss, total_rss)
+        record = {'t': round(session.elapsed_seconds(), 3), 'app': app, 'ffmpeg': encoders}
+        with self.lock:
+            self.samples.append(record)
+        self._check_thresholds(record, now)
+        return record
+    
+    def _over(self, kind, condition):
+        """连续超过阈值的次数达到 SATURATION_SAMPLES 时返回 True"""
+        self.over_counts[kind] = self.over_counts.get(kind, 0) + 1 if condition else 0
+        return self.over_counts[kind] >= self.SATURATION_SAMPLES
+    
+    def _check_thresholds(self, record, now):
+        session = self.session
+        cores = os.cpu_count() or 1
+        encoder_cpu = sum(e['cpu_percent'] or 0 for e in record['ffmpeg'])
+        if self._over('encoder_cpu', record['ffmpeg'] and encoder_cpu >= self.CPU_SATURATION * cores * 100):
+            self._warn('encoder_cpu', f"编码器CPU占用已饱和（{encoder_cpu:.0f}%），可能丢帧，建议降低帧率或画质")
+        app = record['app']
+        if app and self._over('app_cpu', (app['cpu_percent'] or 0) >= self.APP_CPU_LIMIT * 100):
+            self._warn('app_cpu', f"录屏进程CPU占用过高（{app['cpu_percent']:.0f}%），音频线程可能跟不上")
+        if app and app['rss'] >= self.RSS_LIMIT:
+            self._warn('memory', f"录屏进程内存占用过高（{app['rss'] / 1024 / 1024:.0f} MB）")
+        
+        # 磁盘写入：录制中（未暂停）编码器在运行但输出长时间不增长
+        if session.running and not session.paused and record['ffmpeg']:
+            written = sum(e['write_bytes'] or 0 for e in record['ffmpeg'])
+            try:
+                written += os.path.getsize(session.filepath)
+            except OSError:
+                pass
+            last_time, last_written = self.last_growth
+            if last_time is None or written > last_written:
+                self.last_growth = (now, written)
+            elif now - last_time >= self.STALL_SECONDS:
+                self._warn('disk_write', f"磁盘写入跟不上：输出已 {now - last_time:.0f} 秒没有增长")
+        else:
+            self.last_growth = (None, 0)
+    
+    def _warn(self, kind, message):
+        now = time.time()
+        if now - self.last_warning.get(kind, 0) < self.WARNING_COOLDOWN:
+            return
+        self.last_warning[kind] = now
+        self.warnings.append({'t': round(self.session.elapsed_seconds(), 3), 'kind': kind, 'message': message})
+        capture_log.warning("%s", message)
+        self.session.tracer.instant('resource_warning', kind=kind)
+        self.session.resource_warning.emit(kind, message)
+    
+    def latest(self):
+        with self.lock:
+            return self.samples[-1] if self.samples else None
+    
+    def history(self):
+        with self.lock:
+            return list(self.samples)
+    
+    def summary(self):
+        """累计CPU时间、峰值内存与警告"""
+        cpu_seconds = sum(self.cpu_totals.values())
+        if self.app_baseline is not None and os.getpid() in self.cpu_totals:
+            cpu_seconds -= self.app_baseline
+        return {
+            'samples': len(self.samples),
+            'interval': self.interval,
+            'cpu_seconds': round(cpu_seconds, 3) if self.cpu_totals else None,
+            'encoder_pids': sorted(pid for pid in self.cpu_totals if pid != os.getpid()),
+            'peak_rss': self.peak_rss or None,
+            'warnings': list(self.warnings),
+        }
+
+
+_cursor_controller = None
+
+
+def read_cursor_position():
+    """读取鼠标指针的屏幕坐标（物理像素），无法读取时返回 None"""
+    global _cursor_controller
+    try:
+        if sys.platform == 'win32':
+            point = wintypes.POINT()
+            if user32.GetCursorPos(ctypes.byref(point)):
+                return point.x, point.y
+            return None
+        if HAS_PYNPUT:
+            if _cursor_controller is None:
+                from pynput import mouse
+                _cursor_controller = mouse.Controller()
+            x, y = _cursor_controller.position
+            return int(x), int(y)
+    except Exception:
+        pass
+    return None
+
+
+class MouseFollower:
+    """动态鼠标区域 - 录制区域内一个固定大小的视口跟随鼠标指针平移
+
+    每帧读取一次指针位置，指针离开视口中央的死区后才移动目标。目标通过 FFmpeg 交互命令
+    （标准输入 'c'）发给裁剪滤镜 crop@mouse_follow：x/y 是以帧时间 t 为变量的缓动曲线，
+    平移在 FFmpeg 内逐帧计算，不经过 update_region，也不重启进程。
+    """
+    FILTER_NAME = 'crop@mouse_follow'
+    DEAD_ZONE = 0.3  # 死区占视口尺寸的比例，指针在死区内移动时不平移
+    EASE_SECONDS = 0.25  # 缓动时间常数（秒），约3倍时间常数后到达目标
+    LEAD_SECONDS = 0.3  # 新曲线从命令发出后这段时间才开始，保证命令送达前后画面连续
+    COMMAND_INTERVAL = 0.5  # 两次发送目标的最小间隔（FFmpeg 约每100ms读取一条交互命令）
+    MIN_STEP = 4  # 目标移动小于此像素数时不发送
+    
+    def __init__(self, region, width, height, fps, cursor_reader=None):
+        self.fps = fps
+        self.cursor_reader = cursor_reader or read_cursor_position
+        self.requested_size = (int(width), int(height))
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.process = None  # 当前接收命令的 FFmpeg 进程
+        self.clock_origin = None  # 当前进程帧时间 t=0 对应的 time.time()
+        self.last_sent = 0.0
+        self.cursor_reads = 0
+        self.commands_sent = 0
+        self._set_region(region)
+        self.target_x = self.max_x // 2
+        self.target_y = self.max_y // 2
+        self._freeze(self.target_x, self.target_y)
+    
+    def _set_region(self, region):
+        self.region = dict(region)
+        self.width = max(2, min(self.requested_size[0], region['width']) // 2 * 2)
+        self.height = max(2, min(self.requested_size[1], region['height']) // 2 * 2)
+        self.max_x = region['width'] - self.width
+        self.max_y = region['height'] - self.height
+    
+    def _freeze(self, x, y):
+        """视口停在 (x, y)：每个轴保存 (上一条曲线, 当前曲线)，曲线为 (起点, 目标, 开始时间)"""
+        self.curves = {'x': ((x, x, 0.0), (x, x, 0.0)), 'y': ((y, y, 0.0), (y, y, 0.0))}
+    
+    @classmethod
+    def _ease(cls, curve, t):
+        start, target, t0 = curve
+        return start + (target - start) * (1 - math.exp(-max(0.0, t - t0) / cls.EASE_SECONDS))
+    
+    @classmethod
+    def _ease_expr(cls, curve):
+        start, target, t0 = curve
+        return f"{start:.1f}+({target - start:.1f})*(1-exp(-max(0,t-{t0:.3f})/{cls.EASE_SECONDS}))"
+    
+    def _position(self, axis, t):
+        previous, current = self.curves[axis]
+        return self._ease(previous if t < current[2] else current, t)
+    
+    def begin_process(self, region):
+        """新的 FFmpeg 进程即将启动：视口停在当前位置，等待进程开始输出后再发送命令"""
+        with self.lock:
+            t = time.time() - self.clock_origin if self.clock_origin is not None else 0.0
+            x = int(round(self._position('x', t)))
+            y = int(round(self._position('y', t)))
+            self.process = None
+            self.clock_origin = None
+            self._set_region(region)
+            self.target_x = min(max(0, x), self.max_x)
+            self.target_y = min(max(0, y), self.max_y)
+            self._freeze(self.target_x, self.target_y)
+    
+    def crop_filter(self):
+        """当前进程使用的裁剪滤镜（初始位置为常量，之后由交互命令替换为缓动曲线）"""
+        with self.lock:
+            return f"{self.FILTER_NAME}=w={self.width}:h={self.height}:x={self.target_x}:y={self.target_y}"
+    
+    def attach(self, process):
+        """FFmpeg 进程已启动（首帧尚未到达）"""
+        with self.lock:
+            self.process = process
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name='mouse_follower', daemon=True)
+            self.thread.start()
+    
+    def clock_started(self, process):
+        """FFmpeg 开始输出帧：以此刻作为帧时间 t=0"""
+        with self.lock:
+            if process is self.process and self.clock_origin is None:
+                self.clock_origin = time.time()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def _loop(self):
+        interval = 1.0 / max(1, self.fps)
+        while not self.stop_event.wait(interval):
+            try:
+                self.step(time.time())
+            except Exception as e:
+                capture_log.debug("动态鼠标区域更新失败: %s", e)
+    
+    def step(self, now):
+        """读取一次指针位置，必要时移动目标并发送新的缓动曲线"""
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        position = self.cursor_reader()
+        self.cursor_reads += 1
+        if position is None:
+            return
+        commands = []
+        with self.lock:
+            rel_x = position[0] - self.region['left']
+            rel_y = position[1] - self.region['top']
+            center_x = self.target_x + self.width / 2
+            center_y = self.target_y + self.height / 2
+            if (abs(rel_x - center_x) > self.width * self.DEAD_ZONE / 2
+                    or abs(rel_y - center_y) > self.height * self.DEAD_ZONE / 2):
+                self.target_x = int(min(max(0, rel_x - self.width / 2), self.max_x))
+                self.target_y = int(min(max(0, rel_y - self.height / 2), self.max_y))
+            if self.clock_origin is None or now - self.last_sent < self.COMMAND_INTERVAL:
+                return
+            # 新曲线从 t0 开始，起点取旧曲线在 t0 的位置；t0 之前仍沿用旧曲线
+            t0 = now - self.clock_origin + self.LEAD_SECONDS
+            for axis, target in (('x', self.target_x), ('y', self.target_y)):
+                previous, current = self.curves[axis]
+                if abs(target - current[1]) < self.MIN_STEP:
+                    continue
+                curve = (self._ease(current, t0), target, t0)
+                self.curves[axis] = (current, curve)
+                expression = f"if(lt(t,{t0:.3f}),{self._ease_expr(current)},{self._ease_expr(curve)})"
+                commands.append((axis, expression))
+            if commands:
+                self.last_sent = now
+        for axis, expression in commands:
+            self._send_command(process, axis, expression)
+    
+    def _send_command(self, process, axis, expression):
+        try:
+            process.stdin.write(f"c{self.FILTER_NAME} -1 {axis} {expression}\n".encode('ascii'))
+            process.stdin.flush()
+            self.commands_sent += 1
+        except (OSError, ValueError, AttributeError):
+            pass
+    
+    def summary(self):
+        return {'viewport': f'{self.width}x{self.height}', 'cursor_reads': self.cursor_reads,
+                'commands_sent': self.commands_sent}
+
+class StreamRelay:
+    """推流中继 - 把编码进程 tee 出的 MPEG-TS 转发到 RTMP/SRT 服务器，或写成 HLS 直播目录
+
+    编码进程通过本地回环 TCP 连接送来已编码的 TS 包，中继进程只做流复制（-c copy），不重复编码。
+    发送队列有上限：推流进程断开时按指数退避重连，期间队列满了丢弃最旧的数据，本地录制不受影响。
+    每个编码进程（暂停/恢复会重启）一个连接，时间戳从 0 重新开始，因此换连接时重启中继进程。
+    """
+    TS_PACKET = 188
+    CHUNK = 188 * 64  # 每次读取的字节数
+    QUEUE_LIMIT = 16 * 1024 * 1024  # 发送队列上限（字节）
+    BACKOFF_INITIAL = 1.0  # 首次重连等待（秒）
+    BACKOFF_MAX = 30.0
+    STABLE_SECONDS = 10.0  # 推流进程稳定运行多久后重置退避时间
+    BITRATE_WINDOW = 5.0  # 码率统计窗口（秒）
+    HLS_SEGMENT_SECONDS = 2
+    HLS_LIST_SIZE = 6
+    
+    @staticmethod
+    def output_kind(target):
+        """推流目标类型：rtmp / srt / hls（其余都按 HLS 目录或 .m3u8 文件处理）"""
+        lower = target.lower()
+        if lower.startswith(('rtmp://', 'rtmps://')):
+            return 'rtmp'
+        if lower.startswith('srt://'):
+            return 'srt'
+        return 'hls'
+    
+    def __init__(self, target):
+        self.target = target
+        self.kind = self.output_kind(target)
+        self.condition = threading.Condition()
+        self.queue = deque()  # (连接序号, TS数据)
+        self.queue_bytes = 0
+        self.generation = 0  # 编码进程连接序号
+        self.closing = False  # 不再接受新连接，发送完队列后退出
+        self.stop_event = threading.Event()  # 立即停止
+        self.process = None
+        self.process_generation = None
+        self.process_started_at = None
+        self.stderr_tail = deque(maxlen=20)
+        self.backoff = self.BACKOFF_INITIAL
+        self.retry_at = 0.0
+        # 统计
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.sent_history = deque()  # (时间, 累计发送字节数)
+        if self.kind == 'hls':
+            self._prepare_hls_output()
+        
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.url = f"tcp://127.0.0.1:{self.server.getsockname()[1]}"
+        self.accept_thread = threading.Thread(target=self._accept_loop, name='stream_accept', daemon=True)
+        self.sender_thread = threading.Thread(target=self._send_loop, name='stream_sender', daemon=True)
+        self.accept_thread.start()
+        self.sender_thread.start()
+        stream_log.info("推流中继已启动: %s -> %s（本地入口 %s）", self.kind, self.target, self.url)
+    
+    def _prepare_hls_output(self):
+        if self.target.lower().endswith('.m3u8'):
+            self.hls_dir = os.path.dirname(os.path.abspath(self.target))
+            self.hls_playlist = os.path.abspath(self.target)
+        else:
+            self.hls_dir = os.path.abspath(self.target)
+            self.hls_playlist = os.path.join(self.hls_dir, 'index.m3u8')
+        os.makedirs(self.hls_dir, exist_ok=True)
+        # 上一次直播留下的播放列表会被 append_list 接着写，开始前删除
+        if os.path.exists(self.hls_playlist):
+            os.remove(self.hls_playlist)
+    
+    def _relay_command(self):
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-fflags', 'nobuffer',
+               '-f', 'mpegts', '-i', 'pipe:0', '-map', '0', '-c', 'copy']
+        if self.kind == 'rtmp':
+            cmd.extend(['-f', 'flv', self.target])
+        elif self.kind == 'srt':
+            cmd.extend(['-f', 'mpegts', self.target])
+        else:
+            cmd.extend([
+                '-f', 'hls',
+                '-hls_time', str(self.HLS_SEGMENT_SECONDS),
+                '-hls_list_size', str(self.HLS_LIST_SIZE),
+                # 重启中继时接着原播放列表写，并标记不连续
+                '-hls_flags', 'delete_segments+append_list+discont_start+independent_segments',
+                '-hls_segment_filename', os.path.join(self.hls_dir, 'live_%05d.ts'),
+                self.hls_playlist
+            ])
+        return cmd
+    
+    def _accept_loop(self):
+        while not self.closing and not self.stop_event.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            with self.condition:
+                self.generation += 1
+                generation = self.generation
+            pending = b''
+            try:
+                with connection:
+                    while not self.stop_event.is_set():
+                        data = connection.recv(self.CHUNK)
+                        if not data:
+                            break
+                        with self.condition:
+                            self.bytes_received += len(data)
+                        # 按 TS 包对齐入队，换中继进程时从完整的包开始
+                        pending += data
+                        cut = len(pending) - len(pending) % self.TS_PACKET
+                        if cut:
+                            self._enqueue(generation, pending[:cut])
+                            pending = pending[cut:]
+            except OSError:
+                pass
+    
+    def _enqueue(self, generation, data):
+        with self.condition:
+            self.queue.append((generation, data))
+            self.queue_bytes += len(data)
+            while self.queue_bytes > self.QUEUE_LIMIT and self.queue:
+                _, dropped = self.queue.popleft()
+                self.queue_bytes -= len(dropped)
+                self.bytes_dropped += len(dropped)
+            self.condition.notify()
+    
+    def _send_loop(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                while not self.queue and not self.closing and not self.stop_event.is_set():
+                    self.condition.wait(0.5)
+                if not self.queue:
+                    break
+                wait = self.retry_at - time.time()
+                if wait > 0 and self.closing:
+                    # 录制已结束而推流仍断开：丢弃剩余数据，不拖慢本地文件的收尾
+                    self.bytes_dropped += self.queue_bytes
+                    self.queue.clear()
+                    self.queue_bytes = 0
+                    break
+                if wait > 0:
+                    # 重连退避中：数据继续留在队列里（超过上限时丢弃最旧的）
+                    self.condition.wait(min(wait, 0.5))
+                    continue
+                generation, data = self.queue.popleft()
+                self.queue_bytes -= len(data)
+            if not self._ensure_process(generation):
+                # 等待重连，数据放回队首
+                with self.condition:
+                    self.queue.appendleft((generation, data))
+                    self.queue_bytes += len(data)
+                continue
+            try:
+                self.process.stdin.write(data)
+                with self.condition:
+                    self.bytes_sent += len(data)
+                    self._note_sent()
+            except (OSError, ValueError) as e:
+                with self.condition:
+                    self.bytes_dropped += len(data)
+                self._on_process_lost(f"推流连接断开: {e}")
+        self._close_process()
+    
+    def _ensure_process(self, generation):
+        """需要时启动（或为新的编码连接重启）中继进程，进程意外退出或启动失败时安排重连并返回 False"""
+        if self.process is not None and self.process.poll() is None and self.process_generation == generation:
+            return True
+        if self.process is not None and self.process.poll() is not None:
+            self._on_process_lost(f"推流进程已退出 (code={self.process.returncode})")
+            return False
+        self._close_process()
+        try:
+            self.process = subprocess.Popen(
+                self._relay_command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+            )
+        except Exception as e:
+            self.last_error = f"无法启动推流进程: {e}"
+            stream_log.warning("%s", self.last_error)
+            self.process = None
+            self._schedule_retry()
+            return False
+        process = self.process
+        
+        def read_stderr():
+            for line in iter(process.stderr.readline, b''):
+                self.stderr_tail.append(line.decode('utf-8', errors='ignore').strip())
+        threading.Thread(target=read_stderr, name='stream_stderr', daemon=True).start()
+        self.process_generation = generation
+        self.process_started_at = time.time()
+        stream_log.info("推流进程已启动 (PID: %s)", process.pid)
+        return True
+    
+    def _on_process_lost(self, reason):
+        if self.process_started_at and time.time() - self.process_started_at >= self.STABLE_SECONDS:
+            self.backoff = self.BACKOFF_INITIAL
+        detail = self.stderr_tail[-1] if self.stderr_tail else ''
+        self.last_error = f"{reason} {detail}".strip()
+        stream_log.warning("%s，%.0f 秒后重连", self.last_error, self.backoff)
+        with self.condition:
+            self.reconnects += 1
+        self._close_process()
+        self._schedule_retry()
+    
+    def _schedule_retry(self):
+        self.retry_at = time.time() + self.backoff
+        self.backoff = min(self.backoff * 2, self.BACKOFF_MAX)
+    
+    def _close_process(self):
+        process = self.process
+        self.process = None
+        self.process_started_at = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    
+    def _note_sent(self):
+        """记录发送进度（调用方持有 self.condition）"""
+        now = time.time()
+        self.sent_history.append((now, self.bytes_sent))
+        while self.sent_history and now - self.sent_history[0][0] > self.BITRATE_WINDOW:
+            self.sent_history.popleft()
+    
+    def bitrate_kbps(self):
+        """最近 BITRATE_WINDOW 秒的平均发送码率"""
+        with self.condition:
+            history = list(self.sent_history)
+        if len(history) < 2 or history[-1][0] <= history[0][0]:
+            return 0.0
+        return round((history[-1][1] - history[0][1]) * 8 / (history[-1][0] - history[0][0]) / 1000, 1)
+    
+    def metrics(self):
+        process = self.process
+        # 计数器由接收、发送两个线程更新，在锁内取一致的快照
+        with self.condition:
+            counters = {
+                'bitrate_kbps': self.bitrate_kbps(),
+                'bytes_received': self.bytes_received,
+                'bytes_sent': self.bytes_sent,
+                'bytes_dropped': self.bytes_dropped,
+                'queue_bytes': self.queue_bytes,
+                'reconnects': self.reconnects,
+            }
+        return {
+            'target': self.target,
+            'kind': self.kind,
+            'connected': process is not None and process.poll() is None,
+            **counters,
+            'last_error': self.last_error,
+            'playlist': self.hls_playlist if self.kind == 'hls' else None,
+        }
+    
+    def close(self, drain_timeout=10.0):
+        """编码进程结束后调用：发送完队列中剩余的数据（最多等待 drain_timeout 秒）后关闭"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        try:
+            self.server.close()
+        except OSError:
+            pass
+        self.sender_thread.join(timeout=drain_timeout)
+        if self.sender_thread.is_alive():
+            self.stop_event.set()
+            self.sender_thread.join(timeout=5)
+        counters = self.metrics()
+        stream_log.info("推流中继已关闭: 发送 %s 字节，丢弃 %s 字节，重连 %s 次",
+                        counters['bytes_sent'], counters['bytes_dropped'], counters['reconnects'])
+
+class RecordingScheduler:
+    """定时录制与自动停止条件 - 不依赖Qt，界面和命令行/控制接口共用
+
+    start_at（时间戳）到达时调用 on_start()；attach(session) 后按会话的录制时钟（不含暂停）
+    检查最长时长，按已写入的字节数检查文件大小上限，window_alive() 返回 False 时视为窗口已关闭。
+    任一条件满足时只调用一次 on_stop(原因)，由调用方走正常的停止流程（界面按停止按钮，
+    控制器调用 session.stop()），合并/收尾与手动停止完全相同。
+
+    等待时间按距离下一个截止点的时间计算（Event.wait），醒来后重新读取录制时钟，
+    不依赖界面定时器的固定间隔轮询，界面繁忙时也不会延后。
+    """
+    SIZE_CHECK_INTERVAL = 0.5  # 检查文件大小的间隔（秒）
+    WINDOW_CHECK_INTERVAL = 0.2  # 检查窗口是否存在的间隔（秒）
+    IDLE_INTERVAL = 1.0  # 没有需要检查的条件（或暂停中）时的最长等待
+    REASONS = {'duration': '已达到设定的录制时长', 'size': '已达到设定的文件大小',
+               'window_closed': '录制的窗口已关闭'}
+    
+    def __init__(self, start_at=None, max_duration=None, max_bytes=None, window_alive=None,
+                 on_start=None, on_stop=None):
+        self.start_at = float(start_at) if start_at else None
+        self.max_duration = float(max_duration) if max_duration else None
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self.window_alive = window_alive
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self.session = None
+        self.stop_reason = None
+        self.cancel_event = threading.Event()
+        self.wake_event = threading.Event()  # 外部通知（如窗口关闭）时立即检查
+        self.fired_lock = threading.Lock()
+        self.start_thread = None
+        self.watch_thread = None
+    
+    def has_stop_conditions(self):
+        return bool(self.max_duration or self.max_bytes or self.window_alive)
+    
+    def arm_start(self):
+        """在 start_at 时刻调用 on_start（start_at 为空或已过时立即调用）"""
+        self.start_thread = threading.Thread(target=self._start_loop, name='recording_schedule_start', daemon=True)
+        self.start_thread.start()
+    
+    def _start_loop(self):
+        # 按剩余时间等待，每次最多 IDLE_INTERVAL 秒，系统时间被调整后也能及时重新计算
+        while self.start_at and not self.cancel_event.is_set():
+            remaining = self.start_at - time.time()
+            if remaining <= 0:
+                break
+            self.cancel_event.wait(min(remaining, self.IDLE_INTERVAL))
+        if self.cancel_event.is_set():
+            return
+        capture_log.info("到达定时录制开始时间")
+        try:
+            self.on_start()
+        except Exception as e:
+            capture_log.exception("定时开始录制失败: %s", e)
+    
+    def attach(self, session):
+        """开始监视录制会话的停止条件（会话开始采集前调用也可以）"""
+        self.session = session
+        if not self.has_stop_conditions():
+            return
+        self.watch_thread = threading.Thread(target=self._watch_loop, name='recording_schedule_stop', daemon=True)
+        self.watch_thread.start()
+    
+    def notify_window_closed(self):
+        """录制的窗口已关闭（界面检测窗口位置时发现），立即按停止条件处理"""
+        if self.window_alive is not None:
+            self.window_alive = lambda: False
+            self.wake_event.set()
     
+    def cancel(self):
+        self.cancel_event.set()
+        self.wake_event.set()
+    
+    def _watch_loop(self):
+        session = self.session
+        # 等待会话开始采集：录制时钟从 FFmpeg 开始采集时计时
+        while not session.started_future.done():
+            if self.cancel_event.wait(0.05):
+                return
+        if session.started_future.exception() is not None:
+            return
+        while not self.cancel_event.is_set() and session.running and not session.completion_future.done():
+            reason = self._check(session)
+            if reason is not None:
+                self._fire_stop(reason)
+                return
+            self.wake_event.wait(self._next_wait(session))
+            self.wake_event.clear()
+    
+    def _check(self, session):
+        if self.max_duration and session.elapsed_seconds() >= self.max_duration:
+            return 'duration'
+        if self.max_bytes and session.bytes_written() >= self.max_bytes:
+            return 'size'
+        if self.window_alive is not None:
+            try:
+                if not self.window_alive():
+                    return 'window_closed'
+            except Exception as e:
+                capture_log.warning("检查录制窗口失败: %s", e)
+        return None
+    
+    def _next_wait(self, session):
+        waits = [self.IDLE_INTERVAL]
+        if self.max_duration and not session.paused:
+            waits.append(self.max_duration - session.elapsed_seconds())
+        if self.max_bytes:
+            waits.append(self.SIZE_CHECK_INTERVAL)
+        if self.window_alive is not None:
+            waits.append(self.WINDOW_CHECK_INTERVAL)
+        return max(0.01, min(waits))
+    
+    def _fire_stop(self, reason):
+        with self.fired_lock:
+            if self.stop_reason is not None:
+                return
+            self.stop_reason = reason
+        elapsed = self.session.elapsed_seconds() if self.session is not None else 0.0
+        capture_log.info("%s（录制 %.2f 秒），自动停止录制", self.REASONS.get(reason, reason), elapsed)
+        try:
+            self.on_stop(reason)
+        except Exception as e:
+            capture_log.exception("自动停止录制失败: %s", e)
+    
+    def summary(self):
+        """计划与停止条件（可直接序列化为JSON）"""
+        remaining = None
+        if self.max_duration and self.session is not None:
+            remaining = round(max(0.0, self.max_duration - self.session.elapsed_seconds()), 3)
+        return {
+            'start_at': datetime.fromtimestamp(self.start_at).isoformat(timespec='seconds') if self.start_at else None,
+            'max_duration': self.max_duration,
+            'max_bytes': self.max_bytes,
+            'stop_with_window': self.window_alive is not None,
+            'remaining_seconds': remaining,
+            'stop_reason': self.stop_reason,
+        }
+
+
+class SessionTracer:
+    """录制会话分段计时 - 记录各阶段耗时，导出为 Chrome/Perfetto 可打开的 trace JSON
+
+    用法：
+        with tracer.span('encoder_detection'): ...
+        token = tracer.begin('pause_teardown'); ...; tracer.end(token)
+    """
+    TRACE_KEEP = 20  # 保留最近的trace文件数量
+    
+    def __init__(self, name='recording', enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self.events = []
+        self.open_spans = {}
+        self.lock = threading.Lock()
+        self.base = time.perf_counter()
+        self.next_token = 1
+    
+    def _now_us(self):
+        return (time.perf_counter() - self.base) * 1000000
+    
+    def begin(self, name, category='recording', **args):
+        """开始一个阶段，返回用于 end() 的标记"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            token = self.next_token
+            self.next_token += 1
+            self.open_spans[token] = (name, category, self._now_us(), threading.get_ident(), args)
+        return token
+    
+    def end(self, token, **args):
+        """结束 begin() 开始的阶段"""
+        if not self.enabled or token is None:
+            return
+        with self.lock:
+            span = self.open_spans.pop(token, None)
+            if span is None:
+                return
+            name, category, start, tid, span_args = span
+            span_args.update(args)
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'ts': round(start, 1),
+                'dur': round(self._now_us() - start, 1), 'pid': os.getpid(), 'tid': tid, 'args': span_args
+            })
+    
+    def span(self, name, category='recording', **args):
+        """上下文管理器形式的阶段计时"""
+        from contextlib import contextmanager
+        
+        @contextmanager
+        def _span():
+            token = self.begin(name, category, **args)
+            try:
+                yield
+            finally:
+                self.end(token)
+        return _span()
+    
+    def instant(self, name, category='recording', **args):
+        """记录一个时间点事件"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'i', 's': 't', 'ts': round(self._now_us(), 1),
+                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args
+            })
+    
+    def end_all(self):
+        """结束所有未结束的阶段（标记为未完成）"""
+        for token in list(self.open_spans):
+            self.end(token, unfinished=True)
+    
+    def export(self, path):
+        """导出为 Chrome trace JSON"""
+        if not self.enabled:
+            return None
+        self.end_all()
+        with self.lock:
+            events = list(self.events)
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0, 'args': {'name': self.name}}]
+        for tid in sorted({event['tid'] for event in events}):
+            metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                             'args': {'name': thread_names.get(tid, str(tid))}})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        return path
+    
+    @classmethod
+    def trace_dir(cls):
+        return os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具', 'traces')
+    
+    @classmethod
+    def prune(cls, directory=None):
+        """只保留最近 TRACE_KEEP 个trace文件"""
+        directory = directory or cls.trace_dir()
+        try:
+            traces = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.trace.json')]
+            traces.sort(key=os.path.getmtime, reverse=True)
+            for path in traces[cls.TRACE_KEEP:]:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# 未启用计时时使用的空实现（音频录制器等的默认值）
+NULL_TRACER = SessionTracer(enabled=False)
+
+
+class SessionEvent:
+    """录制会话事件 - 与 pyqtSignal 相同的 connect/disconnect/emit 用法，但不依赖Qt"""
+    def __init__(self):
+        self.callbacks = []
+        self.lock = threading.Lock()
+    
+    def connect(self, callback):
+        with self.lock:
+            self.callbacks.append(callback)
+    
+    def disconnect(self, callback=None):
+        with self.lock:
+            if callback is None:
+                self.callbacks = []
+            else:
+                self.callbacks = [cb for cb in self.callbacks if cb != callback]
+    
+    def emit(self, *args):
+        with self.lock:
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                capture_log.exception("录制会话事件回调出错: %s", e)
+
+
+class RecordingSession:
+    """录制会话 - 使用 FFmpeg 实现，类似 ShareX；不依赖任何Qt部件，可脚本化/无界面运行
+
+    用法：
+        session = RecordingSession(region, filepath, fps=30, ...)
+        session.start().result()           # 等待 FFmpeg 开始采集
+        session.pause(); session.resume()
+        session.update_region({...})
+        filepath, size = session.stop().result()  # 等待合并/混音完成
+    """
     def __init__(self, region, filepath, fps=30, microphone_enabled=False, audio_enabled=True, 
                  microphone_device=None, audio_device=None, quality='高质量', audio_quality='高音质', show_cursor=True, 
-                 camera_device=None, camera_enabled=False):
-        super().__init__()
+                 camera_device=None, camera_enabled=False, settings=None, capture_source=None,
+                 audio_recorder_factory=None, cursor_reader=None, camera_index=None, camera_source=None):
+        # 会话事件（对应 RecordingThread 的同名Qt信号）
+        self.recording_failed = SessionEvent()  # 录制失败，参数：错误信息
+        self.video_processing_complete = SessionEvent()  # 视频处理完成，参数：文件路径、文件大小
+        self.merge_progress = SessionEvent()  # 合并进度，参数：消息、当前进度、总进度
+        self.resource_warning = SessionEvent()  # 资源警告，参数：类型、提示信息
+        
+        # 异步结果：采集开始、处理完成
+        from concurrent.futures import Future
+        self.started_future = Future()
+        self.completion_future = Future()
+        self.recording_failed.connect(self._on_session_failed)
+        self.video_processing_complete.connect(self._on_session_complete)
+        self.worker_thread = None  # 无界面运行时的采集线程
+        
+        # 录制时钟（不含暂停时长，与是否录制音频无关）
+        self.clock_started_at = None
+        self.clock_paused_at = None
+        self.clock_paused_total = 0.0
+        self.clock_stopped_at = None  # 停止后时钟不再走，停止后读取的采集帧数不包含合并耗时
+        
+        # 开始录制时的配置快照（只读），录制过程中不受设置修改影响
+        if settings is None:
+            from types import MappingProxyType
+            settings = MappingProxyType(ConfigStore.defaults())
+        self.settings = settings
         self.region = region
         self.filepath = filepath
         self.fps = fps
@@ -816,6 +2196,15 @@ class RecordingThread(QThread):
         self.show_cursor = show_cursor  # 是否显示鼠标指针
         self.camera_device = camera_device  # 摄像头设备名称
         self.camera_enabled = camera_enabled  # 是否启用摄像头录制
+        self.camera_index = camera_index  # 摄像头的 OpenCV 设备索引（与预览窗口共用同一个采集）
+        self.camera_capture = None  # 共享摄像头采集（CameraCapture）
+        self.camera_feed = None  # 当前 FFmpeg 进程的摄像头原始帧连接
+        self.camera_source = camera_source  # 合成摄像头画面（lavfi，如 testsrc），用于基准测试
+        self.camera_size = None  # 送入 FFmpeg 的摄像头帧尺寸 (宽, 高)
+        self.pip_mask_input = False  # 摄像头输入之后是否跟着遮罩图输入
+        self.pip_mask_path = None
+        self.capture_source = capture_source  # 合成画面源（lavfi，如 testsrc2/mandelbrot），为空时捕获屏幕
+        self.audio_recorder_factory = audio_recorder_factory  # 音频录制器工厂 (kind, device_name)，为空时使用真实设备
         self.running = False
         self.paused = False
         self.ffmpeg_process = None
@@ -832,7 +2221,7 @@ class RecordingThread(QThread):
         self.base_filepath = filepath  # 原始文件路径
         import tempfile
         self.segment_dir = tempfile.mkdtemp(prefix='recording_segments_')  # 片段存储目录
-        print(f"DEBUG: 创建片段存储目录: {self.segment_dir}")
+        capture_log.info("创建片段存储目录: %s", self.segment_dir)
         
         # 片段列表管理（序列化）
         self.segment_list_file = os.path.join(self.segment_dir, 'segment_list.json')  # 片段列表文件
@@ -840,17 +2229,47 @@ class RecordingThread(QThread):
         self.recording_start_time = None  # 录制开始时间（用于计算音频时间范围）
         self.last_segment_end_time = 0.0  # 上一个片段的结束时间（用于计算音频时间范围）
         
+        # 分段计时（每次会话导出一个trace文件）
+        self.tracer = SessionTracer(os.path.basename(filepath))
+        self.trace_file = None
+        self.finalize_span = None
+        
+        # 资源采样（采集开始后启动，处理完成后停止）
+        self.resource_sampler = ResourceSampler(self, interval=max(0.1, float(self.settings.get('telemetry_interval', 1.0))))
+        
+        # 延时摄影：每 timelapse_interval 秒采集一帧，按录制帧率播放（0 表示关闭）。
+        # 同一个 FFmpeg 进程持续运行，两帧之间采集设备空闲等待，编码器不重复初始化
+        self.timelapse_interval = max(0.0, float(self.settings.get('timelapse_interval', 0)))
+        if self.timelapse_interval:
+            # 加速后的画面无法与实时声音、摄像头画面对齐，延时摄影只录屏幕画面
+            self.audio_enabled = False
+            self.microphone_enabled = False
+            self.camera_enabled = False
+            capture_log.info("延时摄影：每 %g 秒采集一帧，按 %s FPS 播放（%g 倍速）",
+                             self.timelapse_interval, self.fps, self._timelapse_speedup())
+        
+        # 自动分段：FFmpeg 的 segment 封装器在运行中按时长/大小于关键帧处切换到下一个文件，
+        # 每个分段关闭时即完整可播放，停止时不需要拼接
+        self.split_minutes = float(self.settings.get('split_minutes', 0))
+        self.split_size_gb = int(self.settings.get('split_size_gb', 0))
+        self.split_enabled = bool(self.split_minutes or self.split_size_gb)
+        stem, ext = os.path.splitext(filepath)
+        self.split_pattern = f"{stem}_part%03d{ext or '.mp4'}"  # 分段文件名（从 000 开始编号）
+        self.split_seconds = None  # 实际分段时长（启动编码进程时按编码器计算）
+        self.ffmpeg_audio_inputs = []  # 自动分段时由 FFmpeg 直接采集的音频输入：[(类型, 输入参数)]
+        
         # 初始化系统音频录制器
-        self.system_audio_recorder = SystemAudioRecorder() if HAS_PYAUDIO_WPATCH else None
+        # 自动分段时音频由 FFmpeg 直接采集并写入每个分段，不使用单独的录音文件（否则停止时仍要逐段合并）
+        self.system_audio_recorder = None if self.split_enabled else self._create_audio_recorder('system')
         
         # 初始化麦克风音频录制器（参考SystemAudioRecorder实现）
         self.microphone_audio_recorder = None
-        if self.microphone_enabled and self.microphone_device:
+        if self.microphone_enabled and self.microphone_device and not self.split_enabled:
             try:
-                self.microphone_audio_recorder = MicrophoneAudioRecorder(device_name=self.microphone_device)
-                print(f"DEBUG: 初始化麦克风音频录制器，设备: {self.microphone_device}")
+                self.microphone_audio_recorder = self._create_audio_recorder('microphone')
+                capture_log.info("初始化麦克风音频录制器，设备: %s", self.microphone_device)
             except Exception as e:
-                print(f"DEBUG: 初始化麦克风音频录制器失败: {e}")
+                capture_log.warning("初始化麦克风音频录制器失败: %s", e)
                 self.microphone_audio_recorder = None
         
         # 音频录制器操作锁（防止多线程同时操作导致崩溃）
@@ -865,6 +2284,42 @@ class RecordingThread(QThread):
         self.microphone_audio_file = None  # 麦克风音频文件
         self.audio_saved = False
         self.microphone_audio_saved = False  # 麦克风音频保存状态
+        
+        # 最终文件信息（录制结束时直接写入文件库索引，不需要再用ffprobe探测）
+        self.recorded_duration = None  # 有效录制时长（不含暂停）
+        self.output_has_audio = False  # 最终文件是否已合并音频
+        
+        # 可变帧率：画面静止时丢弃重复帧，最长间隔 vfr_max_interval 秒保留一帧
+        # 延时摄影的画面本来就稀疏，不再去除重复帧
+        self.vfr_enabled = bool(self.settings.get('vfr_enabled', False)) and not self.timelapse_interval
+        
+        # 输出分辨率上限（0 表示按原始分辨率编码）与缩放算法
+        self.max_output_height = int(self.settings.get('max_output_height', 0))
+        self.scale_algorithm = self.settings.get('scale_algorithm', 'fast_bilinear')
+        
+        # 代理文件：同一次采集额外编码一份低码率小尺寸视频（0 表示不生成）
+        self.proxy_height = int(self.settings.get('proxy_height', 0))
+        self.proxy_bitrate = int(self.settings.get('proxy_bitrate', 800))  # kbps
+        self.proxy_filepath = os.path.splitext(filepath)[0] + '_proxy.mp4' if self.proxy_height else None
+        self.proxy_dir = None  # 代理片段目录（第一次启动编码进程时创建）
+        self.proxy_segments = []  # 每个 FFmpeg 进程对应一个代理片段
+        self.vfr_max_interval = max(0.1, float(self.settings.get('vfr_max_interval', 2.0)))
+        self.encoded_frames = {}  # FFmpeg进程PID -> 已编码帧数
+        
+        # 推流：同一份编码结果经 tee 同时写入本地文件和推流中继（RTMP/SRT 地址或 HLS 目录）
+        self.stream_url = (self.settings.get('stream_url') or '').strip() if self.settings.get('stream_enabled') else ''
+        self.stream_relay = None
+        
+        # 摄像头画中画布局：角落、宽度、边距与形状（rect / rounded / circle）
+        self.pip_corner = self.settings.get('pip_corner', 'top_right')
+        self.pip_width = max(16, int(self.settings.get('pip_width', 320)) // 2 * 2)
+        self.pip_margin = max(0, int(self.settings.get('pip_margin', 10)))
+        self.pip_shape = self.settings.get('pip_shape', 'rect')
+        
+        # 动态鼠标区域：只录制跟随鼠标指针的固定大小视口（在 FFmpeg 内裁剪，不重启进程）
+        self.mouse_follow = bool(self.settings.get('record_mouse_region', False))
+        self.cursor_reader = cursor_reader  # 指针位置读取函数，为空时读取真实鼠标
+        self.mouse_follower = None
     
     def _get_ffmpeg_dshow_audio_device(self, system_device_name):
         """获取FFmpeg可用的dshow音频设备名称（通过匹配系统设备名称）"""
@@ -875,12 +2330,13 @@ class RecordingThread(QThread):
             import subprocess
             # 使用FFmpeg列出所有dshow音频设备
             test_cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
-            test_result = subprocess.run(
-                test_cmd,
-                capture_output=True,
-                timeout=3,
-                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            )
+            with self.tracer.span('device_probe', cmd=' '.join(test_cmd[3:5])):
+                test_result = subprocess.run(
+                    test_cmd,
+                    capture_output=True,
+                    timeout=3,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
             test_output = test_result.stderr.decode('utf-8', errors='ignore')
             
             # 查找音频设备列表
@@ -904,13 +2360,13 @@ class RecordingThread(QThread):
                         if device_name and device_name not in audio_devices:
                             audio_devices.append(device_name)
             
-            print(f"DEBUG: FFmpeg检测到的dshow音频设备: {audio_devices}")
-            print(f"DEBUG: 系统设备名称: {system_device_name}")
+            capture_log.info("FFmpeg检测到的dshow音频设备: %s", audio_devices)
+            capture_log.info("系统设备名称: %s", system_device_name)
             
             # 尝试精确匹配
             for device in audio_devices:
                 if device == system_device_name:
-                    print(f"DEBUG: 精确匹配到设备: {device}")
+                    capture_log.info("精确匹配到设备: %s", device)
                     return device
             
             # 尝试部分匹配（移除括号内容后匹配）
@@ -918,24 +2374,24 @@ class RecordingThread(QThread):
             for device in audio_devices:
                 device_clean = device.split(' (')[0].strip()
                 if device_clean == system_name_clean:
-                    print(f"DEBUG: 部分匹配到设备: {device} (系统名称: {system_device_name})")
+                    capture_log.info("部分匹配到设备: %s (系统名称: %s)", device, system_device_name)
                     return device
             
             # 尝试包含匹配
             for device in audio_devices:
                 if system_device_name.lower() in device.lower() or device.lower() in system_device_name.lower():
-                    print(f"DEBUG: 包含匹配到设备: {device} (系统名称: {system_device_name})")
+                    capture_log.info("包含匹配到设备: %s (系统名称: %s)", device, system_device_name)
                     return device
             
             # 如果都匹配不上，返回第一个可用的设备（作为备选）
             if audio_devices:
-                print(f"DEBUG: 无法匹配设备，使用第一个可用设备: {audio_devices[0]}")
+                capture_log.warning("无法匹配设备，使用第一个可用设备: %s", audio_devices[0])
                 return audio_devices[0]
             
-            print(f"DEBUG: 未找到FFmpeg可用的音频设备")
+            capture_log.info("未找到FFmpeg可用的音频设备")
             return None
         except Exception as e:
-            print(f"DEBUG: 获取FFmpeg dshow音频设备失败: {e}")
+            capture_log.warning("获取FFmpeg dshow音频设备失败: %s", e)
             return None
 
     def detect_available_video_encoder(self):
@@ -969,7 +2425,7 @@ class RecordingThread(QThread):
                     if encoder in encoder_output:
                         for line in encoder_output.split('\n'):
                             if encoder in line and line.strip().startswith('V'):
-                                print(f"DEBUG: 找到可用软件编码器: {encoder}")
+                                capture_log.info("找到可用软件编码器: %s", encoder)
                                 return encoder
                 
                 # 如果没有找到软件编码器，再尝试硬件编码器
@@ -978,7 +2434,7 @@ class RecordingThread(QThread):
                     if encoder in encoder_output:
                         for line in encoder_output.split('\n'):
                             if encoder in line and line.strip().startswith('V'):
-                                print(f"DEBUG: 找到硬件编码器: {encoder} (可能不稳定)")
+                                capture_log.info("找到硬件编码器: %s (可能不稳定)", encoder)
                                 return encoder
                 
                 # 最后尝试优先级列表中的其他编码器
@@ -987,23 +2443,23 @@ class RecordingThread(QThread):
                         if encoder in encoder_output:
                             for line in encoder_output.split('\n'):
                                 if encoder in line and line.strip().startswith('V'):
-                                    print(f"DEBUG: 找到可用编码器: {encoder}")
+                                    capture_log.info("找到可用编码器: %s", encoder)
                                     return encoder
                 
-                print("DEBUG: 警告：未找到常用编码器，尝试查找任何视频编码器")
+                capture_log.warning("未找到常用编码器，尝试查找任何视频编码器")
                 # 如果优先列表都没有，尝试找第一个可用的视频编码器
                 for line in encoder_output.split('\n'):
                     if line.strip().startswith('V') and '264' in line:
                         parts = line.split()
                         if len(parts) > 1:
                             encoder_name = parts[1]
-                            print(f"DEBUG: 找到 H.264 编码器: {encoder_name}")
+                            capture_log.info("找到 H.264 编码器: %s", encoder_name)
                             return encoder_name
                 
-                print("DEBUG: 错误：未找到可用的视频编码器")
+                capture_log.error("未找到可用的视频编码器")
                 return None
         except Exception as e:
-            print(f"DEBUG: 检测编码器时出错: {e}")
+            capture_log.warning("检测编码器时出错: %s", e)
         
         return None
     
@@ -1012,9 +2468,9 @@ class RecordingThread(QThread):
         try:
             with open(self.segment_list_file, 'w', encoding='utf-8') as f:
                 json.dump(self.segment_list, f, indent=2, ensure_ascii=False)
-            print(f"DEBUG: 片段列表已保存，共 {len(self.segment_list)} 个片段")
+            capture_log.info("片段列表已保存，共 %s 个片段", len(self.segment_list))
         except Exception as e:
-            print(f"DEBUG: 保存片段列表失败: {e}")
+            capture_log.warning("保存片段列表失败: %s", e)
     
     def _load_segment_list(self):
         """从JSON文件加载片段列表"""
@@ -1022,25 +2478,25 @@ class RecordingThread(QThread):
             if os.path.exists(self.segment_list_file):
                 with open(self.segment_list_file, 'r', encoding='utf-8') as f:
                     self.segment_list = json.load(f)
-                print(f"DEBUG: 片段列表已加载，共 {len(self.segment_list)} 个片段")
+                capture_log.info("片段列表已加载，共 %s 个片段", len(self.segment_list))
                 # 同步到video_segments列表
                 self.video_segments = [seg['video_path'] for seg in self.segment_list if os.path.exists(seg['video_path'])]
                 return True
         except Exception as e:
-            print(f"DEBUG: 加载片段列表失败: {e}")
+            capture_log.warning("加载片段列表失败: %s", e)
         return False
     
     def _add_segment_to_list(self, video_path, start_time=None, end_time=None):
         """添加片段到列表"""
         try:
             if not os.path.exists(video_path):
-                print(f"DEBUG: 警告：片段文件不存在，跳过添加: {video_path}")
+                capture_log.warning("片段文件不存在，跳过添加: %s", video_path)
                 return False
             
             # 如果已经存在，跳过
             for seg in self.segment_list:
                 if seg['video_path'] == video_path:
-                    print(f"DEBUG: 片段已在列表中，跳过: {video_path}")
+                    capture_log.info("片段已在列表中，跳过: %s", video_path)
                     return False
             
             # 计算时间范围
@@ -1070,12 +2526,10 @@ class RecordingThread(QThread):
             # 保存到文件
             self._save_segment_list()
             
-            print(f"DEBUG: 已添加片段到列表: index={segment_info['index']}, path={video_path}, time={start_time:.2f}-{end_time:.2f}")
+            capture_log.info("已添加片段到列表: index=%s, path=%s, time=%.2f-%.2f", segment_info['index'], video_path, start_time, end_time)
             return True
         except Exception as e:
-            print(f"DEBUG: 添加片段到列表失败: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("添加片段到列表失败: %s", e)
             return False
     
     def _update_last_segment_end_time(self, end_time):
@@ -1086,7 +2540,7 @@ class RecordingThread(QThread):
                 self.last_segment_end_time = end_time
                 self._save_segment_list()
         except Exception as e:
-            print(f"DEBUG: 更新片段结束时间失败: {e}")
+            capture_log.warning("更新片段结束时间失败: %s", e)
     
     def _force_close_ffmpeg_process(self, process, timeout=5):
         """强制关闭FFmpeg进程，确保进程被完全关闭"""
@@ -1170,19 +2624,19 @@ class RecordingThread(QThread):
                         with self.ffmpeg_process_lock:
                             if process in self.ffmpeg_processes:
                                 self.ffmpeg_processes.remove(process)
-                        print(f"DEBUG: 使用Windows API强制终止FFmpeg进程: {pid}")
+                        capture_log.info("使用Windows API强制终止FFmpeg进程: %s", pid)
                         return True
             except Exception as win_error:
-                print(f"DEBUG: 使用Windows API终止进程失败: {win_error}")
+                capture_log.warning("使用Windows API终止进程失败: %s", win_error)
             
             # 如果所有方法都失败，从列表中移除并返回False
             with self.ffmpeg_process_lock:
                 if process in self.ffmpeg_processes:
                     self.ffmpeg_processes.remove(process)
-            print(f"DEBUG: 警告：无法完全关闭FFmpeg进程 (PID: {process.pid})")
+            capture_log.warning("无法完全关闭FFmpeg进程 (PID: %s)", process.pid)
             return False
         except Exception as e:
-            print(f"DEBUG: 关闭FFmpeg进程时出错: {e}")
+            capture_log.warning("关闭FFmpeg进程时出错: %s", e)
             # 确保从列表中移除
             with self.ffmpeg_process_lock:
                 if process in self.ffmpeg_processes:
@@ -1197,12 +2651,12 @@ class RecordingThread(QThread):
         
         for process in processes_to_close:
             if process and process.poll() is None:
-                print(f"DEBUG: 清理残留的FFmpeg进程 (PID: {process.pid})")
+                capture_log.info("清理残留的FFmpeg进程 (PID: %s)", process.pid)
                 self._force_close_ffmpeg_process(process, timeout=2)
         
         # 也清理当前进程
         if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-            print(f"DEBUG: 清理当前FFmpeg进程 (PID: {self.ffmpeg_process.pid})")
+            capture_log.info("清理当前FFmpeg进程 (PID: %s)", self.ffmpeg_process.pid)
             self._force_close_ffmpeg_process(self.ffmpeg_process, timeout=2)
             self.ffmpeg_process = None
     
@@ -1217,9 +2671,12 @@ class RecordingThread(QThread):
                 if result.returncode != 0:
                     return False
             except (FileNotFoundError, subprocess.TimeoutExpired):
-                print("DEBUG: FFmpeg 未安装或不可用")
+                capture_log.info("FFmpeg 未安装或不可用")
                 return False
             
+            # 推流中继先开始监听，编码进程启动时连接
+            self._start_stream_relay()
+            
             # 使用锁读取区域参数
             with self.region_lock:
                 recording_region = self.region.copy()
@@ -1231,7 +2688,7 @@ class RecordingThread(QThread):
             adjusted_height = original_height if original_height % 2 == 0 else original_height - 1
             
             if adjusted_width != original_width or adjusted_height != original_height:
-                print(f"DEBUG: 调整区域尺寸从 {original_width}x{original_height} 到 {adjusted_width}x{adjusted_height} (H.264要求偶数尺寸)")
+                capture_log.info("调整区域尺寸从 %sx%s 到 %sx%s (H.264要求偶数尺寸)", original_width, original_height, adjusted_width, adjusted_height)
                 recording_region['width'] = adjusted_width
                 recording_region['height'] = adjusted_height
                 # 更新self.region
@@ -1239,6 +2696,18 @@ class RecordingThread(QThread):
                     self.region['width'] = adjusted_width
                     self.region['height'] = adjusted_height
             
+            # 动态鼠标区域：视口停在当前位置，进程启动后再跟随指针
+            if self.mouse_follow:
+                if self.mouse_follower is None:
+                    self.mouse_follower = MouseFollower(
+                        recording_region,
+                        self.settings.get('mouse_region_width', 1280),
+                        self.settings.get('mouse_region_height', 720),
+                        self.fps,
+                        cursor_reader=self.cursor_reader
+                    )
+                self.mouse_follower.begin_process(recording_region)
+            
             # 启动系统音频录制（如果启用且可用）
             # 检查是否已经在录制（恢复暂停时不需要重新启动）
             system_audio_file = None
@@ -1247,7 +2716,7 @@ class RecordingThread(QThread):
             if self.audio_enabled and self.system_audio_recorder:
                 # 检查系统音频录制器是否已经在运行
                 if hasattr(self.system_audio_recorder, 'is_recording') and self.system_audio_recorder.is_recording:
-                    print("DEBUG: 系统音频录制器已在运行（恢复暂停），继续使用")
+                    capture_log.info("系统音频录制器已在运行（恢复暂停），继续使用")
                     # 生成临时音频文件路径（应该已经存在）
                     import tempfile
                     system_audio_file = os.path.join(tempfile.gettempdir(), "system_audio_recording.wav")
@@ -1259,26 +2728,26 @@ class RecordingThread(QThread):
                     system_audio_file = os.path.join(tempfile.gettempdir(), "system_audio_recording.wav")
                     # 保存到实例变量
                     self.system_audio_file = system_audio_file
-                    print(f"DEBUG: 准备启动系统音频录制，音频文件路径: {system_audio_file}")
-                    print(f"DEBUG: audio_enabled={self.audio_enabled}, system_audio_recorder={self.system_audio_recorder is not None}")
+                    capture_log.info("准备启动系统音频录制，音频文件路径: %s", system_audio_file)
+                    capture_log.info("audio_enabled=%s, system_audio_recorder=%s", self.audio_enabled, self.system_audio_recorder is not None)
                     if self.system_audio_recorder.start_recording():
-                        print("DEBUG: 系统音频录制已启动")
+                        capture_log.info("系统音频录制已启动")
                     else:
-                        print("DEBUG: 无法启动系统音频录制，将使用FFmpeg直接录制音频")
+                        capture_log.warning("无法启动系统音频录制，将使用FFmpeg直接录制音频")
                         system_audio_file = None
                         self.system_audio_file = None
             elif not self.audio_enabled:
-                print("DEBUG: 音频录制已禁用（audio_enabled=False）")
+                capture_log.info("音频录制已禁用（audio_enabled=False）")
                 self.system_audio_file = None
             elif not self.system_audio_recorder:
-                print("DEBUG: 系统音频录制器不可用（pyaudiowpatch未安装或初始化失败）")
+                capture_log.warning("系统音频录制器不可用（pyaudiowpatch未安装或初始化失败）")
                 self.system_audio_file = None
             
             # 启动麦克风音频录制器（如果启用）
             if self.microphone_enabled and self.microphone_audio_recorder and not self.microphone_muted:
                 # 检查麦克风音频录制器是否已经在运行
                 if hasattr(self.microphone_audio_recorder, 'is_recording') and self.microphone_audio_recorder.is_recording:
-                    print("DEBUG: 麦克风音频录制器已在运行（恢复暂停），继续使用")
+                    capture_log.info("麦克风音频录制器已在运行（恢复暂停），继续使用")
                     import tempfile
                     microphone_audio_file = os.path.join(tempfile.gettempdir(), "microphone_audio_recording.wav")
                     self.microphone_audio_file = microphone_audio_file
@@ -1287,22 +2756,23 @@ class RecordingThread(QThread):
                     import tempfile
                     microphone_audio_file = os.path.join(tempfile.gettempdir(), "microphone_audio_recording.wav")
                     self.microphone_audio_file = microphone_audio_file
-                    print(f"DEBUG: 准备启动麦克风音频录制，音频文件路径: {microphone_audio_file}")
+                    capture_log.info("准备启动麦克风音频录制，音频文件路径: %s", microphone_audio_file)
                     if self.microphone_audio_recorder.start_recording():
-                        print("DEBUG: 麦克风音频录制已启动")
+                        capture_log.info("麦克风音频录制已启动")
                     else:
-                        print("DEBUG: 无法启动麦克风音频录制")
+                        capture_log.warning("无法启动麦克风音频录制")
                         microphone_audio_file = None
                         self.microphone_audio_file = None
             elif self.microphone_enabled and self.microphone_muted:
-                print("DEBUG: 麦克风已静音，不启动录制")
+                capture_log.info("麦克风已静音，不启动录制")
             elif not self.microphone_audio_recorder:
-                print("DEBUG: 麦克风音频录制器不可用")
+                capture_log.info("麦克风音频录制器不可用")
             
             # 检测可用的视频编码器
-            self.video_encoder = self.detect_available_video_encoder()
+            with self.tracer.span('encoder_detection'):
+                self.video_encoder = self.detect_available_video_encoder()
             if not self.video_encoder:
-                print("DEBUG: 错误：无法找到可用的视频编码器，录制将失败")
+                capture_log.error("无法找到可用的视频编码器，录制将失败")
                 # 停止系统音频录制
                 if system_audio_file and self.system_audio_recorder:
                     self.system_audio_recorder.stop_recording()
@@ -1314,7 +2784,7 @@ class RecordingThread(QThread):
             if self.recording_start_time is None:
                 self.recording_start_time = time.time()
                 self.last_segment_end_time = 0.0
-                print(f"DEBUG: 录制开始时间已记录: {self.recording_start_time}")
+                capture_log.info("录制开始时间已记录: %s", self.recording_start_time)
             
             # 注意：首次录制时使用原始文件路径，只有在区域改变时才使用片段路径
             # update_region方法会负责设置新的片段路径
@@ -1325,75 +2795,38 @@ class RecordingThread(QThread):
             # 视频输入（屏幕捕获）
             # recording_region已经在上面读取并调整了尺寸
             video_input_index = 0
-            if sys.platform == 'win32':
-                # Windows 使用 gdigrab
-                print(f"DEBUG: 使用区域参数开始录制: offset_x={recording_region['left']}, offset_y={recording_region['top']}, size={recording_region['width']}x{recording_region['height']}")
-                gdigrab_options = [
-                    '-f', 'gdigrab',
-                    '-framerate', str(self.fps),
-                    '-offset_x', str(recording_region['left']),
-                    '-offset_y', str(recording_region['top']),
-                    '-video_size', f"{recording_region['width']}x{recording_region['height']}",
-                ]
-                # 如果不需要显示鼠标指针，添加 draw_mouse=0
-                if not self.show_cursor:
-                    gdigrab_options.extend(['-draw_mouse', '0'])
-                gdigrab_options.append('-i')
-                gdigrab_options.append('desktop')
-                cmd.extend(gdigrab_options)
-            else:
-                # Linux 使用 x11grab
-                x11grab_options = [
-                    '-f', 'x11grab',
-                    '-framerate', str(self.fps),
-                    '-video_size', f"{self.region['width']}x{self.region['height']}",
-                ]
-                # 如果不需要显示鼠标指针，添加 show_region=0
-                if not self.show_cursor:
-                    x11grab_options.extend(['-show_region', '0'])
-                x11grab_options.extend(['-i', f":0.0+{self.region['left']},{self.region['top']}"])
-                cmd.extend(x11grab_options)
+            capture_log.info("使用区域参数开始录制: offset_x=%s, offset_y=%s, size=%sx%s", recording_region['left'], recording_region['top'], recording_region['width'], recording_region['height'])
+            cmd.extend(self._screen_input_args(recording_region))
             
             # 摄像头输入（如果启用）
             camera_input_index = None
-            print(f"DEBUG: 检查摄像头录制 - camera_enabled={self.camera_enabled}, camera_device={self.camera_device}")
+            capture_log.info("检查摄像头录制 - camera_enabled=%s, camera_device=%s", self.camera_enabled, self.camera_device)
             if self.camera_enabled and self.camera_device:
-                print(f"DEBUG: 添加摄像头输入: {self.camera_device}")
-                if sys.platform == 'win32':
-                    # Windows 使用 dshow 捕获摄像头
+                capture_log.info("添加摄像头输入: %s", self.camera_device)
+                camera_args = self._camera_input_args()
+                if camera_args:
                     camera_input_index = len(cmd)  # 记录摄像头输入的位置
-                    # 注意：FFmpeg的dshow设备名称可能需要使用不同的格式
-                    # 尝试使用设备名称，如果失败可能需要使用设备索引
-                    camera_input = f'video="{self.camera_device}"'
-                    cmd.extend([
-                        '-f', 'dshow',
-                        '-video_size', '640x480',  # 摄像头分辨率
-                        '-framerate', '30',
-                        '-i', camera_input
-                    ])
-                    print(f"DEBUG: 已添加Windows摄像头输入: {camera_input}")
-                else:
-                    # Linux 使用 v4l2
-                    camera_input_index = len(cmd)
-                    cmd.extend([
-                        '-f', 'v4l2',
-                        '-video_size', '640x480',
-                        '-framerate', '30',
-                        '-i', self.camera_device
-                    ])
-                    print(f"DEBUG: 已添加Linux/Mac摄像头输入: {self.camera_device}")
+                    cmd.extend(camera_args)
+                    capture_log.info("已添加摄像头输入: %s", camera_args[-1])
             elif self.camera_enabled and not self.camera_device:
-                print(f"DEBUG: 警告：摄像头已启用但未选择设备，无法录制摄像头")
+                capture_log.warning("摄像头已启用但未选择设备，无法录制摄像头")
             
             # 音频输入
             has_audio = False
             audio_inputs = []
             audio_input_indices = []  # 记录每个音频输入的索引位置
+            audio_cmd_start = len(cmd)
             
             # 只有当 audio_enabled=True 时才添加音频输入
             # 系统音频（扬声器）- 使用用户选择的设备或默认设备
             # 如果pyaudiowpatch录制失败或不可用，回退到使用FFmpeg直接录制
-            if self.audio_enabled and (not self.system_audio_recorder or not system_audio_file):  # 只有在没有使用新的系统音频录制器或录制失败时才使用旧的方法
+            if self.audio_enabled and self.split_enabled and self.capture_source:
+                # 合成画面源（基准测试）：系统音频用合成正弦波代替声卡
+                audio_inputs.append({'type': 'lavfi', 'device': 'sine', 'index': len(cmd)})
+                cmd.extend(['-re', '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000'])
+                audio_input_indices.append(len(cmd) - 1)
+                has_audio = True
+            elif self.audio_enabled and (not self.system_audio_recorder or not system_audio_file):  # 只有在没有使用新的系统音频录制器或录制失败时才使用旧的方法
                 if sys.platform == 'win32':
                     # Windows: 优先尝试 WASAPI loopback（Windows 10+ 推荐方式）
                     audio_captured = False
@@ -1402,12 +2835,13 @@ class RecordingThread(QThread):
                     try:
                         # 测试 WASAPI 是否可用
                         test_cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'wasapi', '-i', 'dummy']
-                        test_result = subprocess.run(
-                            test_cmd,
-                            capture_output=True,
-                            timeout=3,
-                            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-                        )
+                        with self.tracer.span('device_probe', cmd=' '.join(test_cmd[3:5])):
+                            test_result = subprocess.run(
+                                test_cmd,
+                                capture_output=True,
+                                timeout=3,
+                                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                            )
                         test_output = test_result.stderr.decode('utf-8', errors='ignore')
                         
                         # WASAPI loopback 设备列表格式示例：
@@ -1452,7 +2886,7 @@ class RecordingThread(QThread):
                         # 如果没有匹配到用户选择的设备，使用第一个可用的 loopback 设备
                         if not matched_device and loopback_devices:
                             matched_device = loopback_devices[0]['full']
-                            print(f"DEBUG: 未找到用户选择的设备，使用第一个可用的 loopback 设备: {matched_device}")
+                            capture_log.info("未找到用户选择的设备，使用第一个可用的 loopback 设备: %s", matched_device)
                         
                         if matched_device:
                             # 使用 WASAPI loopback 录制系统音频
@@ -1465,22 +2899,23 @@ class RecordingThread(QThread):
                             audio_input_indices.append(len(cmd) - 1)
                             has_audio = True
                             audio_captured = True
-                            print(f"DEBUG: 使用 WASAPI loopback 录制系统音频: {matched_device}")
+                            capture_log.info("使用 WASAPI loopback 录制系统音频: %s", matched_device)
                     
                     except Exception as e:
-                        print(f"DEBUG: WASAPI loopback 检测失败: {e}")
+                        capture_log.warning("WASAPI loopback 检测失败: %s", e)
                     
                     # 如果 WASAPI 失败，回退到 dshow（立体声混音）
                     if not audio_captured:
                         try:
                             # 测试 dshow 设备
                             test_cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
-                            test_result = subprocess.run(
-                                test_cmd,
-                                capture_output=True,
-                                timeout=3,
-                                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-                            )
+                            with self.tracer.span('device_probe', cmd=' '.join(test_cmd[3:5])):
+                                test_result = subprocess.run(
+                                    test_cmd,
+                                    capture_output=True,
+                                    timeout=3,
+                                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                                )
                             test_output = test_result.stderr.decode('utf-8', errors='ignore')
                             
                             # 查找立体声混音设备
@@ -1516,12 +2951,12 @@ class RecordingThread(QThread):
                                 audio_input_indices.append(len(cmd) - 1)
                                 has_audio = True
                                 audio_captured = True
-                                print(f"DEBUG: 使用 dshow 录制系统音频: {device_name}")
+                                capture_log.info("使用 dshow 录制系统音频: %s", device_name)
                             else:
-                                print(f"DEBUG: 警告：未找到可用的系统音频录制设备（立体声混音或 WASAPI loopback）")
-                                print(f"DEBUG: 提示：Windows 可能需要启用立体声混音设备（在声音设置中启用）")
+                                capture_log.warning("未找到可用的系统音频录制设备（立体声混音或 WASAPI loopback）")
+                                capture_log.info("提示：Windows 可能需要启用立体声混音设备（在声音设置中启用）")
                         except Exception as e:
-                            print(f"DEBUG: dshow 检测失败: {e}")
+                            capture_log.warning("dshow 检测失败: %s", e)
                 else:
                     # Linux/Mac 使用 pulse
                     audio_inputs.append({
@@ -1533,62 +2968,26 @@ class RecordingThread(QThread):
                     audio_input_indices.append(len(cmd) - 1)
                     has_audio = True
             
+            if self.split_enabled:
+                # 自动分段：麦克风也由 FFmpeg 直接采集，每个分段自带完整音轨；
+                # 记下音频输入，暂停/改区域后重启进程时原样复用（不再重新探测设备）
+                self.ffmpeg_audio_inputs = [('system', cmd[audio_cmd_start:])] if has_audio else []
+                if self.microphone_enabled and self.microphone_device:
+                    microphone_args = self._microphone_input_args()
+                    audio_inputs.append({'type': 'microphone', 'device': self.microphone_device, 'index': len(cmd)})
+                    cmd.extend(microphone_args)
+                    audio_input_indices.append(len(cmd) - 1)
+                    self.ffmpeg_audio_inputs.append(('microphone', microphone_args))
+                    has_audio = True
+            
             # 麦克风音频（已移至独立录制器，不再从 FFmpeg 直接录制）
             # 注意：麦克风现在通过 MicrophoneAudioRecorder 单独录制
             # 录制完成后在后台线程中与系统音频混合
-            print(f"DEBUG: 麦克风状态 - microphone_enabled={self.microphone_enabled}, microphone_audio_recorder={self.microphone_audio_recorder is not None}, microphone_muted={self.microphone_muted}")
+            capture_log.info("麦克风状态 - microphone_enabled=%s, microphone_audio_recorder=%s, microphone_muted=%s", self.microphone_enabled, self.microphone_audio_recorder is not None, self.microphone_muted)
             if self.microphone_enabled and not self.microphone_audio_recorder:
-                print(f"DEBUG: 警告：麦克风已启用但录制器不可用，麦克风音频将不会被录制")
+                capture_log.warning("麦克风已启用但录制器不可用，麦克风音频将不会被录制")
             elif self.microphone_enabled and self.microphone_muted:
-                print(f"DEBUG: 麦克风已静音，不录制麦克风音频")
-            
-            # 根据质量设置和编码器类型确定编码参数
-            # CRF 值范围：0-51，值越小质量越高（适用于 libx264, libopenh264 等）
-            quality_crf_map = {
-                '原画质': '18',      # 接近无损
-                '高质量': '23',      # 高质量（默认）
-                '中等质量': '28',    # 中等质量
-                '低质量': '32'       # 低质量
-            }
-            crf_value = quality_crf_map.get(self.quality, '23')
-            
-            # 根据编码器类型调整编码参数
-            # libopenh264 使用 -b:v (bitrate) 而不是 -crf
-            use_bitrate = False
-            use_cq = False
-            if self.video_encoder == 'libopenh264':
-                # OpenH264 使用码率控制
-                quality_bitrate_map = {
-                    '原画质': '10000k',
-                    '高质量': '5000k',
-                    '中等质量': '3000k',
-                    '低质量': '1500k'
-                }
-                bitrate_value = quality_bitrate_map.get(self.quality, '5000k')
-                use_bitrate = True
-            elif 'nvenc' in self.video_encoder:
-                # NVIDIA 硬件编码器使用 -cq (constant quality) 或 -b:v
-                # h264_nvenc 使用 -cq 参数而不是 -crf
-                quality_cq_map = {
-                    '原画质': '18',
-                    '高质量': '23',
-                    '中等质量': '28',
-                    '低质量': '32'
-                }
-                cq_value = quality_cq_map.get(self.quality, '23')
-                use_bitrate = False  # 使用 CQ 而不是码率
-                use_cq = True
-            elif 'qsv' in self.video_encoder or 'amf' in self.video_encoder:
-                # Intel/AMD 硬件编码器使用码率控制
-                quality_bitrate_map = {
-                    '原画质': '8000k',
-                    '高质量': '4000k',
-                    '中等质量': '2500k',
-                    '低质量': '1200k'
-                }
-                bitrate_value = quality_bitrate_map.get(self.quality, '4000k')
-                use_bitrate = True
-                use_cq = False
+                capture_log.info("麦克风已静音，不录制麦克风音频")
             
             # 编码设置
             # 注意：不使用 -movflags +faststart，因为它在录制时可能导致文件不完整
@@ -1596,91 +2995,76 @@ class RecordingThread(QThread):
             
             # 计算输入流索引
             # 视频输入：0
-            # 摄像头输入（如果有）：1
-            # 音频输入：从摄像头之后开始（如果有摄像头则从2开始，否则从1开始）
+            # 摄像头输入（如果有）：1，画中画遮罩图（如果有）：2
+            # 音频输入：从摄像头（和遮罩图）之后开始
             video_stream_index = 0
             camera_stream_index = 1 if camera_input_index is not None else None
-            audio_start_index = 2 if camera_input_index is not None else 1
+            audio_start_index = 1
+            if camera_input_index is not None:
+                audio_start_index += 2 if self.pip_mask_input else 1
             
             if not has_audio:
                 # 仅视频（可能包含摄像头）
                 if camera_input_index is not None:
                     # 有摄像头：需要合成视频
                     # 使用 filter_complex 将屏幕和摄像头合成
-                    filter_complex = f"[0:v]scale={self.region['width']}:{self.region['height']}[screen];" \
-                                   f"[1:v]scale=320:240[camera];" \
-                                   f"[screen][camera]overlay=W-w-10:10[v]"
+                    video_label = 'vmain' if self.proxy_height else 'v'
+                    filter_complex = ';'.join(self._pip_filter_parts(recording_region, video_label))
+                    if self.proxy_height:
+                        filter_complex += f";{self._proxy_branch(video_label)}"
                     # 构建编码参数
-                    encoder_params = ['-c:v', self.video_encoder]
-                    
-                    # 根据编码器类型设置参数
-                    if use_cq and 'nvenc' in self.video_encoder:
-                        # h264_nvenc 需要特殊参数
-                        encoder_params.extend(['-pix_fmt', 'nv12', '-preset', 'p4', '-cq', cq_value])
-                    else:
-                        encoder_params.extend(['-pix_fmt', 'yuv420p'])
-                        if use_bitrate:
-                            encoder_params.extend(['-b:v', bitrate_value])
-                        else:
-                            encoder_params.extend(['-preset', 'medium', '-crf', crf_value])
-                            if self.video_encoder == 'libx264':
-                                encoder_params.extend(['-profile:v', 'high', '-level', '4.0'])
+                    encoder_params = self._video_encoder_args() + self._frame_rate_output_args()
                     
                     cmd.extend([
                         '-filter_complex', filter_complex,
                         '-map', '[v]'
                     ])
                     cmd.extend(encoder_params)
-                    cmd.extend(['-f', 'mp4', '-y', self.filepath])
+                    cmd.extend(self._master_output_args(self.filepath))
+                    cmd.extend(self._proxy_output_args('[proxy]'))
                 else:
                     # 无摄像头：仅屏幕录制
                     # 构建编码参数
-                    encoder_params = ['-c:v', self.video_encoder]
-                    
-                    # 根据编码器类型设置参数
-                    if use_cq and 'nvenc' in self.video_encoder:
-                        # h264_nvenc 需要特殊参数
-                        encoder_params.extend(['-pix_fmt', 'nv12', '-preset', 'p4', '-cq', cq_value])
-                    else:
-                        encoder_params.extend(['-pix_fmt', 'yuv420p'])
-                        if use_bitrate:
-                            encoder_params.extend(['-b:v', bitrate_value])
-                        else:
-                            encoder_params.extend(['-preset', 'medium', '-crf', crf_value])
-                            if self.video_encoder == 'libx264':
-                                encoder_params.extend(['-profile:v', 'high', '-level', '4.0'])
+                    encoder_params = self._video_encoder_args() + self._frame_rate_output_args()
                     
+                    video_filters = self._video_filter_chain(recording_region)
+                    if video_filters:
+                        cmd.extend(['-vf', video_filters])
+                    # 明确映射：推流时 tee 封装器不会自动选择流
+                    cmd.extend(['-map', '0:v'])
                     cmd.extend(encoder_params)
-                    cmd.extend(['-f', 'mp4', '-y', self.filepath])
+                    cmd.extend(self._master_output_args(self.filepath))
+                    # 代理输出直接引用同一个输入流（只采集、解码一次）
+                    cmd.extend(self._proxy_output_args('0:v', raw_input=True))
             else:
                 # 视频 + 音频（可能包含摄像头）
                 filter_parts = []
                 map_parts = []
                 
                 # 视频部分
+                video_label = 'vmain' if self.proxy_height else 'v'
+                proxy_source = '[proxy]'
                 if camera_input_index is not None:
                     # 有摄像头：合成屏幕和摄像头
-                    filter_parts.append(f"[0:v]scale={self.region['width']}:{self.region['height']}[screen]")
-                    filter_parts.append(f"[1:v]scale=320:240[camera]")
-                    filter_parts.append(f"[screen][camera]overlay=W-w-10:10[v]")
+                    filter_parts.extend(self._pip_filter_parts(recording_region, video_label))
+                    map_parts.extend(['-map', '[v]'])
+                elif self._video_filter_chain(recording_region):
+                    # 无摄像头：仅屏幕（缩放输出分辨率 / 可变帧率去除重复帧）
+                    filter_parts.append(f"[0:v]{self._video_filter_chain(recording_region)}[{video_label}]")
                     map_parts.extend(['-map', '[v]'])
                 else:
                     # 无摄像头：仅屏幕
                     map_parts.extend(['-map', '0:v'])
+                    proxy_source = None
+                if self.proxy_height and proxy_source:
+                    # 一份画面拆分给母版与代理两个编码器
+                    filter_parts.append(self._proxy_branch(video_label))
                 
-                # 音频部分
-                if len(audio_inputs) > 1:
-                    # 多个音频输入，需要混音
-                    audio_filter_parts = []
-                    for i, audio_input in enumerate(audio_inputs):
-                        audio_stream_idx = audio_start_index + i
-                        audio_filter_parts.append(f'[{audio_stream_idx}:a]')
-                    audio_filter = ''.join(audio_filter_parts) + f'amix=inputs={len(audio_inputs)}:duration=longest[a]'
-                    filter_parts.append(audio_filter)
-                    map_parts.extend(['-map', '[a]'])
-                else:
-                    # 单个音频输入
-                    map_parts.extend(['-map', f'{audio_start_index}:a'])
+                # 音频部分（多个音频输入时混音）
+                audio_filters, audio_map = self._audio_mix_parts(
+                    [audio_input['type'] for audio_input in audio_inputs], audio_start_index)
+                filter_parts.extend(audio_filters)
+                map_parts.extend(['-map', audio_map])
                 
                 # 组合所有 filter
                 if filter_parts:
@@ -1690,55 +3074,56 @@ class RecordingThread(QThread):
                 cmd.extend(map_parts)
                 
                 # 构建视频编码参数
-                video_encoder_params = ['-c:v', self.video_encoder]
-                
-                # 根据编码器类型设置参数
-                if use_cq and 'nvenc' in self.video_encoder:
-                    # h264_nvenc 需要特殊参数
-                    video_encoder_params.extend(['-pix_fmt', 'nv12', '-preset', 'p4', '-cq', cq_value])
-                else:
-                    video_encoder_params.extend(['-pix_fmt', 'yuv420p'])
-                    if use_bitrate:
-                        video_encoder_params.extend(['-b:v', bitrate_value])
-                    else:
-                        video_encoder_params.extend(['-preset', 'medium', '-crf', crf_value])
-                        # 只有 libx264 支持这些参数
-                        if self.video_encoder == 'libx264':
-                            video_encoder_params.extend(['-profile:v', 'high', '-level', '4.0'])
-                
-                cmd.extend(video_encoder_params)
+                cmd.extend(self._video_encoder_args())
+                cmd.extend(self._frame_rate_output_args())
                 
                 # 获取音频质量参数
                 audio_params = self._get_audio_quality_params()
                 cmd.extend(audio_params)
                 
-                cmd.extend([
-                    '-f', 'mp4',
-                    '-shortest',
-                    '-y',
-                    self.filepath
-                ])
+                cmd.extend(self._master_output_args(self.filepath, shortest=True))
+                if proxy_source:
+                    cmd.extend(self._proxy_output_args(proxy_source))
+                else:
+                    cmd.extend(self._proxy_output_args('0:v', raw_input=True))
             
-            print(f"DEBUG: 使用 FFmpeg 录制，命令: {' '.join(cmd)}")
+            capture_log.info("使用 FFmpeg 录制，命令: %s", ' '.join(cmd))
             
             # 启动 FFmpeg 进程
             # 注意：stderr 需要实时读取，否则缓冲区可能满导致进程阻塞
-            self.ffmpeg_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                bufsize=0,  # 无缓冲
-                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            )
+            first_frame_span = self.tracer.begin('first_frame')
+            with self.tracer.span('ffmpeg_spawn'):
+                self.ffmpeg_process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    stdin=subprocess.PIPE,
+                    bufsize=0,  # 无缓冲
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
+            # 添加到进程列表（资源采样按此列表统计编码器的CPU与内存）
+            with self.ffmpeg_process_lock:
+                if self.ffmpeg_process not in self.ffmpeg_processes:
+                    self.ffmpeg_processes.append(self.ffmpeg_process)
+            if self.mouse_follower is not None:
+                self.mouse_follower.attach(self.ffmpeg_process)
             
             # 在后台线程中读取 stderr，避免缓冲区满
             stderr_lines = []
+            process = self.ffmpeg_process
+            process_pid = process.pid
             def read_stderr():
                 try:
                     for line in iter(self.ffmpeg_process.stderr.readline, b''):
                         if line:
-                            stderr_lines.append(line.decode('utf-8', errors='ignore'))
+                            text = line.decode('utf-8', errors='ignore')
+                            stderr_lines.append(text)
+                            self._note_encoded_frames(process_pid, text)
+                            if self.mouse_follower is not None and ('Press [q]' in text or 'frame=' in text):
+                                self.mouse_follower.clock_started(process)
+                            # 所有输出初始化完成（已拿到首帧）时 FFmpeg 打印 "Press [q]"
+                            if first_frame_span is not None and ('Press [q]' in text or 'frame=' in text):
+                                self.tracer.end(first_frame_span)
                 except:
                     pass
             
@@ -1749,17 +3134,19 @@ class RecordingThread(QThread):
             time.sleep(0.5)
             if self.ffmpeg_process and self.ffmpeg_process.poll() is not None:
                 # FFmpeg进程已经退出，说明启动失败
-                print("DEBUG: 错误：FFmpeg进程启动失败，立即退出")
+                capture_log.error("FFmpeg进程启动失败，立即退出")
                 # 等待stderr线程读取错误信息
                 time.sleep(0.5)
                 stderr_thread.join(timeout=1)
                 stderr_output = '\n'.join(stderr_lines)
                 if stderr_output:
-                    print(f"DEBUG: FFmpeg错误输出: {stderr_output[-1000:]}")
+                    capture_log.warning("FFmpeg错误输出: %s", stderr_output[-1000:])
                 
                 # 检查是否是摄像头设备错误，如果是，尝试重新构建命令（不包含摄像头）
-                if self.camera_enabled and self.camera_device and 'Could not find video device' in stderr_output:
-                    print(f"DEBUG: 检测到摄像头设备错误，尝试重新录制（不包含摄像头）")
+                # 共享采集时设备在启动前已确认可用，只有 FFmpeg 直接打开设备时才会出现
+                if (self.camera_enabled and self.camera_device and self.camera_feed is None
+                        and 'Could not find video device' in stderr_output):
+                    capture_log.warning("检测到摄像头设备错误，尝试重新录制（不包含摄像头）")
                     # 停止系统音频录制
                     if system_audio_file and self.system_audio_recorder:
                         try:
@@ -1771,7 +3158,7 @@ class RecordingThread(QThread):
                     # 禁用摄像头，重新构建命令
                     self.camera_enabled = False
                     self.camera_device = None
-                    print(f"DEBUG: 已禁用摄像头，重新尝试录制")
+                    capture_log.info("已禁用摄像头，重新尝试录制")
                     # 重新调用录制方法（不包含摄像头）
                     return self.try_ffmpeg_recording()
                 
@@ -1784,14 +3171,19 @@ class RecordingThread(QThread):
                         pass
                 return False
             
+            # FFmpeg 已正常开始采集
+            self._resolve_started()
+            
             # 等待进程结束或停止
             pause_handled = False  # 标记是否已处理暂停
+            finished_process = None  # 循环中已关闭并清空引用的进程（停止时可能正处于暂停或进程刚退出），用于检查返回码
             while self.running:
                 if self.paused:
                     # 暂停时停止当前 FFmpeg 进程（只处理一次）
                     if not pause_handled and self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-                        print("DEBUG: 暂停录制，停止当前 FFmpeg 进程...")
+                        capture_log.debug("暂停录制，停止当前 FFmpeg 进程...")
                         pause_handled = True
+                        teardown_span = self.tracer.begin('pause_teardown')
                         
                         # 暂停系统音频录制
                         if self.system_audio_recorder and self.system_audio_recorder.is_recording:
@@ -1800,7 +3192,7 @@ class RecordingThread(QThread):
                         # 暂停麦克风音频录制
                         if self.microphone_audio_recorder and self.microphone_audio_recorder.is_recording:
                             self.microphone_audio_recorder.pause_recording()
-                            print("DEBUG: 麦克风音频录制已暂停")
+                            capture_log.debug("麦克风音频录制已暂停")
                         
                         # 计算当前片段的结束时间
                         current_time = time.time()
@@ -1821,7 +3213,8 @@ class RecordingThread(QThread):
                             if self.filepath == self.base_filepath:
                                 first_segment = os.path.join(self.segment_dir, f'segment_{self.segment_index:04d}.mp4')
                                 import shutil
-                                shutil.copy2(self.filepath, first_segment)
+                                with self.tracer.span('segment_copy'):
+                                    shutil.copy2(self.filepath, first_segment)
                                 # 添加到片段列表
                                 self._add_segment_to_list(first_segment, start_time=self.last_segment_end_time, end_time=segment_end_time)
                                 self.segment_index += 1
@@ -1831,23 +3224,24 @@ class RecordingThread(QThread):
                                 # 如果还没有添加到列表，添加它
                                 if self.filepath not in self.video_segments:
                                     self._add_segment_to_list(self.filepath, start_time=self.last_segment_end_time, end_time=segment_end_time)
-                        else:
-                            print(f"DEBUG: 警告：片段文件不存在: {self.filepath}")
+                        elif not self.split_enabled:  # 自动分段时由 segment 封装器直接写分段文件
+                            capture_log.warning("片段文件不存在: %s", self.filepath)
                         
                         # 创建新的片段文件路径（恢复时使用）
                         current_segment = os.path.join(self.segment_dir, f'segment_{self.segment_index:04d}.mp4')
                         self.segment_index += 1
                         self.filepath = current_segment
-                        print(f"DEBUG: 准备恢复时使用新片段文件: {self.filepath}")
+                        capture_log.debug("准备恢复时使用新片段文件: %s", self.filepath)
                         
                         # 清空 FFmpeg 进程引用（进程已关闭，从列表中移除）
                         old_process = self.ffmpeg_process
                         self.ffmpeg_process = None
+                        finished_process = old_process or finished_process
                         if old_process:
                             # 确保进程真的被关闭
                             try:
                                 if old_process.poll() is None:
-                                    print(f"DEBUG: 警告：暂停时进程仍在运行 (PID: {old_process.pid})，强制关闭...")
+                                    capture_log.warning("暂停时进程仍在运行 (PID: %s)，强制关闭...", old_process.pid)
                                     self._force_close_ffmpeg_process(old_process, timeout=2)
                             except:
                                 pass
@@ -1855,14 +3249,16 @@ class RecordingThread(QThread):
                             with self.ffmpeg_process_lock:
                                 if old_process in self.ffmpeg_processes:
                                     self.ffmpeg_processes.remove(old_process)
+                        self.tracer.end(teardown_span)
                     
                     # 等待恢复
                     time.sleep(0.1)
                 else:
                     # 如果暂停后恢复，需要重新启动 FFmpeg
                     if pause_handled and self.ffmpeg_process is None and self.running:
-                        print("DEBUG: 恢复录制，重新启动 FFmpeg 进程...")
+                        capture_log.debug("恢复录制，重新启动 FFmpeg 进程...")
                         pause_handled = False  # 重置标记
+                        resume_span = self.tracer.begin('resume_restart')
                         
                         # 恢复系统音频录制
                         if self.system_audio_recorder and self.system_audio_recorder.is_recording:
@@ -1871,13 +3267,13 @@ class RecordingThread(QThread):
                         # 恢复麦克风音频录制
                         if self.microphone_audio_recorder and self.microphone_audio_recorder.is_recording:
                             self.microphone_audio_recorder.resume_recording()
-                            print("DEBUG: 麦克风音频录制已恢复")
+                            capture_log.debug("麦克风音频录制已恢复")
                         
                         # 恢复录制时，在主线程中直接启动FFmpeg进程（不启动新的while循环）
                         try:
                             # 确保旧进程已完全关闭（双重检查）
                             if self.ffmpeg_process is not None:
-                                print("DEBUG: 恢复录制前，确保旧FFmpeg进程已关闭...")
+                                capture_log.debug("恢复录制前，确保旧FFmpeg进程已关闭...")
                                 self._force_close_ffmpeg_process(self.ffmpeg_process, timeout=3)
                                 self.ffmpeg_process = None
                             
@@ -1887,15 +3283,14 @@ class RecordingThread(QThread):
                             # 直接启动FFmpeg进程（不启动while循环）
                             if self.ffmpeg_process is None:
                                 if self._start_ffmpeg_process_only():
-                                    print("DEBUG: FFmpeg进程已成功启动（恢复录制）")
+                                    capture_log.debug("FFmpeg进程已成功启动（恢复录制）")
                                 else:
-                                    print("DEBUG: 警告：FFmpeg进程启动失败（恢复录制）")
+                                    capture_log.warning("FFmpeg进程启动失败（恢复录制）")
                             else:
-                                print("DEBUG: FFmpeg进程已存在，跳过重新启动")
+                                capture_log.debug("FFmpeg进程已存在，跳过重新启动")
                         except Exception as e:
-                            print(f"DEBUG: 恢复录制时出错: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            capture_log.exception("恢复录制时出错: %s", e)
+                        self.tracer.end(resume_span)
                     
                     # 检查进程是否还在运行
                     if self.ffmpeg_process:
@@ -1904,10 +3299,11 @@ class RecordingThread(QThread):
                             # 进程已结束，从列表中移除
                             old_process = self.ffmpeg_process
                             self.ffmpeg_process = None
+                            finished_process = old_process
                             with self.ffmpeg_process_lock:
                                 if old_process in self.ffmpeg_processes:
                                     self.ffmpeg_processes.remove(old_process)
-                            print(f"DEBUG: FFmpeg进程已结束 (返回码: {poll_result})")
+                            capture_log.debug("FFmpeg进程已结束 (返回码: %s)", poll_result)
                             break
                     time.sleep(0.1)
             
@@ -1942,9 +3338,9 @@ class RecordingThread(QThread):
                         # 添加到片段列表
                         self._add_segment_to_list(self.filepath, start_time=self.last_segment_end_time, end_time=segment_end_time)
                     else:
-                        print(f"DEBUG: 最后一个片段文件不存在（可能已被移动）: {self.filepath}")
+                        capture_log.info("最后一个片段文件不存在（可能已被移动）: %s", self.filepath)
                 else:
-                    print(f"DEBUG: 当前文件路径是基础路径，不保存: {self.filepath}")
+                    capture_log.info("当前文件路径是基础路径，不保存: %s", self.filepath)
             
             # 停止系统音频录制 - 优化资源释放（使用锁保护，避免多线程冲突）
             audio_saved = False
@@ -1954,7 +3350,7 @@ class RecordingThread(QThread):
             with self.audio_recorder_lock:
                 # 检查是否已经在停止中，避免重复操作
                 if self.audio_stopping:
-                    print(f"DEBUG: 音频录制器正在停止中，跳过重复操作")
+                    capture_log.info("音频录制器正在停止中，跳过重复操作")
                 else:
                     self.audio_stopping = True
                     
@@ -1964,14 +3360,12 @@ class RecordingThread(QThread):
                     # 使用实例变量而不是局部变量，因为中途启用音频时会设置实例变量
                     if self.system_audio_file and audio_recorder:
                         try:
-                            print(f"DEBUG: 开始停止并保存系统音频录制...")
+                            capture_log.info("开始停止并保存系统音频录制...")
                             # 先停止录制
                             try:
                                 audio_recorder.stop_recording()
                             except Exception as stop_error:
-                                print(f"DEBUG: 停止系统音频录制时出错: {stop_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("停止系统音频录制时出错: %s", stop_error)
                             
                             # 等待一小段时间确保线程完全结束
                             time.sleep(0.5)
@@ -1980,37 +3374,31 @@ class RecordingThread(QThread):
                             try:
                                 audio_saved = audio_recorder.save_recording(self.system_audio_file)
                                 if audio_saved:
-                                    print(f"DEBUG: 系统音频已成功保存到: {self.system_audio_file}")
+                                    capture_log.info("系统音频已成功保存到: %s", self.system_audio_file)
                                     # 检查文件是否存在和大小
                                     if os.path.exists(self.system_audio_file):
                                         file_size = os.path.getsize(self.system_audio_file)
-                                        print(f"DEBUG: 系统音频文件大小: {file_size} 字节 ({file_size / 1024:.2f} KB)")
+                                        capture_log.info("系统音频文件大小: %s 字节 (%.2f KB)", file_size, file_size / 1024)
                                     else:
-                                        print(f"DEBUG: 警告：系统音频文件不存在: {self.system_audio_file}")
+                                        capture_log.warning("系统音频文件不存在: %s", self.system_audio_file)
                                         audio_saved = False
                                 else:
-                                    print(f"DEBUG: 警告：系统音频保存失败")
+                                    capture_log.warning("系统音频保存失败")
                             except Exception as save_error:
-                                print(f"DEBUG: 保存系统音频录制时出错: {save_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("保存系统音频录制时出错: %s", save_error)
                                 audio_saved = False
                             
                             # 关闭资源
                             try:
                                 audio_recorder.close()
                             except Exception as close_error:
-                                print(f"DEBUG: 关闭系统音频录制器时出错: {close_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("关闭系统音频录制器时出错: %s", close_error)
                             
                             # 清空引用（仅在成功保存后）
                             if audio_saved:
                                 self.system_audio_recorder = None
                         except Exception as e:
-                            print(f"DEBUG: 停止系统音频录制时出错: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            capture_log.exception("停止系统音频录制时出错: %s", e)
                             # 即使出错也尝试清理
                             try:
                                 if audio_recorder:
@@ -2021,20 +3409,18 @@ class RecordingThread(QThread):
                                 # 确保清空引用
                                 self.system_audio_recorder = None
                     else:
-                        print(f"DEBUG: 系统音频录制器或文件路径不存在，跳过停止操作")
+                        capture_log.info("系统音频录制器或文件路径不存在，跳过停止操作")
                     
                     # === 停止麦克风音频录制器 ===
                     microphone_recorder = self.microphone_audio_recorder
                     if self.microphone_audio_file and microphone_recorder:
                         try:
-                            print(f"DEBUG: 开始停止并保存麦克风音频录制...")
+                            capture_log.info("开始停止并保存麦克风音频录制...")
                             # 先停止录制
                             try:
                                 microphone_recorder.stop_recording()
                             except Exception as stop_error:
-                                print(f"DEBUG: 停止麦克风音频录制时出错: {stop_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("停止麦克风音频录制时出错: %s", stop_error)
                             
                             # 等待一小段时间确保线程完全结束
                             time.sleep(0.5)
@@ -2043,37 +3429,31 @@ class RecordingThread(QThread):
                             try:
                                 microphone_audio_saved = microphone_recorder.save_recording(self.microphone_audio_file)
                                 if microphone_audio_saved:
-                                    print(f"DEBUG: 麦克风音频已成功保存到: {self.microphone_audio_file}")
+                                    capture_log.info("麦克风音频已成功保存到: %s", self.microphone_audio_file)
                                     # 检查文件是否存在和大小
                                     if os.path.exists(self.microphone_audio_file):
                                         file_size = os.path.getsize(self.microphone_audio_file)
-                                        print(f"DEBUG: 麦克风音频文件大小: {file_size} 字节 ({file_size / 1024:.2f} KB)")
+                                        capture_log.info("麦克风音频文件大小: %s 字节 (%.2f KB)", file_size, file_size / 1024)
                                     else:
-                                        print(f"DEBUG: 警告：麦克风音频文件不存在: {self.microphone_audio_file}")
+                                        capture_log.warning("麦克风音频文件不存在: %s", self.microphone_audio_file)
                                         microphone_audio_saved = False
                                 else:
-                                    print(f"DEBUG: 警告：麦克风音频保存失败")
+                                    capture_log.warning("麦克风音频保存失败")
                             except Exception as save_error:
-                                print(f"DEBUG: 保存麦克风音频录制时出错: {save_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("保存麦克风音频录制时出错: %s", save_error)
                                 microphone_audio_saved = False
                             
                             # 关闭资源
                             try:
                                 microphone_recorder.close()
                             except Exception as close_error:
-                                print(f"DEBUG: 关闭麦克风音频录制器时出错: {close_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("关闭麦克风音频录制器时出错: %s", close_error)
                             
                             # 清空引用（仅在成功保存后）
                             if microphone_audio_saved:
                                 self.microphone_audio_recorder = None
                         except Exception as e:
-                            print(f"DEBUG: 停止麦克风音频录制时出错: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            capture_log.exception("停止麦克风音频录制时出错: %s", e)
                             # 即使出错也尝试清理
                             try:
                                 if microphone_recorder:
@@ -2084,7 +3464,7 @@ class RecordingThread(QThread):
                                 # 确保清空引用
                                 self.microphone_audio_recorder = None
                     else:
-                        print(f"DEBUG: 麦克风音频录制器或文件路径不存在，跳过停止操作")
+                        capture_log.info("麦克风音频录制器或文件路径不存在，跳过停止操作")
                     
                     self.audio_stopping = False
             
@@ -2102,14 +3482,15 @@ class RecordingThread(QThread):
             stderr_output = '\n'.join(stderr_lines)
             if stderr_output:
                 # 只显示最后500字符，避免输出过长
-                print(f"DEBUG: FFmpeg 输出: {stderr_output[-500:]}")
+                capture_log.debug("FFmpeg 输出: %s", stderr_output[-500:])
                 # 检查是否有错误
                 if 'error' in stderr_output.lower() or 'failed' in stderr_output.lower():
-                    print(f"DEBUG: FFmpeg 可能遇到错误，完整输出: {stderr_output}")
+                    capture_log.warning("FFmpeg 可能遇到错误，完整输出: %s", stderr_output)
             
             # 检查返回码
-            return_code = self.ffmpeg_process.returncode
-            print(f"DEBUG: FFmpeg 进程返回码: {return_code}")
+            process = self.ffmpeg_process or finished_process
+            return_code = process.returncode if process else None
+            capture_log.info("FFmpeg 进程返回码: %s", return_code)
             
             # 等待文件系统同步（重要：确保文件完全写入磁盘）
             time.sleep(1.0)  # 增加等待时间
@@ -2119,65 +3500,520 @@ class RecordingThread(QThread):
             if len(self.video_segments) > 0:
                 # 有片段列表，说明使用了分段录制，文件可能已被移动
                 # 这种情况下，只要FFmpeg进程正常结束，就认为录制成功
-                if self.ffmpeg_process and self.ffmpeg_process.returncode == 0:
-                    print(f"DEBUG: FFmpeg 录制完成（分段录制模式），片段已保存")
+                if return_code == 0:
+                    capture_log.info("FFmpeg 录制完成（分段录制模式），片段已保存")
                     return True
                 else:
-                    print(f"DEBUG: FFmpeg 录制失败（分段录制模式），返回码: {self.ffmpeg_process.returncode if self.ffmpeg_process else 'None'}")
+                    capture_log.warning("FFmpeg 录制失败（分段录制模式），返回码: %s", return_code)
                     return False
             elif os.path.exists(self.filepath):
                 # 没有片段列表，检查最终文件
                 file_size = os.path.getsize(self.filepath)
                 if file_size > 1024:  # 至少 1KB
-                    print(f"DEBUG: FFmpeg 录制完成，文件保存至: {self.filepath}, 大小: {file_size / 1024 / 1024:.2f} MB")
+                    capture_log.info("FFmpeg 录制完成，文件保存至: %s, 大小: %.2f MB", self.filepath, file_size / 1024 / 1024)
                     
                     # 验证文件格式
                     try:
                         with open(self.filepath, 'rb') as f:
                             header = f.read(12)
                             if b'ftyp' in header or header[:4] == b'\x00\x00\x00' or header[4:8] == b'ftyp':
-                                print("DEBUG: 文件格式验证通过（MP4）")
+                                capture_log.info("文件格式验证通过（MP4）")
                             else:
-                                print(f"DEBUG: 警告：文件格式可能不正确，文件头: {header[:12].hex()}")
+                                capture_log.warning("文件格式可能不正确，文件头: %s", header[:12].hex())
                     except Exception as e:
-                        print(f"DEBUG: 警告：无法读取文件进行验证: {e}")
+                        capture_log.warning("无法读取文件进行验证: %s", e)
                     
                     return True
                 else:
-                    print(f"DEBUG: 警告：文件存在但大小异常（{file_size} 字节）")
+                    capture_log.warning("文件存在但大小异常（%s 字节）", file_size)
                     return False
             else:
                 # 文件不存在，但如果FFmpeg正常结束，可能是分段录制模式
-                if self.ffmpeg_process and self.ffmpeg_process.returncode == 0:
-                    print(f"DEBUG: FFmpeg 录制完成，但文件不存在（可能是分段录制模式）: {self.filepath}")
+                if return_code == 0:
+                    capture_log.info("FFmpeg 录制完成，但文件不存在（可能是分段录制模式）: %s", self.filepath)
                     return True  # 分段录制模式下，文件可能已被移动，这是正常的
                 else:
-                    print(f"DEBUG: 错误：FFmpeg 录制完成，但文件不存在: {self.filepath}")
+                    capture_log.error("FFmpeg 录制完成，但文件不存在: %s", self.filepath)
                     return False
             
         except Exception as e:
-            print(f"DEBUG: FFmpeg 录制失败: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("FFmpeg 录制失败: %s", e)
             return False
     
     def run(self):
-        """执行录屏"""
+        """执行录屏（阻塞直到采集结束，由调用方决定运行在哪个线程）"""
         if self.try_ffmpeg_recording():
             return
         else:
             error_msg = "FFmpeg 录制失败，请确保已安装 FFmpeg"
-            print(f"ERROR: {error_msg}")
+            capture_log.error("%s", error_msg)
             # 发出录制失败信号
             self.recording_failed.emit(error_msg)
     
+    def start(self):
+        """在后台线程中开始录制，返回采集开始的 Future"""
+        if self.worker_thread is None:
+            self.worker_thread = threading.Thread(target=self.run, name='recording_session', daemon=False)
+            self.worker_thread.start()
+        return self.started_future
+    
+    def wait(self, timeout=None):
+        """等待采集线程结束（不含后台合并），返回是否已结束"""
+        if self.worker_thread is None:
+            return True
+        self.worker_thread.join(timeout)
+        return not self.worker_thread.is_alive()
+    
+    def _resolve_started(self):
+        """FFmpeg 已开始采集"""
+        if self.clock_started_at is None:
+            self.clock_started_at = time.time()
+        self.resource_sampler.start()
+        if not self.started_future.done():
+            self.started_future.set_result(self.base_filepath)
+    
+    def _create_audio_recorder(self, kind):
+        """创建系统音频（system）或麦克风（microphone）录制器"""
+        if self.audio_recorder_factory is not None:
+            recorder = self.audio_recorder_factory(kind, self.microphone_device if kind == 'microphone' else None)
+        elif kind == 'system':
+            recorder = SystemAudioRecorder() if HAS_PYAUDIO_WPATCH else None
+        else:
+            recorder = MicrophoneAudioRecorder(device_name=self.microphone_device)
+        if recorder is not None:
+            recorder.tracer = self.tracer
+        return recorder
+    
+    def _camera_input_args(self):
+        """摄像头的 FFmpeg 输入参数
+
+        有设备索引时使用与预览窗口共享的采集：设备只打开一次，原始帧经本地连接送给 FFmpeg，
+        设备不可用时在启动前就去掉摄像头，不再启动失败后重试。没有索引（命令行等）时由 FFmpeg 直接打开设备。
+        """
+        if self.camera_source:
+            # 合成摄像头画面直接按画中画尺寸生成
+            self.camera_size = (self.pip_width, self.pip_width * 3 // 4 // 2 * 2)
+            args = ['-re', '-f', 'lavfi', '-i', f"{self.camera_source}=size={self.camera_size[0]}x{self.camera_size[1]}:rate=30"]
+        elif self.camera_index is not None and HAS_CV2:
+            if self.camera_capture is None:
+                self.camera_capture = CameraCapture.acquire(self.camera_index)
+            if self.camera_capture.wait_opened() is None:
+                capture_log.warning("摄像头不可用（%s），本次录制不包含摄像头", self.camera_capture.error)
+                self._release_camera()
+                self.camera_enabled = False
+                return []
+            if self.camera_feed is None:
+                # 第一次启动时按画中画宽度（保持设备宽高比）协商采集模式
+                width, height = self.camera_capture.frame_size
+                target = (self.pip_width, max(2, round(self.pip_width * height / width) // 2 * 2))
+                negotiated = self.camera_capture.negotiate(*target)
+                capture_log.info("画中画目标尺寸 %sx%s，摄像头采集模式 %s", target[0], target[1], negotiated)
+                if negotiated is None:
+                    self._release_camera()
+                    self.camera_enabled = False
+                    return []
+            else:
+                # 每个 FFmpeg 进程一个新连接（暂停/恢复会重启进程）
+                self.camera_feed.close()
+                self.camera_feed = None
+            try:
+                self.camera_feed = CameraFeed(self.camera_capture)
+            except RuntimeError as e:
+                capture_log.warning("%s，本次录制不包含摄像头", e)
+                self._release_camera()
+                self.camera_enabled = False
+                return []
+            self.camera_size = self.camera_feed.frame_size
+            args = self.camera_feed.input_args()
+        elif sys.platform == 'win32':
+            # Windows 使用 dshow 捕获摄像头
+            self.camera_size = (640, 480)
+            args = ['-f', 'dshow', '-video_size', '640x480', '-framerate', '30', '-i', f'video="{self.camera_device}"']
+        else:
+            # Linux 使用 v4l2
+            self.camera_size = (640, 480)
+            args = ['-f', 'v4l2', '-video_size', '640x480', '-framerate', '30', '-i', self.camera_device]
+        # 圆角/圆形遮罩：开始录制时生成一次灰度图，逐帧只做 alphamerge
+        self.pip_mask_input = self.pip_shape in ('rounded', 'circle')
+        if self.pip_mask_input:
+            args.extend(['-i', self._pip_mask_file(*self._pip_overlay_size())])
+        return args
+    
+    def pip_summary(self):
+        """画中画布局：采集尺寸、叠加尺寸以及是否需要逐帧缩放，没有摄像头时返回 None"""
+        if not self.camera_enabled or self.camera_size is None:
+            return None
+        overlay = self._pip_overlay_size()
+        return {
+            'corner': self.pip_corner,
+            'shape': self.pip_shape,
+            'margin': self.pip_margin,
+            'camera_size': '%dx%d' % tuple(self.camera_size),
+            'overlay_size': '%dx%d' % overlay,
+            'per_frame_scale': self._pip_scaled_size() != tuple(self.camera_size),
+        }
+    
+    def split_summary(self):
+        """自动分段：分段时长与已写入的分段数量，未启用时返回 None"""
+        if not self.split_enabled:
+            return None
+        parts = self.split_parts()
+        return {
+            'segment_seconds': self.split_seconds,
+            'parts': len(parts),
+            'part_sizes': [os.path.getsize(part) for part in parts if os.path.exists(part)],
+        }
+    
+    def _pip_scaled_size(self):
+        """摄像头画面缩放后的尺寸：采集尺寸已等于画中画宽度时不缩放"""
+        width, height = self.camera_size
+        if width == self.pip_width:
+            return width, height
+        return self.pip_width, max(2, round(self.pip_width * height / width) // 2 * 2)
+    
+    def _pip_overlay_size(self):
+        """叠加到屏幕上的画中画尺寸（圆形时裁成正方形）"""
+        width, height = self._pip_scaled_size()
+        if self.pip_shape == 'circle':
+            side = min(width, height)
+            return side, side
+        return width, height
+    
+    def _pip_mask_file(self, width, height):
+        """生成画中画遮罩（PGM 灰度图，边缘抗锯齿），同一尺寸只生成一次"""
+        path = os.path.join(self.segment_dir, f'pip_mask_{self.pip_shape}_{width}x{height}.pgm')
+        if os.path.exists(path):
+            return path
+        radius = min(width, height) / 2 if self.pip_shape == 'circle' else min(width, height) * 0.15
+        
+        def row(y):
+            dy = max(radius - (y + 0.5), 0.0, (y + 0.5) - (height - radius))
+            if dy == 0:
+                return bytes([255]) * width
+            values = bytearray(width)
+            for x in range(width):
+                dx = max(radius - (x + 0.5), 0.0, (x + 0.5) - (width - radius))
+                coverage = radius - math.hypot(dx, dy) + 0.5
+                values[x] = 255 if coverage >= 1 else (0 if coverage <= 0 else int(coverage * 255))
+            return bytes(values)
+        
+        with open(path, 'wb') as f:
+            f.write(f"P5\n{width} {height}\n255\n".encode('ascii'))
+            for y in range(height):
+                f.write(row(y))
+        self.pip_mask_path = path
+        return path
+    
+    # 画中画角落 -> overlay 位置表达式（m 为边距）
+    PIP_POSITIONS = {
+        'top_left': ('{m}', '{m}'),
+        'top_right': ('W-w-{m}', '{m}'),
+        'bottom_left': ('{m}', 'H-h-{m}'),
+        'bottom_right': ('W-w-{m}', 'H-h-{m}'),
+    }
+    
+    def _pip_filter_parts(self, recording_region, video_label):
+        """屏幕与摄像头画中画合成的 filter_complex 片段，输出到 [video_label]
+
+        屏幕没有裁剪/缩放时直接引用 [0:v]；摄像头采集尺寸与画中画尺寸一致时不缩放。
+        """
+        parts = []
+        screen_ref = '[0:v]'
+        screen_filters = self._screen_scale_filter(recording_region)
+        if screen_filters:
+            parts.append(f"[0:v]{screen_filters}[screen]")
+            screen_ref = '[screen]'
+        
+        camera_filters = []
+        scaled = self._pip_scaled_size()
+        if scaled != tuple(self.camera_size):
+            camera_filters.append(f"scale={scaled[0]}:{scaled[1]}:flags={self.scale_algorithm}")
+        overlay_size = self._pip_overlay_size()
+        if overlay_size != scaled:
+            camera_filters.append(f"crop={overlay_size[0]}:{overlay_size[1]}")
+        camera_ref = '[1:v]'
+        if self.pip_mask_input:
+            source = '[1:v]'
+            if camera_filters:
+                parts.append(f"[1:v]{','.join(camera_filters)}[camera_src]")
+                source = '[camera_src]'
+            parts.append(f"{source}[2:v]alphamerge[camera]")
+            camera_ref = '[camera]'
+        elif camera_filters:
+            parts.append(f"[1:v]{','.join(camera_filters)}[camera]")
+            camera_ref = '[camera]'
+        
+        x, y = self.PIP_POSITIONS.get(self.pip_corner, self.PIP_POSITIONS['top_right'])
+        position = f"x={x.format(m=self.pip_margin)}:y={y.format(m=self.pip_margin)}"
+        parts.append(f"{screen_ref}{camera_ref}overlay={position}{self._vfr_filter_suffix()}[{video_label}]")
+        return parts
+    
+    def _start_stream_relay(self):
+        if not self.stream_url or self.stream_relay is not None:
+            return
+        try:
+            self.stream_relay = StreamRelay(self.stream_url)
+        except Exception as e:
+            stream_log.error("启动推流失败: %s", e)
+            self.resource_warning.emit('stream', f"推流启动失败，仅录制到本地: {e}")
+    
+    def _close_stream_relay(self):
+        if self.stream_relay is not None:
+            self.stream_relay.close()
+    
+    def _master_output_args(self, filepath, shortest=False):
+        """母版输出参数：本地 MP4；推流时用 tee 把同一份编码结果同时写入本地文件和推流中继，不重复编码
+
+        推流分支失败（onfail=ignore）不影响本地文件；编码器输出全局头，TS 分支在关键帧前补 SPS/PPS。
+        无损音质（FLAC）不能放进 MPEG-TS，此时只推送画面。
+        """
+        args = ['-shortest'] if shortest else []
+        local_format = ['mp4']
+        if self.split_enabled:
+            # 自动分段：写入 split_pattern 编号的连续文件，暂停/改区域重启进程后接着编号
+            filepath = self.split_pattern
+            args.extend(self._split_keyframe_args())
+            local_format = ['segment', 'segment_format=mp4', f'segment_time={self.split_seconds}',
+                            'reset_timestamps=1', f'segment_start_number={len(self.split_parts())}']
+        if self.stream_relay is None:
+            output = ['-f', local_format[0]]
+            for option in local_format[1:]:
+                name, value = option.split('=', 1)
+                output.extend([f'-{name}', value])
+            return output + args + ['-y', filepath]
+        local = filepath.replace('\\', '/').replace("'", "'\\''")
+        stream_options = 'f=mpegts:onfail=ignore:bsfs/v=dump_extra'
+        if self.audio_quality == '无损音质':
+            stream_options += ':select=v'
+        local_options = ':'.join(['f=' + local_format[0]] + local_format[1:])
+        return ['-flags', '+global_header'] + args + [
+            '-f', 'tee', f"[{local_options}]'{local}'|[{stream_options}]{self.stream_relay.url}"]
+    
+    # 按大小自动分段时的视频码率上限（kbps）：分段时长按上限折算，保证每个文件不超过设定大小
+    SPLIT_MAXRATE_KBPS = {'原画质': 16000, '高质量': 8000, '中等质量': 4000, '低质量': 2000}
+    SPLIT_MIN_SECONDS = 10
+    
+    def _split_segment_seconds(self):
+        """分段时长：按时长直接取设置；按大小时用视频码率上限加音频码率折算（留 5% 给封装开销），
+        两者都设置时取较短的"""
+        candidates = []
+        if self.split_minutes:
+            # 分段时长按录制时间设置，延时摄影时换算为加速后的输出时长
+            candidates.append(int(round(self.split_minutes * 60 / self._timelapse_speedup())))
+        if self.split_size_gb:
+            total_kbps = self.SPLIT_MAXRATE_KBPS.get(self.quality, 8000)
+            if self.audio_enabled or self.microphone_enabled:
+                total_kbps += 1536 if self.audio_quality == '无损音质' else 320
+            candidates.append(int(self.split_size_gb * 1024 ** 3 * 8 * 0.95 / (total_kbps * 1000)))
+        return max(self.SPLIT_MIN_SECONDS, min(candidates))
+    
+    def _split_rate_cap_args(self):
+        """按大小分段时限制视频峰值码率，质量模式（CRF/CQ）下画面复杂时也不会撑大分段"""
+        if not (self.split_enabled and self.split_size_gb):
+            return []
+        maxrate = self.SPLIT_MAXRATE_KBPS.get(self.quality, 8000)
+        return ['-maxrate', f'{maxrate}k', '-bufsize', f'{maxrate * 2}k']
+    
+    def _split_keyframe_args(self):
+        """在每个分段边界强制关键帧，segment 封装器正好在边界切换文件，前后分段之间不丢帧"""
+        if self.split_seconds is None:
+            self.split_seconds = self._split_segment_seconds()
+        return ['-force_key_frames', f'expr:gte(t,n_forced*{self.split_seconds})']
+    
+    def split_parts(self):
+        """已写入的分段文件（按编号排序，录制中最后一个仍在写入）"""
+        if not self.split_enabled:
+            return []
+        import glob
+        prefix, suffix = self.split_pattern.split('%03d')
+        parts = glob.glob(glob.escape(prefix) + '[0-9][0-9][0-9]' + glob.escape(suffix))
+        return sorted(parts)
+    
+    def _release_camera(self):
+        """关闭摄像头帧连接并释放共享采集（预览窗口仍打开时设备保持打开）"""
+        if self.camera_feed is not None:
+            self.camera_feed.close()
+            self.camera_feed = None
+        if self.camera_capture is not None:
+            # 画中画协商的小尺寸模式只用于本次录制
+            self.camera_capture.restore_mode()
+            self.camera_capture.release()
+            self.camera_capture = None
+    
+    def _screen_input_args(self, recording_region):
+        """屏幕捕获（或合成画面源）的 FFmpeg 输入参数"""
+        width, height = recording_region['width'], recording_region['height']
+        if self.capture_source:
+            # 合成画面源：与屏幕捕获同尺寸、同帧率，用于基准测试
+            # 格式：源名称[=选项][,后续滤镜]，例如 "color=c=gray,drawbox=..."
+            # -re 按实时速度读取，否则 lavfi 会以编码器能接受的最快速度产生帧，帧数和CPU指标都不真实
+            source, _, chain = self.capture_source.partition(',')
+            name, _, options = source.partition('=')
+            graph = f"{name}=size={width}x{height}:rate={self._capture_rate()}"
+            if options:
+                graph += f":{options}"
+            if chain:
+                graph += f",{chain}"
+            return ['-re', '-f', 'lavfi', '-i', graph]
+        if sys.platform == 'win32':
+            # Windows 使用 gdigrab
+            gdigrab_options = [
+                '-f', 'gdigrab',
+                '-framerate', self._capture_rate(),
+                '-offset_x', str(recording_region['left']),
+                '-offset_y', str(recording_region['top']),
+                '-video_size', f"{width}x{height}",
+            ]
+            # 如果不需要显示鼠标指针，添加 draw_mouse=0
+            if not self.show_cursor:
+                gdigrab_options.extend(['-draw_mouse', '0'])
+            gdigrab_options.extend(['-i', 'desktop'])
+            return gdigrab_options
+        # Linux 使用 x11grab
+        x11grab_options = [
+            '-f', 'x11grab',
+            '-framerate', self._capture_rate(),
+            '-video_size', f"{width}x{height}",
+        ]
+        # 如果不需要显示鼠标指针，添加 draw_mouse=0
+        if not self.show_cursor:
+            x11grab_options.extend(['-draw_mouse', '0'])
+        x11grab_options.extend(['-i', f":0.0+{recording_region['left']},{recording_region['top']}"])
+        return x11grab_options
+    
+    def elapsed_seconds(self):
+        """有效录制时长（秒，不含暂停）"""
+        if self.clock_started_at is None:
+            return 0.0
+        now = self.clock_paused_at or self.clock_stopped_at or time.time()
+        return max(0.0, now - self.clock_started_at - self.clock_paused_total)
+    
+    def status(self):
+        """当前会话状态（可直接序列化为JSON）"""
+        if self.completion_future.done():
+            state = 'failed' if self.completion_future.exception() else 'finished'
+        elif self.running:
+            state = 'paused' if self.paused else 'recording'
+        elif self.started_future.done():
+            state = 'processing'
+        else:
+            state = 'starting' if self.worker_thread is not None else 'idle'
+        with self.region_lock:
+            region = dict(self.region)
+        return {
+            'state': state,
+            'filepath': self.base_filepath,
+            'elapsed': round(self.elapsed_seconds(), 3),
+            'region': region,
+            'fps': self.fps,
+        }
+    
+    def bytes_written(self):
+        """已写入的视频字节数：当前文件与已完成片段（去重，当前文件可能已登记为片段），自动分段时为所有分段"""
+        paths = {segment.get('video_path') for segment in list(self.segment_list)}
+        paths.add(self.filepath)
+        paths.update(self.split_parts())
+        bytes_written = 0
+        for path in paths:
+            try:
+                if path and os.path.exists(path):
+                    bytes_written += os.path.getsize(path)
+            except OSError:
+                pass
+        return bytes_written
+    
+    def metrics(self):
+        """录制指标：状态之外的编码器、片段与输出大小信息"""
+        metrics = self.status()
+        bytes_written = self.bytes_written()
+        with self.ffmpeg_process_lock:
+            process_count = len([p for p in self.ffmpeg_processes if p.poll() is None])
+        metrics.update({
+            'video_encoder': self.video_encoder,
+            'segments': len(self.segment_list),
+            'bytes_written': bytes_written,
+            'ffmpeg_processes': process_count,
+            'audio_enabled': bool(self.audio_enabled),
+            'microphone_enabled': bool(self.microphone_enabled),
+            'vfr_enabled': self.vfr_enabled,
+            'output_size': '%dx%d' % self._output_size(metrics['region']),
+            'proxy_file': self.proxy_filepath,
+            'mouse_follow': self.mouse_follower.summary() if self.mouse_follower is not None else None,
+            'pip': self.pip_summary(),
+            'split': self.split_summary(),
+            'timelapse': self.timelapse_summary(),
+            'stream': self.stream_relay.metrics() if self.stream_relay is not None else None,
+            'resources': self.resource_sampler.latest(),
+            'resource_summary': self.resource_sampler.summary(),
+        })
+        metrics.update(self.frame_counts())
+        return metrics
+    
+    def _export_trace(self):
+        """导出本次会话的trace文件"""
+        if self.trace_file is not None:
+            return
+        try:
+            name = os.path.splitext(os.path.basename(self.base_filepath))[0]
+            self.trace_file = self.tracer.export(os.path.join(SessionTracer.trace_dir(), f'{name}.trace.json'))
+            SessionTracer.prune()
+            capture_log.info("录制阶段计时已导出: %s", self.trace_file)
+        except Exception as e:
+            capture_log.warning("导出录制阶段计时失败: %s", e)
+    
+    def _on_session_failed(self, error_msg):
+        self.resource_sampler.stop()
+        self._release_camera()
+        self._close_stream_relay()
+        if self.mouse_follower is not None:
+            self.mouse_follower.stop()
+        self._cleanup_proxy_dir()
+        self.tracer.instant('recording_failed', error=error_msg)
+        self._export_trace()
+        for future in (self.started_future, self.completion_future):
+            if not future.done():
+                future.set_exception(RuntimeError(error_msg))
+    
+    def _on_session_complete(self, filepath, file_size):
+        self.resource_sampler.stop()
+        if self.proxy_height and file_size > 0:
+            # 代理文件与母版一起完成：处理完成事件在代理就绪后才传给调用方
+            try:
+                with self.tracer.span('proxy_finalize', segments=len(self.proxy_segments)):
+                    self._finalize_proxy()
+            except Exception as e:
+                capture_log.error("生成代理文件出错: %s", e)
+        self._cleanup_proxy_dir()
+        if self.vfr_enabled:
+            counts = self.frame_counts()
+            capture_log.info("可变帧率：采集约 %s 帧，编码 %s 帧，节省 %s 帧",
+                             counts['frames_captured'], counts['frames_encoded'], counts['frames_saved'])
+        self.tracer.end(self.finalize_span, file_size=file_size)
+        self._export_trace()
+        if not self.completion_future.done():
+            self.completion_future.set_result((filepath, file_size))
+    
     def stop(self):
-        """停止录制"""
+        """停止录制，返回处理完成的 Future（结果为 (文件路径, 文件大小)）"""
+        self._stop_capture()
+        return self.completion_future
+    
+    def _stop_capture(self):
+        """停止采集并启动后台合并"""
         self.running = False
+        if self.clock_started_at is not None and self.clock_stopped_at is None:
+            self.clock_stopped_at = time.time()
+        if self.mouse_follower is not None:
+            self.mouse_follower.stop()
+        self.finalize_span = self.tracer.begin('stop_to_finalized')
         
         # 强制关闭FFmpeg进程，确保进程被完全关闭
         if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
             self._force_close_ffmpeg_process(self.ffmpeg_process, timeout=10)
+        # 编码器已退出，再释放摄像头（先断开连接会让 FFmpeg 提前结束摄像头输入）
+        self._release_camera()
+        # 推流中继发送完剩余数据后关闭
+        self._close_stream_relay()
         
         # 等待文件写入完成
         time.sleep(0.5)
@@ -2188,11 +4024,17 @@ class RecordingThread(QThread):
             segment_end_time = current_time - self.recording_start_time - (self.system_audio_recorder.total_pause_duration if self.system_audio_recorder else 0)
         else:
             segment_end_time = self.last_segment_end_time + 1.0
+        self.recorded_duration = segment_end_time / self._timelapse_speedup()  # 输出文件的播放时长
+        
+        if self.split_enabled:
+            # 自动分段：每个分段在录制中已由 segment 封装器写完，停止时不需要拼接或合并音频
+            self._finish_split_parts()
+            return
         
         # 如果没有片段列表，说明没有暂停/恢复，文件已经在正确位置（base_filepath）
         # 但可能还需要合并音频，所以也启动处理线程
         if len(self.segment_list) == 0:
-            print(f"DEBUG: 没有暂停/恢复，录制文件已在最终位置: {self.base_filepath}")
+            capture_log.info("没有暂停/恢复，录制文件已在最终位置: %s", self.base_filepath)
             # 启动后台线程处理可能的音频合并
             self._start_video_processing_thread()
             return
@@ -2204,14 +4046,15 @@ class RecordingThread(QThread):
                 # 添加到片段列表（如果还没有添加）
                 self._add_segment_to_list(self.filepath, start_time=self.last_segment_end_time, end_time=segment_end_time)
             else:
-                print(f"DEBUG: 最后一个片段文件不存在（可能已被移动）: {self.filepath}")
+                capture_log.info("最后一个片段文件不存在（可能已被移动）: %s", self.filepath)
         else:
             # 如果filepath是base_filepath，说明这是第一个片段，需要添加到列表
             if os.path.exists(self.filepath):
                 first_segment = os.path.join(self.segment_dir, f'segment_{self.segment_index:04d}.mp4')
                 import shutil
                 if not os.path.exists(first_segment):
-                    shutil.copy2(self.filepath, first_segment)
+                    with self.tracer.span('segment_copy'):
+                        shutil.copy2(self.filepath, first_segment)
                 self._add_segment_to_list(first_segment, start_time=0.0, end_time=segment_end_time)
                 self.segment_index += 1
         
@@ -2220,7 +4063,7 @@ class RecordingThread(QThread):
         # 使用锁保护，避免与try_ffmpeg_recording中的音频停止操作冲突
         with self.audio_recorder_lock:
             if self.system_audio_recorder and not self.audio_stopping:
-                print("DEBUG: 等待音频保存完成...")
+                capture_log.info("等待音频保存完成...")
                 max_wait_time = 3  # 优化：最多等待3秒（从5秒减少）
                 wait_interval = 0.1  # 每0.1秒检查一次
                 waited_time = 0
@@ -2228,7 +4071,7 @@ class RecordingThread(QThread):
                 stable_count = 0
                 while waited_time < max_wait_time:
                     if self.audio_saved:
-                        print("DEBUG: 音频已保存完成")
+                        capture_log.info("音频已保存完成")
                         break
                     # 检查音频文件是否存在
                     if self.system_audio_file and os.path.exists(self.system_audio_file):
@@ -2238,7 +4081,7 @@ class RecordingThread(QThread):
                             if file_size == last_size:
                                 stable_count += 1
                                 if stable_count >= 2:
-                                    print(f"DEBUG: 检测到音频文件已存在且稳定，大小: {file_size} 字节")
+                                    capture_log.info("检测到音频文件已存在且稳定，大小: %s 字节", file_size)
                                     self.audio_saved = True
                                     break
                             else:
@@ -2247,9 +4090,9 @@ class RecordingThread(QThread):
                     time.sleep(wait_interval)
                     waited_time += wait_interval
                 if not self.audio_saved:
-                    print("DEBUG: 警告：等待音频保存超时，但将继续处理")
+                    capture_log.warning("等待音频保存超时，但将继续处理")
             elif self.audio_stopping:
-                print("DEBUG: 音频录制器正在停止中，等待完成...")
+                capture_log.info("音频录制器正在停止中，等待完成...")
                 # 等待停止完成（优化：减少等待时间）
                 max_wait_time = 5  # 优化：最多等待5秒（从10秒减少）
                 wait_interval = 0.1  # 优化：每0.1秒检查一次（从0.2秒减少）
@@ -2258,9 +4101,9 @@ class RecordingThread(QThread):
                     time.sleep(wait_interval)
                     waited_time += wait_interval
                 if self.audio_stopping:
-                    print("DEBUG: 警告：等待音频停止超时")
+                    capture_log.warning("等待音频停止超时")
                 else:
-                    print("DEBUG: 音频停止完成")
+                    capture_log.info("音频停止完成")
         
         # 启动后台线程处理视频合并（避免阻塞）
         self._start_video_processing_thread()
@@ -2268,38 +4111,44 @@ class RecordingThread(QThread):
         # 注意：不在这里停止音频录制器，让try_ffmpeg_recording()方法完成音频保存
         # 音频录制器会在try_ffmpeg_recording()完成后自动清理
     
+    def _finish_split_parts(self):
+        """自动分段录制结束：完成事件传递第一个分段的路径和所有分段的总大小"""
+        parts = self.split_parts()
+        total_size = sum(os.path.getsize(part) for part in parts)
+        capture_log.info("自动分段录制完成，共 %s 个分段，总大小 %s 字节", len(parts), total_size)
+        for part in parts:
+            capture_log.info("%s", part)
+        self.output_has_audio = bool(self.ffmpeg_audio_inputs)
+        self.video_processing_complete.emit(parts[0] if parts else self.base_filepath, total_size)
+    
     def _send_completion_signal(self):
         """发送完成信号的辅助函数"""
         try:
             if os.path.exists(self.base_filepath):
                 file_size = os.path.getsize(self.base_filepath)
                 if file_size > 0:
-                    print(f"DEBUG: 准备发送视频处理完成信号，文件: {self.base_filepath}, 大小: {file_size} 字节")
+                    capture_log.info("准备发送视频处理完成信号，文件: %s, 大小: %s 字节", self.base_filepath, file_size)
                     try:
                         self.video_processing_complete.emit(self.base_filepath, file_size)
                     except Exception as emit_error:
-                        print(f"DEBUG: 发送视频处理完成信号失败: {emit_error}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("发送视频处理完成信号失败: %s", emit_error)
                 else:
-                    print(f"DEBUG: 警告：最终文件大小为0: {self.base_filepath}")
+                    capture_log.warning("最终文件大小为0: %s", self.base_filepath)
                     try:
                         self.video_processing_complete.emit(self.base_filepath, 0)
                     except:
                         pass
             else:
-                print(f"DEBUG: 警告：最终文件不存在: {self.base_filepath}")
+                capture_log.warning("最终文件不存在: %s", self.base_filepath)
                 try:
                     # 创建一个空文件作为占位符
                     with open(self.base_filepath, 'w') as f:
                         pass
                     self.video_processing_complete.emit(self.base_filepath, 0)
                 except Exception as fallback_error:
-                    print(f"DEBUG: 创建占位符文件也失败: {fallback_error}")
+                    capture_log.warning("创建占位符文件也失败: %s", fallback_error)
         except Exception as signal_error:
-            print(f"DEBUG: 发送完成信号时出错: {signal_error}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("发送完成信号时出错: %s", signal_error)
     
     def _start_video_processing_thread(self):
         """启动后台线程处理视频合并"""
@@ -2307,7 +4156,7 @@ class RecordingThread(QThread):
         
         def process_video():
             try:
-                print("DEBUG: 开始处理视频...")
+                capture_log.info("开始处理视频...")
                 # 确保所有异常都被捕获，避免闪退
                 import sys
                 
@@ -2317,14 +4166,13 @@ class RecordingThread(QThread):
                 
                 # 按照片段列表进行合并
                 if len(self.segment_list) > 1:
-                    print(f"DEBUG: 检测到 {len(self.segment_list)} 个视频片段（从列表文件），开始合并...")
+                    capture_log.info("检测到 %s 个视频片段（从列表文件），开始合并...", len(self.segment_list))
                     try:
-                        self._merge_segments()
-                        print("DEBUG: 片段合并完成")
+                        with self.tracer.span('concat', segments=len(self.segment_list) or len(self.video_segments)):
+                            self._merge_segments()
+                        capture_log.info("片段合并完成")
                     except Exception as merge_error:
-                        print(f"DEBUG: 合并片段时出错: {merge_error}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("合并片段时出错: %s", merge_error)
                         # 即使合并失败，也尝试使用第一个片段作为最终文件
                         try:
                             if len(self.segment_list) > 0:
@@ -2332,9 +4180,9 @@ class RecordingThread(QThread):
                                 first_segment = self.segment_list[0]['video_path']
                                 if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                                     shutil.copy2(first_segment, self.base_filepath)
-                                    print(f"DEBUG: 合并失败，已使用第一个片段作为最终文件: {first_segment}")
+                                    capture_log.warning("合并失败，已使用第一个片段作为最终文件: %s", first_segment)
                         except Exception as fallback_error:
-                            print(f"DEBUG: 使用第一个片段作为最终文件也失败: {fallback_error}")
+                            capture_log.warning("使用第一个片段作为最终文件也失败: %s", fallback_error)
                         # 无论是否成功，都继续执行后续的音视频合并和信号发送
                 elif len(self.segment_list) == 1:
                     # 只有一个片段，直接移动到最终文件路径
@@ -2342,35 +4190,33 @@ class RecordingThread(QThread):
                         first_segment_path = self.segment_list[0]['video_path']
                         if os.path.exists(first_segment_path):
                             import shutil
-                            shutil.move(first_segment_path, self.base_filepath)
-                            print(f"DEBUG: 单个片段，直接移动到最终文件: {self.base_filepath}")
+                            with self.tracer.span('segment_move'):
+                                shutil.move(first_segment_path, self.base_filepath)
+                            capture_log.info("单个片段，直接移动到最终文件: %s", self.base_filepath)
                         else:
-                            print(f"DEBUG: 警告：片段文件不存在: {first_segment_path}")
+                            capture_log.warning("片段文件不存在: %s", first_segment_path)
                             # 即使文件不存在，也发送完成信号
                             self._send_completion_signal()
                             return
                     except Exception as move_error:
-                        print(f"DEBUG: 移动片段文件时出错: {move_error}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("移动片段文件时出错: %s", move_error)
                         # 即使移动失败，也发送完成信号
                         self._send_completion_signal()
                         return
                 elif len(self.video_segments) > 1:
                     # 如果没有片段列表但有video_segments，使用旧的合并方式
-                    print(f"DEBUG: 检测到 {len(self.video_segments)} 个视频片段（旧格式），开始合并...")
+                    capture_log.info("检测到 %s 个视频片段（旧格式），开始合并...", len(self.video_segments))
                     try:
-                        self._merge_segments()
-                        print("DEBUG: 片段合并完成")
+                        with self.tracer.span('concat', segments=len(self.segment_list) or len(self.video_segments)):
+                            self._merge_segments()
+                        capture_log.info("片段合并完成")
                     except Exception as merge_error:
-                        print(f"DEBUG: 合并片段时出错: {merge_error}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("合并片段时出错: %s", merge_error)
                 else:
-                    print("DEBUG: 警告：没有视频片段")
+                    capture_log.warning("没有视频片段")
                     # 没有片段时，检查文件是否存在，如果存在则继续处理音频合并
                     if os.path.exists(self.base_filepath):
-                        print("DEBUG: 文件已存在，继续处理音频合并")
+                        capture_log.info("文件已存在，继续处理音频合并")
                         # 继续执行后续的音视频合并逻辑
                     else:
                         # 文件不存在时，发送完成信号
@@ -2379,10 +4225,10 @@ class RecordingThread(QThread):
                 
                 # 片段合并完成后，如果有系统音频，进行音视频合并
                 final_video_file = self.base_filepath
-                print(f"DEBUG: 检查音视频合并条件:")
-                print(f"DEBUG:   audio_enabled={self.audio_enabled}")
-                print(f"DEBUG:   system_audio_file={self.system_audio_file}")
-                print(f"DEBUG:   audio_saved={self.audio_saved}")
+                capture_log.info("检查音视频合并条件:")
+                capture_log.debug("audio_enabled=%s", self.audio_enabled)
+                capture_log.debug("system_audio_file=%s", self.system_audio_file)
+                capture_log.debug("audio_saved=%s", self.audio_saved)
                 
                 # 检查音频文件是否存在和有效（不依赖audio_saved标志，因为可能还没设置）
                 # 如果音频文件还没保存完成，等待一段时间（优化：减少等待时间）
@@ -2390,7 +4236,7 @@ class RecordingThread(QThread):
                 if self.system_audio_file:
                     # 如果audio_saved为False或文件不存在，等待音频文件保存完成
                     if not self.audio_saved or not os.path.exists(self.system_audio_file):
-                        print("DEBUG:   音频文件可能还在保存中，等待...")
+                        capture_log.debug("音频文件可能还在保存中，等待...")
                         import time
                         max_wait_time = 5  # 优化：最多等待5秒（从10秒减少）
                         wait_interval = 0.1  # 优化：每0.1秒检查一次（从0.2秒减少，响应更快）
@@ -2405,7 +4251,7 @@ class RecordingThread(QThread):
                                     if file_size == last_size:
                                         stable_count += 1
                                         if stable_count >= 2:
-                                            print(f"DEBUG:   音频文件已保存，大小: {file_size} 字节")
+                                            capture_log.debug("音频文件已保存，大小: %s 字节", file_size)
                                             self.audio_saved = True
                                             audio_file_valid = True
                                             break
@@ -2417,26 +4263,26 @@ class RecordingThread(QThread):
                         if not audio_file_valid:
                             # 如果超时但文件存在且大小>0，仍然认为有效
                             if os.path.exists(self.system_audio_file) and os.path.getsize(self.system_audio_file) > 0:
-                                print("DEBUG:   等待超时但文件存在，继续使用")
+                                capture_log.warning("等待超时但文件存在，继续使用")
                                 audio_file_valid = True
                             else:
-                                print("DEBUG:   警告：等待音频文件保存超时")
+                                capture_log.warning("等待音频文件保存超时")
                     else:
                         # audio_saved为True，直接检查文件
                         if os.path.exists(self.system_audio_file):
                             audio_file_size = os.path.getsize(self.system_audio_file)
-                            print(f"DEBUG:   音频文件存在: True, 大小: {audio_file_size} 字节")
+                            capture_log.debug("音频文件存在: True, 大小: %s 字节", audio_file_size)
                             if audio_file_size > 0:
                                 audio_file_valid = True
                         else:
-                            print(f"DEBUG:   音频文件存在: False（audio_saved=True但文件不存在）")
+                            capture_log.debug("音频文件存在: False（audio_saved=True但文件不存在）")
                 
                 # 检查麦克风音频文件是否存在和有效（优化：减少等待时间）
                 microphone_file_valid = False
                 if self.microphone_audio_file:
                     # 如果麦克风音频文件还没保存完成，等待一段时间
                     if not self.microphone_audio_saved or not os.path.exists(self.microphone_audio_file):
-                        print("DEBUG:   麦克风音频文件可能还在保存中，等待...")
+                        capture_log.debug("麦克风音频文件可能还在保存中，等待...")
                         import time
                         max_wait_time = 5  # 优化：最多等待5秒（从10秒减少）
                         wait_interval = 0.1  # 优化：每0.1秒检查一次（从0.2秒减少，响应更快）
@@ -2451,7 +4297,7 @@ class RecordingThread(QThread):
                                     if file_size == last_size:
                                         stable_count += 1
                                         if stable_count >= 2:
-                                            print(f"DEBUG:   麦克风音频文件已保存，大小: {file_size} 字节")
+                                            capture_log.debug("麦克风音频文件已保存，大小: %s 字节", file_size)
                                             self.microphone_audio_saved = True
                                             microphone_file_valid = True
                                             break
@@ -2463,26 +4309,26 @@ class RecordingThread(QThread):
                         if not microphone_file_valid:
                             # 如果超时但文件存在且大小>0，仍然认为有效
                             if os.path.exists(self.microphone_audio_file) and os.path.getsize(self.microphone_audio_file) > 0:
-                                print("DEBUG:   等待超时但文件存在，继续使用")
+                                capture_log.warning("等待超时但文件存在，继续使用")
                                 microphone_file_valid = True
                             else:
-                                print("DEBUG:   警告：等待麦克风音频文件保存超时")
+                                capture_log.warning("等待麦克风音频文件保存超时")
                     else:
                         # microphone_audio_saved为True，直接检查文件
                         if os.path.exists(self.microphone_audio_file):
                             microphone_file_size = os.path.getsize(self.microphone_audio_file)
-                            print(f"DEBUG:   麦克风音频文件存在: True, 大小: {microphone_file_size} 字节")
+                            capture_log.debug("麦克风音频文件存在: True, 大小: %s 字节", microphone_file_size)
                             if microphone_file_size > 0:
                                 microphone_file_valid = True
                         else:
-                            print(f"DEBUG:   麦克风音频文件存在: False（microphone_audio_saved=True但文件不存在）")
+                            capture_log.debug("麦克风音频文件存在: False（microphone_audio_saved=True但文件不存在）")
                 
                 if not microphone_file_valid and self.microphone_audio_file:
-                    print(f"DEBUG:   麦克风音频文件存在: False 或无效")
+                    capture_log.debug("麦克风音频文件存在: False 或无效")
                 
-                print(f"DEBUG:   最终视频文件存在: {os.path.exists(final_video_file)}")
-                print(f"DEBUG:   系统音频文件有效: {audio_file_valid}")
-                print(f"DEBUG:   麦克风音频文件有效: {microphone_file_valid}")
+                capture_log.debug("最终视频文件存在: %s", os.path.exists(final_video_file))
+                capture_log.debug("系统音频文件有效: %s", audio_file_valid)
+                capture_log.debug("麦克风音频文件有效: %s", microphone_file_valid)
                 
                 # 决定是否需要合并音频及合并方式
                 has_system_audio = self.system_audio_file and audio_file_valid
@@ -2490,7 +4336,7 @@ class RecordingThread(QThread):
                 
                 # 如果有任何音频文件存在且有效，就进行音视频合并
                 if (has_system_audio or has_microphone_audio) and os.path.exists(final_video_file):
-                    print(f"DEBUG: 检测到音频文件，正在进行音视频合并... (系统音频: {has_system_audio}, 麦克风音频: {has_microphone_audio})")
+                    capture_log.info("检测到音频文件，正在进行音视频合并... (系统音频: %s, 麦克风音频: %s)", has_system_audio, has_microphone_audio)
                     
                     # 发送进度信号
                     try:
@@ -2510,7 +4356,7 @@ class RecordingThread(QThread):
                         # 根据音频文件情况决定合并策略
                         if has_system_audio and has_microphone_audio:
                             # 情况1：同时有系统音频和麦克风音频，需要先混合
-                            print("DEBUG: 同时有系统音频和麦克风音频，先混合音频...")
+                            capture_log.info("同时有系统音频和麦克风音频，先混合音频...")
                             temp_mixed_audio = os.path.join(os.path.dirname(final_video_file), "temp_mixed_audio.wav")
                             
                             # 使用 FFmpeg 混合两个音频源（amix 滴器）- 优化速度
@@ -2528,7 +4374,8 @@ class RecordingThread(QThread):
                                 temp_mixed_audio  # 输出文件
                             ]
                             
-                            print(f"DEBUG: 混合音频命令: {' '.join(mix_cmd)}")
+                            capture_log.info("混合音频命令: %s", ' '.join(mix_cmd))
+                            mix_span = self.tracer.begin('audio_mix')
                             mix_process = subprocess.Popen(
                                 mix_cmd,
                                 stdout=subprocess.PIPE,
@@ -2540,26 +4387,27 @@ class RecordingThread(QThread):
                             
                             # 等待混合完成（优化：减少超时时间，因为处理应该更快）
                             stdout, stderr = mix_process.communicate(timeout=180)  # 优化：3分钟超时（从5分钟减少）
+                            self.tracer.end(mix_span, returncode=mix_process.returncode)
                             if mix_process.returncode == 0:
-                                print("DEBUG: 音频混合成功")
+                                capture_log.info("音频混合成功")
                                 audio_source = temp_mixed_audio
                                 try:
                                     self.merge_progress.emit("音频混合完成，正在合并视频...", 50, 100)
                                 except:
                                     pass
                             else:
-                                print(f"DEBUG: 音频混合失败，返回码: {mix_process.returncode}")
-                                print(f"DEBUG: 错误输出: {stderr[-500:] if stderr else '无错误信息'}")
+                                capture_log.warning("音频混合失败，返回码: %s", mix_process.returncode)
+                                capture_log.error("错误输出: %s", stderr[-500:] if stderr else '无错误信息')
                                 # 如果混合失败，仅使用系统音频
-                                print("DEBUG: 回退到仅使用系统音频")
+                                capture_log.info("回退到仅使用系统音频")
                                 audio_source = self.system_audio_file
                         elif has_system_audio:
                             # 情况2：仅有系统音频
-                            print("DEBUG: 仅有系统音频，直接合并")
+                            capture_log.info("仅有系统音频，直接合并")
                             audio_source = self.system_audio_file
                         else:
                             # 情况3：仅有麦克风音频
-                            print("DEBUG: 仅有麦克风音频，直接合并")
+                            capture_log.info("仅有麦克风音频，直接合并")
                             audio_source = self.microphone_audio_file
                         
                         # 使用 FFmpeg 合并音视频 - 优化速度
@@ -2580,10 +4428,11 @@ class RecordingThread(QThread):
                             final_video_file  # 最终输出文件
                         ]
                         
-                        print(f"DEBUG: 合并命令: {' '.join(merge_cmd)}")
+                        capture_log.info("合并命令: %s", ' '.join(merge_cmd))
                         merge_process = None
                         try:
-                            print("DEBUG: 开始执行音视频合并...")
+                            capture_log.info("开始执行音视频合并...")
+                            mux_span = self.tracer.begin('mux')
                             merge_process = subprocess.Popen(
                                 merge_cmd,
                                 stdout=subprocess.PIPE,
@@ -2597,10 +4446,12 @@ class RecordingThread(QThread):
                             try:
                                 stdout, stderr = merge_process.communicate(timeout=300)  # 优化：5分钟超时（从10分钟减少，因为编码更快了）
                                 return_code = merge_process.returncode
-                                print(f"DEBUG: 音视频合并进程返回码: {return_code}")
+                                self.tracer.end(mux_span, returncode=return_code)
+                                capture_log.info("音视频合并进程返回码: %s", return_code)
                                 
                                 if return_code == 0:
-                                    print("DEBUG: 音视频合并成功")
+                                    capture_log.info("音视频合并成功")
+                                    self.output_has_audio = True
                                     try:
                                         self.merge_progress.emit("音视频合并完成", 100, 100)
                                     except:
@@ -2608,7 +4459,7 @@ class RecordingThread(QThread):
                                     # 验证最终文件
                                     if os.path.exists(final_video_file):
                                         final_size = os.path.getsize(final_video_file)
-                                        print(f"DEBUG: 最终视频文件大小: {final_size / 1024 / 1024:.2f} MB")
+                                        capture_log.info("最终视频文件大小: %.2f MB", final_size / 1024 / 1024)
                                     # 删除临时文件
                                     try:
                                         if os.path.exists(temp_video_file):
@@ -2620,20 +4471,20 @@ class RecordingThread(QThread):
                                         if temp_mixed_audio and os.path.exists(temp_mixed_audio):
                                             os.remove(temp_mixed_audio)
                                     except Exception as e:
-                                        print(f"DEBUG: 删除临时文件失败: {e}")
+                                        capture_log.warning("删除临时文件失败: %s", e)
                                 else:
                                     error_output = stderr[-1000:] if stderr else '无错误信息'
-                                    print(f"DEBUG: 音视频合并失败，返回码: {return_code}")
-                                    print(f"DEBUG: 错误输出: {error_output}")
+                                    capture_log.warning("音视频合并失败，返回码: %s", return_code)
+                                    capture_log.error("错误输出: %s", error_output)
                                     # 恢复原始视频文件
                                     try:
                                         if os.path.exists(temp_video_file):
                                             os.rename(temp_video_file, final_video_file)
-                                            print("DEBUG: 已恢复原始视频文件（无音频）")
+                                            capture_log.info("已恢复原始视频文件（无音频）")
                                     except Exception as e:
-                                        print(f"DEBUG: 恢复原始视频文件失败: {e}")
+                                        capture_log.warning("恢复原始视频文件失败: %s", e)
                             except subprocess.TimeoutExpired:
-                                print("DEBUG: 音视频合并超时（10分钟），尝试终止进程...")
+                                capture_log.warning("音视频合并超时（10分钟），尝试终止进程...")
                                 # 强制关闭进程
                                 if merge_process:
                                     self._force_close_ffmpeg_process(merge_process, timeout=5)
@@ -2641,13 +4492,11 @@ class RecordingThread(QThread):
                                 try:
                                     if os.path.exists(temp_video_file):
                                         os.rename(temp_video_file, final_video_file)
-                                        print("DEBUG: 已恢复原始视频文件（无音频）")
+                                        capture_log.info("已恢复原始视频文件（无音频）")
                                 except Exception as e:
-                                    print(f"DEBUG: 恢复原始视频文件失败: {e}")
+                                    capture_log.warning("恢复原始视频文件失败: %s", e)
                         except Exception as merge_error:
-                            print(f"DEBUG: 音视频合并过程异常: {merge_error}")
-                            import traceback
-                            traceback.print_exc()
+                            capture_log.exception("音视频合并过程异常: %s", merge_error)
                             # 确保进程被关闭
                             if merge_process:
                                 try:
@@ -2658,22 +4507,21 @@ class RecordingThread(QThread):
                             try:
                                 if os.path.exists(temp_video_file):
                                     os.rename(temp_video_file, final_video_file)
-                                    print("DEBUG: 已恢复原始视频文件（无音频）")
+                                    capture_log.info("已恢复原始视频文件（无音频）")
                             except Exception as e:
-                                print(f"DEBUG: 恢复原始视频文件失败: {e}")
+                                capture_log.warning("恢复原始视频文件失败: %s", e)
                     except Exception as e:
-                        print(f"DEBUG: 音视频合并过程出错: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("音视频合并过程出错: %s", e)
                         # 恢复原始视频文件
                         try:
                             if os.path.exists(temp_video_file):
                                 os.rename(temp_video_file, final_video_file)
-                                print("DEBUG: 已恢复原始视频文件（无音频）")
+                                capture_log.info("已恢复原始视频文件（无音频）")
                         except Exception as rename_error:
-                            print(f"DEBUG: 恢复原始视频文件失败: {rename_error}")
+                            capture_log.warning("恢复原始视频文件失败: %s", rename_error)
                 
                 # 清理临时目录（延迟清理，避免文件被占用）
+                cleanup_span = self.tracer.begin('temp_cleanup')
                 try:
                     import time
                     time.sleep(1)  # 等待1秒，确保所有文件操作完成
@@ -2684,43 +4532,53 @@ class RecordingThread(QThread):
                         for retry in range(max_retries):
                             try:
                                 shutil.rmtree(self.segment_dir)
-                                print(f"DEBUG: 清理临时片段目录: {self.segment_dir}")
+                                capture_log.info("清理临时片段目录: %s", self.segment_dir)
                                 break
                             except Exception as rm_error:
                                 if retry < max_retries - 1:
-                                    print(f"DEBUG: 清理临时目录失败（重试 {retry + 1}/{max_retries}）: {rm_error}")
+                                    capture_log.warning("清理临时目录失败（重试 %s/%s）: %s", retry + 1, max_retries, rm_error)
                                     time.sleep(0.5)
                                 else:
-                                    print(f"DEBUG: 清理临时目录最终失败: {rm_error}")
+                                    capture_log.warning("清理临时目录最终失败: %s", rm_error)
                                     # 不抛出异常，避免影响后续处理
                 except Exception as e:
-                    print(f"DEBUG: 清理临时目录异常: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    capture_log.exception("清理临时目录异常: %s", e)
                     # 不抛出异常，避免影响后续处理
                 
+                self.tracer.end(cleanup_span)
+                
+                # 写入最终文件的媒体信息，文件列表无需再探测
+                with self.tracer.span('write_metadata'):
+                    self._write_output_metadata()
+                
+                # 趁文件还在系统缓存中，交给缩略图服务在后台生成，不推迟完成信号
+                # （无界面运行时没有缩略图服务，文件列表打开时再按需生成）
+                try:
+                    if _thumbnail_service is not None:
+                        _thumbnail_service.submit(self.base_filepath, self.recorded_duration)
+                except Exception as thumb_error:
+                    capture_log.warning("提交录制文件缩略图任务失败: %s", thumb_error)
+                
                 # 检查最终文件是否存在并发送完成信号
                 # 无论合并是否成功，只要文件存在就发送信号
                 try:
                     if os.path.exists(self.base_filepath):
                         file_size = os.path.getsize(self.base_filepath)
                         if file_size > 0:
-                            print(f"DEBUG: 准备发送视频处理完成信号，文件: {self.base_filepath}, 大小: {file_size} 字节")
+                            capture_log.info("准备发送视频处理完成信号，文件: %s, 大小: %s 字节", self.base_filepath, file_size)
                             try:
                                 self.video_processing_complete.emit(self.base_filepath, file_size)
                             except Exception as emit_error:
-                                print(f"DEBUG: 发送视频处理完成信号失败: {emit_error}")
-                                import traceback
-                                traceback.print_exc()
+                                capture_log.exception("发送视频处理完成信号失败: %s", emit_error)
                         else:
-                            print(f"DEBUG: 警告：最终文件大小为0: {self.base_filepath}")
+                            capture_log.warning("最终文件大小为0: %s", self.base_filepath)
                             # 即使文件大小为0，也发送信号，让UI知道处理完成
                             try:
                                 self.video_processing_complete.emit(self.base_filepath, 0)
                             except:
                                 pass
                     else:
-                        print(f"DEBUG: 警告：最终文件不存在: {self.base_filepath}")
+                        capture_log.warning("最终文件不存在: %s", self.base_filepath)
                         # 文件不存在时，尝试发送一个空信号，让UI知道处理完成
                         try:
                             # 创建一个空文件作为占位符
@@ -2728,17 +4586,11 @@ class RecordingThread(QThread):
                                 pass
                             self.video_processing_complete.emit(self.base_filepath, 0)
                         except Exception as fallback_error:
-                            print(f"DEBUG: 创建占位符文件也失败: {fallback_error}")
+                            capture_log.warning("创建占位符文件也失败: %s", fallback_error)
                 except Exception as signal_error:
-                    print(f"DEBUG: 发送完成信号时出错: {signal_error}")
-                    import traceback
-                    traceback.print_exc()
+                    capture_log.exception("发送完成信号时出错: %s", signal_error)
             except Exception as e:
-                print(f"DEBUG: 视频处理线程出错: {e}")
-                import traceback
-                import sys
-                exc_type, exc_value, exc_traceback = sys.exc_info()
-                traceback.print_exception(exc_type, exc_value, exc_traceback)
+                capture_log.exception("视频处理线程出错: %s", e)
                 # 即使出错，也尝试发送完成信号（如果文件存在）
                 try:
                     if os.path.exists(self.base_filepath):
@@ -2757,16 +4609,10 @@ class RecordingThread(QThread):
                         except:
                             pass
                 except Exception as final_error:
-                    print(f"DEBUG: 最终错误处理也失败: {final_error}")
-                    import traceback
-                    traceback.print_exc()
+                    capture_log.exception("最终错误处理也失败: %s", final_error)
             except BaseException as be:
                 # 捕获所有异常，包括KeyboardInterrupt和SystemExit
-                print(f"DEBUG: 视频处理线程发生严重错误: {be}")
-                import traceback
-                import sys
-                exc_type, exc_value, exc_traceback = sys.exc_info()
-                traceback.print_exception(exc_type, exc_value, exc_traceback)
+                capture_log.exception("视频处理线程发生严重错误: %s", be)
                 # 尝试发送完成信号
                 try:
                     if os.path.exists(self.base_filepath):
@@ -2782,6 +4628,50 @@ class RecordingThread(QThread):
         self._processing_threads.append(thread)
         thread.start()
     
+    @staticmethod
+    def _codec_name_for_encoder(encoder):
+        """编码器名称 -> ffprobe 中的编码名称"""
+        if not encoder:
+            return None
+        if '264' in encoder:
+            return 'h264'
+        if '265' in encoder or 'hevc' in encoder:
+            return 'hevc'
+        if encoder == 'libvpx':
+            return 'vp8'
+        return encoder
+    
+    def _write_output_metadata(self):
+        """把录制参数作为媒体信息写入文件库索引"""
+        try:
+            if not os.path.exists(self.base_filepath) or os.path.getsize(self.base_filepath) == 0:
+                return
+            with self.region_lock:
+                region = dict(self.region)
+            # 编码尺寸（动态鼠标区域的视口、按输出分辨率上限缩放后）
+            width, height = self._output_size(region)
+            file_size = os.path.getsize(self.base_filepath)
+            duration = self.recorded_duration
+            # 延时摄影的 recorded_duration 已是播放时长，帧率即播放帧率；可变帧率按实际编码帧数计算平均帧率
+            fps = float(self.fps)
+            encoded = sum(self.encoded_frames.values())
+            if self.vfr_enabled and encoded and duration and duration > 0:
+                fps = round(encoded / duration, 3)
+            info = {
+                'duration': duration,
+                'width': width,
+                'height': height,
+                'video_codec': self._codec_name_for_encoder(self.video_encoder),
+                'fps': fps,
+                'has_audio': self.output_has_audio,
+                'audio_codec': 'aac' if self.output_has_audio else None,
+                'bitrate': int(file_size * 8 / duration) if duration and duration > 0 else None,
+            }
+            get_recording_library_index().save_media_info_for_file(self.base_filepath, info)
+            capture_log.info("已写入录制文件媒体信息: %s", info)
+        except Exception as e:
+            capture_log.warning("写入录制文件媒体信息失败: %s", e)
+    
     def _merge_segments(self):
         """合并所有视频片段（按照片段列表文件）- 优化版本支持进度显示"""
         try:
@@ -2790,14 +4680,14 @@ class RecordingThread(QThread):
             if len(self.segment_list) > 0:
                 # 按照索引排序，确保顺序正确
                 sorted_segments = sorted(self.segment_list, key=lambda x: x['index'])
-                print(f"DEBUG: 准备合并 {len(sorted_segments)} 个片段（从列表文件）:")
+                capture_log.info("准备合并 %s 个片段（从列表文件）:", len(sorted_segments))
                 for seg_info in sorted_segments:
                     segments_to_merge.append(seg_info['video_path'])
-                    print(f"DEBUG: 片段 {seg_info['index']}: {seg_info['video_path']}, 时间: {seg_info['start_time']:.2f}-{seg_info['end_time']:.2f}秒")
+                    capture_log.info("片段 %s: %s, 时间: %.2f-%.2f秒", seg_info['index'], seg_info['video_path'], seg_info['start_time'], seg_info['end_time'])
             else:
                 # 使用旧的video_segments列表
                 segments_to_merge = self.video_segments.copy()
-                print(f"DEBUG: 准备合并 {len(segments_to_merge)} 个片段（旧格式）:")
+                capture_log.info("准备合并 %s 个片段（旧格式）:", len(segments_to_merge))
             
             # 先去重，保留第一次出现的片段
             seen_segments = set()
@@ -2807,10 +4697,10 @@ class RecordingThread(QThread):
                     seen_segments.add(segment)
                     unique_segments.append(segment)
                 else:
-                    print(f"DEBUG: 发现重复片段，跳过: {segment}")
+                    capture_log.info("发现重复片段，跳过: %s", segment)
             
             if len(unique_segments) != len(segments_to_merge):
-                print(f"DEBUG: 去重后从 {len(segments_to_merge)} 个片段减少到 {len(unique_segments)} 个片段")
+                capture_log.info("去重后从 %s 个片段减少到 %s 个片段", len(segments_to_merge), len(unique_segments))
                 segments_to_merge = unique_segments
             
             # 验证片段有效性
@@ -2819,19 +4709,19 @@ class RecordingThread(QThread):
                 if os.path.exists(segment):
                     file_size = os.path.getsize(segment)
                     if file_size > 0:
-                        print(f"DEBUG: 片段 {i}: {segment}, 大小: {file_size / 1024 / 1024:.2f} MB")
+                        capture_log.info("片段 %s: %s, 大小: %.2f MB", i, segment, file_size / 1024 / 1024)
                         valid_segments.append(segment)
                     else:
-                        print(f"DEBUG: 警告：片段 {i} 大小为0，跳过: {segment}")
+                        capture_log.warning("片段 %s 大小为0，跳过: %s", i, segment)
                 else:
-                    print(f"DEBUG: 警告：片段 {i} 不存在，跳过: {segment}")
+                    capture_log.warning("片段 %s 不存在，跳过: %s", i, segment)
             
             if len(valid_segments) == 0:
-                print("DEBUG: 错误：没有有效的视频片段可以合并")
+                capture_log.error("没有有效的视频片段可以合并")
                 return
             
             if len(valid_segments) != len(segments_to_merge):
-                print(f"DEBUG: 警告：只有 {len(valid_segments)}/{len(segments_to_merge)} 个片段有效")
+                capture_log.warning("只有 %s/%s 个片段有效", len(valid_segments), len(segments_to_merge))
                 segments_to_merge = valid_segments
             
             # 更新video_segments以保持兼容性
@@ -2856,7 +4746,7 @@ class RecordingThread(QThread):
             # 读取并打印concat文件内容，用于调试
             with open(concat_file, 'r', encoding='utf-8') as f:
                 concat_content = f.read()
-                print(f"DEBUG: concat文件内容:\n{concat_content}")
+                capture_log.info("concat文件内容:\n%s", concat_content)
             
             # 使用FFmpeg concat demuxer合并片段 - 优化参数（进一步提升速度）
             merge_cmd = [
@@ -2873,7 +4763,7 @@ class RecordingThread(QThread):
                 self.base_filepath
             ]
             
-            print(f"DEBUG: 合并片段命令: {' '.join(merge_cmd)}")
+            capture_log.info("合并片段命令: %s", ' '.join(merge_cmd))
             
             # 使用Popen以便实时读取进度
             try:
@@ -2919,7 +4809,7 @@ class RecordingThread(QThread):
                 try:
                     merge_process.wait(timeout=900)  # 15分钟超时，适应大文件
                 except subprocess.TimeoutExpired:
-                    print(f"DEBUG: 合并片段超时")
+                    capture_log.warning("合并片段超时")
                     merge_process.kill()
                     merge_process.wait()
                     raise Exception("合并超时")
@@ -2931,19 +4821,19 @@ class RecordingThread(QThread):
                 if merge_process.returncode == 0:
                     if os.path.exists(self.base_filepath):
                         final_size = os.path.getsize(self.base_filepath)
-                        print(f"DEBUG: 成功合并 {len(segments_to_merge)} 个片段到: {self.base_filepath}, 最终大小: {final_size / 1024 / 1024:.2f} MB")
+                        capture_log.info("成功合并 %s 个片段到: %s, 最终大小: %.2f MB", len(segments_to_merge), self.base_filepath, final_size / 1024 / 1024)
                         try:
                             self.merge_progress.emit("片段合并完成", 100, 100)
                         except:
                             pass
                     else:
-                        print(f"DEBUG: 警告：合并成功但文件不存在: {self.base_filepath}")
+                        capture_log.warning("合并成功但文件不存在: %s", self.base_filepath)
                 else:
                     error_output = ''.join(stderr_lines[-50:]) if stderr_lines else '无错误信息'
-                    print(f"DEBUG: 合并片段失败，返回码: {merge_process.returncode}")
-                    print(f"DEBUG: 错误输出: {error_output}")
+                    capture_log.warning("合并片段失败，返回码: %s", merge_process.returncode)
+                    capture_log.error("错误输出: %s", error_output)
                     # 如果合并失败，尝试使用concat filter方法
-                    print("DEBUG: 尝试使用concat filter方法...")
+                    capture_log.info("尝试使用concat filter方法...")
                     try:
                         self.merge_progress.emit("正在尝试备用合并方法...", 50, 100)
                     except:
@@ -2951,9 +4841,7 @@ class RecordingThread(QThread):
                     self._merge_segments_with_filter()
                     
             except subprocess.TimeoutExpired as timeout_error:
-                print(f"DEBUG: 合并片段超时: {timeout_error}")
-                import traceback
-                traceback.print_exc()
+                capture_log.exception("合并片段超时: %s", timeout_error)
                 # 超时时，尝试使用第一个有效片段作为最终文件
                 if len(self.video_segments) > 0:
                     try:
@@ -2961,14 +4849,12 @@ class RecordingThread(QThread):
                         first_segment = self.video_segments[0]
                         if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                             shutil.copy2(first_segment, self.base_filepath)
-                            print(f"DEBUG: 合并超时，已使用第一个片段作为最终文件: {first_segment}")
+                            capture_log.warning("合并超时，已使用第一个片段作为最终文件: %s", first_segment)
                     except Exception as fallback_error:
-                        print(f"DEBUG: 使用第一个片段作为最终文件也失败: {fallback_error}")
+                        capture_log.warning("使用第一个片段作为最终文件也失败: %s", fallback_error)
                 raise  # 重新抛出异常，让外层处理
             except Exception as subprocess_error:
-                print(f"DEBUG: subprocess调用失败: {subprocess_error}")
-                import traceback
-                traceback.print_exc()
+                capture_log.exception("subprocess调用失败: %s", subprocess_error)
                 # subprocess调用失败时，尝试使用第一个有效片段作为最终文件
                 if len(self.video_segments) > 0:
                     try:
@@ -2976,15 +4862,13 @@ class RecordingThread(QThread):
                         first_segment = self.video_segments[0]
                         if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                             shutil.copy2(first_segment, self.base_filepath)
-                            print(f"DEBUG: subprocess调用失败，已使用第一个片段作为最终文件: {first_segment}")
+                            capture_log.warning("subprocess调用失败，已使用第一个片段作为最终文件: %s", first_segment)
                     except Exception as fallback_error:
-                        print(f"DEBUG: 使用第一个片段作为最终文件也失败: {fallback_error}")
+                        capture_log.warning("使用第一个片段作为最终文件也失败: %s", fallback_error)
                 raise  # 重新抛出异常，让外层处理
                 
         except Exception as e:
-            print(f"DEBUG: 合并片段时出错: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("合并片段时出错: %s", e)
             # 即使出错，也尝试使用第一个有效片段作为最终文件
             try:
                 if len(self.video_segments) > 0:
@@ -2992,11 +4876,9 @@ class RecordingThread(QThread):
                     first_segment = self.video_segments[0]
                     if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                         shutil.copy2(first_segment, self.base_filepath)
-                        print(f"DEBUG: 合并异常，已使用第一个片段作为最终文件: {first_segment}")
+                        capture_log.warning("合并异常，已使用第一个片段作为最终文件: %s", first_segment)
             except Exception as fallback_error:
-                print(f"DEBUG: 回退也失败: {fallback_error}")
-                import traceback
-                traceback.print_exc()
+                capture_log.exception("回退也失败: %s", fallback_error)
     
     def _merge_segments_with_filter(self):
         """使用concat filter合并片段（备用方法）"""
@@ -3008,7 +4890,7 @@ class RecordingThread(QThread):
                 segments_to_merge = [seg_info['video_path'] for seg_info in sorted_segments if os.path.exists(seg_info['video_path'])]
             
             if len(segments_to_merge) == 0:
-                print("DEBUG: 错误：没有有效的视频片段可以合并（filter方法）")
+                capture_log.error("没有有效的视频片段可以合并（filter方法）")
                 return
             
             # 构建输入参数
@@ -3035,7 +4917,7 @@ class RecordingThread(QThread):
                 self.base_filepath
             ]
             
-            print(f"DEBUG: 使用filter方法合并片段")
+            capture_log.info("使用filter方法合并片段")
             # 增加超时时间，长视频合并可能需要更长时间
             merge_process = subprocess.run(
                 merge_cmd,
@@ -3046,10 +4928,10 @@ class RecordingThread(QThread):
             )
             
             if merge_process.returncode == 0:
-                print(f"DEBUG: 成功使用filter方法合并片段")
+                capture_log.info("成功使用filter方法合并片段")
             else:
                 error_output = merge_process.stderr[-1000:] if merge_process.stderr else '无错误信息'
-                print(f"DEBUG: filter方法合并也失败: {error_output}")
+                capture_log.warning("filter方法合并也失败: %s", error_output)
                 # 即使合并失败，也尝试使用第一个有效片段作为最终文件
                 if len(segments_to_merge) > 0:
                     try:
@@ -3057,15 +4939,11 @@ class RecordingThread(QThread):
                         first_segment = segments_to_merge[0]
                         if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                             shutil.copy2(first_segment, self.base_filepath)
-                            print(f"DEBUG: filter方法合并失败，已使用第一个片段作为最终文件: {first_segment}")
+                            capture_log.warning("filter方法合并失败，已使用第一个片段作为最终文件: %s", first_segment)
                     except Exception as fallback_error:
-                        print(f"DEBUG: 使用第一个片段作为最终文件也失败: {fallback_error}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("使用第一个片段作为最终文件也失败: %s", fallback_error)
         except Exception as e:
-            print(f"DEBUG: filter方法合并出错: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("filter方法合并出错: %s", e)
             # 即使出错，也尝试使用第一个有效片段作为最终文件
             try:
                 # 尝试获取片段列表
@@ -3079,16 +4957,333 @@ class RecordingThread(QThread):
                     first_segment = segments_to_merge[0]
                     if os.path.exists(first_segment) and os.path.getsize(first_segment) > 0:
                         shutil.copy2(first_segment, self.base_filepath)
-                        print(f"DEBUG: filter方法合并异常，已使用第一个片段作为最终文件: {first_segment}")
+                        capture_log.warning("filter方法合并异常，已使用第一个片段作为最终文件: %s", first_segment)
             except Exception as final_fallback_error:
-                print(f"DEBUG: 最终回退也失败: {final_fallback_error}")
-                import traceback
-                traceback.print_exc()
+                capture_log.exception("最终回退也失败: %s", final_fallback_error)
 
     def pause(self):
         """暂停录制（FFmpeg 不支持真正的暂停，这里只是标记状态）"""
+        if not self.paused and self.clock_started_at is not None:
+            self.clock_paused_at = time.time()
         self.paused = True
     
+    def _video_encoder_args(self):
+        """根据质量设置和编码器类型返回视频编码参数（-c:v 起）"""
+        # CRF 值范围：0-51，值越小质量越高（适用于 libx264, libopenh264 等）
+        quality_crf_map = {
+            '原画质': '18',      # 接近无损
+            '高质量': '23',      # 高质量（默认）
+            '中等质量': '28',    # 中等质量
+            '低质量': '32'       # 低质量
+        }
+        crf_value = quality_crf_map.get(self.quality, '23')
+        params = ['-c:v', self.video_encoder]
+        
+        if 'nvenc' in self.video_encoder:
+            # NVIDIA 硬件编码器使用 -cq (constant quality)，需要 nv12 像素格式
+            return params + ['-pix_fmt', 'nv12', '-preset', 'p4', '-cq', crf_value] + self._split_rate_cap_args()
+        
+        params.extend(['-pix_fmt', 'yuv420p'])
+        if self.video_encoder == 'libopenh264':
+            # OpenH264 使用码率控制
+            quality_bitrate_map = {
+                '原画质': '10000k',
+                '高质量': '5000k',
+                '中等质量': '3000k',
+                '低质量': '1500k'
+            }
+            params.extend(['-b:v', quality_bitrate_map.get(self.quality, '5000k')])
+        elif 'qsv' in self.video_encoder or 'amf' in self.video_encoder:
+            # Intel/AMD 硬件编码器使用码率控制
+            quality_bitrate_map = {
+                '原画质': '8000k',
+                '高质量': '4000k',
+                '中等质量': '2500k',
+                '低质量': '1200k'
+            }
+            params.extend(['-b:v', quality_bitrate_map.get(self.quality, '4000k')])
+        else:
+            params.extend(['-preset', 'medium', '-crf', crf_value])
+            # 只有 libx264 支持这些参数
+            if self.video_encoder == 'libx264':
+                params.extend(['-profile:v', 'high', '-level', '4.0'])
+        return params + self._split_rate_cap_args()
+    
+    # mpdecimate 阈值：8x8 块差异超过 hi 即视为变化；超过 lo 的块占比达到 frac 也视为变化
+    VFR_DECIMATE_HI = 64 * 12
+    VFR_DECIMATE_LO = 64 * 5
+    VFR_DECIMATE_FRAC = 0.33
+    
+    def _vfr_filter(self):
+        """去除重复/近似重复帧的滤镜（max 限制连续丢弃的帧数，保证最长间隔输出一帧）"""
+        max_dropped = max(1, int(round(self.fps * self.vfr_max_interval)) - 1)
+        return (f"mpdecimate=hi={self.VFR_DECIMATE_HI}:lo={self.VFR_DECIMATE_LO}"
+                f":frac={self.VFR_DECIMATE_FRAC}:max={max_dropped}")
+    
+    def _vfr_filter_suffix(self):
+        """追加到已有滤镜链末尾的可变帧率滤镜"""
+        return f",{self._vfr_filter()}" if self.vfr_enabled else ''
+    
+    # 输出分辨率上限对应的 (长边, 短边) 上限，等比缩放到两者都不超过
+    OUTPUT_SIZE_LIMITS = {2160: (3840, 2160), 1440: (2560, 1440), 1080: (1920, 1080), 720: (1280, 720)}
+    
+    def _frame_size(self, recording_region):
+        """进入缩放前的画面尺寸：动态鼠标区域时为视口尺寸"""
+        if self.mouse_follower is not None:
+            return self.mouse_follower.width, self.mouse_follower.height
+        return recording_region['width'], recording_region['height']
+    
+    def _follow_crop_filter(self):
+        """动态鼠标区域的裁剪滤镜（位于屏幕画面滤镜链最前面），未启用时返回 None"""
+        return self.mouse_follower.crop_filter() if self.mouse_follower is not None else None
+    
+    def _output_size(self, recording_region):
+        """按输出分辨率上限计算编码尺寸（保持宽高比、偶数尺寸），无需缩放时返回原尺寸"""
+        width, height = self._frame_size(recording_region)
+        limit = self.OUTPUT_SIZE_LIMITS.get(self.max_output_height)
+        if limit is None:
+            return width, height
+        # 长边对长边，竖屏区域同样适用
+        max_long, max_short = limit
+        long_side, short_side = max(width, height), min(width, height)
+        factor = min(1.0, max_long / long_side, max_short / short_side)
+        if factor >= 1.0:
+            return width, height
+        return max(2, int(width * factor) // 2 * 2), max(2, int(height * factor) // 2 * 2)
+    
+    def _scale_filter(self, recording_region, convert_format=True):
+        """缩小到输出分辨率的滤镜；convert_format 时在同一次缩放中完成像素格式转换，
+        避免先按原尺寸转换格式再缩放。无需缩放时返回 None"""
+        width, height = self._frame_size(recording_region)
+        out_width, out_height = self._output_size(recording_region)
+        if (out_width, out_height) == (width, height):
+            return None
+        scale = f"scale={out_width}:{out_height}:flags={self.scale_algorithm}"
+        if convert_format:
+            pixel_format = 'nv12' if self.video_encoder and 'nvenc' in self.video_encoder else 'yuv420p'
+            scale += f",format={pixel_format}"
+        return scale
+    
+    def _screen_scale_filter(self, recording_region):
+        """摄像头画中画合成前的屏幕裁剪/缩放滤镜，不需要时返回 None（不做原尺寸的空缩放）"""
+        filters = [self._follow_crop_filter(), self._scale_filter(recording_region, convert_format=False)]
+        return ','.join(f for f in filters if f) or None
+    
+    def _video_filter_chain(self, recording_region):
+        """屏幕画面的滤镜链：先裁剪鼠标区域、缩小，再去重（去重在小尺寸上比较更省CPU），没有滤镜时返回 None"""
+        filters = [self._follow_crop_filter(), self._scale_filter(recording_region), self._timelapse_filter()]
+        if self.vfr_enabled:
+            filters.append(self._vfr_filter())
+        return ','.join(f for f in filters if f) or None
+    
+    def _proxy_scale_filter(self):
+        """代理画面缩放：只缩小不放大，宽度按比例取偶数"""
+        pixel_format = 'nv12' if self.video_encoder and 'nvenc' in self.video_encoder else 'yuv420p'
+        return f"scale=-2:'min({self.proxy_height},ih)':flags={self.scale_algorithm},format={pixel_format}"
+    
+    def _proxy_branch(self, label):
+        """把滤镜输出 [label] 拆分为母版 [v] 与代理 [proxy]"""
+        return f"[{label}]split=2[v][proxy_src];[proxy_src]{self._proxy_scale_filter()}[proxy]"
+    
+    def _proxy_encoder_args(self):
+        """代理编码参数：与母版同一编码器，使用最快的预设和固定低码率"""
+        params = ['-c:v', self.video_encoder]
+        if 'nvenc' in self.video_encoder:
+            params.extend(['-preset', 'p1'])
+        elif self.video_encoder == 'libx264':
+            params.extend(['-preset', 'veryfast'])
+        bitrate = self.proxy_bitrate
+        params.extend(['-b:v', f'{bitrate}k', '-maxrate', f'{bitrate * 3 // 2}k', '-bufsize', f'{bitrate * 2}k'])
+        return params
+    
+    def _proxy_output_args(self, source, raw_input=False):
+        """代理文件的第二个输出（source 为滤镜标签或输入流；raw_input 时在输出端缩放）"""
+        if not self.proxy_height:
+            return []
+        args = ['-map', source]
+        if raw_input:
+            filters = [f for f in (self._follow_crop_filter(), self._proxy_scale_filter(), self._timelapse_filter()) if f]
+            if self.vfr_enabled:
+                filters.append(self._vfr_filter())
+            args.extend(['-vf', ','.join(filters)])
+        args.extend(self._proxy_encoder_args())
+        args.extend(self._frame_rate_output_args())
+        args.extend(['-an', '-f', 'mp4', '-y', self._next_proxy_segment()])
+        return args
+    
+    def _next_proxy_segment(self):
+        """为新启动的编码进程分配代理片段路径"""
+        if self.proxy_dir is None:
+            import tempfile
+            self.proxy_dir = tempfile.mkdtemp(prefix='recording_proxy_')
+        path = os.path.join(self.proxy_dir, f'proxy_{len(self.proxy_segments):03d}.mp4')
+        self.proxy_segments.append(path)
+        return path
+    
+    def _finalize_proxy(self):
+        """拼接代理片段（流复制），并从母版复制已混好的音频（自动分段时从各分段拼接），不再重新编码画面"""
+        segments = [path for path in self.proxy_segments if os.path.exists(path) and os.path.getsize(path) > 0]
+        if not segments:
+            capture_log.info("没有可用的代理片段，跳过代理文件")
+            return None
+        list_file = self._write_concat_list('proxy_concat.txt', segments)
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_file]
+        # 自动分段时 base_filepath 不会写入，音频在各分段文件中
+        audio_sources = self.split_parts() if self.split_enabled else [self.base_filepath]
+        audio_sources = [path for path in audio_sources if os.path.exists(path) and os.path.getsize(path) > 0]
+        if self.output_has_audio and audio_sources:
+            if len(audio_sources) == 1:
+                cmd.extend(['-i', audio_sources[0]])
+            else:
+                cmd.extend(['-f', 'concat', '-safe', '0', '-i', self._write_concat_list('proxy_audio.txt', audio_sources)])
+            cmd.extend(['-map', '0:v', '-map', '1:a', '-c:v', 'copy', '-c:a', 'aac', '-b:a', '96k', '-shortest'])
+        else:
+            cmd.extend(['-c', 'copy'])
+        cmd.extend(['-movflags', '+faststart', '-y', self.proxy_filepath])
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            timeout=120,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        if result.returncode != 0:
+            capture_log.error("生成代理文件失败: %s", result.stderr.decode('utf-8', errors='ignore')[-500:])
+            return None
+        capture_log.info("代理文件已生成: %s", self.proxy_filepath)
+        return self.proxy_filepath
+    
+    def _write_concat_list(self, name, paths):
+        """在代理目录中写入 concat 分离器的文件列表，返回列表路径"""
+        list_file = os.path.join(self.proxy_dir, name)
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for path in paths:
+                escaped = path.replace('\\', '/').replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        return list_file
+    
+    def _cleanup_proxy_dir(self):
+        if self.proxy_dir and os.path.exists(self.proxy_dir):
+            import shutil
+            shutil.rmtree(self.proxy_dir, ignore_errors=True)
+    
+    def _frame_rate_output_args(self):
+        """输出帧率参数：可变帧率按丢帧后的实际时间戳写入，不补重复帧；延时摄影按播放帧率写入
+        （输入帧率只有每秒零点几帧，不指定时输出会沿用输入帧率）"""
+        if self.timelapse_interval:
+            return ['-r', str(self.fps)]
+        if not self.vfr_enabled:
+            return []
+        return ['-fps_mode', 'vfr'] if self.ffmpeg_supports_fps_mode() else ['-vsync', 'vfr']
+    
+    _fps_mode_supported = None  # 进程内只检测一次
+    
+    @classmethod
+    def ffmpeg_supports_fps_mode(cls):
+        """FFmpeg 5.1 起才有 -fps_mode，更早的版本只能用 -vsync（新版本中已弃用但仍可用）"""
+        if cls._fps_mode_supported is None:
+            try:
+                result = subprocess.run(
+                    ['ffmpeg', '-hide_banner', '-h', 'long'],
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    timeout=3,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
+                cls._fps_mode_supported = '-fps_mode' in result.stdout
+            except Exception as e:
+                capture_log.warning("检测 FFmpeg 是否支持 -fps_mode 时出错: %s", e)
+                cls._fps_mode_supported = False
+            capture_log.info("可变帧率参数: %s", '-fps_mode vfr' if cls._fps_mode_supported else '-vsync vfr')
+        return cls._fps_mode_supported
+    
+    # 延时摄影体积估算：1080p 屏幕画面每个输出帧的大致大小（KB）。相邻两帧间隔数秒，画面差异比实时录制大
+    TIMELAPSE_FRAME_KB = {'原画质': 250, '高质量': 120, '中等质量': 60, '低质量': 35}
+    
+    def _timelapse_speedup(self):
+        """延时摄影的加速倍数（录制时长 / 输出时长），未启用时为 1"""
+        return self.timelapse_interval * self.fps if self.timelapse_interval else 1.0
+    
+    def _capture_rate(self):
+        """采集帧率：延时摄影时为 1/间隔（分数形式，例如每 2 秒一帧为 1/2）"""
+        if not self.timelapse_interval:
+            return str(self.fps)
+        from fractions import Fraction
+        interval = Fraction(self.timelapse_interval).limit_denominator(1000)
+        return f"{interval.denominator}/{interval.numerator}"
+    
+    def _timelapse_filter(self):
+        """延时摄影按帧序号重排时间戳，每帧播放 1/fps 秒（采集抖动不会造成播放卡顿），未启用时返回 None
+        （先把时间基改为 1/fps：输入时间基可能是 1/采集帧率，例如每秒一帧时为 1 秒，N/fps 会被取整成重复时间戳而丢帧）"""
+        return f"settb=1/{self.fps},setpts=N" if self.timelapse_interval else None
+    
+    @classmethod
+    def timelapse_estimate(cls, interval, fps, quality, record_seconds, pixels=1920 * 1080):
+        """估算录制 record_seconds 秒的延时摄影输出：(播放时长秒数, 文件字节数)，每帧大小按输出像素数相对 1080p 折算"""
+        frames = record_seconds / interval
+        frame_bytes = cls.TIMELAPSE_FRAME_KB.get(quality, 120) * 1024 * pixels / (1920 * 1080)
+        return frames / fps, int(frames * frame_bytes)
+    
+    def timelapse_summary(self):
+        """延时摄影参数与当前进度（未启用时为 None）"""
+        if not self.timelapse_interval:
+            return None
+        frames = int(self.elapsed_seconds() / self.timelapse_interval)
+        return {
+            'interval': self.timelapse_interval,
+            'playback_fps': self.fps,
+            'speedup': round(self._timelapse_speedup(), 3),
+            'frames': frames,
+            'output_seconds': round(frames / self.fps, 3),
+        }
+    
+    def _note_encoded_frames(self, pid, text):
+        """从 FFmpeg 进度输出中记录该进程已编码的帧数"""
+        if 'frame=' not in text:
+            return
+        counts = re.findall(r'frame=\s*(\d+)', text)
+        if counts:
+            self.encoded_frames[pid] = int(counts[-1])
+    
+    def frame_counts(self):
+        """采集帧数（按有效录制时长估算）、实际编码帧数和可变帧率节省的帧数"""
+        captured = int(round(self.elapsed_seconds() * (1.0 / self.timelapse_interval if self.timelapse_interval else self.fps)))
+        encoded = sum(self.encoded_frames.values())
+        return {
+            'frames_captured': captured,
+            'frames_encoded': encoded,
+            'frames_saved': max(0, captured - encoded) if self.vfr_enabled and encoded else 0,
+        }
+    
+    def _microphone_input_args(self):
+        """自动分段时麦克风的 FFmpeg 输入参数（合成画面源时用合成正弦波代替）"""
+        if self.capture_source or self.microphone_device == 'synthetic':
+            return ['-re', '-f', 'lavfi', '-i', 'sine=frequency=880:sample_rate=48000']
+        if sys.platform == 'win32':
+            return ['-f', 'dshow', '-i', f'audio={self.microphone_device}']
+        return ['-f', 'pulse', '-i', self.microphone_device or 'default']
+    
+    def _audio_mix_parts(self, kinds, first_index):
+        """音频输入的滤镜与映射：麦克风经过 volume@mic（录制中用命令静音/取消静音），多路输入用 amix 混音
+        
+        kinds 为各音频输入的类型，first_index 为第一个音频输入的序号；返回 (滤镜列表, -map 参数)
+        """
+        filters = []
+        sources = []
+        for i, kind in enumerate(kinds):
+            stream = f'[{first_index + i}:a]'
+            if kind == 'microphone':
+                filters.append(f"{stream}volume@mic={0 if self.microphone_muted else 1}[mic]")
+                stream = '[mic]'
+            sources.append(stream)
+        if len(sources) > 1:
+            filters.append(''.join(sources) + f'amix=inputs={len(sources)}:duration=longest[a]')
+            return filters, '[a]'
+        if filters:
+            return filters, '[mic]'
+        return filters, f'{first_index}:a'
+    
     def _get_audio_quality_params(self):
         """根据音频质量设置返回相应的编码参数"""
         # 音频质量参数映射
@@ -3137,18 +5332,25 @@ class RecordingThread(QThread):
     
     def resume(self):
         """恢复录制"""
+        if self.clock_paused_at is not None:
+            self.clock_paused_total += time.time() - self.clock_paused_at
+            self.clock_paused_at = None
         self.paused = False
     
     def update_region(self, new_region):
         """更新录制区域（使用分段录制方案：保存当前片段，使用新区域继续录制）"""
+        with self.tracer.span('region_update'):
+            return self._update_region(new_region)
+    
+    def _update_region(self, new_region):
         with self.region_lock:
             old_region = self.region.copy()
             self.region = new_region.copy()
-            print(f"DEBUG: 更新录制区域从 {old_region} 到 {new_region}")
+            capture_log.info("更新录制区域从 %s 到 %s", old_region, new_region)
             
             # 如果FFmpeg正在运行，需要保存当前片段并重新启动
             if self.running and self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-                print("DEBUG: 区域改变，保存当前片段并使用新区域继续录制")
+                capture_log.info("区域改变，保存当前片段并使用新区域继续录制")
                 
                 # 停止当前FFmpeg进程并保存片段（使用强制关闭方法）
                 old_filepath = self.filepath
@@ -3168,14 +5370,15 @@ class RecordingThread(QThread):
                         # 这是第一次区域改变，将原始文件复制为第一个片段
                         first_segment = os.path.join(self.segment_dir, f'segment_{self.segment_index:04d}.mp4')
                         import shutil
-                        shutil.copy2(old_filepath, first_segment)
+                        with self.tracer.span('segment_copy'):
+                            shutil.copy2(old_filepath, first_segment)
                         self.video_segments.append(first_segment)
                         self.segment_index += 1
-                        print(f"DEBUG: 第一次区域改变，保存原始文件为第一个片段: {first_segment}")
+                        capture_log.info("第一次区域改变，保存原始文件为第一个片段: %s", first_segment)
                     else:
                         # 已经是片段文件，直接添加
                         self.video_segments.append(old_filepath)
-                        print(f"DEBUG: 保存片段: {old_filepath}")
+                        capture_log.info("保存片段: %s", old_filepath)
                 
                 # 创建新的片段文件路径
                 current_segment = os.path.join(self.segment_dir, f'segment_{self.segment_index:04d}.mp4')
@@ -3197,14 +5400,14 @@ class RecordingThread(QThread):
                 current_filepath = self.filepath
             
             if not self.running:
-                print("DEBUG: 录制已停止，不再重新启动FFmpeg")
+                capture_log.info("录制已停止，不再重新启动FFmpeg")
                 return
             
             if self.ffmpeg_process is not None:
-                print("DEBUG: FFmpeg进程已存在，跳过重新启动")
+                capture_log.info("FFmpeg进程已存在，跳过重新启动")
                 return
             
-            print(f"DEBUG: 重新启动FFmpeg进程，使用区域: {current_region}, 文件路径: {current_filepath}")
+            capture_log.info("重新启动FFmpeg进程，使用区域: %s, 文件路径: %s", current_region, current_filepath)
             
             # 注意：由于FFmpeg命令构建逻辑很复杂，我们暂时不在这里重新构建命令
             # 而是设置一个标志，让主线程知道需要重新启动FFmpeg进程
@@ -3220,32 +5423,30 @@ class RecordingThread(QThread):
             # 实际上，由于我们已经有了filepath，我们可以直接重新启动FFmpeg进程
             # 但需要重新构建命令，这很复杂
             # 所以暂时不实现，而是让主线程处理
-            print("DEBUG: 注意：_restart_ffmpeg_only暂未实现完整的FFmpeg启动逻辑")
+            capture_log.info("注意：_restart_ffmpeg_only暂未实现完整的FFmpeg启动逻辑")
         except Exception as e:
-            print(f"DEBUG: _restart_ffmpeg_only出错: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("_restart_ffmpeg_only出错: %s", e)
     
     def set_audio_enabled(self, enabled):
         """动态控制系统音频录制（录制过程中）"""
-        print(f"DEBUG: RecordingThread - 设置音频状态: {enabled}")
+        capture_log.info("RecordingThread - 设置音频状态: %s", enabled)
         with self.audio_recorder_lock:
             if self.system_audio_recorder and self.system_audio_recorder.is_recording:
                 if enabled:
                     self.system_audio_recorder.unmute_audio()
-                    print("DEBUG: 已启用系统音频录制")
+                    capture_log.info("已启用系统音频录制")
                 else:
                     self.system_audio_recorder.mute_audio()
-                    print("DEBUG: 已禁用系统音频录制")
+                    capture_log.info("已禁用系统音频录制")
                 return True
             elif enabled and self.system_audio_recorder and not self.system_audio_recorder.is_recording:
                 # 录制过程中首次启用音频，需要启动系统音频录制器
-                print("DEBUG: 录制过程中首次启用音频，动态启动系统音频录制器")
+                capture_log.info("录制过程中首次启用音频，动态启动系统音频录制器")
                 import tempfile
                 import time
                 if not self.system_audio_file:
                     self.system_audio_file = os.path.join(tempfile.gettempdir(), "system_audio_recording.wav")
-                print(f"DEBUG: 系统音频文件路径: {self.system_audio_file}")
+                capture_log.info("系统音频文件路径: %s", self.system_audio_file)
                 
                 # 计算从录制开始到现在的时间差（排除暂停时间）
                 elapsed_time = 0.0
@@ -3255,11 +5456,11 @@ class RecordingThread(QThread):
                     # 排除暂停时间
                     if self.system_audio_recorder and hasattr(self.system_audio_recorder, 'total_pause_duration'):
                         elapsed_time -= self.system_audio_recorder.total_pause_duration
-                    print(f"DEBUG: 录制已进行 {elapsed_time:.2f} 秒，需要预填充静音数据")
+                    capture_log.info("录制已进行 %.2f 秒，需要预填充静音数据", elapsed_time)
                 
                 # 启动音频录制器
                 if self.system_audio_recorder.start_recording():
-                    print("DEBUG: 系统音频录制器已成功启动")
+                    capture_log.info("系统音频录制器已成功启动")
                     
                     # 如果已经录制了一段时间，需要预填充静音数据以对齐时间轴
                     if elapsed_time > 0:
@@ -3268,57 +5469,73 @@ class RecordingThread(QThread):
                         silence_chunks_needed = int(elapsed_time / chunk_duration)
                         
                         if silence_chunks_needed > 0:
-                            print(f"DEBUG: 预填充 {silence_chunks_needed} 个静音chunk，对齐 {elapsed_time:.2f} 秒的时间差")
+                            capture_log.info("预填充 %s 个静音chunk，对齐 %.2f 秒的时间差", silence_chunks_needed, elapsed_time)
                             # 生成静音数据
                             silence_chunk = self.system_audio_recorder._generate_silence_chunk()
                             # 填充到录制数据列表
                             for _ in range(silence_chunks_needed):
                                 self.system_audio_recorder.recording_data.append(silence_chunk)
-                            print(f"DEBUG: 静音数据填充完成，当前总chunk数: {len(self.system_audio_recorder.recording_data)}")
+                            capture_log.info("静音数据填充完成，当前总chunk数: %s", len(self.system_audio_recorder.recording_data))
                     
                     return True
                 else:
-                    print("DEBUG: 系统音频录制器启动失败")
+                    capture_log.warning("系统音频录制器启动失败")
                     return False
             else:
-                print("DEBUG: 系统音频录制器不可用或未开始录制")
+                capture_log.info("系统音频录制器不可用或未开始录制")
+                return False
+    
+    def _set_split_microphone(self, enabled):
+        """自动分段时麦克风在 FFmpeg 内混音：通过 volume@mic 命令静音/取消静音，不重启进程"""
+        self.microphone_muted = not enabled
+        if not any(kind == 'microphone' for kind, _ in self.ffmpeg_audio_inputs):
+            audio_log.warning("自动分段录制开始时没有采集麦克风，无法中途开启")
+            return False
+        process = self.ffmpeg_process
+        if process is not None and process.poll() is None:
+            try:
+                process.stdin.write(f"cvolume@mic -1 volume {1 if enabled else 0}\n".encode('ascii'))
+                process.stdin.flush()
+            except (OSError, ValueError, AttributeError):
                 return False
+        audio_log.info("自动分段录制：麦克风已%s", '取消静音' if enabled else '静音')
+        return True
     
     def set_microphone_enabled(self, enabled):
         """动态控制麦克风录制（录制过程中）"""
-        print(f"DEBUG: RecordingThread - 设置麦克风状态: {enabled}")
+        capture_log.info("RecordingThread - 设置麦克风状态: %s", enabled)
+        if self.split_enabled:
+            return self._set_split_microphone(enabled)
         with self.audio_recorder_lock:
             # 更新microphone_enabled标志（不仅仅是microphone_muted）
             if enabled:
                 self.microphone_enabled = True
                 self.microphone_muted = False
-                print("DEBUG: 已启用麦克风录制")
+                capture_log.info("已启用麦克风录制")
                 
                 # 如果麦克风音频录制器不存在，但microphone_device存在，尝试创建录制器
                 if not self.microphone_audio_recorder and self.microphone_device:
                     try:
                         # MicrophoneAudioRecorder 类在同一个文件中定义，可以直接使用
-                        self.microphone_audio_recorder = MicrophoneAudioRecorder(device_name=self.microphone_device)
-                        print(f"DEBUG: 动态创建麦克风音频录制器，设备: {self.microphone_device}")
+                        self.microphone_audio_recorder = self._create_audio_recorder('microphone')
+                        capture_log.info("动态创建麦克风音频录制器，设备: %s", self.microphone_device)
                     except Exception as e:
-                        print(f"DEBUG: 动态创建麦克风音频录制器失败: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        capture_log.exception("动态创建麦克风音频录制器失败: %s", e)
                         return False
                 
                 # 如果麦克风音频录制器存在且正在录制，取消静音
                 if self.microphone_audio_recorder and self.microphone_audio_recorder.is_recording:
                     self.microphone_audio_recorder.unmute_audio()
-                    print("DEBUG: 麦克风音频录制器已取消静音")
+                    capture_log.info("麦克风音频录制器已取消静音")
                     return True
                 elif enabled and self.microphone_audio_recorder and not self.microphone_audio_recorder.is_recording:
                     # 录制过程中首次启用麦克风，需要启动麦克风音频录制器
-                    print("DEBUG: 录制过程中首次启用麦克风，动态启动麦克风音频录制器")
+                    capture_log.info("录制过程中首次启用麦克风，动态启动麦克风音频录制器")
                     import tempfile
                     import time
                     if not self.microphone_audio_file:
                         self.microphone_audio_file = os.path.join(tempfile.gettempdir(), "microphone_audio_recording.wav")
-                    print(f"DEBUG: 麦克风音频文件路径: {self.microphone_audio_file}")
+                    capture_log.info("麦克风音频文件路径: %s", self.microphone_audio_file)
                     
                     # 计算从录制开始到现在的时间差（排除暂停时间）
                     elapsed_time = 0.0
@@ -3330,11 +5547,11 @@ class RecordingThread(QThread):
                             elapsed_time -= self.system_audio_recorder.total_pause_duration
                         elif self.microphone_audio_recorder and hasattr(self.microphone_audio_recorder, 'total_pause_duration'):
                             elapsed_time -= self.microphone_audio_recorder.total_pause_duration
-                        print(f"DEBUG: 录制已进行 {elapsed_time:.2f} 秒，需要预填充静音数据")
+                        capture_log.info("录制已进行 %.2f 秒，需要预填充静音数据", elapsed_time)
                     
                     # 启动麦克风音频录制器
                     if self.microphone_audio_recorder.start_recording():
-                        print("DEBUG: 麦克风音频录制器已成功启动")
+                        capture_log.info("麦克风音频录制器已成功启动")
                         
                         # 如果已经录制了一段时间，需要预填充静音数据以对齐时间轴
                         if elapsed_time > 0:
@@ -3343,31 +5560,31 @@ class RecordingThread(QThread):
                             silence_chunks_needed = int(elapsed_time / chunk_duration)
                             
                             if silence_chunks_needed > 0:
-                                print(f"DEBUG: 预填充 {silence_chunks_needed} 个静音chunk，对齐 {elapsed_time:.2f} 秒的时间差")
+                                capture_log.info("预填充 %s 个静音chunk，对齐 %.2f 秒的时间差", silence_chunks_needed, elapsed_time)
                                 # 生成静音数据
                                 silence_chunk = self.microphone_audio_recorder._generate_silence_chunk()
                                 # 填充到录制数据列表
                                 for _ in range(silence_chunks_needed):
                                     self.microphone_audio_recorder.recording_data.append(silence_chunk)
-                                print(f"DEBUG: 静音数据填充完成，当前总chunk数: {len(self.microphone_audio_recorder.recording_data)}")
+                                capture_log.info("静音数据填充完成，当前总chunk数: %s", len(self.microphone_audio_recorder.recording_data))
                         
                         return True
                     else:
-                        print("DEBUG: 麦克风音频录制器启动失败")
+                        capture_log.warning("麦克风音频录制器启动失败")
                         return False
                 elif not self.microphone_device:
-                    print("DEBUG: 未选择麦克风设备，无法启动录制")
+                    capture_log.warning("未选择麦克风设备，无法启动录制")
                     return False
                 else:
-                    print("DEBUG: 麦克风音频录制器不可用")
+                    capture_log.info("麦克风音频录制器不可用")
                     return False
             else:
                 self.microphone_muted = True
-                print("DEBUG: 已禁用麦克风录制")
+                capture_log.info("已禁用麦克风录制")
                 # 如果麦克风音频录制器存在且正在录制，静音
                 if self.microphone_audio_recorder and self.microphone_audio_recorder.is_recording:
                     self.microphone_audio_recorder.mute_audio()
-                    print("DEBUG: 麦克风音频录制器已静音")
+                    capture_log.info("麦克风音频录制器已静音")
                 
                 return True
     
@@ -3377,7 +5594,7 @@ class RecordingThread(QThread):
             if not self.running or not self.ffmpeg_process:
                 return
             
-            print("DEBUG: 开始片段切换...")
+            capture_log.info("开始片段切换...")
             
             # 记录当前片段的结束时间
             current_time = time.time()
@@ -3402,7 +5619,8 @@ class RecordingThread(QThread):
                     # 第一个片段，复制到片段目录
                     new_segment_path = os.path.join(self.segment_dir, f'segment_0.mp4')
                     import shutil
-                    shutil.copy2(old_filepath, new_segment_path)
+                    with self.tracer.span('segment_copy'):
+                        shutil.copy2(old_filepath, new_segment_path)
                     self._add_segment_to_list(new_segment_path, start_time=0.0, end_time=segment_end_time)
                     self.segment_index = 1
                 else:
@@ -3416,12 +5634,10 @@ class RecordingThread(QThread):
             # 重新启动FFmpeg进程（使用新的麦克风状态）
             self.try_ffmpeg_recording()
             
-            print(f"DEBUG: 片段切换完成，新片段: {self.filepath}")
+            capture_log.info("片段切换完成，新片段: %s", self.filepath)
             
         except Exception as e:
-            print(f"DEBUG: 片段切换失败: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("片段切换失败: %s", e)
     
     def _start_ffmpeg_process_only(self):
         """只启动FFmpeg进程，不启动while循环（用于恢复录制）
@@ -3445,44 +5661,35 @@ class RecordingThread(QThread):
                 with self.region_lock:
                     self.region['width'] = adjusted_width
                     self.region['height'] = adjusted_height
+            if self.mouse_follower is not None:
+                self.mouse_follower.begin_process(recording_region)
             
             # 构建 FFmpeg 命令（复用 try_ffmpeg_recording 的逻辑，但简化音频处理）
             # 因为恢复录制时，系统音频通常已经通过 pyaudiowpatch 在录制
             cmd = ['ffmpeg']
             
             # 视频输入（屏幕捕获）
-            if sys.platform == 'win32':
-                gdigrab_options = [
-                    '-f', 'gdigrab',
-                    '-framerate', str(self.fps),
-                    '-offset_x', str(recording_region['left']),
-                    '-offset_y', str(recording_region['top']),
-                    '-video_size', f"{recording_region['width']}x{recording_region['height']}",
-                ]
-                if not self.show_cursor:
-                    gdigrab_options.extend(['-draw_mouse', '0'])
-                gdigrab_options.append('-i')
-                gdigrab_options.append('desktop')
-                cmd.extend(gdigrab_options)
+            cmd.extend(self._screen_input_args(recording_region))
             
             # 摄像头输入（如果启用）
             camera_input_index = None
             if self.camera_enabled and self.camera_device:
-                if sys.platform == 'win32':
+                camera_args = self._camera_input_args()
+                if camera_args:
                     camera_input_index = len(cmd)
-                    camera_input = f'video="{self.camera_device}"'
-                    cmd.extend([
-                        '-f', 'dshow',
-                        '-video_size', '640x480',
-                        '-framerate', '30',
-                        '-i', camera_input
-                    ])
+                    cmd.extend(camera_args)
             
             # 音频输入（简化：恢复录制时通常系统音频已通过pyaudiowpatch录制，所以这里不添加音频输入）
             # 但如果需要，可以添加简单的音频输入
             has_audio = False
             audio_inputs = []
-            if self.audio_enabled and (not self.system_audio_recorder or not self.system_audio_file):
+            if self.split_enabled:
+                # 自动分段：沿用开始录制时由 FFmpeg 直接采集的音频输入
+                for kind, input_args in self.ffmpeg_audio_inputs:
+                    cmd.extend(input_args)
+                    audio_inputs.append(kind)
+                has_audio = bool(audio_inputs)
+            elif self.audio_enabled and (not self.system_audio_recorder or not self.system_audio_file):
                 # 只有在没有使用pyaudiowpatch时才添加FFmpeg音频输入
                 if sys.platform == 'win32':
                     # 简化：尝试添加WASAPI loopback
@@ -3492,75 +5699,86 @@ class RecordingThread(QThread):
                     except:
                         pass
             
-            # 构建编码参数
-            quality_crf_map = {
-                '原画质': '18',
-                '高质量': '23',
-                '中等质量': '28',
-                '低质量': '32'
-            }
-            crf_value = quality_crf_map.get(self.quality, '23')
-            
-            use_bitrate = False
-            use_cq = False
-            if self.video_encoder == 'libopenh264':
-                bitrate_value = '5000k'
-                use_bitrate = True
-            elif 'nvenc' in self.video_encoder:
-                cq_value = crf_value
-                use_cq = True
-            elif 'qsv' in self.video_encoder or 'amf' in self.video_encoder:
-                bitrate_value = '4000k'
-                use_bitrate = True
-            
-            # 视频编码参数
-            video_encoder_params = ['-c:v', self.video_encoder]
-            if use_cq and 'nvenc' in self.video_encoder:
-                video_encoder_params.extend(['-pix_fmt', 'nv12', '-preset', 'p4', '-cq', cq_value])
+            # 自动分段的音频混音与映射（音频输入在摄像头和遮罩图之后）
+            audio_filters, audio_map = [], None
+            if audio_inputs:
+                audio_first = 2 + int(self.pip_mask_input) if camera_input_index is not None else 1
+                audio_filters, audio_map = self._audio_mix_parts(audio_inputs, audio_first)
+            
+            # 视频滤镜与编码参数（与开始录制时相同）
+            if camera_input_index is not None:
+                # 画中画：与开始录制时同样的合成布局
+                video_label = 'vmain' if self.proxy_height else 'v'
+                filter_parts = self._pip_filter_parts(recording_region, video_label)
+                if self.proxy_height:
+                    filter_parts.append(self._proxy_branch(video_label))
+                filter_parts.extend(audio_filters)
+                cmd.extend(['-filter_complex', ';'.join(filter_parts), '-map', '[v]'])
+                if has_audio:
+                    cmd.extend(['-map', audio_map or f"{2 + int(self.pip_mask_input)}:a"])
             else:
-                video_encoder_params.extend(['-pix_fmt', 'yuv420p'])
-                if use_bitrate:
-                    video_encoder_params.extend(['-b:v', bitrate_value])
+                video_filters = self._video_filter_chain(recording_region)
+                if video_filters:
+                    cmd.extend(['-vf', video_filters])
+                if audio_map is not None:
+                    # 明确映射，多路音频输入时全部混入而不是只选中其中一路
+                    if audio_filters:
+                        cmd.extend(['-filter_complex', ';'.join(audio_filters)])
+                    cmd.extend(['-map', '0:v', '-map', audio_map])
                 else:
-                    video_encoder_params.extend(['-preset', 'medium', '-crf', crf_value])
-                    if self.video_encoder == 'libx264':
-                        video_encoder_params.extend(['-profile:v', 'high', '-level', '4.0'])
-            
-            cmd.extend(video_encoder_params)
+                    # 明确映射：推流时 tee 封装器不会自动选择流
+                    cmd.extend(['-map', '0:v'])
+                    if has_audio:
+                        cmd.extend(['-map', '1:a'])
+            cmd.extend(self._video_encoder_args())
+            cmd.extend(self._frame_rate_output_args())
             
             # 音频编码参数（如果有音频）
             if has_audio:
                 audio_params = self._get_audio_quality_params()
                 cmd.extend(audio_params)
-                cmd.extend(['-f', 'mp4', '-shortest', '-y', current_filepath])
+                cmd.extend(self._master_output_args(current_filepath, shortest=True))
+            else:
+                cmd.extend(self._master_output_args(current_filepath))
+            if camera_input_index is not None:
+                cmd.extend(self._proxy_output_args('[proxy]'))
             else:
-                cmd.extend(['-f', 'mp4', '-y', current_filepath])
+                cmd.extend(self._proxy_output_args('0:v', raw_input=True))
             
-            print(f"DEBUG: 恢复录制 - 启动FFmpeg进程，命令: {' '.join(cmd[:15])}...")
+            capture_log.info("恢复录制 - 启动FFmpeg进程，命令: %s...", ' '.join(cmd[:15]))
             
             # 启动 FFmpeg 进程
-            self.ffmpeg_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                bufsize=0,
-                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            )
+            with self.tracer.span('ffmpeg_spawn', restart=True):
+                self.ffmpeg_process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    stdin=subprocess.PIPE,
+                    bufsize=0,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
+            if self.mouse_follower is not None:
+                self.mouse_follower.attach(self.ffmpeg_process)
             
             # 添加到进程列表
             with self.ffmpeg_process_lock:
                 if self.ffmpeg_process not in self.ffmpeg_processes:
                     self.ffmpeg_processes.append(self.ffmpeg_process)
-                    print(f"DEBUG: 已添加FFmpeg进程到跟踪列表 (PID: {self.ffmpeg_process.pid})")
+                    capture_log.info("已添加FFmpeg进程到跟踪列表 (PID: %s)", self.ffmpeg_process.pid)
             
             # 在后台线程中读取 stderr（避免缓冲区满）
             stderr_lines = []
+            process = self.ffmpeg_process
+            process_pid = process.pid
             def read_stderr():
                 try:
                     for line in iter(self.ffmpeg_process.stderr.readline, b''):
                         if line:
-                            stderr_lines.append(line.decode('utf-8', errors='ignore'))
+                            text = line.decode('utf-8', errors='ignore')
+                            stderr_lines.append(text)
+                            self._note_encoded_frames(process_pid, text)
+                            if self.mouse_follower is not None and ('Press [q]' in text or 'frame=' in text):
+                                self.mouse_follower.clock_started(process)
                 except:
                     pass
             
@@ -3570,22 +5788,20 @@ class RecordingThread(QThread):
             # 等待一小段时间，检查FFmpeg是否正常启动
             time.sleep(0.5)
             if self.ffmpeg_process and self.ffmpeg_process.poll() is not None:
-                print("DEBUG: 错误：FFmpeg进程启动失败")
+                capture_log.error("FFmpeg进程启动失败")
                 # 读取错误信息
                 time.sleep(0.2)
                 stderr_thread.join(timeout=0.5)
                 if stderr_lines:
                     error_output = '\n'.join(stderr_lines)
-                    print(f"DEBUG: FFmpeg错误输出: {error_output[-500:]}")
+                    capture_log.warning("FFmpeg错误输出: %s", error_output[-500:])
                 return False
             
-            print(f"DEBUG: FFmpeg进程已成功启动 (PID: {self.ffmpeg_process.pid})")
+            capture_log.info("FFmpeg进程已成功启动 (PID: %s)", self.ffmpeg_process.pid)
             return True
             
         except Exception as e:
-            print(f"DEBUG: 启动FFmpeg进程时出错: {e}")
-            import traceback
-            traceback.print_exc()
+            capture_log.exception("启动FFmpeg进程时出错: %s", e)
             return False
     
     def _restart_recording(self):
@@ -3600,7 +5816,7 @@ class RecordingThread(QThread):
         
         # 重新启动录制（只重新启动 FFmpeg，不重新初始化系统音频录制器）
         if self.running:
-            print(f"DEBUG: 重新启动录制，使用新区域: {current_region}, 文件路径: {current_filepath}")
+            capture_log.info("重新启动录制，使用新区域: %s, 文件路径: %s", current_region, current_filepath)
             # 注意：这里调用try_ffmpeg_recording会启动新的while循环，但主线程的while循环还在运行
             # 这会导致多个FFmpeg进程和片段重复保存的问题
             # 但由于FFmpeg命令构建逻辑很复杂，暂时保留原来的方式
@@ -3613,453 +5829,1578 @@ class RecordingThread(QThread):
                 try:
                     self.try_ffmpeg_recording()
                 except Exception as e:
-                    print(f"DEBUG: _restart_recording调用try_ffmpeg_recording时出错: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    capture_log.exception("_restart_recording调用try_ffmpeg_recording时出错: %s", e)
             else:
-                print("DEBUG: FFmpeg进程已存在，跳过重新启动")
+                capture_log.info("FFmpeg进程已存在，跳过重新启动")
         else:
-            print("DEBUG: 录制已停止，不再重新启动")
+            capture_log.info("录制已停止，不再重新启动")
 
 
-class CameraPreviewWindow(QWidget):
-    """摄像头预览窗口 - 400x400大小，显示在桌面右下角"""
-    def __init__(self, camera_index=0, parent=None):
-        super().__init__(None)  # 独立窗口
-        self.setWindowTitle('摄像头预览')
-        self.setFixedSize(400, 400)
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Window)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        
-        self.camera_index = camera_index
-        self.camera = None
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.camera_init_thread = None  # 摄像头初始化线程
-        
-        # 窗口拖动功能
-        self.dragging = False
-        self.drag_position = QPoint()
-        
-        # 初始化UI
-        self.init_ui()
-        
-        # 将窗口移动到桌面右下角
-        self.move_to_bottom_right()
-        
-        # 异步打开摄像头（避免阻塞UI）
-        QTimer.singleShot(50, self.start_camera_async)
-    
-    def init_ui(self):
-        """初始化UI"""
-        # 创建主容器
-        main_widget = QWidget()
-        main_widget.setStyleSheet(
-            "background-color: #1a1a21; "
-            "border-radius: 8px;"
-        )
-        
-        # 创建主布局
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
-        main_layout.addWidget(main_widget)
-        
-        # 创建内容布局
-        layout = QVBoxLayout(main_widget)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        
-        # 创建标题栏（包含关闭按钮）
-        title_bar = QWidget()
-        title_bar.setFixedHeight(32)
-        title_bar.setStyleSheet("background-color: #1a1a21; border-top-left-radius: 8px; border-top-right-radius: 8px;")
-        
-        title_layout = QHBoxLayout(title_bar)
-        title_layout.setContentsMargins(12, 0, 12, 0)
-        title_layout.setSpacing(8)
-        
-        # 标题
-        title_label = QLabel('摄像头预览')
-        title_label.setStyleSheet("color: #FFFFFF; font-family: 'Microsoft YaHei'; font-size: 12px; font-weight: 500;")
-        
-        # 关闭按钮
-        close_button = QPushButton('×')
-        close_button.setFixedSize(24, 24)
-        close_button.setStyleSheet(
-            "background-color: transparent; "
-            "color: #9CA3AF; "
-            "font-size: 16px; "
-            "border: none;"
+class ReplayBuffer(RecordingSession):
+    """即时回放缓冲 - 后台持续录制到一组滚动的短片段，随时把最近 N 秒保存为完整文件
+
+    复用 RecordingSession 的屏幕输入和编码参数，由 FFmpeg segment 复用器写入
+    固定数量、循环覆盖的 MPEG-TS 片段（每段以关键帧开头，可直接流复制拼接），
+    磁盘占用超过上限时删除最旧的片段。只录制画面，不录制音频。
+
+    用法：
+        replay = ReplayBuffer(region, seconds=60)
+        replay.start().result()
+        filepath, size = replay.save('replay.mp4')   # 保存最近 60 秒
+        replay.stop()
+    """
+    SEGMENT_SECONDS = 2  # 单个片段时长（秒），也是保存时长的精度
+    MIN_SECONDS = 30
+    MAX_SECONDS = 600
+    CHECK_INTERVAL = 1.0  # 检查磁盘占用的间隔（秒）
+
+    def __init__(self, region, seconds=60, max_mb=1024, fps=30, quality='高质量', show_cursor=True,
+                 settings=None, capture_source=None):
+        super().__init__(
+            region, os.path.join(os.path.expanduser('~'), 'replay_buffer.mp4'), fps=fps,
+            microphone_enabled=False, audio_enabled=False, quality=quality, show_cursor=show_cursor,
+            settings=settings, capture_source=capture_source,
+            audio_recorder_factory=lambda kind, device_name: None
         )
-        close_button.setToolTip('关闭')
-        close_button.clicked.connect(self.close)
-        
-        # 关闭按钮悬停效果
-        def close_enter(event):
-            close_button.setStyleSheet(
-                "background-color: #EF4444; "
-                "color: #FFFFFF; "
-                "font-size: 16px; "
-                "border-radius: 4px; "
-                "border: none;"
+        self.tracer = NULL_TRACER  # 回放缓冲长期运行，不记录分段计时
+        self.mouse_follow = False  # 回放缓冲始终录制整个区域
+        self.stream_url = ''  # 回放缓冲不推流
+        self.split_enabled = False  # 回放缓冲自己管理循环片段
+        # 回放缓冲始终实时录制（保存最近一段操作），不使用延时摄影
+        self.timelapse_interval = 0.0
+        self.vfr_enabled = bool(self.settings.get('vfr_enabled', False))
+        self.seconds = max(self.MIN_SECONDS, min(int(seconds), self.MAX_SECONDS))
+        self.max_bytes = max(1, int(max_mb)) * 1024 * 1024
+        # 片段数量：缓冲时长 + 正在写入的片段 + 即将被覆盖的片段
+        self.segment_wrap = -(-self.seconds // self.SEGMENT_SECONDS) + 2
+        self.segment_pattern = os.path.join(self.segment_dir, 'replay_%04d.ts')
+        self.replay_saved = SessionEvent()  # 回放已保存，参数：文件路径、文件大小
+        self.save_lock = threading.Lock()  # 保存与磁盘清理互斥，避免拼接时片段被删除
+        self.stop_event = threading.Event()
+        self.stderr_tail = deque(maxlen=20)
+        self.disk_cap_warned = False
+
+    def try_ffmpeg_recording(self):
+        """持续录制滚动片段，直到 stop()"""
+        try:
+            with self.region_lock:
+                recording_region = self.region.copy()
+            # 确保宽度和高度是偶数（H.264编码器要求）
+            recording_region['width'] -= recording_region['width'] % 2
+            recording_region['height'] -= recording_region['height'] % 2
+
+            self.video_encoder = self.detect_available_video_encoder()
+            if not self.video_encoder:
+                capture_log.error("无法找到可用的视频编码器，回放缓冲无法启动")
+                return False
+
+            cmd = ['ffmpeg', '-hide_banner']
+            cmd.extend(self._screen_input_args(recording_region))
+            video_filters = self._video_filter_chain(recording_region)
+            if video_filters:
+                cmd.extend(['-vf', video_filters])
+            cmd.extend(self._video_encoder_args())
+            cmd.extend(self._frame_rate_output_args())
+            cmd.extend([
+                # 每个片段都从关键帧开始，保存时可直接流复制拼接
+                '-force_key_frames', f'expr:gte(t,n_forced*{self.SEGMENT_SECONDS})',
+                '-f', 'segment',
+                '-segment_time', str(self.SEGMENT_SECONDS),
+                '-segment_wrap', str(self.segment_wrap),
+                '-segment_format', 'mpegts',
+                '-reset_timestamps', '1',
+                '-y', self.segment_pattern
+            ])
+            capture_log.info("启动回放缓冲，命令: %s", ' '.join(cmd))
+
+            self.running = True
+            self.ffmpeg_process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
             )
-            event.accept()
-        
-        def close_leave(event):
-            close_button.setStyleSheet(
-                "background-color: transparent; "
-                "color: #9CA3AF; "
-                "font-size: 16px; "
-                "border: none;"
+            with self.ffmpeg_process_lock:
+                self.ffmpeg_processes.append(self.ffmpeg_process)
+
+            def read_stderr():
+                try:
+                    for line in iter(self.ffmpeg_process.stderr.readline, b''):
+                        self.stderr_tail.append(line.decode('utf-8', errors='ignore').rstrip())
+                except:
+                    pass
+
+            threading.Thread(target=read_stderr, daemon=True).start()
+
+            time.sleep(0.5)
+            if self.ffmpeg_process.poll() is not None:
+                self.running = False
+                capture_log.error("回放缓冲 FFmpeg 启动失败: %s", ' | '.join(self.stderr_tail))
+                return False
+
+            self._resolve_started()
+            while self.running:
+                if self.ffmpeg_process.poll() is not None:
+                    self.running = False
+                    capture_log.error("回放缓冲 FFmpeg 意外退出: %s", ' | '.join(self.stderr_tail))
+                    return False
+                self._enforce_disk_cap()
+                self.stop_event.wait(self.CHECK_INTERVAL)
+            return True
+        except Exception as e:
+            capture_log.exception("回放缓冲录制出错: %s", e)
+            self.running = False
+            return False
+
+    def _list_segments(self):
+        """按写入时间从旧到新返回 [(修改时间, 路径, 大小)]"""
+        segments = []
+        try:
+            names = os.listdir(self.segment_dir)
+        except OSError:
+            return segments
+        for name in names:
+            if not (name.startswith('replay_') and name.endswith('.ts')):
+                continue
+            path = os.path.join(self.segment_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_size > 0:
+                segments.append((stat.st_mtime, path, stat.st_size))
+        segments.sort()
+        return segments
+
+    def _enforce_disk_cap(self):
+        """磁盘占用超过上限时删除最旧的片段（保留最新的两个）"""
+        with self.save_lock:
+            segments = self._list_segments()
+            total = sum(size for _, _, size in segments)
+            while total > self.max_bytes and len(segments) > 2:
+                _, path, size = segments.pop(0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    break
+                total -= size
+                if not self.disk_cap_warned:
+                    self.disk_cap_warned = True
+                    capture_log.warning("回放缓冲已达磁盘上限 %s MB，可保存的时长将少于 %s 秒",
+                                        self.max_bytes // (1024 * 1024), self.seconds)
+
+    def save(self, output_path, seconds=None):
+        """以流复制方式把最近 seconds 秒（默认整个缓冲）保存为完整文件，返回 (文件路径, 文件大小)"""
+        if seconds is None:
+            seconds = self.seconds
+        seconds = max(1, min(int(seconds), self.seconds))
+        with self.save_lock:
+            # 最近的已完成片段 + 正在写入的片段
+            count = -(-seconds // self.SEGMENT_SECONDS) + 1
+            segments = [path for _, path, _ in self._list_segments()[-count:]]
+            if not segments:
+                raise RuntimeError('回放缓冲中还没有可保存的画面')
+            list_file = os.path.join(self.segment_dir, 'replay_concat.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for path in segments:
+                    escaped = path.replace('\\', '/').replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            cmd = [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', list_file,
+                '-c', 'copy', '-movflags', '+faststart',
+                '-y', output_path
+            ]
+            started = time.time()
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=30,
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
             )
-            event.accept()
-        
-        close_button.enterEvent = close_enter
-        close_button.leaveEvent = close_leave
-        
-        # 标题栏布局
-        title_layout.addWidget(title_label, 1)
-        title_layout.addWidget(close_button)
-        
-        # 窗口拖动功能（在标题栏上，但不影响关闭按钮）
-        def title_bar_mouse_press(event):
-            if event.button() == Qt.LeftButton:
-                self.dragging = True
-                self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
-                event.accept()
-        
-        def title_bar_mouse_move(event):
-            if self.dragging and event.buttons() == Qt.LeftButton:
-                self.move(event.globalPos() - self.drag_position)
-                event.accept()
-        
-        def title_bar_mouse_release(event):
-            self.dragging = False
-        
-        title_bar.mousePressEvent = title_bar_mouse_press
-        title_bar.mouseMoveEvent = title_bar_mouse_move
-        title_bar.mouseReleaseEvent = title_bar_mouse_release
-        
-        layout.addWidget(title_bar)
-        
-        # 创建视频显示标签
-        self.video_label = QLabel()
-        self.video_label.setAlignment(Qt.AlignCenter)
-        self.video_label.setText("正在加载摄像头...")
-        self.video_label.setStyleSheet(
-            "background-color: #000000; "
-            "border-bottom-left-radius: 8px; "
-            "border-bottom-right-radius: 8px; "
-            "color: #FFFFFF; "
-            "font-family: 'Microsoft YaHei'; "
-            "font-size: 14px;"
-        )
-        layout.addWidget(self.video_label)
+            if result.returncode != 0 or not os.path.exists(output_path):
+                error = result.stderr.decode('utf-8', errors='ignore').strip()
+                raise RuntimeError(f"保存回放失败: {error[-500:]}")
+        file_size = os.path.getsize(output_path)
+        capture_log.info("回放已保存: %s（%s 个片段，耗时 %.2f 秒）", output_path, len(segments), time.time() - started)
+        self.replay_saved.emit(output_path, file_size)
+        return output_path, file_size
+
+    def _update_region(self, new_region):
+        """回放缓冲的区域在启动时固定，区域变化时由调用方重新创建"""
+        capture_log.warning("回放缓冲不支持录制中更新区域，请重新启动回放缓冲")
+
+    def _stop_capture(self):
+        """停止采集并删除所有片段（回放缓冲没有后台合并）"""
+        self.running = False
+        self.stop_event.set()
+        self._cleanup_all_ffmpeg_processes()
+        if self.worker_thread is not None and self.worker_thread is not threading.current_thread():
+            self.worker_thread.join(timeout=5)
+        self.resource_sampler.stop()
+        with self.save_lock:
+            import shutil
+            shutil.rmtree(self.segment_dir, ignore_errors=True)
+        if not self.completion_future.done():
+            self.completion_future.set_result((None, 0))
+
+
+class MonitorGroupSession:
+    """多显示器并行录制 - 每个显示器一个 RecordingSession（各自独立的编码进程），共用同一个录制时钟
+
+    对外接口与 RecordingSession 相同，可直接交给 RecordingThread 运行。系统音频、麦克风和
+    摄像头只录制到第一个显示器的文件中；暂停/恢复/停止同时下发到所有会话。
+    录制结束后把先开始采集的文件开头多出的部分裁掉（MP4/MOV 用编辑列表无损裁剪，其他容器
+    只记录在清单中），并在第一个文件旁写入 <文件名>.monitors.json，记录每个文件的显示器区域、
+    对齐到共用时钟需要裁掉的开头时长以及是否已裁剪。
+    """
+    TRIM_FORMATS = ('.mp4', '.mov')  # 支持编辑列表，复制流即可精确裁掉开头
+    TRIM_MIN_SECONDS = 0.01
+    def __init__(self, regions, filepath, region=None, **session_kwargs):
+        self.recording_failed = SessionEvent()
+        self.video_processing_complete = SessionEvent()
+        self.merge_progress = SessionEvent()
+        self.resource_warning = SessionEvent()
+        
+        from concurrent.futures import Future
+        self.started_future = Future()
+        self.completion_future = Future()
+        self.worker_thread = None
+        self.base_filepath = filepath
+        self.regions = list(regions)
+        self.manifest_file = None
+        self.clock_started_at = None  # 共用时钟零点：全部显示器都开始采集的时刻
+        self.trimmed = {}  # 文件路径 -> 已裁掉的开头时长（秒）
+        
+        base, ext = os.path.splitext(filepath)
+        self.sessions = []
+        for index, (name, monitor_region) in enumerate(self.regions):
+            kwargs = dict(session_kwargs)
+            if index > 0:
+                # 音频与摄像头只录制一份
+                kwargs.update(audio_enabled=False, microphone_enabled=False, camera_enabled=False, camera_device=None)
+            session = RecordingSession(dict(monitor_region), f'{base}_{name}{ext}', **kwargs)
+            if index > 0:
+                session.stream_url = ''  # 推流只发送第一个显示器的画面
+            session.recording_failed.connect(self._on_member_failed)
+            session.video_processing_complete.connect(self._on_member_complete)
+            session.merge_progress.connect(self.merge_progress.emit)
+            session.resource_warning.connect(self.resource_warning.emit)
+            self.sessions.append(session)
+        self.primary = self.sessions[0]
+        self.results = {}
+        self.results_lock = threading.Lock()
+        capture_log.info("多显示器录制，共 %s 个输出: %s", len(self.sessions), [s.filepath for s in self.sessions])
     
-    def start_camera_async(self):
-        """异步启动摄像头（在后台线程中初始化）"""
-        if not HAS_CV2:
-            self.video_label.setText("OpenCV未安装，无法使用摄像头")
-            print("DEBUG: OpenCV未安装，无法使用摄像头")
+    def __getattr__(self, name):
+        # 其余属性（区域、编码器等）读取第一个显示器的会话
+        if name in ('primary', 'sessions'):
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+    
+    def _for_each(self, method, *args):
+        """同时对所有会话执行同一操作，返回各会话的结果"""
+        with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+            return list(executor.map(lambda session: getattr(session, method)(*args), self.sessions))
+    
+    def run(self):
+        """并行启动所有会话并阻塞到全部采集结束"""
+        for session in self.sessions:
+            session.start()
+        threading.Thread(target=self._wait_started, name='monitor_group_start', daemon=True).start()
+        for session in self.sessions:
+            session.wait()
+    
+    def start(self):
+        """在后台线程中开始录制，返回全部显示器都开始采集的 Future"""
+        if self.worker_thread is None:
+            self.worker_thread = threading.Thread(target=self.run, name='monitor_group_session', daemon=False)
+            self.worker_thread.start()
+        return self.started_future
+    
+    def wait(self, timeout=None):
+        if self.worker_thread is None:
+            return True
+        self.worker_thread.join(timeout)
+        return not self.worker_thread.is_alive()
+    
+    def _wait_started(self):
+        try:
+            for session in self.sessions:
+                session.started_future.result()
+        except Exception:
+            return  # 失败由 _on_member_failed 处理
+        # 共用时钟：以最后一个开始采集的会话为零点，先开始的文件在对齐时裁掉开头多出的部分
+        self.clock_started_at = max(session.clock_started_at for session in self.sessions)
+        if not self.started_future.done():
+            self.started_future.set_result(self.base_filepath)
+    
+    def _on_member_failed(self, error_msg):
+        """任一显示器失败时停止其余会话"""
+        if self.completion_future.done():
             return
-        
-        # 使用线程初始化摄像头，避免阻塞UI
-        def init_camera():
-            camera = None
+        for session in self.sessions:
+            if session.running:
+                threading.Thread(target=session.stop, daemon=True).start()
+        for future in (self.started_future, self.completion_future):
+            if not future.done():
+                future.set_exception(RuntimeError(error_msg))
+        self.recording_failed.emit(error_msg)
+    
+    def _on_member_complete(self, filepath, file_size):
+        with self.results_lock:
+            self.results[filepath] = file_size
+            if len(self.results) < len(self.sessions):
+                return
+        if self.completion_future.done():
+            return  # 已因其他显示器失败而结束
+        self._apply_trims()
+        self._write_manifest()
+        primary_path = self.primary.filepath
+        primary_size = self.results.get(primary_path, file_size)
+        if not self.completion_future.done():
+            self.completion_future.set_result((primary_path, primary_size))
+        self.video_processing_complete.emit(primary_path, primary_size)
+    
+    def _trim_start(self, session):
+        origin = self.clock_started_at or 0.0
+        return max(0.0, origin - (session.clock_started_at or origin))
+    
+    def _apply_trims(self):
+        """把各文件开头早于共用时钟零点的部分裁掉：从关键帧开始复制流，编辑列表让播放从裁剪点开始"""
+        for session in self.sessions:
+            trim = self._trim_start(session)
+            path = session.filepath
+            if trim < self.TRIM_MIN_SECONDS or not os.path.exists(path):
+                continue
+            if os.path.splitext(path)[1].lower() not in self.TRIM_FORMATS:
+                capture_log.info("%s 的容器不支持编辑列表，开头 %.3f 秒只记录在清单中", os.path.basename(path), trim)
+                continue
+            stem, ext = os.path.splitext(path)
+            trimmed_path = f'{stem}.trim{ext}'
             try:
-                print(f"DEBUG: 开始初始化摄像头 {self.camera_index}")
-                # 先尝试使用DirectShow后端（Windows推荐）
-                try:
-                    camera = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-                    if not camera.isOpened():
-                        print(f"DEBUG: DirectShow后端打开失败，尝试默认后端")
-                        camera.release()
-                        camera = cv2.VideoCapture(self.camera_index)
-                except Exception as e:
-                    print(f"DEBUG: DirectShow后端异常: {e}，使用默认后端")
-                    camera = cv2.VideoCapture(self.camera_index)
-                
-                if camera and camera.isOpened():
-                    # 设置摄像头分辨率（使用较低分辨率加快速度）
-                    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                    # 设置缓冲区大小为1，减少延迟
-                    camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                    
-                    # 在主线程中启动定时器
-                    self.camera = camera
-                    QTimer.singleShot(0, self._start_timer)
-                    print(f"DEBUG: 摄像头 {self.camera_index} 初始化完成")
-                else:
-                    error_msg = "无法打开摄像头"
-                    print(f"DEBUG: {error_msg} {self.camera_index}")
-                    QTimer.singleShot(0, lambda msg=error_msg: self.video_label.setText(msg))
-                    if camera:
-                        camera.release()
+                result = subprocess.run(
+                    ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', f'{trim:.3f}', '-i', path,
+                     '-map', '0', '-c', 'copy', '-y', trimmed_path],
+                    capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=300,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
+                if result.returncode != 0 or not os.path.exists(trimmed_path):
+                    raise RuntimeError(result.stderr[-300:])
+                os.replace(trimmed_path, path)
+                self.trimmed[path] = trim
+                self.results[path] = os.path.getsize(path)
+                if session.recorded_duration:
+                    session.recorded_duration = max(0.0, session.recorded_duration - trim)
+                session._write_output_metadata()  # 更新文件库中的时长与大小
+                capture_log.info("已裁掉 %s 开头 %.3f 秒，与共用时钟对齐", os.path.basename(path), trim)
             except Exception as e:
-                error_msg = f"摄像头错误: {str(e)}"
-                print(f"DEBUG: 启动摄像头失败: {e}")
-                import traceback
-                traceback.print_exc()
-                QTimer.singleShot(0, lambda msg=error_msg: self.video_label.setText(msg))
-                if camera:
+                capture_log.warning("裁剪 %s 失败，开头 %.3f 秒只记录在清单中: %s", os.path.basename(path), trim, e)
+                if os.path.exists(trimmed_path):
                     try:
-                        camera.release()
-                    except:
+                        os.remove(trimmed_path)
+                    except OSError:
                         pass
-        
-        self.camera_init_thread = threading.Thread(target=init_camera, daemon=True)
-        self.camera_init_thread.start()
-    
-    def _start_timer(self):
-        """在主线程中启动定时器"""
-        print(f"DEBUG: _start_timer 被调用, camera={self.camera}")
-        if self.camera:
-            is_opened = self.camera.isOpened()
-            print(f"DEBUG: camera.isOpened() = {is_opened}")
-            if is_opened:
-                # 启动定时器，每33ms更新一次（约30fps）
-                self.timer.start(33)
-                print(f"DEBUG: 摄像头定时器已启动")
-            else:
-                print(f"DEBUG: 摄像头已关闭，无法启动定时器")
-        else:
-            print(f"DEBUG: camera 为 None，无法启动定时器")
     
-    def update_frame(self):
-        """更新视频帧"""
-        if self.camera is None or not HAS_CV2:
-            return
-        
+    def _write_manifest(self):
+        """写入多显示器清单：文件、区域、对齐到共用时钟需要裁掉的开头时长与是否已裁剪"""
         try:
-            ret, frame = self.camera.read()
-            if ret:
-                # 将BGR转换为RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # 调整大小以适应窗口
-                height, width = frame_rgb.shape[:2]
-                # 计算缩放比例，保持宽高比
-                scale = min(400 / width, 400 / height)
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                frame_resized = cv2.resize(frame_rgb, (new_width, new_height))
-                
-                # 转换为QImage
-                h, w, ch = frame_resized.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(frame_resized.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                
-                # 转换为QPixmap并显示
-                pixmap = QPixmap.fromImage(qt_image)
-                self.video_label.setPixmap(pixmap)
-            else:
-                print("DEBUG: 无法读取摄像头帧")
+            manifest = {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'outputs': [
+                    {
+                        'monitor': name,
+                        'file': os.path.basename(session.filepath),
+                        'region': session.region,
+                        'trim_start': round(self._trim_start(session), 3),
+                        'trim_applied': session.filepath in self.trimmed,
+                        'duration': session.recorded_duration,
+                        'file_size': self.results.get(session.filepath),
+                    }
+                    for (name, _), session in zip(self.regions, self.sessions)
+                ],
+            }
+            self.manifest_file = os.path.splitext(self.primary.filepath)[0] + '.monitors.json'
+            with open(self.manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            print(f"DEBUG: 更新视频帧失败: {e}")
+            capture_log.warning("写入多显示器清单失败: %s", e)
     
-    def move_to_bottom_right(self):
-        """将窗口移动到桌面右下角"""
-        screen = QDesktopWidget().screenGeometry()
-        window_geometry = self.frameGeometry()
-        x = screen.width() - window_geometry.width() - 20
-        y = screen.height() - window_geometry.height() - 20
-        self.move(x, y)
+    def stop(self):
+        """同时停止所有会话，返回全部处理完成的 Future"""
+        self._for_each('_stop_capture')
+        return self.completion_future
     
-    def mousePressEvent(self, event):
-        """鼠标按下事件 - 用于拖动窗口"""
-        if event.button() == Qt.LeftButton:
-            self.dragging = True
-            self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
-            event.accept()
+    def pause(self):
+        self._for_each('pause')
     
-    def mouseMoveEvent(self, event):
-        """鼠标移动事件 - 用于拖动窗口"""
-        if self.dragging and event.buttons() == Qt.LeftButton:
-            self.move(event.globalPos() - self.drag_position)
-            event.accept()
+    def resume(self):
+        self._for_each('resume')
     
-    def mouseReleaseEvent(self, event):
-        """鼠标释放事件"""
-        self.dragging = False
+    def update_region(self, new_region):
+        capture_log.warning("多显示器录制不支持更新录制区域")
     
-    def closeEvent(self, event):
-        """窗口关闭事件 - 释放摄像头资源"""
-        self.stop_camera()
-        event.accept()
+    def set_audio_enabled(self, enabled):
+        return self.primary.set_audio_enabled(enabled)
     
-    def stop_camera(self):
-        """停止摄像头"""
-        # 停止定时器
-        if self.timer:
-            self.timer.stop()
+    def set_microphone_enabled(self, enabled):
+        return self.primary.set_microphone_enabled(enabled)
+    
+    def _cleanup_all_ffmpeg_processes(self):
+        for session in self.sessions:
+            session._cleanup_all_ffmpeg_processes()
+    
+    def elapsed_seconds(self):
+        return self.primary.elapsed_seconds()
+    
+    def bytes_written(self):
+        return sum(session.bytes_written() for session in self.sessions)
+    
+    def status(self):
+        status = self.primary.status()
+        status['monitors'] = [session.status() for session in self.sessions]
+        return status
+    
+    def metrics(self):
+        metrics = self.primary.metrics()
+        metrics['monitors'] = [session.metrics() for session in self.sessions]
+        return metrics
+
+
+class PcmChunkStream:
+    """音频录制器的流式输出 - 代替录制器的 recording_data 列表，音频块不在内存中累积，
+    而是经本地回环 TCP 连接实时送给 FFmpeg（-f s16le/s24le -i tcp://127.0.0.1:端口）
+
+    录制线程只用到 append() 和 len()：len() 返回已写入的块数，录制器据此补充静音保持时间轴连续；
+    流不能迭代或切片，录制器使用流时不裁剪内存中的块，save_recording() 也不再写 WAV。
+    发送在单独的线程中进行，FFmpeg 读取变慢也不会阻塞音频线程。
+    """
+    ACCEPT_TIMEOUT = 10.0
+    
+    def __init__(self, kind):
+        self.kind = kind
+        self.chunks = 0  # 已写入的音频块数
+        self.bytes_sent = 0
+        self.connected = False
+        self.dropped = False  # FFmpeg 没有连接，之后的数据直接丢弃
+        self.queue = queue.Queue()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.server.settimeout(self.ACCEPT_TIMEOUT)
+        self.url = f"tcp://127.0.0.1:{self.server.getsockname()[1]}"
+        self.thread = threading.Thread(target=self._serve, name=f'pcm_stream_{kind}', daemon=True)
+        self.thread.start()
+    
+    def append(self, data):
+        self.chunks += 1
+        if not self.dropped:
+            self.queue.put(data)
+    
+    def __len__(self):
+        return self.chunks
+    
+    @staticmethod
+    def input_args(recorder):
+        """录制器对应的 FFmpeg 原始PCM输入参数（录制器开始录制后才知道设备的实际采样率）"""
+        sample_width = getattr(recorder, 'sample_width', None) or (3 if recorder.format == pyaudio.paInt24 else 2)
+        return [
+            '-f', 's24le' if sample_width == 3 else 's16le',
+            '-ar', str(recorder.sample_rate),
+            '-ac', str(recorder.channels),
+            '-i', recorder.chunk_stream.url
+        ]
+    
+    def _serve(self):
+        try:
+            connection, _ = self.server.accept()
+        except OSError:
+            audio_log.warning("FFmpeg 没有连接音频输入（%s），丢弃该路音频", self.kind)
+            self.dropped = True
+            return
+        self.connected = True
+        try:
+            with connection:
+                while True:
+                    data = self.queue.get()
+                    if data is None:
+                        break  # 关闭连接，FFmpeg 读到该输入结束
+                    connection.sendall(data)
+                    self.bytes_sent += len(data)
+        except OSError:
+            self.dropped = True  # FFmpeg 进程已结束
+    
+    def close(self, timeout=10.0):
+        """发送完已写入的数据后关闭连接"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+        try:
+            self.server.close()
+        except OSError:
+            pass
+    
+    def summary(self):
+        return {'chunks': self.chunks, 'bytes_sent': self.bytes_sent, 'connected': self.connected}
+
+
+class AudioOnlySession:
+    """纯音频录制 - 不启动屏幕采集和视频编码，停止后也不需要合并
+
+    系统声音与麦克风仍由 SystemAudioRecorder / MicrophoneAudioRecorder 采集，每个音频块经 PcmChunkStream
+    实时送给一个只做音频编码的 FFmpeg 进程（两路输入时 amix 混音），录制过程中直接写入
+    AAC(.m4a) / Opus(.opus) / FLAC(.flac) 文件；停止时关闭输入连接，编码器写完文件尾即完成。
+    对外接口与 RecordingSession 相同，可直接交给 RecordingThread 运行。
+    """
+    # 格式 -> (扩展名, 编码参数, 封装参数)；m4a 使用分片写入，录制中途异常结束时已写入的部分仍可播放
+    FORMATS = {
+        'AAC': ('.m4a', ['-c:a', 'aac'], ['-f', 'mp4', '-movflags', '+empty_moov+default_base_moof',
+                                           '-frag_duration', '1000000']),
+        'Opus': ('.opus', ['-c:a', 'libopus'], ['-f', 'ogg']),
+        'FLAC': ('.flac', ['-c:a', 'flac'], ['-f', 'flac']),
+    }
+    # 有损格式按音频质量选择码率（FLAC 无损，不需要码率）
+    BITRATES = {
+        'AAC': {'无损音质': '320k', '高音质': '256k', '中等音质': '192k', '低音质': '128k'},
+        'Opus': {'无损音质': '256k', '高音质': '160k', '中等音质': '96k', '低音质': '64k'},
+    }
+    STOP_TIMEOUT = 15.0  # 等待编码器写完文件尾的最长时间
+    
+    def __init__(self, region=None, filepath=None, microphone_enabled=False, audio_enabled=True,
+                 microphone_device=None, audio_device=None, audio_quality='高音质', settings=None,
+                 audio_recorder_factory=None, **video_kwargs):
+        # video_kwargs：帧率、清晰度、摄像头等画面参数，与 RecordingSession 使用同一组参数创建，纯音频录制时忽略
+        self.recording_failed = SessionEvent()
+        self.video_processing_complete = SessionEvent()
+        self.merge_progress = SessionEvent()
+        self.resource_warning = SessionEvent()
+        
+        from concurrent.futures import Future
+        self.started_future = Future()
+        self.completion_future = Future()
+        self.recording_failed.connect(self._on_session_failed)
+        self.worker_thread = None
+        
+        self.clock_started_at = None
+        self.clock_paused_at = None
+        self.clock_paused_total = 0.0
+        
+        if settings is None:
+            from types import MappingProxyType
+            settings = MappingProxyType(ConfigStore.defaults())
+        self.settings = settings
+        self.audio_format = settings.get('audio_only_format') or 'AAC'
+        if self.audio_format not in self.FORMATS:
+            self.audio_format = 'AAC'
+        extension = self.FORMATS[self.audio_format][0]
+        self.filepath = self.base_filepath = os.path.splitext(filepath)[0] + extension
+        self.region = dict(region) if region else None
+        self.microphone_enabled = microphone_enabled
+        self.audio_enabled = audio_enabled
+        self.microphone_device = microphone_device
+        self.audio_device = audio_device
+        self.audio_quality = audio_quality
+        self.audio_recorder_factory = audio_recorder_factory
+        self.running = False
+        self.paused = False
+        self.recorded_duration = None
         
-        # 等待初始化线程完成（如果还在运行）
-        if self.camera_init_thread and self.camera_init_thread.is_alive():
+        self.recorders = {}  # 类型（system/microphone）-> 音频录制器
+        self.streams = {}  # 类型 -> PcmChunkStream
+        self.ffmpeg_process = None
+        self.ffmpeg_processes = []
+        self.ffmpeg_process_lock = threading.Lock()
+        self.stderr_tail = deque(maxlen=20)
+        self.stop_event = threading.Event()
+        self.stop_lock = threading.Lock()
+        
+        self.tracer = SessionTracer(os.path.basename(self.filepath))
+        self.trace_file = None
+        self.resource_sampler = ResourceSampler(self, interval=max(0.1, float(settings.get('telemetry_interval', 1.0))))
+    
+    def _create_audio_recorder(self, kind):
+        """创建系统音频（system）或麦克风（microphone）录制器"""
+        if self.audio_recorder_factory is not None:
+            recorder = self.audio_recorder_factory(kind, self.microphone_device if kind == 'microphone' else None)
+        elif kind == 'system':
+            recorder = SystemAudioRecorder() if HAS_PYAUDIO_WPATCH else None
+        else:
+            recorder = MicrophoneAudioRecorder(device_name=self.microphone_device)
+        if recorder is not None:
+            recorder.tracer = self.tracer
+        return recorder
+    
+    def _codec_args(self):
+        _, codec, muxer = self.FORMATS[self.audio_format]
+        args = list(codec)
+        bitrate = self.BITRATES.get(self.audio_format, {}).get(self.audio_quality)
+        if bitrate:
+            args.extend(['-b:a', bitrate])
+        # Opus 只支持 48kHz 等固定采样率，统一输出 48kHz 立体声
+        args.extend(['-ar', '48000', '-ac', '2'])
+        return args + list(muxer)
+    
+    def run(self):
+        """启动音频录制器与编码进程，阻塞到停止"""
+        try:
+            with self.tracer.span('audio_only_start', format=self.audio_format):
+                self._start_capture()
+        except Exception as e:
+            audio_log.exception("纯音频录制启动失败: %s", e)
+            self._stop_inputs()
+            self._cleanup_all_ffmpeg_processes()
+            self.recording_failed.emit(f"纯音频录制失败：{e}")
+            return
+        self.stop_event.wait()
+    
+    def start(self):
+        """在后台线程中开始录制，返回编码进程开始接收音频的 Future"""
+        if self.worker_thread is None:
+            self.worker_thread = threading.Thread(target=self.run, name='audio_only_session', daemon=False)
+            self.worker_thread.start()
+        return self.started_future
+    
+    def wait(self, timeout=None):
+        if self.worker_thread is None:
+            return True
+        self.worker_thread.join(timeout)
+        return not self.worker_thread.is_alive()
+    
+    def _start_capture(self):
+        kinds = []
+        if self.audio_enabled:
+            kinds.append('system')
+        if self.microphone_enabled:
+            kinds.append('microphone')
+        if not kinds:
+            raise RuntimeError('没有开启系统声音或麦克风')
+        for kind in kinds:
+            recorder = self._create_audio_recorder(kind)
+            if recorder is None:
+                audio_log.warning("纯音频录制：%s 录制器不可用，跳过", kind)
+                continue
+            stream = PcmChunkStream(kind)
+            recorder.chunk_stream = stream
+            if not recorder.start_recording():
+                audio_log.warning("纯音频录制：%s 录制器启动失败，跳过", kind)
+                stream.close(timeout=0)
+                continue
+            self.recorders[kind] = recorder
+            self.streams[kind] = stream
+        if not self.recorders:
+            raise RuntimeError('没有可用的音频设备')
+        
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error']
+        for kind, recorder in self.recorders.items():
+            cmd.extend(PcmChunkStream.input_args(recorder))
+        if len(self.recorders) > 1:
+            sources = ''.join(f'[{i}:a]' for i in range(len(self.recorders)))
+            cmd.extend(['-filter_complex', f'{sources}amix=inputs={len(self.recorders)}:duration=longest[a]',
+                        '-map', '[a]'])
+        cmd.extend(self._codec_args())
+        cmd.extend(['-y', self.filepath])
+        audio_log.debug("纯音频录制命令: %s", ' '.join(cmd))
+        
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        with self.ffmpeg_process_lock:
+            self.ffmpeg_process = process
+            self.ffmpeg_processes.append(process)
+        threading.Thread(target=self._read_stderr, args=(process,), name='audio_only_stderr', daemon=True).start()
+        
+        self.running = True
+        self.clock_started_at = time.time()
+        self.resource_sampler.start()
+        audio_log.info("纯音频录制已开始（%s），写入: %s", '、'.join(self.recorders), self.filepath)
+        if not self.started_future.done():
+            self.started_future.set_result(self.filepath)
+    
+    def _read_stderr(self, process):
+        for line in iter(process.stderr.readline, b''):
+            text = line.decode('utf-8', errors='ignore').strip()
+            if text:
+                self.stderr_tail.append(text)
+    
+    def _stop_inputs(self):
+        """停止录制器并关闭输入连接（编码器读到所有输入结束后写完文件退出）"""
+        for kind, recorder in self.recorders.items():
             try:
-                self.camera_init_thread.join(timeout=1.0)
+                recorder.stop_recording()
             except Exception as e:
-                print(f"DEBUG: 等待摄像头初始化线程失败: {e}")
-        
-        # 释放摄像头
-        if self.camera:
+                audio_log.warning("停止 %s 录制器失败: %s", kind, e)
+        for stream in self.streams.values():
+            stream.close()
+        for recorder in self.recorders.values():
             try:
-                if HAS_CV2:
-                    self.camera.release()
-                    print(f"DEBUG: 摄像头 {self.camera_index} 已释放")
-            except Exception as e:
-                print(f"DEBUG: 释放摄像头失败: {e}")
-            self.camera = None
-
-
-class SystemAudioRecorder:
-    def __init__(self):
-        self.pa = None
-        self.stream = None
-        self.recording_thread = None
-        self.is_recording = False
-        self.recording_data = []
-        # 使用更高的位深度以提高音质
-        self.format = pyaudio.paInt24 if hasattr(pyaudio, 'paInt24') else pyaudio.paInt16
-        self.channels = 2
-        # 默认使用更高的采样率
-        self.sample_rate = 48000
-        # 进一步增大缓冲区以彻底解决卡顿问题
-        self.chunk = 8192  # 从4096增大到8192，提供更好的稳定性
-        self.loopback_device = None
-        
-        # 新增：用于连续录制的变量
-        self.last_read_time = 0  # 记录上次读取时间
-        self.chunk_duration = self.chunk / self.sample_rate  # 每个chunk的时长(秒)
-        self.silence_data = None  # 预生成的静音数据
-        self.read_timeout = 0.1  # 读取超时时间(秒)
-        self.initial_pa = None  # 保存初始的pyaudio实例
-        self.paused = False  # 暂停标志
-        self.pause_start_time = None  # 暂停开始时间
-        self.total_pause_duration = 0.0  # 累计暂停时长
-        
-        # 线程安全保护
-        self._operation_lock = threading.Lock()  # 保护关键操作
-        self._saving = False  # 标记是否正在保存
-        
-        # 动态音频控制
-        self.audio_muted = False  # 是否静音（录制过程中动态控制）
-        
-    def _generate_silence_chunk(self):
-        """生成一个chunk的静音数据"""
-        # 根据位深度计算静音数据大小
-        bytes_per_sample = 3 if self.format == pyaudio.paInt24 else 2  # 24位为3字节，16位为2字节
-        silence_size = self.chunk * self.channels * bytes_per_sample
-        return b'\x00' * silence_size
+                recorder.close()
+            except Exception:
+                pass
     
-    def start_recording(self):
-        """开始录制系统声音 - 连续录制版本"""
-        if not HAS_PYAUDIO_WPATCH:
-            print("DEBUG: pyaudiowpatch未安装，无法录制系统音频")
-            return False
-            
-        if self.is_recording:
-            print("DEBUG: 已经在录制中")
-            return False
-        
-        # 获取Loopback设备
-        self.loopback_device = self._get_loopback_device()
-        if not self.loopback_device:
-            print("DEBUG: 未找到合适的Loopback设备")
-            return False
-        
-        # 使用设备支持的实际采样率
-        self.sample_rate = int(self.loopback_device['defaultSampleRate'])
-        # 重新计算chunk时长
-        self.chunk_duration = self.chunk / self.sample_rate
-        # 预生成静音数据
-        self.silence_data = self._generate_silence_chunk()
-        
-        print(f"DEBUG: 使用设备 {self.loopback_device['name']} 开始连续录制，采样率: {self.sample_rate}Hz")
-        
-        self.is_recording = True
-        self.recording_data = []
-        self.last_read_time = time.time()  # 初始化时间记录
-        
-        # 确保pyaudio实例已经初始化
-        if not self.pa and HAS_PYAUDIO_WPATCH:
-            self.pa = pyaudio.PyAudio()
-            self.initial_pa = self.pa
-        
+    def stop(self):
+        """停止录制，返回完成的 Future（结果为 (文件路径, 文件大小)）"""
+        self._stop_capture()
+        return self.completion_future
+    
+    def _stop_capture(self):
+        with self.stop_lock:
+            if not self.running:
+                return
+            self.running = False
+        self.recorded_duration = self.elapsed_seconds()
+        threading.Thread(target=self._finish, name='audio_only_finish', daemon=False).start()
+    
+    def _finish(self):
+        """编码器收尾：没有合并步骤，文件写完即完成"""
+        with self.tracer.span('audio_only_finalize'):
+            self._stop_inputs()
+            process = self.ffmpeg_process
+            try:
+                process.wait(timeout=self.STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                audio_log.warning("音频编码器没有按时结束，强制关闭")
+                self._cleanup_all_ffmpeg_processes()
+        self.stop_event.set()
+        self.resource_sampler.stop()
+        file_size = os.path.getsize(self.filepath) if os.path.exists(self.filepath) else 0
+        if process.returncode != 0 or file_size == 0:
+            detail = self.stderr_tail[-1] if self.stderr_tail else f'退出码 {process.returncode}'
+            self.recording_failed.emit(f"纯音频编码失败：{detail}")
+            return
+        self._export_trace()
+        audio_log.info("纯音频录制完成: %s（%s 字节，%.2f 秒）", self.filepath, file_size, self.recorded_duration)
+        if not self.completion_future.done():
+            self.completion_future.set_result((self.filepath, file_size))
+        self.video_processing_complete.emit(self.filepath, file_size)
+    
+    def _export_trace(self):
+        if self.trace_file is not None:
+            return
         try:
-            # 打开音频流 - 优化配置以减少延迟和提高稳定性
-            self.stream = self.pa.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                input_device_index=int(self.loopback_device['index']),
-                frames_per_buffer=self.chunk,
-                stream_callback=None,
-                start=False
-            )
-            
-            # 启动流
-            self.stream.start_stream()
-            
+            name = os.path.splitext(os.path.basename(self.filepath))[0]
+            self.trace_file = self.tracer.export(os.path.join(SessionTracer.trace_dir(), f'{name}.trace.json'))
+            SessionTracer.prune()
         except Exception as e:
-            print(f"DEBUG: 打开音频流失败: {e}")
-            self.is_recording = False
+            audio_log.warning("导出录制阶段计时失败: %s", e)
+    
+    def _on_session_failed(self, error_msg):
+        self.running = False
+        self.stop_event.set()
+        self.resource_sampler.stop()
+        self.tracer.instant('recording_failed', error=error_msg)
+        self._export_trace()
+        for future in (self.started_future, self.completion_future):
+            if not future.done():
+                future.set_exception(RuntimeError(error_msg))
+    
+    def pause(self):
+        if not self.running or self.paused:
+            return
+        self.paused = True
+        self.clock_paused_at = time.time()
+        # 暂停期间录制器不产生数据，恢复后在文件中直接接上
+        for recorder in self.recorders.values():
+            recorder.pause_recording()
+    
+    def resume(self):
+        if not self.paused:
+            return
+        for recorder in self.recorders.values():
+            recorder.resume_recording()
+        if self.clock_paused_at is not None:
+            self.clock_paused_total += time.time() - self.clock_paused_at
+            self.clock_paused_at = None
+        self.paused = False
+    
+    def update_region(self, new_region):
+        audio_log.debug("纯音频录制没有录制区域，忽略区域更新")
+        return False
+    
+    def _set_muted(self, kind, enabled):
+        recorder = self.recorders.get(kind)
+        if recorder is None:
+            audio_log.warning("纯音频录制开始时没有采集 %s，无法中途开启", kind)
             return False
-        
-        # 开始录制线程 - 使用更低优先级避免干扰主线程
-        self.recording_thread = threading.Thread(target=self._continuous_record_thread)
-        self.recording_thread.daemon = True
-        try:
-            import ctypes
-            # 设置线程优先级为低于正常，减少对UI的影响
-            thread_id = self.recording_thread.ident
-            handle = ctypes.windll.kernel32.OpenThread(0x0200, False, thread_id)
-            ctypes.windll.kernel32.SetThreadPriority(handle, 0x0001)  # THREAD_PRIORITY_LOWEST
-        except:
-            pass  # 如果设置优先级失败，继续执行
-        
-        self.recording_thread.start()
-        
+        if enabled:
+            recorder.unmute_audio()
+        else:
+            recorder.mute_audio()
         return True
     
-    def _continuous_record_thread(self):
-        """连续录制线程 - 确保音频数据连续，修复卡顿问题"""
-        import audioop  # 用于音频处理
-        
-        print("DEBUG: 开始连续音频录制线程")
-        
-        # 记录开始时间
-        start_time = time.time()
-        last_read_index = 0  # 记录最后读取的位置索引
-        
-        # 动态休眠时间 - 根据chunk大小调整，使用更短的休眠时间以提高响应性
-        chunk_size_ms = int(self.chunk_duration * 1000 * 0.5)  # 使用chunk时长的50%作为基准休眠时间
-        sleep_interval = max(0.001, chunk_size_ms / 1000.0)  # 最小1ms，提高读取频率
-        
-        # 减少日志输出以提高性能
-        log_counter = 0
-        
-        # 连续读取计数器，用于检测是否有数据可读
-        consecutive_empty_reads = 0
-        max_empty_reads = 3  # 连续3次空读后才休眠
-        
-        while self.is_recording:
-            try:
-                current_time = time.time()
-                # 如果暂停，不计算时间，暂停期间不补充静音
-                if self.paused:
-                    # 暂停期间，不读取数据，不补充静音，只休眠
-                    time.sleep(0.1)
-                    continue
-                
-                # 计算实际录制时长（排除暂停时间）
-                elapsed = current_time - start_time - self.total_pause_duration
-                
-                # 计算当前应该有多少个chunk
-                expected_chunks_current = int(elapsed / self.chunk_duration)
-                
-                # 优先读取音频数据，而不是先补充静音
+    def set_audio_enabled(self, enabled):
+        self.audio_enabled = enabled
+        return self._set_muted('system', enabled)
+    
+    def set_microphone_enabled(self, enabled):
+        self.microphone_enabled = enabled
+        return self._set_muted('microphone', enabled)
+    
+    def _cleanup_all_ffmpeg_processes(self):
+        with self.ffmpeg_process_lock:
+            processes = list(self.ffmpeg_processes)
+        for process in processes:
+            if process.poll() is None:
+                try:
+                    process.kill()
+                    process.wait(timeout=5)
+                except Exception as e:
+                    audio_log.warning("关闭音频编码器失败: %s", e)
+    
+    def elapsed_seconds(self):
+        """有效录制时长（秒，不含暂停）"""
+        if self.clock_started_at is None:
+            return 0.0
+        now = self.clock_paused_at or time.time()
+        return max(0.0, now - self.clock_started_at - self.clock_paused_total)
+    
+    def bytes_written(self):
+        try:
+            return os.path.getsize(self.filepath) if os.path.exists(self.filepath) else 0
+        except OSError:
+            return 0
+    
+    def status(self):
+        if self.completion_future.done():
+            state = 'failed' if self.completion_future.exception() else 'finished'
+        elif self.running:
+            state = 'paused' if self.paused else 'recording'
+        elif self.started_future.done():
+            state = 'processing'
+        else:
+            state = 'starting' if self.worker_thread is not None else 'idle'
+        return {
+            'state': state,
+            'filepath': self.filepath,
+            'elapsed': round(self.elapsed_seconds(), 3),
+            'region': self.region,
+            'fps': None,
+            'audio_format': self.audio_format,
+        }
+    
+    def metrics(self):
+        metrics = self.status()
+        with self.ffmpeg_process_lock:
+            process_count = len([p for p in self.ffmpeg_processes if p.poll() is None])
+        metrics.update({
+            'bytes_written': self.bytes_written(),
+            'ffmpeg_processes': process_count,
+            'audio_enabled': bool(self.audio_enabled),
+            'microphone_enabled': bool(self.microphone_enabled),
+            'audio_inputs': {kind: stream.summary() for kind, stream in self.streams.items()},
+            'resources': self.resource_sampler.latest(),
+            'resource_summary': self.resource_sampler.summary(),
+        })
+        return metrics
+
+
+class RecordingThread(QThread):
+    """录屏线程 - 在Qt线程中运行 RecordingSession，并把会话事件转换为Qt信号"""
+    recording_failed = pyqtSignal(str)  # 录制失败信号，传递错误信息
+    video_processing_complete = pyqtSignal(str, int)  # 视频处理完成信号，传递文件路径和文件大小
+    merge_progress = pyqtSignal(str, int, int)  # 合并进度信号，传递消息、当前进度、总进度
+    resource_warning = pyqtSignal(str, str)  # 资源警告信号，传递类型和提示信息
+    
+    def __init__(self, *args, session=None, **kwargs):
+        super().__init__()
+        # session 可以是现成的会话（例如多显示器的 MonitorGroupSession），否则按参数创建 RecordingSession
+        self.session = session if session is not None else RecordingSession(*args, **kwargs)
+        # 会话事件可能在采集线程或合并线程中触发，Qt信号会自动排队到接收者所在线程
+        self.session.recording_failed.connect(self.recording_failed.emit)
+        self.session.video_processing_complete.connect(self.video_processing_complete.emit)
+        self.session.merge_progress.connect(self.merge_progress.emit)
+        self.session.resource_warning.connect(self.resource_warning.emit)
+    
+    def __getattr__(self, name):
+        # 其余属性（区域、编码器、片段信息等）直接读取会话
+        if name == 'session':
+            raise AttributeError(name)
+        return getattr(self.session, name)
+    
+    def run(self):
+        """执行录屏"""
+        self.session.run()
+    
+    def stop(self):
+        """停止录制"""
+        return self.session.stop()
+    
+    def pause(self):
+        """暂停录制"""
+        self.session.pause()
+    
+    def resume(self):
+        """恢复录制"""
+        self.session.resume()
+    
+    def update_region(self, new_region):
+        """更新录制区域"""
+        return self.session.update_region(new_region)
+    
+    def set_audio_enabled(self, enabled):
+        """动态设置系统音频录制状态"""
+        return self.session.set_audio_enabled(enabled)
+    
+    def set_microphone_enabled(self, enabled):
+        """动态设置麦克风录制状态"""
+        return self.session.set_microphone_enabled(enabled)
+    
+    def _cleanup_all_ffmpeg_processes(self):
+        """清理所有FFmpeg进程"""
+        self.session._cleanup_all_ffmpeg_processes()
+
+
+class CameraCapture:
+    """摄像头采集 - 每个设备只打开一次，同一帧分发给预览窗口（缩小后）和录制编码器（原始帧）
+
+    预览窗口与录制会话通过 acquire()/release() 共享同一个实例，最后一个使用者释放时才关闭设备，
+    录制开始时不再由 FFmpeg 通过 dshow/v4l2 再次打开设备。
+    """
+    WIDTH = 640
+    HEIGHT = 480
+    OPEN_TIMEOUT = 5.0  # 等待设备打开并读到第一帧的时间（秒）
+    READ_FAILURE_LIMIT = 30  # 连续读取失败多少次视为设备丢失
+    _instances = {}  # 设备索引 -> CameraCapture
+    _instances_lock = threading.Lock()
+    
+    @classmethod
+    def acquire(cls, index):
+        """获取设备的共享采集实例（首次获取时在后台线程中打开设备）"""
+        with cls._instances_lock:
+            capture = cls._instances.get(index)
+            if capture is None:
+                capture = cls(index)
+                cls._instances[index] = capture
+            capture.users += 1
+            capture.start()
+        return capture
+    
+    def release(self):
+        """释放一次使用，没有使用者时关闭设备"""
+        with CameraCapture._instances_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if CameraCapture._instances.get(self.index) is self:
+                del CameraCapture._instances[self.index]
+        self.stop()
+    
+    def __init__(self, index):
+        self.index = index
+        self.users = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.opened_event = threading.Event()  # 设备已打开并读到第一帧，或打开失败
+        self.error = None
+        self.frame_lock = threading.Lock()
+        self.frame = None  # 最新原始帧（BGR）
+        self.frame_size = None  # (宽, 高)
+        self.frame_count = 0
+        self.preview_size = None  # 预览需要的最大尺寸 (宽, 高)，为空时不生成预览帧
+        self.preview_frame = None  # 最新预览帧（RGB，已缩小）
+        self.requested_mode = None  # 待切换的采集尺寸 (宽, 高)，由采集线程执行
+        self.mode_event = threading.Event()  # 新尺寸的第一帧已到达
+        self.original_mode = None  # 画中画协商前的采集尺寸，录制结束时恢复（预览窗口仍在使用设备）
+    
+    def start(self):
+        if not HAS_CV2:
+            self.error = "OpenCV未安装，无法使用摄像头"
+            self.opened_event.set()
+            return
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._loop, name=f'camera_{self.index}', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def wait_opened(self, timeout=None):
+        """等待设备打开，返回帧尺寸 (宽, 高)，失败时返回 None"""
+        self.opened_event.wait(self.OPEN_TIMEOUT if timeout is None else timeout)
+        return self.frame_size if self.error is None else None
+    
+    def set_preview_size(self, size):
+        """设置预览帧的最大尺寸，None 表示不再生成预览帧"""
+        self.preview_size = size
+        if size is None:
+            with self.frame_lock:
+                self.preview_frame = None
+    
+    def negotiate(self, width, height, timeout=2.0):
+        """请求设备切换到最接近 (宽, 高) 的原生模式，返回协商后的帧尺寸
+
+        由驱动选择最接近的采集模式，画中画直接使用采集尺寸，不需要逐帧缩放。
+        切换超时时返回当前帧尺寸（仍在切换中时为 None）；录制结束后调用 restore_mode() 恢复原来的模式。
+        """
+        if self.error is not None or self.frame_size == (width, height):
+            return self.frame_size
+        if self.original_mode is None:
+            self.original_mode = self.frame_size
+        self.mode_event.clear()
+        self.requested_mode = (width, height)
+        if not self.mode_event.wait(timeout):
+            capture_log.warning("摄像头 %s 切换采集模式超时，使用当前尺寸 %s", self.index, self.frame_size)
+        return self.frame_size
+    
+    def restore_mode(self):
+        """恢复 negotiate() 之前的采集模式（不等待切换完成）"""
+        mode, self.original_mode = self.original_mode, None
+        if mode is None or self.error is not None or mode == self.frame_size:
+            return
+        self.mode_event.clear()
+        self.requested_mode = mode
+    
+    def latest_frame(self):
+        with self.frame_lock:
+            return self.frame
+    
+    def latest_preview(self):
+        with self.frame_lock:
+            return self.preview_frame
+    
+    def _open(self):
+        capture_log.info("开始初始化摄像头 %s", self.index)
+        camera = None
+        # 先尝试使用DirectShow后端（Windows推荐）
+        if sys.platform == 'win32':
+            try:
+                camera = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+                if not camera.isOpened():
+                    capture_log.warning("DirectShow后端打开失败，尝试默认后端")
+                    camera.release()
+                    camera = None
+            except Exception as e:
+                capture_log.warning("DirectShow后端异常: %s，使用默认后端", e)
+                camera = None
+        if camera is None:
+            camera = cv2.VideoCapture(self.index)
+        if not camera.isOpened():
+            camera.release()
+            return None
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.WIDTH)
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.HEIGHT)
+        # 设置缓冲区大小为1，减少延迟
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return camera
+    
+    def _loop(self):
+        camera = None
+        try:
+            camera = self._open()
+            if camera is None:
+                self.error = "无法打开摄像头"
+                capture_log.warning("%s %s", self.error, self.index)
+                return
+            failures = 0
+            while not self.stop_event.is_set():
+                if self.requested_mode is not None:
+                    width, height = self.requested_mode
+                    self.requested_mode = None
+                    camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+                    with self.frame_lock:
+                        self.frame = None
+                        self.frame_size = None
+                ret, frame = camera.read()
+                if not ret:
+                    failures += 1
+                    if failures >= self.READ_FAILURE_LIMIT:
+                        self.error = "无法读取摄像头画面"
+                        capture_log.warning("摄像头 %s 连续读取失败，停止采集", self.index)
+                        return
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                preview = self._make_preview(frame)
+                with self.frame_lock:
+                    self.frame = frame
+                    self.preview_frame = preview
+                    self.frame_count += 1
+                    if self.frame_size is None:
+                        self.frame_size = (frame.shape[1], frame.shape[0])
+                        capture_log.info("摄像头 %s 采集分辨率 %sx%s", self.index, self.frame_size[0], self.frame_size[1])
+                        self.mode_event.set()
+                self.opened_event.set()
+        except Exception as e:
+            self.error = f"摄像头错误: {str(e)}"
+            capture_log.exception("摄像头采集失败: %s", e)
+        finally:
+            self.opened_event.set()
+            if camera is not None:
+                try:
+                    camera.release()
+                    capture_log.debug("摄像头 %s 已释放", self.index)
+                except Exception as e:
+                    capture_log.warning("释放摄像头失败: %s", e)
+    
+    def _make_preview(self, frame):
+        """按预览尺寸等比缩放并转换为RGB（没有预览时不做任何处理）"""
+        size = self.preview_size
+        if size is None:
+            return None
+        height, width = frame.shape[:2]
+        scale = min(size[0] / width, size[1] / height)
+        if scale != 1.0:
+            # 画中画协商的小尺寸模式在预览中放大显示
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)),
+                               interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+class CameraFeed:
+    """把共享摄像头的原始帧按固定帧率送给一个 FFmpeg 进程
+
+    FFmpeg 的标准输入用于交互命令，原始帧走本地回环 TCP 连接（-f rawvideo -i tcp://127.0.0.1:端口）。
+    每个 FFmpeg 进程一个连接，进程结束时连接断开，暂停/恢复时重新创建。
+    """
+    ACCEPT_TIMEOUT = 10.0
+    MODE_TIMEOUT = 2.0  # 采集模式切换中（帧尺寸未知）时等待新尺寸第一帧的时间
+    
+    def __init__(self, capture, fps=30):
+        self.capture = capture
+        self.fps = fps
+        self.frame_size = capture.frame_size
+        if self.frame_size is None:
+            capture.mode_event.wait(self.MODE_TIMEOUT)
+            self.frame_size = capture.frame_size
+            if self.frame_size is None:
+                raise RuntimeError(f"摄像头 {capture.index} 采集尺寸未知（切换采集模式超时）")
+        self.frames_sent = 0
+        self.stop_event = threading.Event()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.server.settimeout(self.ACCEPT_TIMEOUT)
+        self.url = f"tcp://127.0.0.1:{self.server.getsockname()[1]}"
+        self.thread = threading.Thread(target=self._serve, name='camera_feed', daemon=True)
+        self.thread.start()
+    
+    def input_args(self):
+        """FFmpeg 摄像头输入参数（按到达时间打时间戳，与屏幕捕获对齐）"""
+        width, height = self.frame_size
+        return [
+            '-f', 'rawvideo',
+            '-pixel_format', 'bgr24',
+            '-video_size', f'{width}x{height}',
+            '-framerate', str(self.fps),
+            '-use_wallclock_as_timestamps', '1',
+            '-thread_queue_size', '64',
+            '-i', self.url
+        ]
+    
+    def _serve(self):
+        try:
+            connection, _ = self.server.accept()
+        except OSError:
+            return
+        interval = 1.0 / self.fps
+        next_time = time.perf_counter()
+        try:
+            with connection:
+                while not self.stop_event.is_set():
+                    # 始终发送最新一帧：摄像头卡顿时重复上一帧，屏幕画面不会因等待摄像头而停顿
+                    frame = self.capture.latest_frame()
+                    if frame is not None and (frame.shape[1], frame.shape[0]) == self.frame_size:
+                        connection.sendall(frame.tobytes())
+                        self.frames_sent += 1
+                    next_time += interval
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        self.stop_event.wait(delay)
+                    else:
+                        next_time = time.perf_counter()
+        except OSError:
+            pass  # FFmpeg 进程已结束
+    
+    def close(self):
+        self.stop_event.set()
+        try:
+            self.server.close()
+        except OSError:
+            pass
+
+
+class CameraPreviewWindow(QWidget):
+    """摄像头预览窗口 - 400x400大小，显示在桌面右下角"""
+    def __init__(self, camera_index=0, parent=None):
+        super().__init__(None)  # 独立窗口
+        self.setWindowTitle('摄像头预览')
+        self.setFixedSize(400, 400)
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Window)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        
+        self.camera_index = camera_index
+        self.camera = None
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_frame)
+        
+        # 窗口拖动功能
+        self.dragging = False
+        self.drag_position = QPoint()
+        
+        # 初始化UI
+        self.init_ui()
+        
+        # 将窗口移动到桌面右下角
+        self.move_to_bottom_right()
+        
+        # 异步打开摄像头（避免阻塞UI）
+        QTimer.singleShot(50, self.start_camera_async)
+    
+    def init_ui(self):
+        """初始化UI"""
+        # 创建主容器
+        main_widget = QWidget()
+        main_widget.setStyleSheet(
+            "background-color: #1a1a21; "
+            "border-radius: 8px;"
+        )
+        
+        # 创建主布局
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+        main_layout.addWidget(main_widget)
+        
+        # 创建内容布局
+        layout = QVBoxLayout(main_widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        
+        # 创建标题栏（包含关闭按钮）
+        title_bar = QWidget()
+        title_bar.setFixedHeight(32)
+        title_bar.setStyleSheet("background-color: #1a1a21; border-top-left-radius: 8px; border-top-right-radius: 8px;")
+        
+        title_layout = QHBoxLayout(title_bar)
+        title_layout.setContentsMargins(12, 0, 12, 0)
+        title_layout.setSpacing(8)
+        
+        # 标题
+        title_label = QLabel('摄像头预览')
+        title_label.setStyleSheet("color: #FFFFFF; font-family: 'Microsoft YaHei'; font-size: 12px; font-weight: 500;")
+        
+        # 关闭按钮
+        close_button = QPushButton('×')
+        close_button.setFixedSize(24, 24)
+        close_button.setStyleSheet(
+            "background-color: transparent; "
+            "color: #9CA3AF; "
+            "font-size: 16px; "
+            "border: none;"
+        )
+        close_button.setToolTip('关闭')
+        close_button.clicked.connect(self.close)
+        
+        # 关闭按钮悬停效果
+        def close_enter(event):
+            close_button.setStyleSheet(
+                "background-color: #EF4444; "
+                "color: #FFFFFF; "
+                "font-size: 16px; "
+                "border-radius: 4px; "
+                "border: none;"
+            )
+            event.accept()
+        
+        def close_leave(event):
+            close_button.setStyleSheet(
+                "background-color: transparent; "
+                "color: #9CA3AF; "
+                "font-size: 16px; "
+                "border: none;"
+            )
+            event.accept()
+        
+        close_button.enterEvent = close_enter
+        close_button.leaveEvent = close_leave
+        
+        # 标题栏布局
+        title_layout.addWidget(title_label, 1)
+        title_layout.addWidget(close_button)
+        
+        # 窗口拖动功能（在标题栏上，但不影响关闭按钮）
+        def title_bar_mouse_press(event):
+            if event.button() == Qt.LeftButton:
+                self.dragging = True
+                self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
+                event.accept()
+        
+        def title_bar_mouse_move(event):
+            if self.dragging and event.buttons() == Qt.LeftButton:
+                self.move(event.globalPos() - self.drag_position)
+                event.accept()
+        
+        def title_bar_mouse_release(event):
+            self.dragging = False
+        
+        title_bar.mousePressEvent = title_bar_mouse_press
+        title_bar.mouseMoveEvent = title_bar_mouse_move
+        title_bar.mouseReleaseEvent = title_bar_mouse_release
+        
+        layout.addWidget(title_bar)
+        
+        # 创建视频显示标签
+        self.video_label = QLabel()
+        self.video_label.setAlignment(Qt.AlignCenter)
+        self.video_label.setText("正在加载摄像头...")
+        self.video_label.setStyleSheet(
+            "background-color: #000000; "
+            "border-bottom-left-radius: 8px; "
+            "border-bottom-right-radius: 8px; "
+            "color: #FFFFFF; "
+            "font-family: 'Microsoft YaHei'; "
+            "font-size: 14px;"
+        )
+        layout.addWidget(self.video_label)
+    
+    def start_camera_async(self):
+        """异步启动摄像头（共享采集在后台线程中打开设备，不阻塞UI）"""
+        if not HAS_CV2:
+            self.video_label.setText("OpenCV未安装，无法使用摄像头")
+            print("DEBUG: OpenCV未安装，无法使用摄像头")
+            return
+        
+        # 与录制共用同一个采集实例：录制开始时不会再次打开设备
+        self.camera = CameraCapture.acquire(self.camera_index)
+        self.camera.set_preview_size((400, 400))
+        # 每33ms刷新一次（约30fps），只取采集线程已缩小好的最新一帧
+        self.timer.start(33)
+        capture_log.info("摄像头预览已启动，设备索引 %s", self.camera_index)
+    
+    def update_frame(self):
+        """更新视频帧"""
+        if self.camera is None:
+            return
+        
+        try:
+            if self.camera.error:
+                self.timer.stop()
+                self.video_label.setText(self.camera.error)
+                return
+            frame_rgb = self.camera.latest_preview()
+            if frame_rgb is None:
+                return
+            # 转换为QImage（采集线程已按窗口大小等比缩小并转换为RGB）
+            h, w, ch = frame_rgb.shape
+            bytes_per_line = ch * w
+            qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
+            
+            # 转换为QPixmap并显示
+            pixmap = QPixmap.fromImage(qt_image)
+            self.video_label.setPixmap(pixmap)
+        except Exception as e:
+            print(f"DEBUG: 更新视频帧失败: {e}")
+    
+    def move_to_bottom_right(self):
+        """将窗口移动到桌面右下角"""
+        screen = QDesktopWidget().screenGeometry()
+        window_geometry = self.frameGeometry()
+        x = screen.width() - window_geometry.width() - 20
+        y = screen.height() - window_geometry.height() - 20
+        self.move(x, y)
+    
+    def mousePressEvent(self, event):
+        """鼠标按下事件 - 用于拖动窗口"""
+        if event.button() == Qt.LeftButton:
+            self.dragging = True
+            self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
+            event.accept()
+    
+    def mouseMoveEvent(self, event):
+        """鼠标移动事件 - 用于拖动窗口"""
+        if self.dragging and event.buttons() == Qt.LeftButton:
+            self.move(event.globalPos() - self.drag_position)
+            event.accept()
+    
+    def mouseReleaseEvent(self, event):
+        """鼠标释放事件"""
+        self.dragging = False
+    
+    def closeEvent(self, event):
+        """窗口关闭事件 - 释放摄像头资源"""
+        self.stop_camera()
+        event.accept()
+    
+    def stop_camera(self):
+        """停止摄像头预览（录制仍在使用时设备保持打开）"""
+        # 停止定时器
+        if self.timer:
+            self.timer.stop()
+        
+        if self.camera:
+            try:
+                self.camera.set_preview_size(None)
+                self.camera.release()
+            except Exception as e:
+                capture_log.warning("释放摄像头失败: %s", e)
+            self.camera = None
+
+
+class SystemAudioRecorder:
+    def __init__(self):
+        self.pa = None
+        self.stream = None
+        self.recording_thread = None
+        self.is_recording = False
+        self.recording_data = []
+        # 使用更高的位深度以提高音质
+        self.format = pyaudio.paInt24 if hasattr(pyaudio, 'paInt24') else pyaudio.paInt16
+        self.channels = 2
+        # 默认使用更高的采样率
+        self.sample_rate = 48000
+        # 进一步增大缓冲区以彻底解决卡顿问题
+        self.chunk = 8192  # 从4096增大到8192，提供更好的稳定性
+        self.loopback_device = None
+        
+        # 新增：用于连续录制的变量
+        self.last_read_time = 0  # 记录上次读取时间
+        self.chunk_duration = self.chunk / self.sample_rate  # 每个chunk的时长(秒)
+        self.silence_data = None  # 预生成的静音数据
+        self.read_timeout = 0.1  # 读取超时时间(秒)
+        self.initial_pa = None  # 保存初始的pyaudio实例
+        self.paused = False  # 暂停标志
+        self.pause_start_time = None  # 暂停开始时间
+        self.total_pause_duration = 0.0  # 累计暂停时长
+        
+        # 线程安全保护
+        self._operation_lock = threading.Lock()  # 保护关键操作
+        self._saving = False  # 标记是否正在保存
+        
+        # 动态音频控制
+        self.audio_muted = False  # 是否静音（录制过程中动态控制）
+        
+        # 纯音频录制时的流式输出（PcmChunkStream），为空时音频块保存在内存中，停止后再保存
+        self.chunk_stream = None
+        
+        # 分段计时（由录制会话注入）
+        self.tracer = NULL_TRACER
+        
+    def _generate_silence_chunk(self):
+        """生成一个chunk的静音数据"""
+        # 根据位深度计算静音数据大小
+        bytes_per_sample = 3 if self.format == pyaudio.paInt24 else 2  # 24位为3字节，16位为2字节
+        silence_size = self.chunk * self.channels * bytes_per_sample
+        return b'\x00' * silence_size
+    
+    def start_recording(self):
+        """开始录制系统声音 - 连续录制版本"""
+        with self.tracer.span('audio_start', category='audio', source='system'):
+            return self._start_recording()
+    
+    def _start_recording(self):
+        if not HAS_PYAUDIO_WPATCH:
+            audio_log.warning("pyaudiowpatch未安装，无法录制系统音频")
+            return False
+            
+        if self.is_recording:
+            audio_log.info("已经在录制中")
+            return False
+        
+        # 获取Loopback设备
+        self.loopback_device = self._get_loopback_device()
+        if not self.loopback_device:
+            audio_log.info("未找到合适的Loopback设备")
+            return False
+        
+        # 使用设备支持的实际采样率
+        self.sample_rate = int(self.loopback_device['defaultSampleRate'])
+        # 重新计算chunk时长
+        self.chunk_duration = self.chunk / self.sample_rate
+        # 预生成静音数据
+        self.silence_data = self._generate_silence_chunk()
+        
+        audio_log.info("使用设备 %s 开始连续录制，采样率: %sHz", self.loopback_device['name'], self.sample_rate)
+        
+        self.is_recording = True
+        self.recording_data = self.chunk_stream if self.chunk_stream is not None else []
+        self.last_read_time = time.time()  # 初始化时间记录
+        
+        # 确保pyaudio实例已经初始化
+        if not self.pa and HAS_PYAUDIO_WPATCH:
+            self.pa = pyaudio.PyAudio()
+            self.initial_pa = self.pa
+        
+        try:
+            # 打开音频流 - 优化配置以减少延迟和提高稳定性
+            self.stream = self.pa.open(
+                format=self.format,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                input_device_index=int(self.loopback_device['index']),
+                frames_per_buffer=self.chunk,
+                stream_callback=None,
+                start=False
+            )
+            
+            # 启动流
+            self.stream.start_stream()
+            
+        except Exception as e:
+            audio_log.warning("打开音频流失败: %s", e)
+            self.is_recording = False
+            return False
+        
+        # 开始录制线程 - 使用更低优先级避免干扰主线程
+        self.recording_thread = threading.Thread(target=self._continuous_record_thread)
+        self.recording_thread.daemon = True
+        try:
+            import ctypes
+            # 设置线程优先级为低于正常，减少对UI的影响
+            thread_id = self.recording_thread.ident
+            handle = ctypes.windll.kernel32.OpenThread(0x0200, False, thread_id)
+            ctypes.windll.kernel32.SetThreadPriority(handle, 0x0001)  # THREAD_PRIORITY_LOWEST
+        except:
+            pass  # 如果设置优先级失败，继续执行
+        
+        self.recording_thread.start()
+        
+        return True
+    
+    def _continuous_record_thread(self):
+        """连续录制线程 - 确保音频数据连续，修复卡顿问题"""
+        import audioop  # 用于音频处理
+        
+        audio_log.debug("开始连续音频录制线程")
+        
+        # 记录开始时间
+        start_time = time.time()
+        last_read_index = 0  # 记录最后读取的位置索引
+        
+        # 动态休眠时间 - 根据chunk大小调整，使用更短的休眠时间以提高响应性
+        chunk_size_ms = int(self.chunk_duration * 1000 * 0.5)  # 使用chunk时长的50%作为基准休眠时间
+        sleep_interval = max(0.001, chunk_size_ms / 1000.0)  # 最小1ms，提高读取频率
+        
+        # 减少日志输出以提高性能
+        log_counter = 0
+        
+        # 连续读取计数器，用于检测是否有数据可读
+        consecutive_empty_reads = 0
+        max_empty_reads = 3  # 连续3次空读后才休眠
+        
+        while self.is_recording:
+            try:
+                current_time = time.time()
+                # 如果暂停，不计算时间，暂停期间不补充静音
+                if self.paused:
+                    # 暂停期间，不读取数据，不补充静音，只休眠
+                    time.sleep(0.1)
+                    continue
+                
+                # 计算实际录制时长（排除暂停时间）
+                elapsed = current_time - start_time - self.total_pause_duration
+                
+                # 计算当前应该有多少个chunk
+                expected_chunks_current = int(elapsed / self.chunk_duration)
+                
+                # 优先读取音频数据，而不是先补充静音
                 # 这样可以确保实际音频数据不会被静音覆盖
                 data_read = False
                 if self.stream and self.is_recording:
@@ -4097,15 +7438,15 @@ class SystemAudioRecorder:
                                                 self.last_read_time = current_time
                                                 
                                                 # 非常少地打印调试信息
-                                                if len(self.recording_data) % 500 == 0:
+                                                if len(self.recording_data) % 500 == 0 and audio_log.isEnabledFor(logging.DEBUG):
                                                     rms = audioop.rms(data, 3) if len(data) >= 6 else 0
-                                                    print(f"DEBUG: 音频电平: {rms}, 已录制: {len(self.recording_data)} chunks")
+                                                    audio_log.debug("音频电平: %s, 已录制: %s chunks", rms, len(self.recording_data))
                                                 
                                                 read_attempts += 1
                                             else:
                                                 # 数据长度不正确，跳过这个chunk
                                                 if log_counter % 200 == 0:
-                                                    print(f"DEBUG: 警告：音频数据长度不正确，期望: {expected_size}, 实际: {len(data)}")
+                                                    audio_log.warning("音频数据长度不正确，期望: %s, 实际: %s", expected_size, len(data))
                                                 break
                                         else:
                                             # 没有数据可读，退出读取循环
@@ -4120,7 +7461,7 @@ class SystemAudioRecorder:
                                     # OSError通常表示流已关闭或没有数据
                                     error_str = str(read_ex)
                                     if "not open" in error_str.lower() or "closed" in error_str.lower():
-                                        print("DEBUG: 音频流已关闭，停止读取")
+                                        audio_log.debug("音频流已关闭，停止读取")
                                         break
                                     consecutive_empty_reads += 1
                                     break
@@ -4131,9 +7472,9 @@ class SystemAudioRecorder:
                                         # 缓冲区溢出，说明数据积压，需要更频繁读取
                                         consecutive_empty_reads = 0
                                         if log_counter % 100 == 0:
-                                            print(f"DEBUG: 音频缓冲区溢出，需要更频繁读取")
+                                            audio_log.debug("音频缓冲区溢出，需要更频繁读取")
                                     elif log_counter % 100 == 0:
-                                        print(f"DEBUG: 音频读取异常: {read_ex}")
+                                        audio_log.debug("音频读取异常: %s", read_ex)
                                     consecutive_empty_reads += 1
                                     break
                             
@@ -4144,15 +7485,15 @@ class SystemAudioRecorder:
                         # OSError通常表示流已关闭，这是正常的，直接退出循环
                         error_str = str(read_error)
                         if "not open" in error_str.lower() or "closed" in error_str.lower():
-                            print("DEBUG: 音频流已关闭，停止读取")
+                            audio_log.debug("音频流已关闭，停止读取")
                             break
                         elif log_counter % 100 == 0:
-                            print(f"DEBUG: 音频读取OSError: {error_str}")
+                            audio_log.debug("音频读取OSError: %s", error_str)
                     except Exception as read_error:
                         # 其他读取错误，记录但不中断
                         error_str = str(read_error)
                         if "Input overflowed" not in error_str and log_counter % 100 == 0:
-                            print(f"DEBUG: 音频读取错误: {error_str}")
+                            audio_log.debug("音频读取错误: %s", error_str)
                 
                 # 只有在没有读取到数据且数据不足时才补充静音
                 # 这样可以避免用静音覆盖实际音频数据
@@ -4168,13 +7509,13 @@ class SystemAudioRecorder:
                         # 减少日志输出频率
                         log_counter += 1
                         if log_counter % 50 == 0:
-                            print(f"DEBUG: 补充静音，当前: {len(self.recording_data)}, 期望: {expected_chunks_current}")
+                            audio_log.debug("补充静音，当前: %s, 期望: %s", len(self.recording_data), expected_chunks_current)
                     
                     # 只有在没有读取到数据且流确实不活跃时才打印警告
                     # 注意：即使没有读取到数据，也可能是因为暂时没有新数据，不代表流不活跃
                     if self.stream and not self.stream.is_active():
                         if log_counter % 200 == 0:
-                            print("DEBUG: 音频流不活跃")
+                            audio_log.debug("音频流不活跃")
                 
                 # 检查是否应该退出录制
                 if not self.is_recording:
@@ -4200,33 +7541,33 @@ class SystemAudioRecorder:
                     time.sleep(sleep_interval)
                 
                 # 限制内存使用 - 但保留更多数据以避免丢失
-                if len(self.recording_data) > 10000:  # 提高阈值，保留更多数据
+                if self.chunk_stream is None and len(self.recording_data) > 10000:  # 提高阈值，保留更多数据
                     # 只清理最旧的数据，保留最近的数据
                     # 保留最后8000个chunk
                     self.recording_data = self.recording_data[-8000:]
                     if log_counter % 100 == 0:
-                        print(f"DEBUG: 音频数据清理，当前: {len(self.recording_data)}")
+                        audio_log.debug("音频数据清理，当前: %s", len(self.recording_data))
                     
             except Exception as e:
                 # 简化错误处理，避免复杂操作
                 if log_counter % 500 == 0:
-                    print(f"DEBUG: 录制线程错误: {e}")
+                    audio_log.debug("录制线程错误: %s", e)
                 # 简单休眠避免CPU占用过高
                 time.sleep(0.005)
         
-        print(f"DEBUG: 连续录制线程结束，总共录制 {len(self.recording_data)} 个chunk")
+        audio_log.debug("连续录制线程结束，总共录制 %s 个chunk", len(self.recording_data))
     
     def pause_recording(self):
         """暂停录制（停止读取，但保留数据和流）"""
         if not self.is_recording:
-            print("DEBUG: 没有在录制中，无法暂停")
+            audio_log.warning("没有在录制中，无法暂停")
             return False
         
         if self.paused:
-            print("DEBUG: 音频录制已经暂停")
+            audio_log.info("音频录制已经暂停")
             return True
         
-        print("DEBUG: 暂停音频录制")
+        audio_log.info("暂停音频录制")
         # 记录暂停开始时间
         self.pause_start_time = time.time()
         self.paused = True
@@ -4236,29 +7577,29 @@ class SystemAudioRecorder:
             try:
                 if self.stream.is_active():
                     self.stream.stop_stream()
-                    print("DEBUG: 音频流已暂停")
+                    audio_log.info("音频流已暂停")
             except Exception as e:
-                print(f"DEBUG: 暂停音频流时出错: {e}")
+                audio_log.warning("暂停音频流时出错: %s", e)
         
         return True
     
     def resume_recording(self):
         """恢复录制（重新启动音频流）"""
         if not self.is_recording:
-            print("DEBUG: 没有在录制中，无法恢复")
+            audio_log.warning("没有在录制中，无法恢复")
             return False
         
         if not self.paused:
-            print("DEBUG: 音频录制未暂停，无需恢复")
+            audio_log.info("音频录制未暂停，无需恢复")
             return True
         
-        print("DEBUG: 恢复音频录制")
+        audio_log.info("恢复音频录制")
         
         # 计算暂停时长并累加
         if self.pause_start_time:
             pause_duration = time.time() - self.pause_start_time
             self.total_pause_duration += pause_duration
-            print(f"DEBUG: 暂停时长: {pause_duration:.2f}秒, 累计暂停时长: {self.total_pause_duration:.2f}秒")
+            audio_log.info("暂停时长: %.2f秒, 累计暂停时长: %.2f秒", pause_duration, self.total_pause_duration)
             self.pause_start_time = None
         
         self.paused = False
@@ -4271,10 +7612,10 @@ class SystemAudioRecorder:
                     # 尝试重新启动流
                     try:
                         self.stream.start_stream()
-                        print("DEBUG: 音频流已恢复")
+                        audio_log.info("音频流已恢复")
                     except Exception as e:
                         # 如果启动失败，可能是流已关闭，需要重新创建
-                        print(f"DEBUG: 重新启动音频流失败: {e}，尝试重新创建流...")
+                        audio_log.warning("重新启动音频流失败: %s，尝试重新创建流...", e)
                         try:
                             # 关闭旧流
                             if not self.stream.is_stopped():
@@ -4296,32 +7637,32 @@ class SystemAudioRecorder:
                                 start=False
                             )
                             self.stream.start_stream()
-                            print("DEBUG: 音频流已重新创建并启动")
+                            audio_log.info("音频流已重新创建并启动")
                         except Exception as e2:
-                            print(f"DEBUG: 重新创建音频流失败: {e2}")
+                            audio_log.warning("重新创建音频流失败: %s", e2)
                             return False
                 elif not self.stream.is_active():
                     # 流未停止但未激活，尝试启动
                     try:
                         self.stream.start_stream()
-                        print("DEBUG: 音频流已恢复")
+                        audio_log.info("音频流已恢复")
                     except Exception as e:
-                        print(f"DEBUG: 恢复音频流时出错: {e}")
+                        audio_log.warning("恢复音频流时出错: %s", e)
                         return False
                 else:
-                    print("DEBUG: 音频流已在运行")
+                    audio_log.info("音频流已在运行")
             except Exception as e:
-                print(f"DEBUG: 恢复音频流时出错: {e}")
+                audio_log.warning("恢复音频流时出错: %s", e)
                 return False
         else:
-            print("DEBUG: 警告：音频流不存在，无法恢复")
+            audio_log.warning("音频流不存在，无法恢复")
             return False
         
         return True
     
     def mute_audio(self):
         """静音（录制过程中禁用音频）"""
-        print("DEBUG: MicrophoneAudioRecorder - 静音音频")
+        audio_log.info("MicrophoneAudioRecorder - 静音音频")
         self.audio_muted = True
         
         # 立即清空音频流缓冲区，减少延迟
@@ -4331,15 +7672,15 @@ class SystemAudioRecorder:
                 available = self.stream.get_read_available()
                 if available > 0:
                     self.stream.read(available, exception_on_overflow=False)
-                    print(f"DEBUG: 已清空麦克风缓冲区 {available} 帧，减少静音延迟")
+                    audio_log.info("已清空麦克风缓冲区 %s 帧，减少静音延迟", available)
             except Exception as e:
-                print(f"DEBUG: 清空麦克风缓冲区失败: {e}")
+                audio_log.warning("清空麦克风缓冲区失败: %s", e)
         
         return True
     
     def unmute_audio(self):
         """取消静音（录制过程中启用音频）"""
-        print("DEBUG: MicrophoneAudioRecorder - 取消静音")
+        audio_log.info("MicrophoneAudioRecorder - 取消静音")
         self.audio_muted = False
         
         # 立即清空音频流缓冲区，避免播放旧数据
@@ -4349,20 +7690,20 @@ class SystemAudioRecorder:
                 available = self.stream.get_read_available()
                 if available > 0:
                     self.stream.read(available, exception_on_overflow=False)
-                    print(f"DEBUG: 已清空麦克风缓冲区 {available} 帧，避免播放旧数据")
+                    audio_log.info("已清空麦克风缓冲区 %s 帧，避免播放旧数据", available)
             except Exception as e:
-                print(f"DEBUG: 清空麦克风缓冲区失败: {e}")
+                audio_log.warning("清空麦克风缓冲区失败: %s", e)
         
         return True
     
     def stop_recording(self):
         """停止录制（线程安全）"""
-        with self._operation_lock:
+        with self._operation_lock, self.tracer.span('audio_stop', category='audio'):
             if not self.is_recording:
-                print("DEBUG: 没有在录制中")
+                audio_log.info("没有在录制中")
                 return False
             
-            print("DEBUG: 停止连续音频录制")
+            audio_log.info("停止连续音频录制")
             self.is_recording = False
             
             # 先停止音频流，避免继续读取数据
@@ -4371,16 +7712,16 @@ class SystemAudioRecorder:
                     if self.stream.is_active():
                         self.stream.stop_stream()
                 except Exception as e:
-                    print(f"DEBUG: 停止音频流时出错: {e}")
+                    audio_log.warning("停止音频流时出错: %s", e)
             
             # 等待录制线程结束，增加等待时间并检查线程状态
             if self.recording_thread and self.recording_thread.is_alive():
-                print("DEBUG: 等待录制线程结束...")
+                audio_log.info("等待录制线程结束...")
                 self.recording_thread.join(timeout=5.0)  # 增加到5秒
                 if self.recording_thread.is_alive():
-                    print("DEBUG: 警告：录制线程未在超时时间内结束")
+                    audio_log.warning("录制线程未在超时时间内结束")
                 else:
-                    print("DEBUG: 录制线程已结束")
+                    audio_log.info("录制线程已结束")
             
             # 关闭流（在线程结束后）
             if self.stream:
@@ -4390,35 +7731,39 @@ class SystemAudioRecorder:
                     self.stream.close()
                     self.stream = None
                 except Exception as e:
-                    print(f"DEBUG: 关闭音频流时出错: {e}")
+                    audio_log.warning("关闭音频流时出错: %s", e)
                     self.stream = None
             
             # 计算总时长
             total_duration = len(self.recording_data) * self.chunk_duration
-            print(f"DEBUG: 音频录制完成，总时长: {total_duration:.2f}秒, 总数据量: {len(self.recording_data)} chunks")
+            audio_log.info("音频录制完成，总时长: %.2f秒, 总数据量: %s chunks", total_duration, len(self.recording_data))
             
             return True
     
     def save_recording(self, filename="system_audio.wav"):
         """保存录制的音频到WAV文件（线程安全）"""
-        with self._operation_lock:
+        with self._operation_lock, self.tracer.span('audio_save', category='audio', source='system'):
             # 检查是否正在保存，避免重复保存
             if self._saving:
-                print("DEBUG: 音频正在保存中，跳过重复操作")
+                audio_log.info("音频正在保存中，跳过重复操作")
                 return False
             
             if not self.recording_data:
-                print("DEBUG: 没有录制数据可以保存")
+                audio_log.info("没有录制数据可以保存")
+                return False
+            
+            if self.chunk_stream is not None:
+                audio_log.debug("音频已实时送给 FFmpeg，没有需要保存的数据")
                 return False
             
             if not HAS_PYAUDIO_WPATCH:
-                print("DEBUG: pyaudiowpatch未安装，无法保存音频")
+                audio_log.warning("pyaudiowpatch未安装，无法保存音频")
                 return False
             
             self._saving = True
             try:
-                print(f"DEBUG: 正在保存音频到 {filename}...")
-                print(f"DEBUG: 音频数据信息: {len(self.recording_data)} chunks, 采样率: {self.sample_rate}Hz")
+                audio_log.info("正在保存音频到 %s...", filename)
+                audio_log.info("音频数据信息: %s chunks, 采样率: %sHz", len(self.recording_data), self.sample_rate)
                 
                 # 创建数据副本，避免在保存过程中数据被修改
                 recording_data_copy = list(self.recording_data)
@@ -4440,13 +7785,11 @@ class SystemAudioRecorder:
                 wf.close()
                 
                 actual_duration = total_frames / self.sample_rate
-                print(f"DEBUG: 音频已保存到 {filename}, 时长: {actual_duration:.2f}秒, 总帧数: {total_frames}")
+                audio_log.info("音频已保存到 %s, 时长: %.2f秒, 总帧数: %s", filename, actual_duration, total_frames)
                 return True
                 
             except Exception as e:
-                print(f"DEBUG: 保存音频失败: {e}")
-                import traceback
-                traceback.print_exc()
+                audio_log.exception("保存音频失败: %s", e)
                 return False
             finally:
                 self._saving = False
@@ -4455,7 +7798,7 @@ class SystemAudioRecorder:
     def _get_loopback_device(self):
         """获取Loopback设备 - 优化PyAudio实例管理"""
         if not HAS_PYAUDIO_WPATCH:
-            print("DEBUG: pyaudiowpatch未安装，无法录制系统音频")
+            audio_log.warning("pyaudiowpatch未安装，无法录制系统音频")
             return None
         
         # 如果已有PyAudio实例，复用它；否则创建新实例
@@ -4472,7 +7815,7 @@ class SystemAudioRecorder:
             for i in range(temp_pa.get_device_count()):
                 device_info = temp_pa.get_device_info_by_index(i)
                 if device_info['maxInputChannels'] > 0 and 'loopback' in device_info['name'].lower():
-                    print(f"DEBUG: 找到Loopback设备: {device_info['name']}")
+                    audio_log.info("找到Loopback设备: %s", device_info['name'])
                     return device_info
             
             # 如果没找到特定名称的设备，尝试查找第一个可用的输入设备
@@ -4481,12 +7824,12 @@ class SystemAudioRecorder:
                 if device_info['maxInputChannels'] > 0:
                     # 检查是否是默认输出设备的loopback
                     if device_info.get('isLoopbackDevice', False):
-                        print(f"DEBUG: 找到默认Loopback设备: {device_info['name']}")
+                        audio_log.info("找到默认Loopback设备: %s", device_info['name'])
                         return device_info
             
             return None
         except Exception as e:
-            print(f"DEBUG: 获取Loopback设备时出错: {e}")
+            audio_log.warning("获取Loopback设备时出错: %s", e)
             # 如果创建了临时实例但失败了，清理它
             if temp_pa and temp_pa != self.pa:
                 try:
@@ -4507,7 +7850,7 @@ class SystemAudioRecorder:
                         self.stream.stop_stream()
                     self.stream.close()
                 except Exception as e:
-                    print(f"DEBUG: 关闭流时出错: {e}")
+                    audio_log.warning("关闭流时出错: %s", e)
                 finally:
                     self.stream = None
             
@@ -4519,7 +7862,7 @@ class SystemAudioRecorder:
                 try:
                     self.pa.terminate()
                 except Exception as e:
-                    print(f"DEBUG: 终止PyAudio时出错: {e}")
+                    audio_log.warning("终止PyAudio时出错: %s", e)
                 finally:
                     self.pa = None
                     self.initial_pa = None
@@ -4529,9 +7872,9 @@ class SystemAudioRecorder:
             self.recording_data = []
             self.loopback_device = None
             
-            print("DEBUG: PyAudio资源已完全释放")
+            audio_log.info("PyAudio资源已完全释放")
         except Exception as e:
-            print(f"DEBUG: 关闭PyAudio资源时发生错误: {e}")
+            audio_log.warning("关闭PyAudio资源时发生错误: %s", e)
             # 强制清理
             self.stream = None
             self.pa = None
@@ -4574,6 +7917,12 @@ class MicrophoneAudioRecorder:
         # 动态音频控制
         self.audio_muted = False  # 是否静音（录制过程中动态控制）
         
+        # 纯音频录制时的流式输出（PcmChunkStream），为空时音频块保存在内存中，停止后再保存
+        self.chunk_stream = None
+        
+        # 分段计时（由录制会话注入）
+        self.tracer = NULL_TRACER
+        
     def _generate_silence_chunk(self):
         """生成一个chunk的静音数据"""
         # 根据位深度计算静音数据大小
@@ -4583,14 +7932,18 @@ class MicrophoneAudioRecorder:
     
     def start_recording(self):
         """开始录制麦克风音频 - 连续录制版本"""
+        with self.tracer.span('audio_start', category='audio', source='microphone'):
+            return self._start_recording()
+    
+    def _start_recording(self):
         if not HAS_PYAUDIO_WPATCH:
-            print("DEBUG: pyaudiowpatch未安装，尝试使用pyaudio")
+            audio_log.info("pyaudiowpatch未安装，尝试使用pyaudio")
             # 尝试使用标准pyaudio
             try:
                 import pyaudio as standard_pyaudio
                 self.pa = standard_pyaudio.PyAudio()
             except:
-                print("DEBUG: pyaudio也未安装，无法录制麦克风音频")
+                audio_log.warning("pyaudio也未安装，无法录制麦克风音频")
                 return False
         else:
             if not self.pa:
@@ -4598,13 +7951,13 @@ class MicrophoneAudioRecorder:
                 self.initial_pa = self.pa
             
         if self.is_recording:
-            print("DEBUG: 麦克风已经在录制中")
+            audio_log.info("麦克风已经在录制中")
             return False
         
         # 获取麦克风设备
         self.microphone_device = self._get_microphone_device()
         if not self.microphone_device:
-            print("DEBUG: 未找到合适的麦克风设备")
+            audio_log.info("未找到合适的麦克风设备")
             return False
         
         # 使用设备支持的实际采样率
@@ -4614,10 +7967,10 @@ class MicrophoneAudioRecorder:
         # 预生成静音数据
         self.silence_data = self._generate_silence_chunk()
         
-        print(f"DEBUG: 使用麦克风设备 {self.microphone_device['name']} 开始连续录制，采样率: {self.sample_rate}Hz")
+        audio_log.info("使用麦克风设备 %s 开始连续录制，采样率: %sHz", self.microphone_device['name'], self.sample_rate)
         
         self.is_recording = True
-        self.recording_data = []
+        self.recording_data = self.chunk_stream if self.chunk_stream is not None else []
         self.last_read_time = time.time()  # 初始化时间记录
         
         try:
@@ -4637,7 +7990,7 @@ class MicrophoneAudioRecorder:
             self.stream.start_stream()
             
         except Exception as e:
-            print(f"DEBUG: 打开麦克风音频流失败: {e}")
+            audio_log.warning("打开麦克风音频流失败: %s", e)
             self.is_recording = False
             return False
         
@@ -4661,7 +8014,7 @@ class MicrophoneAudioRecorder:
         """连续录制线程 - 确保音频数据连续，修复卡顿问题"""
         import audioop  # 用于音频处理
         
-        print("DEBUG: 开始麦克风连续音频录制线程")
+        audio_log.debug("开始麦克风连续音频录制线程")
         
         # 记录开始时间
         start_time = time.time()
@@ -4730,16 +8083,16 @@ class MicrophoneAudioRecorder:
                                                 
                                                 # 非常少地打印调试信息
                                                 log_counter += 1
-                                                if len(self.recording_data) % 500 == 0:
+                                                if len(self.recording_data) % 500 == 0 and audio_log.isEnabledFor(logging.DEBUG):
                                                     bytes_per_sample = 3 if self.format == pyaudio.paInt24 else 2
                                                     rms = audioop.rms(data, bytes_per_sample) if len(data) >= 6 else 0
-                                                    print(f"DEBUG: 麦克风音频电平: {rms}, 已录制: {len(self.recording_data)} chunks")
+                                                    audio_log.debug("麦克风音频电平: %s, 已录制: %s chunks", rms, len(self.recording_data))
                                                 
                                                 read_attempts += 1
                                             else:
                                                 # 数据长度不正确，跳过这个chunk
                                                 if log_counter % 200 == 0:
-                                                    print(f"DEBUG: 警告：麦克风音频数据长度不正确，期望: {expected_size}, 实际: {len(data)}")
+                                                    audio_log.warning("麦克风音频数据长度不正确，期望: %s, 实际: %s", expected_size, len(data))
                                                 break
                                         else:
                                             # 没有数据可读，退出读取循环
@@ -4754,7 +8107,7 @@ class MicrophoneAudioRecorder:
                                     # OSError通常表示流已关闭或没有数据
                                     error_str = str(read_ex)
                                     if "not open" in error_str.lower() or "closed" in error_str.lower():
-                                        print("DEBUG: 麦克风音频流已关闭，停止读取")
+                                        audio_log.debug("麦克风音频流已关闭，停止读取")
                                         break
                                     consecutive_empty_reads += 1
                                     break
@@ -4765,9 +8118,9 @@ class MicrophoneAudioRecorder:
                                         # 缓冲区溢出，说明数据积压，需要更频繁读取
                                         consecutive_empty_reads = 0
                                         if log_counter % 100 == 0:
-                                            print(f"DEBUG: 麦克风音频缓冲区溢出，需要更频繁读取")
+                                            audio_log.debug("麦克风音频缓冲区溢出，需要更频繁读取")
                                     elif log_counter % 100 == 0:
-                                        print(f"DEBUG: 麦克风音频读取异常: {read_ex}")
+                                        audio_log.debug("麦克风音频读取异常: %s", read_ex)
                                     consecutive_empty_reads += 1
                                     break
                             
@@ -4778,7 +8131,7 @@ class MicrophoneAudioRecorder:
                         # 其他读取错误，记录但不中断
                         error_str = str(read_error)
                         if "Input overflowed" not in error_str and log_counter % 100 == 0:
-                            print(f"DEBUG: 麦克风音频读取错误: {error_str}")
+                            audio_log.debug("麦克风音频读取错误: %s", error_str)
                 
                 # 只有在没有读取到数据且数据不足时才补充静音
                 if not data_read:
@@ -4791,7 +8144,7 @@ class MicrophoneAudioRecorder:
                         
                         log_counter += 1
                         if log_counter % 50 == 0:
-                            print(f"DEBUG: 麦克风补充静音，当前: {len(self.recording_data)}, 期望: {expected_chunks_current}")
+                            audio_log.debug("麦克风补充静音，当前: %s, 期望: %s", len(self.recording_data), expected_chunks_current)
                 
                 # 检查是否应该退出录制
                 if not self.is_recording:
@@ -4809,30 +8162,30 @@ class MicrophoneAudioRecorder:
                 else:
                     time.sleep(sleep_interval)
                 
-                # 限制内存使用
-                if len(self.recording_data) > 10000:
+                # 限制内存使用（流式输出不在内存中累积）
+                if self.chunk_stream is None and len(self.recording_data) > 10000:
                     self.recording_data = self.recording_data[-8000:]
                     if log_counter % 100 == 0:
-                        print(f"DEBUG: 麦克风音频数据清理，当前: {len(self.recording_data)}")
+                        audio_log.debug("麦克风音频数据清理，当前: %s", len(self.recording_data))
                     
             except Exception as e:
                 if log_counter % 500 == 0:
-                    print(f"DEBUG: 麦克风录制线程错误: {e}")
+                    audio_log.debug("麦克风录制线程错误: %s", e)
                 time.sleep(0.005)
         
-        print(f"DEBUG: 麦克风连续录制线程结束，总共录制 {len(self.recording_data)} 个chunk")
+        audio_log.debug("麦克风连续录制线程结束，总共录制 %s 个chunk", len(self.recording_data))
     
     def pause_recording(self):
         """暂停录制（停止读取，但保留数据和流）"""
         if not self.is_recording:
-            print("DEBUG: 麦克风没有在录制中，无法暂停")
+            audio_log.warning("麦克风没有在录制中，无法暂停")
             return False
         
         if self.paused:
-            print("DEBUG: 麦克风音频录制已经暂停")
+            audio_log.info("麦克风音频录制已经暂停")
             return True
         
-        print("DEBUG: 暂停麦克风音频录制")
+        audio_log.info("暂停麦克风音频录制")
         # 记录暂停开始时间
         self.pause_start_time = time.time()
         self.paused = True
@@ -4842,29 +8195,29 @@ class MicrophoneAudioRecorder:
             try:
                 if self.stream.is_active():
                     self.stream.stop_stream()
-                    print("DEBUG: 麦克风音频流已暂停")
+                    audio_log.info("麦克风音频流已暂停")
             except Exception as e:
-                print(f"DEBUG: 暂停麦克风音频流时出错: {e}")
+                audio_log.warning("暂停麦克风音频流时出错: %s", e)
         
         return True
     
     def resume_recording(self):
         """恢复录制（重新启动音频流）"""
         if not self.is_recording:
-            print("DEBUG: 麦克风没有在录制中，无法恢复")
+            audio_log.warning("麦克风没有在录制中，无法恢复")
             return False
         
         if not self.paused:
-            print("DEBUG: 麦克风音频录制未暂停，无需恢复")
+            audio_log.info("麦克风音频录制未暂停，无需恢复")
             return True
         
-        print("DEBUG: 恢复麦克风音频录制")
+        audio_log.info("恢复麦克风音频录制")
         
         # 计算暂停时长并累加
         if self.pause_start_time:
             pause_duration = time.time() - self.pause_start_time
             self.total_pause_duration += pause_duration
-            print(f"DEBUG: 麦克风暂停时长: {pause_duration:.2f}秒, 累计暂停时长: {self.total_pause_duration:.2f}秒")
+            audio_log.info("麦克风暂停时长: %.2f秒, 累计暂停时长: %.2f秒", pause_duration, self.total_pause_duration)
             self.pause_start_time = None
         
         self.paused = False
@@ -4876,9 +8229,9 @@ class MicrophoneAudioRecorder:
                 if self.stream.is_stopped():
                     try:
                         self.stream.start_stream()
-                        print("DEBUG: 麦克风音频流已恢复")
+                        audio_log.info("麦克风音频流已恢复")
                     except Exception as e:
-                        print(f"DEBUG: 重新启动麦克风音频流失败: {e}，尝试重新创建流...")
+                        audio_log.warning("重新启动麦克风音频流失败: %s，尝试重新创建流...", e)
                         try:
                             if not self.stream.is_stopped():
                                 self.stream.stop_stream()
@@ -4899,31 +8252,31 @@ class MicrophoneAudioRecorder:
                                 start=False
                             )
                             self.stream.start_stream()
-                            print("DEBUG: 麦克风音频流已重新创建并启动")
+                            audio_log.info("麦克风音频流已重新创建并启动")
                         except Exception as e2:
-                            print(f"DEBUG: 重新创建麦克风音频流失败: {e2}")
+                            audio_log.warning("重新创建麦克风音频流失败: %s", e2)
                             return False
                 elif not self.stream.is_active():
                     try:
                         self.stream.start_stream()
-                        print("DEBUG: 麦克风音频流已恢复")
+                        audio_log.info("麦克风音频流已恢复")
                     except Exception as e:
-                        print(f"DEBUG: 恢复麦克风音频流时出错: {e}")
+                        audio_log.warning("恢复麦克风音频流时出错: %s", e)
                         return False
                 else:
-                    print("DEBUG: 麦克风音频流已在运行")
+                    audio_log.info("麦克风音频流已在运行")
             except Exception as e:
-                print(f"DEBUG: 恢复麦克风音频流时出错: {e}")
+                audio_log.warning("恢复麦克风音频流时出错: %s", e)
                 return False
         else:
-            print("DEBUG: 警告：麦克风音频流不存在，无法恢复")
+            audio_log.warning("麦克风音频流不存在，无法恢复")
             return False
         
         return True
     
     def mute_audio(self):
         """静音（录制过程中禁用音频）"""
-        print("DEBUG: MicrophoneAudioRecorder - 静音麦克风")
+        audio_log.info("MicrophoneAudioRecorder - 静音麦克风")
         self.audio_muted = True
         
         # 立即清空音频流缓冲区，减少延迟
@@ -4933,15 +8286,15 @@ class MicrophoneAudioRecorder:
                 available = self.stream.get_read_available()
                 if available > 0:
                     self.stream.read(available, exception_on_overflow=False)
-                    print(f"DEBUG: 已清空麦克风缓冲区 {available} 帧，减少静音延迟")
+                    audio_log.info("已清空麦克风缓冲区 %s 帧，减少静音延迟", available)
             except Exception as e:
-                print(f"DEBUG: 清空麦克风缓冲区失败: {e}")
+                audio_log.warning("清空麦克风缓冲区失败: %s", e)
         
         return True
     
     def unmute_audio(self):
         """取消静音（录制过程中启用音频）"""
-        print("DEBUG: MicrophoneAudioRecorder - 取消静音")
+        audio_log.info("MicrophoneAudioRecorder - 取消静音")
         self.audio_muted = False
         
         # 立即清空音频流缓冲区，避免播放旧数据
@@ -4951,20 +8304,20 @@ class MicrophoneAudioRecorder:
                 available = self.stream.get_read_available()
                 if available > 0:
                     self.stream.read(available, exception_on_overflow=False)
-                    print(f"DEBUG: 已清空麦克风缓冲区 {available} 帧，避免播放旧数据")
+                    audio_log.info("已清空麦克风缓冲区 %s 帧，避免播放旧数据", available)
             except Exception as e:
-                print(f"DEBUG: 清空麦克风缓冲区失败: {e}")
+                audio_log.warning("清空麦克风缓冲区失败: %s", e)
         
         return True
     
     def stop_recording(self):
         """停止录制（线程安全）"""
-        with self._operation_lock:
+        with self._operation_lock, self.tracer.span('audio_stop', category='audio'):
             if not self.is_recording:
-                print("DEBUG: 麦克风没有在录制中")
+                audio_log.info("麦克风没有在录制中")
                 return False
             
-            print("DEBUG: 停止麦克风连续音频录制")
+            audio_log.info("停止麦克风连续音频录制")
             self.is_recording = False
             
             # 先停止音频流，避免继续读取数据
@@ -4973,16 +8326,16 @@ class MicrophoneAudioRecorder:
                     if self.stream.is_active():
                         self.stream.stop_stream()
                 except Exception as e:
-                    print(f"DEBUG: 停止麦克风音频流时出错: {e}")
+                    audio_log.warning("停止麦克风音频流时出错: %s", e)
             
             # 等待录制线程结束
             if self.recording_thread and self.recording_thread.is_alive():
-                print("DEBUG: 等待麦克风录制线程结束...")
+                audio_log.info("等待麦克风录制线程结束...")
                 self.recording_thread.join(timeout=5.0)
                 if self.recording_thread.is_alive():
-                    print("DEBUG: 警告：麦克风录制线程未在超时时间内结束")
+                    audio_log.warning("麦克风录制线程未在超时时间内结束")
                 else:
-                    print("DEBUG: 麦克风录制线程已结束")
+                    audio_log.info("麦克风录制线程已结束")
             
             # 关闭流（在线程结束后）
             if self.stream:
@@ -4992,139 +8345,1395 @@ class MicrophoneAudioRecorder:
                     self.stream.close()
                     self.stream = None
                 except Exception as e:
-                    print(f"DEBUG: 关闭麦克风音频流时出错: {e}")
+                    audio_log.warning("关闭麦克风音频流时出错: %s", e)
                     self.stream = None
             
             # 计算总时长
             total_duration = len(self.recording_data) * self.chunk_duration
-            print(f"DEBUG: 麦克风音频录制完成，总时长: {total_duration:.2f}秒, 总数据量: {len(self.recording_data)} chunks")
+            audio_log.info("麦克风音频录制完成，总时长: %.2f秒, 总数据量: %s chunks", total_duration, len(self.recording_data))
             
             return True
     
-    def save_recording(self, filename="microphone_audio.wav"):
-        """保存录制的音频到WAV文件（线程安全）"""
+    def save_recording(self, filename="microphone_audio.wav"):
+        """保存录制的音频到WAV文件（线程安全）"""
+        with self._operation_lock, self.tracer.span('audio_save', category='audio', source='microphone'):
+            # 检查是否正在保存，避免重复保存
+            if self._saving:
+                audio_log.info("麦克风音频正在保存中，跳过重复操作")
+                return False
+            
+            if not self.recording_data:
+                audio_log.info("没有麦克风录制数据可以保存")
+                return False
+            
+            if self.chunk_stream is not None:
+                audio_log.debug("麦克风音频已实时送给 FFmpeg，没有需要保存的数据")
+                return False
+            
+            self._saving = True
+            try:
+                audio_log.info("正在保存麦克风音频到 %s...", filename)
+                audio_log.info("麦克风音频数据信息: %s chunks, 采样率: %sHz", len(self.recording_data), self.sample_rate)
+                
+                # 创建数据副本，避免在保存过程中数据被修改
+                recording_data_copy = list(self.recording_data)
+                
+                import wave
+                wf = wave.open(filename, 'wb')
+                wf.setnchannels(self.channels)
+                wf.setsampwidth(self.pa.get_sample_size(self.format))
+                wf.setframerate(self.sample_rate)
+                
+                # 写入所有数据
+                total_frames = 0
+                bytes_per_sample = 3 if self.format == pyaudio.paInt24 else 2
+                for chunk in recording_data_copy:
+                    wf.writeframes(chunk)
+                    total_frames += len(chunk) // (self.channels * bytes_per_sample)
+                
+                wf.close()
+                
+                actual_duration = total_frames / self.sample_rate
+                audio_log.info("麦克风音频已保存到 %s, 时长: %.2f秒, 总帧数: %s", filename, actual_duration, total_frames)
+                return True
+                
+            except Exception as e:
+                audio_log.exception("保存麦克风音频失败: %s", e)
+                return False
+            finally:
+                self._saving = False
+    
+    def _get_microphone_device(self):
+        """获取麦克风设备"""
+        if not self.pa:
+            audio_log.info("PyAudio未初始化")
+            return None
+        
+        try:
+            # 如果用户指定了设备名称，尝试匹配
+            if self.device_name:
+                for i in range(self.pa.get_device_count()):
+                    device_info = self.pa.get_device_info_by_index(i)
+                    if device_info['maxInputChannels'] > 0:
+                        # 尝试匹配设备名称
+                        if self.device_name.lower() in device_info['name'].lower():
+                            audio_log.info("找到匹配的麦克风设备: %s", device_info['name'])
+                            return device_info
+            
+            # 如果没有指定设备或未找到匹配，使用默认输入设备
+            default_input_index = self.pa.get_default_input_device_info()['index']
+            device_info = self.pa.get_device_info_by_index(default_input_index)
+            audio_log.info("使用默认麦克风设备: %s", device_info['name'])
+            return device_info
+            
+        except Exception as e:
+            audio_log.warning("获取麦克风设备时出错: %s", e)
+            return None
+    
+    def close(self):
+        """关闭PyAudio资源 - 确保正确的资源释放顺序"""
+        try:
+            # 1. 先确保流已关闭
+            if self.stream:
+                try:
+                    if self.stream.is_active():
+                        self.stream.stop_stream()
+                    if not self.stream.is_stopped():
+                        self.stream.stop_stream()
+                    self.stream.close()
+                except Exception as e:
+                    audio_log.warning("关闭麦克风流时出错: %s", e)
+                finally:
+                    self.stream = None
+            
+            # 2. 等待一小段时间确保资源释放
+            time.sleep(0.1)
+            
+            # 3. 终止PyAudio实例
+            if self.pa:
+                try:
+                    self.pa.terminate()
+                except Exception as e:
+                    audio_log.warning("终止麦克风PyAudio时出错: %s", e)
+                finally:
+                    self.pa = None
+                    self.initial_pa = None
+            
+            # 4. 清理其他资源
+            self.recording_thread = None
+            self.recording_data = []
+            self.microphone_device = None
+            
+            audio_log.info("麦克风PyAudio资源已完全释放")
+        except Exception as e:
+            audio_log.warning("关闭麦克风PyAudio资源时发生错误: %s", e)
+            # 强制清理
+            self.stream = None
+            self.pa = None
+            self.initial_pa = None
+            self.recording_thread = None
+
+
+class SyntheticAudioRecorder:
+    """合成音频录制器 - 与 SystemAudioRecorder 接口一致，按实时速率产生确定的PCM（正弦波），用于基准测试"""
+    def __init__(self, frequency=440.0, sample_rate=48000, channels=2, chunk=4800):
+        self.frequency = frequency
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk = chunk
+        self.sample_width = 2  # 16位
+        self.is_recording = False
+        self.recording_data = []
+        self.recording_thread = None
+        self.paused = False
+        self.pause_start_time = None
+        self.total_pause_duration = 0.0
+        self.audio_muted = False
+        self.samples_generated = 0
+        self.chunk_stream = None  # 纯音频录制时的流式输出
+        self._operation_lock = threading.Lock()
+        self.tracer = NULL_TRACER
+    
+    def _generate_silence_chunk(self):
+        """生成一个chunk的静音数据"""
+        return b'\x00' * (self.chunk * self.channels * self.sample_width)
+    
+    def _generate_tone_chunk(self):
+        """生成下一个chunk的正弦波数据（相位连续）"""
+        import math
+        import struct
+        frames = []
+        step = 2 * math.pi * self.frequency / self.sample_rate
+        for i in range(self.chunk):
+            value = int(12000 * math.sin(step * (self.samples_generated + i)))
+            frames.append(struct.pack('<' + 'h' * self.channels, *([value] * self.channels)))
+        self.samples_generated += self.chunk
+        return b''.join(frames)
+    
+    def start_recording(self):
+        """开始按实时速率产生音频数据"""
+        with self._operation_lock:
+            if self.is_recording:
+                return False
+            self.is_recording = True
+            if self.chunk_stream is not None:
+                self.recording_data = self.chunk_stream
+            self.recording_thread = threading.Thread(target=self._generate_loop, daemon=True)
+            self.recording_thread.start()
+        return True
+    
+    def _generate_loop(self):
+        chunk_duration = self.chunk / self.sample_rate
+        next_time = time.perf_counter()
+        while self.is_recording:
+            next_time += chunk_duration
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.paused or not self.is_recording:
+                continue
+            tone = self._generate_tone_chunk()
+            self.recording_data.append(self._generate_silence_chunk() if self.audio_muted else tone)
+    
+    def pause_recording(self):
+        if self.is_recording and not self.paused:
+            self.pause_start_time = time.time()
+            self.paused = True
+        return True
+    
+    def resume_recording(self):
+        if self.paused:
+            if self.pause_start_time:
+                self.total_pause_duration += time.time() - self.pause_start_time
+                self.pause_start_time = None
+            self.paused = False
+        return True
+    
+    def mute_audio(self):
+        self.audio_muted = True
+        return True
+    
+    def unmute_audio(self):
+        self.audio_muted = False
+        return True
+    
+    def stop_recording(self):
         with self._operation_lock:
-            # 检查是否正在保存，避免重复保存
-            if self._saving:
-                print("DEBUG: 麦克风音频正在保存中，跳过重复操作")
-                return False
-            
-            if not self.recording_data:
-                print("DEBUG: 没有麦克风录制数据可以保存")
+            if not self.is_recording:
                 return False
-            
-            self._saving = True
-            try:
-                print(f"DEBUG: 正在保存麦克风音频到 {filename}...")
-                print(f"DEBUG: 麦克风音频数据信息: {len(self.recording_data)} chunks, 采样率: {self.sample_rate}Hz")
-                
-                # 创建数据副本，避免在保存过程中数据被修改
-                recording_data_copy = list(self.recording_data)
-                
-                import wave
-                wf = wave.open(filename, 'wb')
+            self.is_recording = False
+        if self.recording_thread:
+            self.recording_thread.join(timeout=2)
+        return True
+    
+    def save_recording(self, filename):
+        """保存为16位WAV文件"""
+        if self.chunk_stream is not None:
+            return False  # 已实时送给 FFmpeg
+        import wave
+        try:
+            with wave.open(filename, 'wb') as wf:
                 wf.setnchannels(self.channels)
-                wf.setsampwidth(self.pa.get_sample_size(self.format))
+                wf.setsampwidth(self.sample_width)
                 wf.setframerate(self.sample_rate)
-                
-                # 写入所有数据
-                total_frames = 0
-                bytes_per_sample = 3 if self.format == pyaudio.paInt24 else 2
-                for chunk in recording_data_copy:
-                    wf.writeframes(chunk)
-                    total_frames += len(chunk) // (self.channels * bytes_per_sample)
-                
-                wf.close()
-                
-                actual_duration = total_frames / self.sample_rate
-                print(f"DEBUG: 麦克风音频已保存到 {filename}, 时长: {actual_duration:.2f}秒, 总帧数: {total_frames}")
-                return True
-                
-            except Exception as e:
-                print(f"DEBUG: 保存麦克风音频失败: {e}")
-                import traceback
-                traceback.print_exc()
-                return False
-            finally:
-                self._saving = False
+                wf.writeframes(b''.join(self.recording_data))
+            return True
+        except Exception as e:
+            audio_log.warning("保存合成音频失败: %s", e)
+            return False
     
-    def _get_microphone_device(self):
-        """获取麦克风设备"""
-        if not self.pa:
-            print("DEBUG: PyAudio未初始化")
+    def close(self):
+        self.recording_data = []
+
+
+# 文件列表中显示的视频文件扩展名
+VIDEO_FILE_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
+
+
+class RecordingLibraryIndex:
+    """录制文件库索引 - 使用SQLite保存文件信息，排序和分页都在索引中完成"""
+    # 表格列号 -> 索引字段（只允许这些字段参与排序，避免拼接任意SQL）
+    SORT_FIELDS = {0: 'name', 1: 'size', 2: 'ctime'}
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
+            db_path = os.path.join(config_dir, 'library.db')
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        except Exception as e:
+            # 索引文件不可用时退回内存索引，文件列表仍可正常使用
+            library_log.warning("打开文件库索引失败，使用内存索引: %s", e)
+            self.db_path = ':memory:'
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        """创建索引表结构"""
+        with self.lock:
+            try:
+                self.conn.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.DatabaseError:
+                pass
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS recordings ('
+                'path TEXT PRIMARY KEY, '
+                'directory TEXT NOT NULL, '
+                'name TEXT NOT NULL, '
+                'size INTEGER NOT NULL, '
+                'ctime REAL NOT NULL, '
+                'mtime REAL NOT NULL)'
+            )
+            for field in self.SORT_FIELDS.values():
+                self.conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_recordings_{field} ON recordings(directory, {field}, path)'
+                )
+            # 媒体信息缓存：只有 (path, size, mtime) 完全一致时才视为有效
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS media_info ('
+                'path TEXT PRIMARY KEY, '
+                'size INTEGER NOT NULL, '
+                'mtime REAL NOT NULL, '
+                'duration REAL, '
+                'width INTEGER, '
+                'height INTEGER, '
+                'video_codec TEXT, '
+                'fps REAL, '
+                'has_audio INTEGER, '
+                'audio_codec TEXT, '
+                'bitrate INTEGER)'
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def normalize_directory(directory):
+        """统一目录写法，保证同一目录在索引中只有一个键"""
+        return os.path.normcase(os.path.abspath(directory))
+
+    def diff_directory(self, directory):
+        """扫描目录并与索引比较，返回 (新增条目, 删除路径, 变化条目)，不修改索引"""
+        directory = self.normalize_directory(directory)
+        with self.lock:
+            known = {
+                row['path']: (row['size'], row['mtime'])
+                for row in self.conn.execute(
+                    'SELECT path, size, mtime FROM recordings WHERE directory = ?', (directory,)
+                )
+            }
+
+        added = []
+        changed = []
+        seen = set()
+        try:
+            # os.scandir 在Windows上随目录项一起返回文件属性，不需要逐个文件再stat
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not entry.name.lower().endswith(VIDEO_FILE_EXTENSIONS):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    path = os.path.join(directory, entry.name)
+                    seen.add(path)
+                    record = {
+                        'path': path,
+                        'directory': directory,
+                        'name': entry.name,
+                        'size': stat.st_size,
+                        'ctime': stat.st_ctime,
+                        'mtime': stat.st_mtime,
+                    }
+                    old = known.get(path)
+                    if old is None:
+                        added.append(record)
+                    elif old != (stat.st_size, stat.st_mtime):
+                        changed.append(record)
+        except OSError as e:
+            library_log.warning("扫描录制目录失败: %s", e)
+            return [], [], []
+
+        removed = [path for path in known if path not in seen]
+        return added, removed, changed
+
+    def apply_diff(self, added, removed, changed):
+        """批量写入扫描结果"""
+        with self.lock:
+            self.conn.executemany('DELETE FROM recordings WHERE path = ?', [(p,) for p in removed])
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO recordings (path, directory, name, size, ctime, mtime) '
+                'VALUES (:path, :directory, :name, :size, :ctime, :mtime)',
+                added + changed
+            )
+            self.conn.commit()
+
+    def upsert(self, record):
+        """插入或更新单个条目"""
+        self.apply_diff([record], [], [])
+
+    def remove(self, path):
+        """删除单个条目"""
+        self.apply_diff([], [path], [])
+
+    def get(self, path):
+        """按路径读取条目"""
+        with self.lock:
+            return self.conn.execute('SELECT * FROM recordings WHERE path = ?', (path,)).fetchone()
+
+    def count(self, directory):
+        """目录中的条目数量"""
+        directory = self.normalize_directory(directory)
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM recordings WHERE directory = ?', (directory,)
+            ).fetchone()[0]
+
+    def _order_clause(self, sort_column, descending, alias=''):
+        field = self.SORT_FIELDS.get(sort_column, 'ctime')
+        direction = 'DESC' if descending else 'ASC'
+        return field, f'ORDER BY {alias}{field} {direction}, {alias}path {direction}'
+
+    def fetch(self, directory, sort_column, descending, offset, limit):
+        """按排序读取一页条目（附带仍然有效的媒体信息）"""
+        directory = self.normalize_directory(directory)
+        _, order = self._order_clause(sort_column, descending, alias='r.')
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT r.path, r.directory, r.name, r.size, r.ctime, r.mtime, '
+                'm.duration, m.width, m.height, m.video_codec, m.fps, m.has_audio, m.audio_codec, m.bitrate '
+                'FROM recordings r LEFT JOIN media_info m '
+                'ON m.path = r.path AND m.size = r.size AND m.mtime = r.mtime '
+                f'WHERE r.directory = ? {order} LIMIT ? OFFSET ?',
+                (directory, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_media_info(self, path, size, mtime, info):
+        """保存媒体信息（探测结果或录制结束时写入的信息）"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO media_info '
+                '(path, size, mtime, duration, width, height, video_codec, fps, has_audio, audio_codec, bitrate) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, size, mtime, info.get('duration'), info.get('width'), info.get('height'),
+                 info.get('video_codec'), info.get('fps'), 1 if info.get('has_audio') else 0,
+                 info.get('audio_codec'), info.get('bitrate'))
+            )
+            self.conn.commit()
+
+    def save_media_info_for_file(self, path, info):
+        """按文件当前的大小和修改时间保存媒体信息"""
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            library_log.warning("保存媒体信息失败，无法读取文件属性: %s", e)
+            return
+        # 路径写法与目录扫描保持一致，否则缓存无法命中
+        path = os.path.join(self.normalize_directory(os.path.dirname(path)), os.path.basename(path))
+        self.save_media_info(path, stat.st_size, stat.st_mtime, info)
+
+    def position_of(self, record, sort_column, descending):
+        """计算条目在当前排序下的行号（条目本身不必已在索引中）"""
+        directory = self.normalize_directory(record['directory'])
+        field, _ = self._order_clause(sort_column, descending)
+        op = '>' if descending else '<'
+        with self.lock:
+            return self.conn.execute(
+                f'SELECT COUNT(*) FROM recordings WHERE directory = ? '
+                f'AND ({field} {op} ? OR ({field} = ? AND path {op} ?))',
+                (directory, record[field], record[field], record['path'])
+            ).fetchone()[0]
+
+    def all_paths(self, directory):
+        """目录中全部条目的路径"""
+        directory = self.normalize_directory(directory)
+        with self.lock:
+            return [row['path'] for row in self.conn.execute(
+                'SELECT path FROM recordings WHERE directory = ?', (directory,)
+            )]
+
+
+_recording_library_index = None
+
+
+def get_recording_library_index():
+    """获取进程内共享的文件库索引"""
+    global _recording_library_index
+    if _recording_library_index is None:
+        _recording_library_index = RecordingLibraryIndex()
+    return _recording_library_index
+
+
+def probe_media_info(filepath, timeout=15):
+    """使用 ffprobe 读取媒体信息（时长、分辨率、编码、帧率、音频、码率），失败返回 None"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', filepath],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=timeout,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        if result.returncode != 0:
+            library_log.warning("ffprobe 探测失败 %s: %s", filepath, result.stderr[-200:] if result.stderr else '')
             return None
-        
+        data = json.loads(result.stdout or '{}')
+    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError) as e:
+        library_log.warning("ffprobe 探测出错 %s: %s", filepath, e)
+        return None
+
+    info = {'duration': None, 'width': None, 'height': None, 'video_codec': None,
+            'fps': None, 'has_audio': False, 'audio_codec': None, 'bitrate': None}
+    fmt = data.get('format', {})
+    try:
+        info['duration'] = float(fmt['duration'])
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        info['bitrate'] = int(fmt['bit_rate'])
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    for stream in data.get('streams', []):
+        codec_type = stream.get('codec_type')
+        if codec_type == 'video' and info['video_codec'] is None:
+            info['video_codec'] = stream.get('codec_name')
+            info['width'] = stream.get('width')
+            info['height'] = stream.get('height')
+            # avg_frame_rate 形如 "30/1"，VFR 文件可能为 "0/0"
+            rate = stream.get('avg_frame_rate') or stream.get('r_frame_rate') or '0/0'
+            try:
+                num, den = rate.split('/')
+                if float(den) > 0:
+                    info['fps'] = round(float(num) / float(den), 2)
+            except ValueError:
+                pass
+        elif codec_type == 'audio' and not info['has_audio']:
+            info['has_audio'] = True
+            info['audio_codec'] = stream.get('codec_name')
+    return info
+
+
+class MediaProbePool(QObject):
+    """后台媒体探测池 - 限制并发数，每个 (path, size, mtime) 只探测一次"""
+    probe_finished = pyqtSignal(str)  # 探测完成信号，传递文件路径
+
+    def __init__(self, library_index, max_workers=2, parent=None):
+        super().__init__(parent)
+        self.library_index = library_index
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='media_probe')
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+
+    def request(self, path, size, mtime):
+        """请求探测文件（已在队列中的文件会被忽略）"""
+        key = (path, size, mtime)
+        with self.pending_lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+        self.executor.submit(self._probe, key)
+
+    def _probe(self, key):
+        path, size, mtime = key
         try:
-            # 如果用户指定了设备名称，尝试匹配
-            if self.device_name:
-                for i in range(self.pa.get_device_count()):
-                    device_info = self.pa.get_device_info_by_index(i)
-                    if device_info['maxInputChannels'] > 0:
-                        # 尝试匹配设备名称
-                        if self.device_name.lower() in device_info['name'].lower():
-                            print(f"DEBUG: 找到匹配的麦克风设备: {device_info['name']}")
-                            return device_info
-            
-            # 如果没有指定设备或未找到匹配，使用默认输入设备
-            default_input_index = self.pa.get_default_input_device_info()['index']
-            device_info = self.pa.get_device_info_by_index(default_input_index)
-            print(f"DEBUG: 使用默认麦克风设备: {device_info['name']}")
-            return device_info
-            
+            info = probe_media_info(path)
+            if info is None:
+                # 探测失败也写入缓存（时长记为-1），避免每次打开列表都重复探测
+                info = {'duration': -1}
+            self.library_index.save_media_info(path, size, mtime, info)
+            self.probe_finished.emit(path)
+        except Exception as e:
+            library_log.exception("媒体探测任务出错 %s: %s", path, e)
+        finally:
+            with self.pending_lock:
+                self.pending.discard(key)
+
+    def shutdown(self):
+        """丢弃排队中的探测任务"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_media_probe_pool = None
+
+
+def get_media_probe_pool():
+    """获取进程内共享的媒体探测池（需在主线程中首次调用）"""
+    global _media_probe_pool
+    if _media_probe_pool is None:
+        _media_probe_pool = MediaProbePool(get_recording_library_index())
+    return _media_probe_pool
+
+
+class LibraryScanner(QObject):
+    """后台目录扫描 - 在工作线程中比较目录与索引（网络共享目录可能很慢），结果通过信号交回主线程"""
+    scan_finished = pyqtSignal(str, object, object, object)  # 目录、新增条目、删除路径、变化条目
+
+    def __init__(self, library_index, parent=None):
+        super().__init__(parent)
+        self.library_index = library_index
+        # 单线程：同一时刻只有一次扫描，扫描结果按提交顺序返回
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library_scan')
+
+    def request(self, directory):
+        """请求扫描目录"""
+        self.executor.submit(self._scan, directory)
+
+    def _scan(self, directory):
+        try:
+            added, removed, changed = self.library_index.diff_directory(directory)
+        except Exception as e:
+            library_log.exception("扫描录制目录出错 %s: %s", directory, e)
+            added, removed, changed = [], [], []
+        self.scan_finished.emit(directory, added, removed, changed)
+
+    def shutdown(self):
+        """丢弃排队中的扫描任务"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_library_scanner = None
+
+
+def get_library_scanner():
+    """获取进程内共享的目录扫描器（需在主线程中首次调用）"""
+    global _library_scanner
+    if _library_scanner is None:
+        _library_scanner = LibraryScanner(get_recording_library_index())
+    return _library_scanner
+
+
+class ThumbnailCache:
+    """缩略图磁盘缓存 - 封面图和预览条（精灵图），按总大小做LRU淘汰"""
+    POSTER_WIDTH = 320
+    FRAME_WIDTH = 160
+    FRAME_HEIGHT = 90
+    SPRITE_FRAMES = 10
+
+    def __init__(self, cache_dir=None, max_bytes=200 * 1024 * 1024):
+        if cache_dir is None:
+            config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
+            cache_dir = os.path.join(config_dir, 'thumbnails')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except Exception as e:
+            library_log.warning("创建缩略图缓存目录失败: %s", e)
+
+    @staticmethod
+    def cache_key(path, size, mtime):
+        """同一文件内容（路径、大小、修改时间一致）对应同一个键"""
+        import hashlib
+        raw = f"{os.path.normcase(os.path.abspath(path))}|{size}|{mtime:.6f}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def paths_for(self, key):
+        """返回 (封面图路径, 预览条路径)"""
+        return (os.path.join(self.cache_dir, f'{key}_poster.jpg'),
+                os.path.join(self.cache_dir, f'{key}_sprite.jpg'))
+
+    def lookup(self, key):
+        """命中时返回 (封面图路径, 预览条路径) 并刷新LRU时间，未命中返回 None"""
+        poster, sprite = self.paths_for(key)
+        if not (os.path.exists(poster) and os.path.exists(sprite)):
+            return None
+        now = time.time()
+        for path in (poster, sprite):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return poster, sprite
+
+    def _run_ffmpeg(self, cmd, output):
+        """执行 FFmpeg 并把结果原子地移动到缓存文件"""
+        tmp_output = output + '.tmp.jpg'
+        result = subprocess.run(
+            cmd + ['-y', tmp_output],
+            capture_output=True,
+            timeout=30,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        if result.returncode != 0 or not os.path.exists(tmp_output):
+            stderr = result.stderr.decode('utf-8', errors='replace') if result.stderr else ''
+            library_log.warning("生成缩略图失败: %s", stderr[-300:])
+            try:
+                os.remove(tmp_output)
+            except OSError:
+                pass
+            return False
+        os.replace(tmp_output, output)
+        return True
+
+    def generate(self, filepath, duration=None):
+        """生成封面图和预览条，返回 (封面图路径, 预览条路径)，失败返回 None
+
+        所有取帧都放在 -i 之前做输入端跳转，并用 -skip_frame nokey 只解码关键帧，
+        耗时与视频长度基本无关。
+        """
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        key = self.cache_key(filepath, stat.st_size, stat.st_mtime)
+        cached = self.lookup(key)
+        if cached:
+            return cached
+
+        if not duration or duration <= 0:
+            info = probe_media_info(filepath)
+            duration = info.get('duration') if info else None
+        if not duration or duration <= 0:
+            duration = 0.0
+
+        poster, sprite = self.paths_for(key)
+        seek_args = ['-noaccurate_seek', '-skip_frame', 'nokey']
+        try:
+            # 封面图：取10%位置的关键帧，避开片头黑屏
+            poster_cmd = ['ffmpeg', '-v', 'error'] + seek_args + [
+                '-ss', f'{duration * 0.1:.3f}', '-i', filepath,
+                '-frames:v', '1',
+                '-vf', f'scale={self.POSTER_WIDTH}:-2',
+                '-q:v', '4'
+            ]
+            if not self._run_ffmpeg(poster_cmd, poster):
+                return None
+
+            # 预览条：N个均匀分布的关键帧横向拼接成一张图，悬停时按位置裁剪
+            frames = self.SPRITE_FRAMES
+            w, h = self.FRAME_WIDTH, self.FRAME_HEIGHT
+            sprite_cmd = ['ffmpeg', '-v', 'error']
+            for i in range(frames):
+                sprite_cmd += seek_args + ['-ss', f'{duration * (i + 0.5) / frames:.3f}', '-i', filepath]
+            filters = [
+                f'[{i}:v]scale={w}:{h}:force_original_aspect_ratio=decrease,'
+                f'pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color=black[f{i}]'
+                for i in range(frames)
+            ]
+            filters.append(''.join(f'[f{i}]' for i in range(frames)) + f'hstack=inputs={frames}[sprite]')
+            sprite_cmd += ['-filter_complex', ';'.join(filters), '-map', '[sprite]', '-frames:v', '1', '-q:v', '5']
+            if not self._run_ffmpeg(sprite_cmd, sprite):
+                return None
+        except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+            library_log.warning("生成缩略图出错 %s: %s", filepath, e)
+            return None
+
+        self.enforce_limit()
+        return poster, sprite
+
+    def enforce_limit(self):
+        """缓存超过上限时按最近使用时间淘汰最旧的文件"""
+        with self.lock:
+            try:
+                entries = []
+                total = 0
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+                            total += stat.st_size
+                if total <= self.max_bytes:
+                    return
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * 0.9:  # 淘汰到90%，避免每次生成都触发
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+                library_log.info("缩略图缓存已淘汰到 %.1f MB", total / 1024 / 1024)
+            except Exception as e:
+                library_log.warning("清理缩略图缓存失败: %s", e)
+
+
+_thumbnail_cache = None
+
+
+def get_thumbnail_cache():
+    """获取进程内共享的缩略图缓存"""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
+
+
+class ThumbnailService(QObject):
+    """缩略图服务 - 后台生成缩略图，并在主线程中缓存解码后的QPixmap"""
+    thumbnail_ready = pyqtSignal(str)  # 缩略图生成完成信号，传递文件路径
+    MEMORY_ITEMS = 300  # 内存中最多保留的文件数量
+    ICON_WIDTH = 56  # 列表中封面图标的尺寸
+    ICON_HEIGHT = 32
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnail')
+        self.pending = set()
+        self.pending_lock = threading.Lock()  # 同时保护 pending 和 failed（后台线程写入，主线程读取）
+        self.failed = set()
+        from collections import OrderedDict
+        self.pixmaps = OrderedDict()  # key -> (封面图, 预览条)
+
+    def get_pixmaps(self, record):
+        """返回 (封面图, 预览条) QPixmap；没有缓存时发起后台生成并返回 None（仅在主线程调用）"""
+        key = self.cache.cache_key(record['path'], record['size'], record['mtime'])
+        pixmaps = self.pixmaps.get(key)
+        if pixmaps is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmaps
+        with self.pending_lock:
+            if key in self.failed:
+                return None
+
+        cached = self.cache.lookup(key)
+        if cached:
+            poster = QPixmap(cached[0])
+            if not poster.isNull():
+                poster = poster.scaled(self.ICON_WIDTH, self.ICON_HEIGHT, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            pixmaps = (poster, QPixmap(cached[1]))
+            self.pixmaps[key] = pixmaps
+            while len(self.pixmaps) > self.MEMORY_ITEMS:
+                self.pixmaps.popitem(last=False)
+            return pixmaps
+
+        self._request(key, record['path'], record.get('duration'))
+        return None
+
+    def submit(self, path, duration=None):
+        """在后台生成指定文件的缩略图（可在任意线程调用，例如录制完成时趁文件还在系统缓存中）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._request(self.cache.cache_key(path, stat.st_size, stat.st_mtime), path, duration)
+
+    def _request(self, key, path, duration):
+        with self.pending_lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+        self.executor.submit(self._generate, key, path, duration)
+
+    def _generate(self, key, path, duration):
+        try:
+            if self.cache.generate(path, duration) is None:
+                with self.pending_lock:
+                    self.failed.add(key)
+            self.thumbnail_ready.emit(path)
         except Exception as e:
-            print(f"DEBUG: 获取麦克风设备时出错: {e}")
+            library_log.exception("缩略图任务出错 %s: %s", path, e)
+        finally:
+            with self.pending_lock:
+                self.pending.discard(key)
+
+
+_thumbnail_service = None
+
+
+def get_thumbnail_service():
+    """获取进程内共享的缩略图服务（需在主线程中首次调用）"""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        _thumbnail_service = ThumbnailService(get_thumbnail_cache())
+    return _thumbnail_service
+
+
+class RecordingLibraryModel(QAbstractTableModel):
+    """录制文件库表格模型 - 行数据按需从索引分批读取"""
+    HEADERS = ['文件名', '大小', '创建时间', '时长', '分辨率', '编码', '码率']
+    MEDIA_COLUMNS = (3, 4, 5, 6)  # 来自媒体探测的列
+    FETCH_BATCH = 200
+    # 单次变化超过该数量时直接重置模型，比逐行插入/删除更快
+    INCREMENTAL_LIMIT = 100
+
+    def __init__(self, library_index, directory, size_formatter, probe_pool=None, thumbnail_service=None, parent=None):
+        super().__init__(parent)
+        self.library_index = library_index
+        self.directory = directory
+        self.size_formatter = size_formatter
+        self.probe_pool = probe_pool
+        if self.probe_pool is not None:
+            self.probe_pool.probe_finished.connect(self.on_probe_finished)
+        self.thumbnail_service = thumbnail_service
+        if self.thumbnail_service is not None:
+            self.thumbnail_service.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.sort_column = 2  # 默认按创建时间排序（最新的在前）
+        self.sort_descending = True
+        self.total_rows = 0
+        self.loaded_rows = 0
+        self.row_cache = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.loaded_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.HEADERS):
+            return self.HEADERS[section]
+        return None
+
+    def record_at(self, row):
+        """读取指定行的条目，按批从索引加载并缓存"""
+        record = self.row_cache.get(row)
+        if record is None and 0 <= row < self.total_rows:
+            start = row - row % self.FETCH_BATCH
+            # 只有单行失效时（例如探测结果到达）只重新读取这一行
+            batch_cached = (start in self.row_cache) or (start + 1 in self.row_cache)
+            count = 1 if batch_cached else self.FETCH_BATCH
+            if batch_cached:
+                start = row
+            rows = self.library_index.fetch(
+                self.directory, self.sort_column, self.sort_descending, start, count
+            )
+            for i, item in enumerate(rows):
+                self.row_cache[start + i] = item
+            record = self.row_cache.get(row)
+        return record
+
+    def path_at(self, row):
+        """指定行对应的文件路径"""
+        record = self.record_at(row)
+        return record['path'] if record is not None else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.record_at(index.row())
+        if record is None:
+            return None
+
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return record['name']
+            if column == 1:
+                return self.size_formatter(record['size'])
+            if column == 2:
+                return datetime.fromtimestamp(record['ctime']).strftime('%Y-%m-%d %H:%M:%S')
+            if column in self.MEDIA_COLUMNS:
+                return self._media_text(record, column)
+        elif role == Qt.DecorationRole and column == 0 and self.thumbnail_service is not None:
+            pixmaps = self.thumbnail_service.get_pixmaps(record)
+            if pixmaps is not None and not pixmaps[0].isNull():
+                return pixmaps[0]
+        elif role == Qt.UserRole:
+            return record['path']
+        elif role == Qt.ToolTipRole and column == 0:
+            return record['path']
+        return None
+
+    def _media_text(self, record, column):
+        """媒体信息列的显示文本；没有缓存时只对正在显示的行发起后台探测"""
+        duration = record.get('duration')
+        if duration is None:
+            if self.probe_pool is not None:
+                self.probe_pool.request(record['path'], record['size'], record['mtime'])
+            return '...'
+        if duration < 0:
+            return '-'
+
+        if column == 3:
+            total = int(duration)
+            return f"{total // 3600:d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+        if column == 4:
+            if not record.get('width') or not record.get('height'):
+                return '-'
+            text = f"{record['width']}x{record['height']}"
+            if record.get('fps'):
+                text += f" @{record['fps']:g}fps"
+            return text
+        if column == 5:
+            video_codec = record.get('video_codec') or '-'
+            if record.get('has_audio'):
+                return f"{video_codec} / {record.get('audio_codec') or '音频'}"
+            return f"{video_codec} / 无音频"
+        if column == 6:
+            bitrate = record.get('bitrate')
+            if not bitrate:
+                return '-'
+            if bitrate >= 1000000:
+                return f"{bitrate / 1000000:.1f} Mbps"
+            return f"{bitrate / 1000:.0f} kbps"
+        return None
+
+    def sprite_at(self, row):
+        """指定行的预览条QPixmap（没有时返回 None）"""
+        record = self.record_at(row)
+        if record is None or self.thumbnail_service is None:
+            return None
+        pixmaps = self.thumbnail_service.get_pixmaps(record)
+        if pixmaps is None or pixmaps[1].isNull():
             return None
+        return pixmaps[1]
+
+    def on_probe_finished(self, path):
+        """探测结果到达 - 只刷新对应行的媒体信息列"""
+        self._refresh_row(path, self.MEDIA_COLUMNS[0], self.MEDIA_COLUMNS[-1])
+
+    def on_thumbnail_ready(self, path):
+        """缩略图生成完成 - 刷新对应行的文件名列（封面图标）"""
+        self._refresh_row(path, 0, 0)
+
+    def _refresh_row(self, path, first_column, last_column):
+        """后台结果到达后刷新单行的指定列"""
+        record = self.library_index.get(path)
+        if record is None or self.library_index.normalize_directory(record['directory']) != \
+                self.library_index.normalize_directory(self.directory):
+            return
+        row = self.library_index.position_of(record, self.sort_column, self.sort_descending)
+        if row >= self.loaded_rows:
+            return
+        self.row_cache.pop(row, None)
+        self.dataChanged.emit(self.index(row, first_column), self.index(row, last_column))
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.loaded_rows < self.total_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, self.total_rows - self.loaded_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded_rows, self.loaded_rows + count - 1)
+        self.loaded_rows += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column not in RecordingLibraryIndex.SORT_FIELDS:
+            return
+        self.sort_column = column
+        self.sort_descending = (order == Qt.DescendingOrder)
+        self.reload()
+
+    def set_directory(self, directory):
+        """切换显示的目录"""
+        self.directory = directory
+        self.reload()
+
+    def reload(self):
+        """重置模型，只加载第一批行"""
+        self.beginResetModel()
+        self.row_cache.clear()
+        self.total_rows = self.library_index.count(self.directory)
+        self.loaded_rows = min(self.FETCH_BATCH, self.total_rows)
+        self.endResetModel()
+
+    def apply_changes(self, added, removed, changed):
+        """把目录扫描结果写入索引，并以增量方式通知视图"""
+        if len(added) + len(removed) + len(changed) > self.INCREMENTAL_LIMIT:
+            self.library_index.apply_diff(added, removed, changed)
+            self.reload()
+            return
+
+        # 变化的条目排序键可能改变，按先删除再插入处理
+        for path in list(removed) + [record['path'] for record in changed]:
+            old = self.library_index.get(path)
+            if old is None:
+                continue
+            row = self.library_index.position_of(old, self.sort_column, self.sort_descending)
+            visible = row < self.loaded_rows
+            if visible:
+                self.beginRemoveRows(QModelIndex(), row, row)
+            self.library_index.remove(path)
+            self.row_cache.clear()
+            self.total_rows -= 1
+            if visible:
+                self.loaded_rows -= 1
+                self.endRemoveRows()
+
+        for record in list(added) + list(changed):
+            row = self.library_index.position_of(record, self.sort_column, self.sort_descending)
+            # 插入位置在已加载范围内，或者所有行都已加载时，才需要通知视图
+            visible = row < self.loaded_rows or self.loaded_rows == self.total_rows
+            if visible:
+                self.beginInsertRows(QModelIndex(), row, row)
+            self.library_index.upsert(record)
+            self.row_cache.clear()
+            self.total_rows += 1
+            if visible:
+                self.loaded_rows += 1
+                self.endInsertRows()
+
+
+class ChunkedExporter:
+    """成品录像的并行分块导出（GIF/WebM/MP4）
+
+    在关键帧处把源文件切成若干块，每块由一个 FFmpeg 进程编码，多个进程同时运行占满所有核心
+    （每个进程限制线程数）。GIF 使用两遍调色板：先从整段视频生成一次共享调色板，各块用同一个调色板
+    编码，拼接后颜色一致；WebM/MP4 的音频整段编码一次，最后与拼接好的视频流直接复制合并。
+    进度回调 on_progress(消息, 当前, 总数) 与合并进度信号的参数一致。
+    """
+    # 格式 -> (输出扩展名, 块文件扩展名)；MP4 的块使用 TS，参数集在码流中，拼接更可靠
+    FORMATS = {'GIF': ('.gif', '.gif'), 'WebM': ('.webm', '.webm'), 'MP4': ('.mp4', '.ts')}
+    GIF_FPS = 12
+    GIF_MAX_WIDTH = 800
+    WEBM_MAX_HEIGHT = 720
+    MIN_CHUNK_SECONDS = 4.0  # 块太短时进程启动和寻址的开销超过并行的收益
+    CHUNKS_PER_WORKER = 2  # 块数多于进程数，各块编码快慢不均时进程也不会空闲
+    THREADS_PER_WORKER = 2
     
-    def close(self):
-        """关闭PyAudio资源 - 确保正确的资源释放顺序"""
+    def __init__(self, source, image_format, output=None, workers=None, chunk_count=None, on_progress=None):
+        if image_format not in self.FORMATS:
+            raise ValueError(f"导出格式应为 {'/'.join(self.FORMATS)}: {image_format}")
+        self.source = os.path.abspath(source)
+        self.format = image_format
+        self.output = os.path.abspath(output) if output else self.default_output(self.source, image_format)
+        cores = os.cpu_count() or 1
+        self.workers = max(1, int(workers) if workers else cores // self.THREADS_PER_WORKER)
+        # 每个 FFmpeg 进程的线程数：进程数 × 线程数 ≈ 核心数
+        self.threads = max(1, cores // self.workers)
+        self.chunk_count = chunk_count
+        self.on_progress = on_progress
+        self.cancel_event = threading.Event()
+        self.processes = set()
+        self.process_lock = threading.Lock()
+    
+    @classmethod
+    def default_output(cls, source, image_format):
+        """与源文件同目录的 文件名_export.扩展名，已存在时追加序号"""
+        stem = os.path.splitext(source)[0]
+        extension = cls.FORMATS[image_format][0]
+        output = f'{stem}_export{extension}'
+        index = 1
+        while os.path.exists(output):
+            output = f'{stem}_export_{index}{extension}'
+            index += 1
+        return output
+    
+    @staticmethod
+    def plan_chunks(duration, keyframes, chunk_count, min_seconds):
+        """按目标块数在最接近等分点的关键帧处切分，返回 [(开始, 结束)]（秒）"""
+        chunk_count = max(1, min(int(chunk_count), int(duration // min_seconds)))
+        boundaries = [0.0]
+        for index in range(1, chunk_count):
+            target = duration * index / chunk_count
+            candidates = [t for t in keyframes if boundaries[-1] + min_seconds / 2 <= t <= duration - min_seconds / 2]
+            if not candidates:
+                break
+            cut = min(candidates, key=lambda t: abs(t - target))
+            if cut > boundaries[-1]:
+                boundaries.append(cut)
+        boundaries.append(duration)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+    
+    def cancel(self):
+        """取消导出，结束所有正在运行的 FFmpeg 进程"""
+        self.cancel_event.set()
+        with self.process_lock:
+            for process in list(self.processes):
+                try:
+                    process.kill()
+                except Exception:
+                    pass
+    
+    def _report(self, message, current, total=100):
+        if self.on_progress is not None:
+            try:
+                self.on_progress(message, int(current), total)
+            except Exception as e:
+                export_log.warning("导出进度回调失败: %s", e)
+    
+    def _ffmpeg(self, args, on_time=None):
+        """运行 FFmpeg，按 -progress 输出的 out_time 回调已编码的秒数，返回耗时（秒）"""
+        if self.cancel_event.is_set():
+            raise RuntimeError('导出已取消')
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1', '-y'] + args
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        with self.process_lock:
+            self.processes.add(process)
+            if self.cancel_event.is_set():
+                # 启动期间已取消：cancel() 没有看到这个进程
+                process.kill()
+        # 错误输出在单独线程中读取：否则错误/警告写满管道后 FFmpeg 阻塞，进度输出永远读不到结尾
+        stderr_tail = deque(maxlen=20)
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_tail.extend(line.rstrip() for line in iter(process.stderr.readline, '')),
+            name='export_stderr', daemon=True
+        )
+        stderr_reader.start()
         try:
-            # 1. 先确保流已关闭
-            if self.stream:
+            for line in iter(process.stdout.readline, ''):
+                # out_time_ms 实际单位也是微秒
+                if on_time is not None and line.startswith(('out_time_us=', 'out_time_ms=')):
+                    try:
+                        on_time(int(line.split('=', 1)[1]) / 1000000.0)
+                    except ValueError:
+                        pass
+            process.wait()
+            stderr_reader.join(timeout=5)
+        finally:
+            with self.process_lock:
+                self.processes.discard(process)
+        if self.cancel_event.is_set():
+            raise RuntimeError('导出已取消')
+        if process.returncode != 0:
+            error_output = ' | '.join(stderr_tail)
+            raise RuntimeError(f"FFmpeg 导出失败（返回码 {process.returncode}）: {error_output[-300:]}")
+        return time.perf_counter() - started
+    
+    def _keyframes(self):
+        """读取视频流关键帧的时间（只读取数据包，不解码）"""
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+             '-of', 'csv=p=0', self.source],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=120,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        keyframes = []
+        for line in result.stdout.splitlines():
+            fields = line.strip().split(',')
+            if len(fields) >= 2 and 'K' in fields[1]:
                 try:
-                    if self.stream.is_active():
-                        self.stream.stop_stream()
-                    if not self.stream.is_stopped():
-                        self.stream.stop_stream()
-                    self.stream.close()
-                except Exception as e:
-                    print(f"DEBUG: 关闭麦克风流时出错: {e}")
-                finally:
-                    self.stream = None
-            
-            # 2. 等待一小段时间确保资源释放
-            time.sleep(0.1)
-            
-            # 3. 终止PyAudio实例
-            if self.pa:
+                    keyframes.append(float(fields[0]))
+                except ValueError:
+                    pass
+        return sorted(keyframes)
+    
+    def _scale_filter(self):
+        if self.format == 'GIF':
+            return f"scale='min({self.GIF_MAX_WIDTH},iw)':-2:flags=lanczos"
+        if self.format == 'WebM':
+            return f"scale=-2:'min({self.WEBM_MAX_HEIGHT},ih)'"
+        return 'scale=trunc(iw/2)*2:trunc(ih/2)*2'
+    
+    def _video_args(self, fps):
+        """各块的视频滤镜与编码参数（固定帧率，块拼接后时间戳连续）"""
+        video_filter = f"fps={fps},{self._scale_filter()}"
+        if self.format == 'GIF':
+            return ['-filter_complex', f'[0:v]{video_filter}[x];[x][1:v]paletteuse=dither=bayer:bayer_scale=5']
+        if self.format == 'WebM':
+            codec = ['-c:v', 'libvpx-vp9', '-crf', '36', '-b:v', '0', '-row-mt', '1',
+                     '-deadline', 'good', '-cpu-used', '5']
+        else:
+            codec = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23']
+        return ['-vf', video_filter] + codec + ['-pix_fmt', 'yuv420p']
+    
+    def run(self, baseline=False):
+        """执行导出并返回结果；baseline 为真时再用单个进程完整导出一次，报告实测加速比"""
+        import shutil
+        import tempfile
+        from concurrent.futures import wait, FIRST_EXCEPTION
+        info = probe_media_info(self.source)
+        if not info or not info['duration'] or not info['video_codec']:
+            raise RuntimeError(f"无法读取视频信息: {self.source}")
+        duration = info['duration']
+        fps = self.GIF_FPS if self.format == 'GIF' else (info['fps'] or 30)
+        started = time.perf_counter()
+        work_dir = tempfile.mkdtemp(prefix='export_', dir=os.path.dirname(self.output))
+        try:
+            keyframes = self._keyframes()
+            chunks = self.plan_chunks(duration, keyframes, self.chunk_count or self.workers * self.CHUNKS_PER_WORKER,
+                                      self.MIN_CHUNK_SECONDS)
+            export_log.info("导出 %s: %s 块，%s 个进程 × %s 线程", self.format, len(chunks), self.workers, self.threads)
+            stage_seconds = {}
+            
+            palette_path = None
+            if self.format == 'GIF':
+                # 第一遍：从整段视频生成共享调色板；关键帧足够多时只解码关键帧
+                self._report('正在生成调色板...', 0)
+                palette_path = os.path.join(work_dir, 'palette.png')
+                skip = ['-skip_frame', 'nokey'] if len(keyframes) >= 8 else []
+                stage_seconds['palette'] = self._ffmpeg(
+                    skip + ['-i', self.source, '-vf', f'{self._scale_filter()},palettegen=stats_mode=full',
+                            '-frames:v', '1', '-update', '1', '-threads', str(self.threads * self.workers),
+                            palette_path])
+            
+            encoded = [0.0] * len(chunks)
+            progress_lock = threading.Lock()
+            
+            def chunk_progress(index, seconds):
+                with progress_lock:
+                    encoded[index] = min(seconds, chunks[index][1] - chunks[index][0])
+                    done = sum(encoded)
+                self._report(f'正在并行编码 {len(chunks)} 块...', 5 + 85 * done / duration)
+            
+            chunk_extension = self.FORMATS[self.format][1]
+            chunk_paths = [os.path.join(work_dir, f'chunk_{index:04d}{chunk_extension}') for index in range(len(chunks))]
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export_chunk') as pool:
+                audio_future = None
+                audio_path = None
+                if info['has_audio'] and self.format != 'GIF':
+                    # 音频整段编码一次，与视频块并行
+                    audio_path = os.path.join(work_dir, 'audio.webm' if self.format == 'WebM' else 'audio.m4a')
+                    audio_codec = ['-c:a', 'libopus', '-b:a', '96k'] if self.format == 'WebM' else ['-c:a', 'aac', '-b:a', '160k']
+                    audio_future = pool.submit(self._ffmpeg, ['-i', self.source, '-vn', '-sn'] + audio_codec + [audio_path])
+                chunk_futures = []
+                for index, ((start, end), path) in enumerate(zip(chunks, chunk_paths)):
+                    # 输入前寻址：起点是关键帧，解码器不需要从更早的位置解起
+                    args = ['-ss', f'{start:.3f}', '-i', self.source]
+                    if palette_path:
+                        args += ['-i', palette_path]
+                    args += self._video_args(fps) + ['-t', f'{end - start:.3f}', '-an', '-sn',
+                                                     '-threads', str(self.threads), path]
+                    chunk_futures.append(pool.submit(self._ffmpeg, args, lambda seconds, index=index: chunk_progress(index, seconds)))
+                # 任意一块失败时立即结束其余进程
+                done, _ = wait(chunk_futures + ([audio_future] if audio_future else []), return_when=FIRST_EXCEPTION)
+                errors = [future.exception() for future in done if future.exception() is not None]
+                if errors:
+                    self.cancel()
+                    raise errors[0]
+                chunk_seconds = [future.result() for future in chunk_futures]
+                if audio_future:
+                    stage_seconds['audio'] = audio_future.result()
+            
+            # 拼接：concat 分离器直接复制各块，不再重新编码
+            self._report('正在拼接...', 92)
+            list_file = os.path.join(work_dir, 'chunks.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for path in chunk_paths:
+                    f.write(f"file '{path.replace(chr(92), '/')}'\n")
+            stitch = ['-f', 'concat', '-safe', '0', '-i', list_file]
+            if audio_path:
+                stitch += ['-i', audio_path, '-map', '0:v', '-map', '1:a']
+            stitch += ['-c', 'copy']
+            if self.format == 'MP4':
+                stitch += ['-movflags', '+faststart']
+            try:
+                stage_seconds['stitch'] = self._ffmpeg(stitch + [self.output])
+            except RuntimeError:
+                if self.format != 'GIF' or self.cancel_event.is_set():
+                    raise
+                # 部分 FFmpeg 版本不能直接复制 GIF 数据包，改为解码后用同一个调色板重新映射（颜色不变）
+                export_log.warning("GIF 块直接拼接失败，使用调色板重新映射")
+                stage_seconds['stitch'] = self._ffmpeg(
+                    ['-f', 'concat', '-safe', '0', '-i', list_file, '-i', palette_path,
+                     '-filter_complex', '[0:v][1:v]paletteuse=dither=none', self.output])
+        except Exception:
+            # 取消时拼接可能已写了一半，不留下不完整的输出
+            if self.cancel_event.is_set() and os.path.exists(self.output):
                 try:
-                    self.pa.terminate()
-                except Exception as e:
-                    print(f"DEBUG: 终止麦克风PyAudio时出错: {e}")
-                finally:
-                    self.pa = None
-                    self.initial_pa = None
-            
-            # 4. 清理其他资源
-            self.recording_thread = None
-            self.recording_data = []
-            self.microphone_device = None
-            
-            print("DEBUG: 麦克风PyAudio资源已完全释放")
-        except Exception as e:
-            print(f"DEBUG: 关闭麦克风PyAudio资源时发生错误: {e}")
-            # 强制清理
-            self.stream = None
-            self.pa = None
-            self.initial_pa = None
-            self.recording_thread = None
+                    os.remove(self.output)
+                except OSError:
+                    pass
+            raise
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        wall_seconds = time.perf_counter() - started
+        # 各进程耗时之和 / 总耗时 = 平均同时运行的进程数（并发度）。并行时各进程互相争抢核心，单个进程更慢，
+        # 所以它不是相对单进程导出的加速比；实测加速比需要 baseline 对照导出
+        serial_seconds = sum(chunk_seconds) + sum(stage_seconds.values())
+        result = {
+            'output': self.output,
+            'format': self.format,
+            'size': os.path.getsize(self.output),
+            'duration': round(duration, 3),
+            'chunks': len(chunks),
+            'workers': self.workers,
+            'threads_per_worker': self.threads,
+            'wall_seconds': round(wall_seconds, 3),
+            'chunk_seconds': [round(seconds, 3) for seconds in chunk_seconds],
+            'stage_seconds': {name: round(seconds, 3) for name, seconds in stage_seconds.items()},
+            'serial_seconds': round(serial_seconds, 3),
+            'concurrency': round(serial_seconds / wall_seconds, 2) if wall_seconds > 0 else None,
+        }
+        if baseline:
+            # 对照：单个进程（使用全部线程）不分块导出同一文件
+            self._report('正在进行单进程对照导出...', 96)
+            reference_output = os.path.join(os.path.dirname(self.output),
+                                            f'.baseline_{os.getpid()}{self.FORMATS[self.format][0]}')
+            reference = ChunkedExporter(self.source, self.format, output=reference_output, workers=1, chunk_count=1)
+            reference.threads = (os.cpu_count() or 1)
+            try:
+                reference_result = reference.run()
+            finally:
+                if os.path.exists(reference_output):
+                    os.remove(reference_output)
+            result['baseline_seconds'] = reference_result['wall_seconds']
+            result['speedup'] = round(reference_result['wall_seconds'] / wall_seconds, 2) if wall_seconds > 0 else None
+        self._report('导出完成', 100)
+        export_log.info("导出完成: %s，%s 块，耗时 %.1f 秒，平均并发度 %s",
+                        self.output, len(chunks), wall_seconds, result['concurrency'])
+        return result
 
 
 class FileListWindow(QWidget):
     """文件列表窗口 - 独立窗口"""
+    export_progress = pyqtSignal(str, int, int)  # 导出进度，传递消息、当前进度、总进度
+    export_finished = pyqtSignal(object)  # 导出完成，传递结果字典
+    export_failed = pyqtSignal(str)  # 导出失败，传递错误信息
+    
     def __init__(self, parent=None):
         super().__init__(None)  # 设置为None，使其成为独立窗口，不依赖父窗口
         self.setWindowTitle('文件列表')
-        self.setFixedSize(800, 600)
+        self.setFixedSize(1000, 600)
         # 移除 WindowStaysOnTopHint，使其作为普通独立窗口
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Window)
         self.setAttribute(Qt.WA_TranslucentBackground)
@@ -5142,6 +9751,34 @@ class FileListWindow(QWidget):
         self.dragging = False
         self.drag_position = QPoint()
         
+        # 文件库索引和表格模型（行数据按需从索引读取）
+        self.library_index = get_recording_library_index()
+        self.library_model = RecordingLibraryModel(
+            self.library_index, self.recordings_dir, self.format_file_size,
+            probe_pool=get_media_probe_pool(), thumbnail_service=get_thumbnail_service(), parent=self
+        )
+        self.library_loaded = False
+        
+        # 目录扫描在后台线程中进行；扫描未返回前再次请求只记一次，返回后补扫
+        self.library_scanner = get_library_scanner()
+        self.library_scanner.scan_finished.connect(self.on_directory_scanned, Qt.QueuedConnection)
+        self.directory_scan_pending = False
+        self.directory_rescan_needed = False
+        
+        # 监听录制目录变化，防抖后增量同步索引
+        self.directory_watcher = QFileSystemWatcher(self)
+        self.directory_watcher.directoryChanged.connect(self.on_directory_changed)
+        self.directory_sync_timer = QTimer(self)
+        self.directory_sync_timer.setSingleShot(True)
+        self.directory_sync_timer.setInterval(300)
+        self.directory_sync_timer.timeout.connect(self.load_file_list)
+        
+        # GIF/WebM/MP4 导出：在后台线程中并行分块编码，进度通过信号回到主线程
+        self.exporter = None
+        self.export_progress.connect(self.on_export_progress)
+        self.export_finished.connect(self.on_export_finished)
+        self.export_failed.connect(self.on_export_failed)
+        
         self.init_ui()
         self.load_file_list()
     
@@ -5265,14 +9902,17 @@ class FileListWindow(QWidget):
         layout.setContentsMargins(16, 16, 16, 16)
         layout.setSpacing(12)
         
-        # 创建表格
-        self.file_table = QTableWidget()
-        self.file_table.setColumnCount(3)
-        self.file_table.setHorizontalHeaderLabels(['文件名', '大小', '创建时间'])
+        # 创建表格（数据来自文件库模型）
+        self.file_table = QTableView()
+        self.file_table.setModel(self.library_model)
+        self.file_table.setSortingEnabled(True)
+        self.file_table.horizontalHeader().setSortIndicator(
+            self.library_model.sort_column, Qt.DescendingOrder
+        )
         
         # 设置表格样式 - 优化可见性
         self.file_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #1a1a21;
                 border: 1px solid #374151;
                 border-radius: 8px;
@@ -5283,19 +9923,19 @@ class FileListWindow(QWidget):
                 selection-background-color: #2d2d38;
                 selection-color: #FFFFFF;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border: none;
                 background-color: #1a1a21;
             }
-            QTableWidget::item:alternate {
+            QTableView::item:alternate {
                 background-color: #13131a;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3B82F6;
                 color: #FFFFFF;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #2d2d38;
             }
             QHeaderView::section {
@@ -5314,6 +9954,10 @@ class FileListWindow(QWidget):
         header.setSectionResizeMode(0, QHeaderView.Stretch)  # 文件名列自动拉伸
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)  # 大小列适应内容
         header.setSectionResizeMode(2, QHeaderView.ResizeToContents)  # 时间列适应内容
+        # 媒体信息列使用固定宽度：适应内容会读取所有行，从而对不可见的文件也发起探测
+        for column, width in zip(RecordingLibraryModel.MEDIA_COLUMNS, (70, 130, 110, 80)):
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+            self.file_table.setColumnWidth(column, width)
         
         # 设置表格属性
         self.file_table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -5322,9 +9966,17 @@ class FileListWindow(QWidget):
         self.file_table.verticalHeader().setVisible(False)
         self.file_table.setAlternatingRowColors(True)  # 启用交替行颜色，提高可读性
         self.file_table.setShowGrid(False)  # 隐藏网格线，更美观
-        self.file_table.verticalHeader().setDefaultSectionSize(35)  # 设置默认行高
+        self.file_table.verticalHeader().setDefaultSectionSize(44)  # 设置默认行高（容纳封面图标）
+        self.file_table.setIconSize(QSize(ThumbnailService.ICON_WIDTH, ThumbnailService.ICON_HEIGHT))
         self.file_table.setDragEnabled(True)  # 启用拖动选择
         
+        # 悬停在文件名列上时，按鼠标横向位置显示预览条中的对应帧
+        self.file_table.setMouseTracking(True)
+        self.file_table.viewport().installEventFilter(self)
+        self.scrub_preview = QLabel(self, Qt.ToolTip | Qt.FramelessWindowHint)
+        self.scrub_preview.setStyleSheet("background-color: #000000; border: 1px solid #4B5563;")
+        self.scrub_preview.hide()
+        
         layout.addWidget(self.file_table)
         
         return container
@@ -5431,6 +10083,30 @@ class FileListWindow(QWidget):
         self.delete_button.clicked.connect(self.delete_selected_files)
         self.delete_button.setEnabled(False)
         
+        # 导出按钮（GIF/WebM/MP4）
+        self.export_button = QPushButton('导出')
+        self.export_button.setFixedSize(90, 36)
+        self.export_button.setStyleSheet("""
+            QPushButton {
+                background-color: #2d2d38;
+                color: #FFFFFF;
+                border: 1px solid #4B5563;
+                border-radius: 6px;
+                font-family: 'Microsoft YaHei';
+                font-size: 13px;
+            }
+            QPushButton:hover {
+                background-color: #374151;
+                border: 1px solid #ff3a3a;
+            }
+            QPushButton:disabled {
+                background-color: #374151;
+                color: #9CA3AF;
+            }
+        """)
+        self.export_button.clicked.connect(self.show_export_menu)
+        self.export_button.setEnabled(False)
+        
         # 打开按钮
         self.open_button = QPushButton('打开')
         self.open_button.setFixedSize(80, 36)
@@ -5454,6 +10130,7 @@ class FileListWindow(QWidget):
         self.open_button.clicked.connect(self.open_selected_file)
         self.open_button.setEnabled(False)
         
+        right_layout.addWidget(self.export_button)
         right_layout.addWidget(self.delete_button)
         right_layout.addWidget(self.open_button)
         
@@ -5462,7 +10139,7 @@ class FileListWindow(QWidget):
         layout.addLayout(right_layout)
         
         # 连接表格选择事件
-        self.file_table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.file_table.selectionModel().selectionChanged.connect(self.on_selection_changed)
         
         return bottom_bar
     
@@ -5493,9 +10170,7 @@ class FileListWindow(QWidget):
         return default_dir
     
     def load_file_list(self):
-        """加载文件列表"""
-        self.file_table.setRowCount(0)
-        
+        """加载文件列表 - 扫描目录并增量同步文件库索引"""
         # 如果目录不存在，自动创建
         if not os.path.exists(self.recordings_dir):
             try:
@@ -5505,43 +10180,84 @@ class FileListWindow(QWidget):
                 print(f"DEBUG: 创建录制目录失败: {e}")
             return
         
-        # 获取所有文件
-        files = []
-        for filename in os.listdir(self.recordings_dir):
-            filepath = os.path.join(self.recordings_dir, filename)
-            if os.path.isfile(filepath):
-                # 只显示视频文件
-                if filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')):
-                    files.append(filepath)
+        # 确保目录处于监听中（目录被删除重建后监听会失效）
+        if self.recordings_dir not in self.directory_watcher.directories():
+            self.directory_watcher.addPath(self.recordings_dir)
         
-        # 按创建时间排序（最新的在前）
-        files.sort(key=lambda x: os.path.getctime(x), reverse=True)
+        # 扫描结果是相对当时的索引计算的，上一次结果写入索引前不能开始下一次扫描
+        if self.directory_scan_pending:
+            self.directory_rescan_needed = True
+            return
+        self.directory_scan_pending = True
+        self.library_scanner.request(self.recordings_dir)
+    
+    def on_directory_scanned(self, directory, added, removed, changed):
+        """后台扫描完成（在主线程中执行）- 把差异增量写入模型"""
+        if not self.directory_scan_pending:
+            return  # 其他文件列表窗口请求的扫描
+        self.directory_scan_pending = False
+        if RecordingLibraryIndex.normalize_directory(directory) != \
+                RecordingLibraryIndex.normalize_directory(self.recordings_dir):
+            # 扫描期间切换了目录，结果作废
+            self.directory_rescan_needed = True
+        else:
+            if not self.library_loaded:
+                # 首次打开：批量写入索引后一次性重置模型
+                self.library_index.apply_diff(added, removed, changed)
+                self.library_model.reload()
+                self.library_loaded = True
+            elif added or removed or changed:
+                self.library_model.apply_changes(added, removed, changed)
+            library_log.info("文件列表已同步: 新增 %s, 删除 %s, 变化 %s, 共 %s 个文件",
+                             len(added), len(removed), len(changed), self.library_model.total_rows)
+        
+        if self.directory_rescan_needed:
+            self.directory_rescan_needed = False
+            self.load_file_list()
+    
+    def on_directory_changed(self, path):
+        """录制目录变化 - 防抖后再同步，避免录制写入时频繁扫描"""
+        self.directory_sync_timer.start()
+    
+    def eventFilter(self, obj, event):
+        """表格视口事件 - 实现悬停预览"""
+        if hasattr(self, 'file_table') and obj is self.file_table.viewport():
+            if event.type() == QEvent.MouseMove:
+                self.update_scrub_preview(event.pos())
+            elif event.type() in (QEvent.Leave, QEvent.MouseButtonPress, QEvent.Wheel):
+                self.scrub_preview.hide()
+        return super().eventFilter(obj, event)
+    
+    def update_scrub_preview(self, pos):
+        """根据鼠标在文件名单元格中的横向位置，显示预览条中对应的帧"""
+        index = self.file_table.indexAt(pos)
+        if not index.isValid() or index.column() != 0:
+            self.scrub_preview.hide()
+            return
+        sprite = self.library_model.sprite_at(index.row())
+        if sprite is None:
+            self.scrub_preview.hide()
+            return
         
-        # 填充表格
-        for filepath in files:
-            filename = os.path.basename(filepath)
-            file_size = os.path.getsize(filepath)
-            create_time = datetime.fromtimestamp(os.path.getctime(filepath))
-            
-            row = self.file_table.rowCount()
-            self.file_table.insertRow(row)
-            
-            # 文件名
-            name_item = QTableWidgetItem(filename)
-            self.file_table.setItem(row, 0, name_item)
-            
-            # 文件大小
-            size_str = self.format_file_size(file_size)
-            size_item = QTableWidgetItem(size_str)
-            self.file_table.setItem(row, 1, size_item)
-            
-            # 创建时间
-            time_str = create_time.strftime('%Y-%m-%d %H:%M:%S')
-            time_item = QTableWidgetItem(time_str)
-            self.file_table.setItem(row, 2, time_item)
-            
-            # 保存文件路径到item的data中
-            name_item.setData(Qt.UserRole, filepath)
+        cell = self.file_table.visualRect(index)
+        frames = ThumbnailCache.SPRITE_FRAMES
+        fraction = (pos.x() - cell.left()) / max(1, cell.width())
+        frame = min(frames - 1, max(0, int(fraction * frames)))
+        frame_width = sprite.width() // frames
+        self.scrub_preview.setPixmap(sprite.copy(frame * frame_width, 0, frame_width, sprite.height()))
+        self.scrub_preview.adjustSize()
+        
+        global_pos = self.file_table.viewport().mapToGlobal(QPoint(pos.x() + 16, cell.bottom() + 4))
+        self.scrub_preview.move(global_pos)
+        if not self.scrub_preview.isVisible():
+            self.scrub_preview.show()
+    
+    def get_selected_rows(self):
+        """获取选中的行号"""
+        selection_model = self.file_table.selectionModel()
+        if selection_model is None:
+            return []
+        return sorted(index.row() for index in selection_model.selectedRows())
     
     def format_file_size(self, size_bytes):
         """格式化文件大小"""
@@ -5553,13 +10269,12 @@ class FileListWindow(QWidget):
     
     def on_selection_changed(self):
         """选择变化时的处理 - 支持多选"""
-        selected_rows = set()
-        for item in self.file_table.selectedItems():
-            selected_rows.add(item.row())
+        selected_rows = self.get_selected_rows()
         
         has_selection = len(selected_rows) > 0
         self.open_button.setEnabled(has_selection)
         self.delete_button.setEnabled(has_selection)
+        self.export_button.setEnabled(len(selected_rows) == 1 or self.exporter is not None)
         
         # 更新按钮文本，显示选中数量
         if has_selection:
@@ -5573,24 +10288,18 @@ class FileListWindow(QWidget):
     
     def open_selected_file(self):
         """打开选中的文件 - 支持多选"""
-        selected_rows = set()
-        for item in self.file_table.selectedItems():
-            selected_rows.add(item.row())
+        selected_rows = self.get_selected_rows()
         
         if selected_rows:
             # 打开所有选中的文件
             for row in selected_rows:
-                name_item = self.file_table.item(row, 0)
-                if name_item:
-                    filepath = name_item.data(Qt.UserRole)
-                    if filepath:
-                        self.open_file(filepath)
+                filepath = self.library_model.path_at(row)
+                if filepath:
+                    self.open_file(filepath)
     
     def delete_selected_files(self):
         """批量删除选中的文件"""
-        selected_rows = set()
-        for item in self.file_table.selectedItems():
-            selected_rows.add(item.row())
+        selected_rows = self.get_selected_rows()
         
         if not selected_rows:
             return
@@ -5599,12 +10308,10 @@ class FileListWindow(QWidget):
         filepaths = []
         filenames = []
         for row in selected_rows:
-            name_item = self.file_table.item(row, 0)
-            if name_item:
-                filepath = name_item.data(Qt.UserRole)
-                if filepath and os.path.exists(filepath):
-                    filepaths.append(filepath)
-                    filenames.append(os.path.basename(filepath))
+            filepath = self.library_model.path_at(row)
+            if filepath and os.path.exists(filepath):
+                filepaths.append(filepath)
+                filenames.append(os.path.basename(filepath))
         
         if not filepaths:
             return
@@ -5648,6 +10355,106 @@ class FileListWindow(QWidget):
             # 刷新列表
             self.load_file_list()
     
+    def show_export_menu(self):
+        """显示导出格式菜单（导出进行中时只有取消导出）"""
+        menu = RoundedMenu(self)
+        menu.setStyleSheet("""
+            QMenu {
+                background-color: transparent;
+                border: none;
+                color: #FFFFFF;
+                padding: 4px;
+            }
+            QMenu::item {
+                padding: 8px 24px 8px 12px;
+                border-radius: 4px;
+                font-family: 'Microsoft YaHei';
+                font-size: 13px;
+            }
+            QMenu::item:selected {
+                background-color: #374151;
+                color: #FFFFFF;
+            }
+        """)
+        if self.exporter is not None:
+            action = QAction('取消导出', self)
+            action.triggered.connect(self.cancel_export)
+            menu.addAction(action)
+        else:
+            for image_format, label in (('GIF', '导出为 GIF'), ('WebM', '导出为 WebM'), ('MP4', '导出为 MP4')):
+                action = QAction(label, self)
+                action.triggered.connect(lambda checked=False, image_format=image_format: self.start_export(image_format))
+                menu.addAction(action)
+        menu.exec_(self.export_button.mapToGlobal(QPoint(0, -menu.sizeHint().height())))
+    
+    def start_export(self, image_format):
+        """在后台线程中导出选中的文件"""
+        selected_rows = self.get_selected_rows()
+        if len(selected_rows) != 1 or self.exporter is not None:
+            return
+        filepath = self.library_model.path_at(selected_rows[0])
+        if not filepath or not os.path.exists(filepath):
+            return
+        try:
+            exporter = ChunkedExporter(filepath, image_format, on_progress=self.export_progress.emit)
+        except Exception as e:
+            CustomMessageBox.show_message(self, '导出失败', str(e), 'warning')
+            return
+        self.exporter = exporter
+        self.export_button.setEnabled(True)  # 导出中点击可取消
+        self.export_button.setText('导出 0%')
+        
+        def run_export():
+            try:
+                self.export_finished.emit(exporter.run())
+            except Exception as e:
+                export_log.exception("导出失败: %s", e)
+                self.export_failed.emit(str(e))
+        
+        threading.Thread(target=run_export, name='chunked_export', daemon=True).start()
+    
+    def cancel_export(self):
+        """取消正在进行的导出（结果通过导出失败回调返回）"""
+        if self.exporter is not None:
+            self.exporter.cancel()
+            self.export_button.setText('正在取消...')
+    
+    def on_export_progress(self, message, current, total):
+        """导出进度回调（在主线程中执行）"""
+        if self.exporter is None or self.exporter.cancel_event.is_set():
+            return
+        percent = int(current / total * 100) if total > 0 else 0
+        self.export_button.setText(f'导出 {percent}%')
+        self.export_button.setToolTip(message)
+    
+    def _reset_export_button(self):
+        self.exporter = None
+        self.export_button.setText('导出')
+        self.export_button.setToolTip('')
+        self.on_selection_changed()
+    
+    def on_export_finished(self, result):
+        """导出完成回调（在主线程中执行）"""
+        self._reset_export_button()
+        message = (f"已导出：{os.path.basename(result['output'])}（{self.format_file_size(result['size'])}）\n\n"
+                   f"{result['chunks']} 块 / {result['workers']} 个进程并行，耗时 {result['wall_seconds']:.1f} 秒\n"
+                   f"平均并发度 {result['concurrency']}（平均同时运行的编码进程数）")
+        CustomMessageBox.show_message(self, '导出完成', message, 'information')
+        self.load_file_list()
+    
+    def on_export_failed(self, error_msg):
+        """导出失败回调（在主线程中执行）"""
+        cancelled = self.exporter is not None and self.exporter.cancel_event.is_set()
+        self._reset_export_button()
+        if not cancelled:
+            CustomMessageBox.show_message(self, '导出失败', error_msg, 'warning')
+    
+    def closeEvent(self, event):
+        """窗口关闭事件 - 取消正在进行的导出（再次打开文件列表会创建新窗口）"""
+        if self.exporter is not None:
+            self.exporter.cancel()
+        event.accept()
+    
     def open_file(self, filepath):
         """打开文件"""
         if os.path.exists(filepath):
@@ -5682,14 +10489,8 @@ class FileListWindow(QWidget):
             CustomMessageBox.show_message(self, '提示', '录制文件夹不存在', 'information')
             return
         
-        # 获取所有文件
-        files = []
-        for filename in os.listdir(self.recordings_dir):
-            filepath = os.path.join(self.recordings_dir, filename)
-            if os.path.isfile(filepath):
-                # 只统计视频文件
-                if filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')):
-                    files.append(filepath)
+        # 获取所有文件（索引由目录监听在后台保持同步，这里不再同步扫描目录）
+        files = [path for path in self.library_index.all_paths(self.recordings_dir) if os.path.isfile(path)]
         
         if not files:
             CustomMessageBox.show_message(self, '提示', '文件夹中没有可删除的文件', 'information')
@@ -6186,6 +10987,117 @@ class CustomMessageBox(QDialog):
         msg = CustomMessageBox(title, message, 'question', parent)
         msg.exec_()
         return msg.result == True
+
+
+class ScheduleDialog(CustomMessageBox):
+    """定时录制窗口：开始时间与自动停止条件（只对下一次录制生效）"""
+    # 最长录制时长选项：(秒数, 显示文本)，0 表示不限制
+    DURATION_OPTIONS = [(0, '不限制'), (300, '5 分钟'), (600, '10 分钟'), (1800, '30 分钟'), (3600, '1 小时'),
+                        (7200, '2 小时'), (14400, '4 小时')]
+    # 文件大小上限选项：(字节数, 显示文本)，0 表示不限制
+    SIZE_OPTIONS = [(0, '不限制'), (500 * 1024 ** 2, '500 MB'), (1024 ** 3, '1 GB'), (2 * 1024 ** 3, '2 GB'),
+                    (4 * 1024 ** 3, '4 GB'), (8 * 1024 ** 3, '8 GB')]
+    
+    def __init__(self, schedule=None, window_selected=False, parent=None):
+        super().__init__('定时录制', '', 'question', parent)
+        self.setFixedSize(420, 360)
+        self.schedule = None  # 点击确定后的计划
+        schedule = schedule or {}
+        if schedule.get('start_at'):
+            self.start_edit.setText(datetime.fromtimestamp(schedule['start_at']).strftime('%Y-%m-%d %H:%M:%S'))
+        self.duration_combo.setCurrentIndex(max(0, self.duration_combo.findData(schedule.get('max_duration') or 0)))
+        self.size_combo.setCurrentIndex(max(0, self.size_combo.findData(schedule.get('max_bytes') or 0)))
+        self.window_check.setChecked(bool(schedule.get('stop_with_window')) and window_selected)
+        self.window_check.setEnabled(window_selected)
+        if not window_selected:
+            self.window_check.setToolTip('需要先选择要录制的窗口')
+    
+    def create_content_area(self):
+        """创建内容区域"""
+        container = QWidget()
+        container.setStyleSheet("background-color: #25252d; border-top-left-radius: 0px; border-top-right-radius: 0px; border-bottom-left-radius: 12px; border-bottom-right-radius: 12px;")
+        
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(30, 24, 30, 24)
+        layout.setSpacing(16)
+        layout.setAlignment(Qt.AlignTop)
+        
+        label_style = "color: #FFFFFF; font-family: 'Microsoft YaHei'; font-size: 13px;"
+        self.start_edit = QLineEdit()
+        self.start_edit.setPlaceholderText('留空立即开始，或 HH:MM / YYYY-MM-DD HH:MM')
+        self.start_edit.setStyleSheet(
+            "background-color: #2d2d38; border: 1px solid #4B5563; border-radius: 6px; color: #FFFFFF; "
+            "padding: 6px; font-family: 'Microsoft YaHei'; font-size: 13px;"
+        )
+        combo_style = (
+            "QComboBox { background-color: #2d2d38; border: 1px solid #4B5563; border-radius: 6px; color: #FFFFFF; "
+            "padding: 6px; font-family: 'Microsoft YaHei'; font-size: 13px; } "
+            "QComboBox QAbstractItemView { background-color: #2d2d38; color: #FFFFFF; selection-background-color: #374151; }"
+        )
+        self.duration_combo = QComboBox()
+        self.size_combo = QComboBox()
+        for combo, options in ((self.duration_combo, self.DURATION_OPTIONS), (self.size_combo, self.SIZE_OPTIONS)):
+            for value, text in options:
+                combo.addItem(text, value)
+            combo.setStyleSheet(combo_style)
+        self.window_check = QCheckBox('所选窗口关闭时停止录制')
+        self.window_check.setStyleSheet(
+            "QCheckBox { color: #FFFFFF; font-family: 'Microsoft YaHei'; font-size: 13px; } "
+            "QCheckBox::indicator { width: 18px; height: 18px; border: 2px solid #4B5563; border-radius: 4px; "
+            "background-color: #2d2d38; } "
+            "QCheckBox::indicator:checked { background-color: #3B82F6; border-color: #3B82F6; }"
+        )
+        
+        form = QFormLayout()
+        form.setSpacing(12)
+        for text, widget in (('开始时间：', self.start_edit), ('最长时长：', self.duration_combo),
+                             ('文件大小上限：', self.size_combo)):
+            label = QLabel(text)
+            label.setStyleSheet(label_style)
+            form.addRow(label, widget)
+        
+        # 开始时间格式错误时在这里提示
+        self.error_label = QLabel('')
+        self.error_label.setStyleSheet("color: #F87171; font-family: 'Microsoft YaHei'; font-size: 12px;")
+        
+        button_layout = QHBoxLayout()
+        button_layout.setAlignment(Qt.AlignCenter)
+        button_layout.setSpacing(12)
+        for text, color, hover, handler in (('确定', '#60A5FA', '#3B82F6', self.accept_schedule),
+                                             ('取消', '#6B7280', '#4B5563', lambda: self.accept_result(False))):
+            button = QPushButton(text)
+            button.setFixedSize(80, 36)
+            button.setCursor(Qt.PointingHandCursor)
+            button.setStyleSheet(
+                f"QPushButton {{ background-color: {color}; color: #FFFFFF; border: 1px solid {hover}; "
+                "border-radius: 6px; font-family: 'Microsoft YaHei'; font-size: 13px; font-weight: 600; "
+                "padding: 6px 16px; } "
+                f"QPushButton:hover {{ background-color: {hover}; }}"
+            )
+            button.clicked.connect(handler)
+            button_layout.addWidget(button)
+        
+        layout.addLayout(form)
+        layout.addWidget(self.window_check)
+        layout.addWidget(self.error_label)
+        layout.addLayout(button_layout)
+        return container
+    
+    def accept_schedule(self):
+        """校验开始时间，保存计划并关闭"""
+        text = self.start_edit.text().strip()
+        try:
+            start_at = parse_start_time_argument(text) if text else None
+        except ValueError:
+            self.error_label.setText('开始时间格式应为 HH:MM 或 YYYY-MM-DD HH:MM')
+            return
+        self.schedule = {
+            'start_at': start_at,
+            'max_duration': self.duration_combo.currentData() or None,
+            'max_bytes': self.size_combo.currentData() or None,
+            'stop_with_window': self.window_check.isEnabled() and self.window_check.isChecked(),
+        }
+        self.accept_result(True)
         
 
 
@@ -6540,8 +11452,249 @@ class SplashScreen(QWidget):
         event.accept()
 
 
+class ConfigStore:
+    """配置中心 - 启动时读取一次 config.json，之后读写都在内存中完成
+
+    写入经过防抖后在后台线程中原子地落盘（先写临时文件再 os.replace），
+    订阅者在配置变化时收到 {键: 新值}。
+    """
+    # 键 -> (类型, 默认值, 允许的取值；None 表示不限制)
+    SCHEMA = {
+        'output_path': (str, '', None),
+        'video_format': (str, 'MP4', ('MP4', 'AVI', 'MOV', 'MKV', 'FLV', 'WMV')),
+        'fps': (int, 30, (20, 25, 30, 50, 60)),
+        'quality': (str, '高质量', ('原画质', '高质量', '中等质量', '低质量')),
+        'audio_quality': (str, '高音质', ('无损音质', '高音质', '中等音质', '低音质')),
+        'show_cursor': (bool, True, None),
+        'record_mouse_region': (bool, False, None),
+        'hide_main_window': (bool, False, None),
+        'show_border': (bool, True, None),
+        'allow_click_region': (bool, False, None),
+        'hotkey_start': (str, 'F9', None),
+        'hotkey_stop': (str, 'F10', None),
+        'hotkey_pause': (str, 'F11', None),
+        'hotkey_toggle': (str, 'Ctrl+F12', None),
+        'hotkey_replay': (str, 'Ctrl+F9', None),
+        'hotkey_screenshot': (str, 'Ctrl+F7', None),
+        'hotkey_burst': (str, 'Ctrl+F8', None),
+        'screenshot_format': (str, 'PNG', ('PNG', 'JPEG', 'WebP')),
+        'screenshot_quality': (int, 90, None),  # JPEG/WebP 质量（0-100）
+        'burst_count': (int, 10, (3, 5, 10, 20, 50)),  # 连拍张数
+        'burst_interval': (float, 0.5, (0.1, 0.2, 0.5, 1.0, 2.0, 5.0)),  # 连拍间隔（秒）
+        'replay_enabled': (bool, False, None),  # 后台即时回放缓冲
+        'replay_seconds': (int, 60, (30, 60, 120, 300, 600)),  # 保存回放的时长（秒）
+        'replay_max_mb': (int, 1024, None),  # 回放缓冲占用磁盘的上限（MB）
+        'vfr_enabled': (bool, False, None),  # 可变帧率：画面静止时不重复编码
+        'vfr_max_interval': (float, 2.0, None),  # 可变帧率下最长多少秒至少输出一帧
+        'max_output_height': (int, 0, (0, 2160, 1440, 1080, 720)),  # 输出分辨率上限，0 表示原始分辨率
+        'scale_algorithm': (str, 'fast_bilinear', ('fast_bilinear', 'bilinear', 'bicubic', 'area', 'lanczos')),
+        'capture_monitor': (str, 'primary', None),  # 全屏录制：primary / all / each / 显示器序号
+        'proxy_height': (int, 0, (0, 360, 480, 540, 720)),  # 代理文件高度，0 表示不生成
+        'proxy_bitrate': (int, 800, None),  # 代理文件视频码率（kbps）
+        'split_minutes': (int, 0, (0, 5, 10, 15, 30, 60, 120)),  # 自动分段：每 N 分钟一个文件，0 表示不按时长分段
+        'split_size_gb': (int, 0, (0, 1, 2, 4, 8)),  # 自动分段：每个文件不超过 N GB，0 表示不按大小分段
+        'audio_only_format': (str, '', ('', 'AAC', 'Opus', 'FLAC')),  # 纯音频录制格式，空表示录制画面
+        'timelapse_interval': (float, 0.0, (0.0, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)),  # 延时摄影：每 N 秒采集一帧，0 表示关闭
+        'stream_enabled': (bool, False, None),  # 录制时同时推流
+        'stream_url': (str, '', None),  # rtmp:// 或 srt:// 地址，或 HLS 输出目录 / .m3u8 文件
+        'pip_corner': (str, 'top_right', ('top_left', 'top_right', 'bottom_left', 'bottom_right')),  # 摄像头画中画位置
+        'pip_width': (int, 320, (160, 240, 320, 480, 640)),  # 画中画宽度（像素）
+        'pip_margin': (int, 10, (0, 10, 20, 40)),  # 画中画距画面边缘的距离（像素）
+        'pip_shape': (str, 'rect', ('rect', 'rounded', 'circle')),  # 画中画形状：矩形、圆角、圆形
+        'mouse_region_width': (int, 1280, None),  # 动态鼠标区域的视口尺寸
+        'mouse_region_height': (int, 720, None),
+        'telemetry_interval': (float, 1.0, None),  # 资源采样间隔（秒）
+    }
+    WRITE_DELAY = 0.5  # 防抖时间（秒）
+
+    def __init__(self, config_file=None):
+        if config_file is None:
+            config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
+            config_file = os.path.join(config_dir, 'config.json')
+        self.config_file = config_file
+        self.lock = threading.RLock()
+        self.subscribers = []  # [(回调, 关注的键集合或None)]
+        self.write_timer = None
+        self.file_exists = False
+        self.values = self._load()
+
+    @classmethod
+    def defaults(cls):
+        """默认配置"""
+        return {key: spec[1] for key, spec in cls.SCHEMA.items()}
+
+    @classmethod
+    def validate(cls, key, value):
+        """按模式校验单个配置项，非法时返回默认值"""
+        spec = cls.SCHEMA.get(key)
+        if spec is None:
+            return value  # 未知键原样保留，兼容新版本写入的配置
+        value_type, default, choices = spec
+        if value_type is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if value_type is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, value_type) or (value_type is int and isinstance(value, bool)):
+            config_log.warning("配置项 %s 类型无效: %r，使用默认值 %r", key, value, default)
+            return default
+        if key == 'hotkey_toggle' and value == 'F12':
+            # 兼容旧配置：F12 自动升级为 Ctrl+F12
+            return 'Ctrl+F12'
+        if choices is not None and value not in choices:
+            config_log.warning("配置项 %s 取值无效: %r，使用默认值 %r", key, value, default)
+            return default
+        return value
+
+    def _load(self):
+        """读取并校验配置文件（只在启动时执行一次）"""
+        values = self.defaults()
+        if not os.path.exists(self.config_file):
+            return values
+        self.file_exists = True
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError('配置文件根节点不是对象')
+            for key, value in data.items():
+                values[key] = self.validate(key, value)
+        except Exception as e:
+            config_log.warning("读取config.json失败，使用默认配置: %s", e)
+        return values
+
+    def get(self, key, default=None):
+        """读取单个配置项"""
+        with self.lock:
+            return self.values.get(key, default)
+
+    def snapshot(self):
+        """返回当前配置的只读快照（录制线程使用，不受之后的修改影响）"""
+        from types import MappingProxyType
+        with self.lock:
+            return MappingProxyType(dict(self.values))
+
+    def update(self, changes):
+        """批量修改配置，通知订阅者并安排防抖写入"""
+        changed = {}
+        with self.lock:
+            for key, value in changes.items():
+                value = self.validate(key, value)
+                if self.values.get(key) != value:
+                    self.values[key] = value
+                    changed[key] = value
+            if changed or not self.file_exists:
+                self._schedule_write()
+        if changed:
+            self._notify(changed)
+        return changed
+
+    def set(self, key, value):
+        """修改单个配置项"""
+        return self.update({key: value})
+
+    def subscribe(self, callback, keys=None):
+        """订阅配置变化；keys 为 None 时订阅全部键"""
+        with self.lock:
+            self.subscribers.append((callback, set(keys) if keys else None))
+
+    def unsubscribe(self, callback):
+        """取消订阅"""
+        with self.lock:
+            self.subscribers = [(cb, keys) for cb, keys in self.subscribers if cb != callback]
+
+    def _notify(self, changed):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback, keys in subscribers:
+            if keys is not None and not keys.intersection(changed):
+                continue
+            try:
+                callback(changed)
+            except Exception as e:
+                config_log.exception("配置变化回调出错: %s", e)
+
+    def _schedule_write(self):
+        if self.write_timer is not None:
+            self.write_timer.cancel()
+        self.write_timer = threading.Timer(self.WRITE_DELAY, self.flush)
+        self.write_timer.daemon = True
+        self.write_timer.start()
+
+    def flush(self):
+        """立即把配置原子地写入磁盘"""
+        with self.lock:
+            if self.write_timer is not None:
+                self.write_timer.cancel()
+                self.write_timer = None
+            data = dict(self.values)
+            try:
+                os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+                tmp_file = self.config_file + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.config_file)
+                self.file_exists = True
+                return True
+            except Exception as e:
+                config_log.warning("写入config.json失败: %s", e)
+                return False
+
+
+_config_store = None
+
+
+def get_config_store():
+    """获取进程内共享的配置中心"""
+    global _config_store
+    if _config_store is None:
+        _config_store = ConfigStore()
+    return _config_store
+
+
 class SettingsWindow(QWidget):
     """设置窗口"""
+    # 回放时长选项：(秒数, 显示文本)
+    REPLAY_SECONDS_OPTIONS = [(30, '30 秒'), (60, '1 分钟'), (120, '2 分钟'), (300, '5 分钟'), (600, '10 分钟')]
+    # 回放缓冲磁盘上限选项：(MB, 显示文本)
+    REPLAY_MAX_MB_OPTIONS = [(256, '256 MB'), (512, '512 MB'), (1024, '1 GB'), (2048, '2 GB'), (4096, '4 GB')]
+    # 最大输出分辨率选项：(高度上限, 显示文本)，0 表示原始分辨率
+    MAX_OUTPUT_OPTIONS = [(0, '原始分辨率'), (2160, '2160p (4K)'), (1440, '1440p'), (1080, '1080p'), (720, '720p')]
+    # 代理文件选项：(高度, 显示文本)，0 表示不生成
+    PROXY_HEIGHT_OPTIONS = [(0, '不生成'), (360, '360p'), (480, '480p'), (540, '540p'), (720, '720p')]
+    # 自动分段选项：(取值, 显示文本)，0 表示不分段
+    SPLIT_MINUTES_OPTIONS = [(0, '不按时长'), (5, '每 5 分钟'), (10, '每 10 分钟'), (15, '每 15 分钟'),
+                             (30, '每 30 分钟'), (60, '每 1 小时'), (120, '每 2 小时')]
+    SPLIT_SIZE_OPTIONS = [(0, '不按大小'), (1, '每 1 GB'), (2, '每 2 GB'), (4, '每 4 GB'), (8, '每 8 GB')]
+    # 纯音频录制选项：(格式, 显示文本)，空表示录制画面
+    AUDIO_ONLY_OPTIONS = [('', '关闭（录制画面）'), ('AAC', 'AAC (.m4a)'), ('Opus', 'Opus (.opus)'),
+                          ('FLAC', 'FLAC (.flac，无损)')]
+    # 延时摄影选项：(采集间隔秒数, 显示文本)，0 表示关闭
+    TIMELAPSE_OPTIONS = [(0.0, '关闭'), (0.5, '每 0.5 秒一帧'), (1.0, '每 1 秒一帧'), (2.0, '每 2 秒一帧'),
+                         (5.0, '每 5 秒一帧'), (10.0, '每 10 秒一帧'), (30.0, '每 30 秒一帧'), (60.0, '每 1 分钟一帧')]
+    # 截图与连拍选项：(取值, 显示文本)
+    SCREENSHOT_FORMAT_OPTIONS = [('PNG', 'PNG（无损）'), ('JPEG', 'JPEG'), ('WebP', 'WebP')]
+    BURST_COUNT_OPTIONS = [(3, '3 张'), (5, '5 张'), (10, '10 张'), (20, '20 张'), (50, '50 张')]
+    BURST_INTERVAL_OPTIONS = [(0.1, '间隔 0.1 秒'), (0.2, '间隔 0.2 秒'), (0.5, '间隔 0.5 秒'), (1.0, '间隔 1 秒'),
+                              (2.0, '间隔 2 秒'), (5.0, '间隔 5 秒')]
+    # 摄像头画中画选项：(取值, 显示文本)
+    PIP_CORNER_OPTIONS = [('top_right', '右上角'), ('top_left', '左上角'), ('bottom_right', '右下角'), ('bottom_left', '左下角')]
+    PIP_WIDTH_OPTIONS = [(160, '160 像素'), (240, '240 像素'), (320, '320 像素'), (480, '480 像素'), (640, '640 像素')]
+    PIP_MARGIN_OPTIONS = [(0, '无边距'), (10, '10 像素'), (20, '20 像素'), (40, '40 像素')]
+    PIP_SHAPE_OPTIONS = [('rect', '矩形'), ('rounded', '圆角'), ('circle', '圆形')]
+    # 动态鼠标区域视口尺寸选项：("宽x高", 显示文本)
+    MOUSE_REGION_OPTIONS = [('1920x1080', '1920×1080'), ('1280x720', '1280×720'), ('960x540', '960×540'),
+                            ('800x600', '800×600')]
+    # 缩放算法选项：(FFmpeg 算法名, 显示文本)
+    SCALE_ALGORITHM_OPTIONS = [
+        ('fast_bilinear', '快速双线性（最省CPU）'),
+        ('bilinear', '双线性'),
+        ('bicubic', '双三次'),
+        ('area', '区域平均'),
+        ('lanczos', 'Lanczos（最清晰）'),
+    ]
+    
     def __init__(self, parent=None):
         super().__init__(None)  # 独立窗口
         self.setWindowTitle('设置')
@@ -6552,14 +11705,9 @@ class SettingsWindow(QWidget):
         # 保存父窗口引用
         self.parent = parent
         
-        # 配置文件路径 - 保存到用户目录而不是程序安装目录
-        config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
-        if not os.path.exists(config_dir):
-            try:
-                os.makedirs(config_dir)
-            except:
-                pass
-        self.config_file = os.path.join(config_dir, 'config.json')
+        # 配置中心（配置文件保存在用户目录而不是程序安装目录）
+        self.config_store = get_config_store()
+        self.config_file = self.config_store.config_file
         
         self.dragging = False
         self.drag_position = QPoint()
@@ -6830,11 +11978,122 @@ class SettingsWindow(QWidget):
         self.audio_quality_combo.addItems(['无损音质', '高音质', '中等音质', '低音质'])
         self.audio_quality_combo.setStyleSheet(self.video_format_combo.styleSheet())
         
+        # 帧率模式：可变帧率在画面静止时跳过重复帧
+        self.frame_rate_mode_combo = QComboBox()
+        self.frame_rate_mode_combo.addItems(['固定帧率', '可变帧率（静止画面不重复编码）'])
+        self.frame_rate_mode_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        
+        # 最大输出分辨率：超过时在采集管线中直接缩小后再编码
+        self.max_output_combo = QComboBox()
+        for height, label in self.MAX_OUTPUT_OPTIONS:
+            self.max_output_combo.addItem(label, height)
+        self.max_output_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        
+        # 缩放算法：fast_bilinear 最省CPU，lanczos 最清晰
+        self.scale_algorithm_combo = QComboBox()
+        for algorithm, label in self.SCALE_ALGORITHM_OPTIONS:
+            self.scale_algorithm_combo.addItem(label, algorithm)
+        self.scale_algorithm_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        
+        # 代理文件：同一次采集额外输出一份低码率小尺寸视频，便于上传审阅
+        self.proxy_height_combo = QComboBox()
+        for height, label in self.PROXY_HEIGHT_OPTIONS:
+            self.proxy_height_combo.addItem(label, height)
+        self.proxy_height_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        
+        # 全屏录制的显示器：主显示器 / 整个虚拟桌面 / 每个显示器分别录制 / 指定显示器
+        self.capture_monitor_combo = QComboBox()
+        self.capture_monitor_combo.addItem('主显示器', 'primary')
+        self.capture_monitor_combo.addItem('全部显示器（整个虚拟桌面）', 'all')
+        self.capture_monitor_combo.addItem('每个显示器分别录制（并行编码）', 'each')
+        for monitor in enumerate_monitors():
+            label = f"显示器 {monitor['index'] + 1}：{monitor['width']}x{monitor['height']}，{monitor['dpi']:g} DPI"
+            if monitor['primary']:
+                label += '（主）'
+            self.capture_monitor_combo.addItem(label, str(monitor['index']))
+        self.capture_monitor_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        
         layout.addRow('视频格式：', self.video_format_combo)
+        layout.addRow('全屏录制显示器：', self.capture_monitor_combo)
         layout.addRow('录制帧率：', self.fps_combo)
+        layout.addRow('帧率模式：', self.frame_rate_mode_combo)
+        layout.addRow('最大输出分辨率：', self.max_output_combo)
+        layout.addRow('缩放算法：', self.scale_algorithm_combo)
+        layout.addRow('代理文件：', self.proxy_height_combo)
+        
+        # 自动分段：长时间录制在关键帧处滚动写入连续的多个文件，每个文件关闭后即可播放
+        self.split_minutes_combo = QComboBox()
+        self.split_size_combo = QComboBox()
+        for combo, options in ((self.split_minutes_combo, self.SPLIT_MINUTES_OPTIONS),
+                               (self.split_size_combo, self.SPLIT_SIZE_OPTIONS)):
+            for value, label in options:
+                combo.addItem(label, value)
+            combo.setStyleSheet(self.video_format_combo.styleSheet())
+        split_layout = QHBoxLayout()
+        split_layout.addWidget(self.split_minutes_combo)
+        split_layout.addWidget(self.split_size_combo)
+        layout.addRow('自动分段：', split_layout)
+        
+        # 延时摄影：低采集帧率、按录制帧率播放，下方显示每录制 1 小时的输出时长与大小估算
+        self.timelapse_combo = QComboBox()
+        for interval, label in self.TIMELAPSE_OPTIONS:
+            self.timelapse_combo.addItem(label, interval)
+        self.timelapse_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        self.timelapse_estimate_label = QLabel()
+        self.timelapse_estimate_label.setStyleSheet("color: #9CA3AF; font-family: 'Microsoft YaHei'; font-size: 12px;")
+        self.timelapse_estimate_label.setWordWrap(True)
+        for combo in (self.timelapse_combo, self.fps_combo, self.quality_combo):
+            combo.currentIndexChanged.connect(self.update_timelapse_estimate)
+        layout.addRow('延时摄影：', self.timelapse_combo)
+        layout.addRow('', self.timelapse_estimate_label)
+        self.update_timelapse_estimate()
+        
+        # 摄像头画中画布局：位置与大小在同一行，边距与形状在同一行
+        self.pip_corner_combo = QComboBox()
+        self.pip_width_combo = QComboBox()
+        self.pip_margin_combo = QComboBox()
+        self.pip_shape_combo = QComboBox()
+        for combo, options in ((self.pip_corner_combo, self.PIP_CORNER_OPTIONS),
+                               (self.pip_width_combo, self.PIP_WIDTH_OPTIONS),
+                               (self.pip_margin_combo, self.PIP_MARGIN_OPTIONS),
+                               (self.pip_shape_combo, self.PIP_SHAPE_OPTIONS)):
+            for value, label in options:
+                combo.addItem(label, value)
+            combo.setStyleSheet(self.video_format_combo.styleSheet())
+        pip_layout = QHBoxLayout()
+        pip_layout.addWidget(self.pip_corner_combo)
+        pip_layout.addWidget(self.pip_width_combo)
+        pip_style_layout = QHBoxLayout()
+        pip_style_layout.addWidget(self.pip_margin_combo)
+        pip_style_layout.addWidget(self.pip_shape_combo)
+        layout.addRow('摄像头画中画：', pip_layout)
+        layout.addRow('画中画样式：', pip_style_layout)
         layout.addRow('清晰度：', self.quality_combo)
         layout.addRow('音频质量：', self.audio_quality_combo)
         
+        # 纯音频录制：只录制系统声音/麦克风，边录边编码写入音频文件，不采集屏幕
+        self.audio_only_combo = QComboBox()
+        for audio_format, label in self.AUDIO_ONLY_OPTIONS:
+            self.audio_only_combo.addItem(label, audio_format)
+        self.audio_only_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        layout.addRow('纯音频录制：', self.audio_only_combo)
+        
+        # 截图与连拍：截取当前录制区域，格式与连拍张数/间隔在同一行
+        self.screenshot_format_combo = QComboBox()
+        self.burst_count_combo = QComboBox()
+        self.burst_interval_combo = QComboBox()
+        for combo, options in ((self.screenshot_format_combo, self.SCREENSHOT_FORMAT_OPTIONS),
+                               (self.burst_count_combo, self.BURST_COUNT_OPTIONS),
+                               (self.burst_interval_combo, self.BURST_INTERVAL_OPTIONS)):
+            for value, label in options:
+                combo.addItem(label, value)
+            combo.setStyleSheet(self.video_format_combo.styleSheet())
+        burst_layout = QHBoxLayout()
+        burst_layout.addWidget(self.burst_count_combo)
+        burst_layout.addWidget(self.burst_interval_combo)
+        layout.addRow('截图格式：', self.screenshot_format_combo)
+        layout.addRow('连拍：', burst_layout)
+        
         group.setLayout(layout)
         return group
     
@@ -6880,8 +12139,17 @@ class SettingsWindow(QWidget):
                 }
             """)
         
+        self.mouse_region_combo = QComboBox()
+        for size, label in self.MOUSE_REGION_OPTIONS:
+            self.mouse_region_combo.addItem(label, size)
+        self.mouse_region_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        self.mouse_region_combo.setToolTip('跟随鼠标指针的视口大小（不超过录制区域）')
+        mouse_region_layout = QFormLayout()
+        mouse_region_layout.addRow('鼠标区域大小：', self.mouse_region_combo)
+        
         layout.addWidget(self.show_cursor_check)
         layout.addWidget(self.record_mouse_region_check)
+        layout.addLayout(mouse_region_layout)
         group.setLayout(layout)
         
         return group
@@ -6908,13 +12176,41 @@ class SettingsWindow(QWidget):
         self.hide_main_window_check = QCheckBox('录制开始时隐藏主窗口')
         self.show_border_check = QCheckBox('显示录制区域边框')
         self.allow_click_region_check = QCheckBox('允许在录制过程中移动录制区域（自定义录制窗口大小时启用）')
+        self.replay_enabled_check = QCheckBox('后台即时回放（按快捷键保存最近一段画面）')
+        self.stream_enabled_check = QCheckBox('录制时同时推流（不重复编码）')
         
-        for checkbox in [self.hide_main_window_check, self.show_border_check, self.allow_click_region_check]:
+        for checkbox in [self.hide_main_window_check, self.show_border_check, self.allow_click_region_check,
+                         self.replay_enabled_check, self.stream_enabled_check]:
             checkbox.setStyleSheet(self.show_cursor_check.styleSheet())
         
+        # 回放时长
+        self.replay_seconds_combo = QComboBox()
+        for seconds, label in self.REPLAY_SECONDS_OPTIONS:
+            self.replay_seconds_combo.addItem(label, seconds)
+        self.replay_seconds_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        # 回放缓冲占用磁盘的上限（超过时丢弃最旧的分段）
+        self.replay_max_mb_combo = QComboBox()
+        for max_mb, label in self.REPLAY_MAX_MB_OPTIONS:
+            self.replay_max_mb_combo.addItem(label, max_mb)
+        self.replay_max_mb_combo.setStyleSheet(self.video_format_combo.styleSheet())
+        replay_layout = QFormLayout()
+        replay_layout.addRow('回放时长：', self.replay_seconds_combo)
+        replay_layout.addRow('回放磁盘上限：', self.replay_max_mb_combo)
+        
+        # 推流地址：RTMP/SRT 服务器，或写入 HLS 直播文件的目录
+        self.stream_url_edit = QLineEdit()
+        self.stream_url_edit.setStyleSheet(self.output_path_edit.styleSheet())
+        self.stream_url_edit.setPlaceholderText('rtmp://服务器/live/密钥、srt://主机:端口 或 HLS 输出目录')
+        stream_layout = QFormLayout()
+        stream_layout.addRow('推流地址：', self.stream_url_edit)
+        
         layout.addWidget(self.hide_main_window_check)
         layout.addWidget(self.show_border_check)
         layout.addWidget(self.allow_click_region_check)
+        layout.addWidget(self.replay_enabled_check)
+        layout.addLayout(replay_layout)
+        layout.addWidget(self.stream_enabled_check)
+        layout.addLayout(stream_layout)
         group.setLayout(layout)
         
         return group
@@ -6942,8 +12238,12 @@ class SettingsWindow(QWidget):
         self.hotkey_stop = QKeySequenceEdit()
         self.hotkey_pause = QKeySequenceEdit()
         self.hotkey_toggle = QKeySequenceEdit()
+        self.hotkey_replay = QKeySequenceEdit()
+        self.hotkey_screenshot = QKeySequenceEdit()
+        self.hotkey_burst = QKeySequenceEdit()
         
-        for edit in [self.hotkey_start, self.hotkey_stop, self.hotkey_pause, self.hotkey_toggle]:
+        for edit in [self.hotkey_start, self.hotkey_stop, self.hotkey_pause, self.hotkey_toggle, self.hotkey_replay,
+                     self.hotkey_screenshot, self.hotkey_burst]:
             edit.setStyleSheet("""
                 QKeySequenceEdit {
                     background-color: #2d2d38;
@@ -6960,6 +12260,9 @@ class SettingsWindow(QWidget):
         layout.addRow('停止录制：', self.hotkey_stop)
         layout.addRow('暂停录制：', self.hotkey_pause)
         layout.addRow('显示/隐藏窗口：', self.hotkey_toggle)
+        layout.addRow('保存即时回放：', self.hotkey_replay)
+        layout.addRow('截图：', self.hotkey_screenshot)
+        layout.addRow('连拍：', self.hotkey_burst)
         
         group.setLayout(layout)
         return group
@@ -7071,100 +12374,153 @@ class SettingsWindow(QWidget):
         
         return default_dir
     
+    def update_timelapse_estimate(self):
+        """按延时摄影间隔、帧率和清晰度显示每录制 1 小时的输出时长与大小估算"""
+        interval = self.timelapse_combo.currentData()
+        if not interval:
+            self.timelapse_estimate_label.setText('')
+            self.timelapse_estimate_label.setVisible(False)
+            return
+        fps = int(self.fps_combo.currentText().replace(' FPS', ''))
+        output_seconds, size_bytes = RecordingSession.timelapse_estimate(
+            interval, fps, self.quality_combo.currentText(), 3600)
+        minutes, seconds = divmod(int(round(output_seconds)), 60)
+        length_text = f'{minutes} 分 {seconds} 秒' if minutes else f'{seconds} 秒'
+        size_text = f'{size_bytes / 1024 ** 3:.1f} GB' if size_bytes >= 1024 ** 3 else f'{size_bytes / 1024 ** 2:.0f} MB'
+        self.timelapse_estimate_label.setText(
+            f'每录制 1 小时输出约 {length_text}（{interval * fps:g} 倍速），约 {size_text}（按 1080p 估算）；'
+            f'延时摄影不录制声音和摄像头')
+        self.timelapse_estimate_label.setVisible(True)
+    
     def load_default_settings(self):
         """加载默认设置"""
         default_dir = self.get_default_save_path()
         self.output_path_edit.setText(default_dir)
         self.video_format_combo.setCurrentText('MP4')
         self.fps_combo.setCurrentText('30 FPS')
+        self.frame_rate_mode_combo.setCurrentIndex(0)
+        self.max_output_combo.setCurrentIndex(0)
+        self.scale_algorithm_combo.setCurrentIndex(0)
+        self.proxy_height_combo.setCurrentIndex(0)
+        self.split_minutes_combo.setCurrentIndex(0)
+        self.split_size_combo.setCurrentIndex(0)
+        self.timelapse_combo.setCurrentIndex(0)
+        self.pip_corner_combo.setCurrentIndex(self.pip_corner_combo.findData('top_right'))
+        self.pip_width_combo.setCurrentIndex(self.pip_width_combo.findData(320))
+        self.pip_margin_combo.setCurrentIndex(self.pip_margin_combo.findData(10))
+        self.pip_shape_combo.setCurrentIndex(self.pip_shape_combo.findData('rect'))
         self.quality_combo.setCurrentText('高质量')
         self.audio_quality_combo.setCurrentText('高音质')  # 默认高音质
+        self.audio_only_combo.setCurrentIndex(0)
+        self.screenshot_format_combo.setCurrentIndex(self.screenshot_format_combo.findData('PNG'))
+        self.burst_count_combo.setCurrentIndex(self.burst_count_combo.findData(10))
+        self.burst_interval_combo.setCurrentIndex(self.burst_interval_combo.findData(0.5))
         self.show_cursor_check.setChecked(True)
         self.record_mouse_region_check.setChecked(False)
+        self.mouse_region_combo.setCurrentIndex(self.mouse_region_combo.findData('1280x720'))
         self.hide_main_window_check.setChecked(False)
         self.show_border_check.setChecked(True)
         self.allow_click_region_check.setChecked(False)
+        self.replay_enabled_check.setChecked(False)
+        self.capture_monitor_combo.setCurrentIndex(0)
+        self.stream_enabled_check.setChecked(False)
+        self.stream_url_edit.setText('')
+        self.replay_seconds_combo.setCurrentIndex(self.replay_seconds_combo.findData(60))
+        self.replay_max_mb_combo.setCurrentIndex(self.replay_max_mb_combo.findData(1024))
         self.hotkey_start.setKeySequence(QKeySequence('F9'))
         self.hotkey_stop.setKeySequence(QKeySequence('F10'))
         self.hotkey_pause.setKeySequence(QKeySequence('F11'))
         self.hotkey_toggle.setKeySequence(QKeySequence('Ctrl+F12'))
+        self.hotkey_replay.setKeySequence(QKeySequence('Ctrl+F9'))
+        self.hotkey_screenshot.setKeySequence(QKeySequence('Ctrl+F7'))
+        self.hotkey_burst.setKeySequence(QKeySequence('Ctrl+F8'))
     
     def load_settings(self):
-        """加载设置"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                
-                # 获取保存的路径，如果没有则使用智能默认路径
-                saved_path = settings.get('output_path', '')
-                if saved_path:
-                    # 检查保存的路径是否在D盘且D盘不存在/不可访问
-                    if saved_path.startswith('D:\\'):
-                        d_drive_available = False
-                        try:
-                            if os.path.isdir('D:\\'):
-                                os.listdir('D:\\')
-                                d_drive_available = True
-                        except (OSError, PermissionError):
-                            d_drive_available = False
-                        
-                        if not d_drive_available:
-                            print(f"DEBUG: 保存的路径在D盘但D盘不存在或不可访问，切换到C盘")
-                            # 将D盘路径转换为C盘路径
-                            saved_path = saved_path.replace('D:\\', 'C:\\', 1)
-                    output_path = saved_path
-                else:
-                    output_path = self.get_default_save_path()
-                
-                self.output_path_edit.setText(output_path)
-                
-                # 确保设置的路径存在
-                if output_path and not os.path.exists(output_path):
-                    try:
-                        os.makedirs(output_path)
-                        print(f"DEBUG: 自动创建设置的保存目录: {output_path}")
-                    except Exception as e:
-                        print(f"DEBUG: 创建设置目录失败: {e}")
-                        # 如果创建失败，使用智能默认路径
-                        fallback_path = self.get_default_save_path()
-                        self.output_path_edit.setText(fallback_path)
-                self.video_format_combo.setCurrentText(settings.get('video_format', 'MP4'))
-                
-                # 加载帧率设置，从数值转换为选项文本
-                fps_value = settings.get('fps', 30)
-                fps_text = f'{fps_value} FPS'
-                if fps_text in ['20 FPS', '25 FPS', '30 FPS', '50 FPS', '60 FPS']:
-                    self.fps_combo.setCurrentText(fps_text)
-                else:
-                    self.fps_combo.setCurrentText('30 FPS')  # 默认值
-                
-                self.quality_combo.setCurrentText(settings.get('quality', '高质量'))
-                # 加载音频质量设置
-                self.audio_quality_combo.setCurrentText(settings.get('audio_quality', '高音质'))
-                
-                self.show_cursor_check.setChecked(settings.get('show_cursor', True))
-                self.record_mouse_region_check.setChecked(settings.get('record_mouse_region', False))
-                self.hide_main_window_check.setChecked(settings.get('hide_main_window', False))
-                self.show_border_check.setChecked(settings.get('show_border', True))
-                self.allow_click_region_check.setChecked(settings.get('allow_click_region', False))
+        """加载设置（从配置中心读取，不再访问配置文件）"""
+        settings = self.config_store.snapshot()
+        
+        # 获取保存的路径，如果没有则使用智能默认路径
+        saved_path = settings['output_path']
+        if saved_path:
+            # 检查保存的路径是否在D盘且D盘不存在/不可访问
+            if saved_path.startswith('D:\\'):
+                d_drive_available = False
+                try:
+                    if os.path.isdir('D:\\'):
+                        os.listdir('D:\\')
+                        d_drive_available = True
+                except (OSError, PermissionError):
+                    d_drive_available = False
                 
-                if 'hotkey_start' in settings:
-                    self.hotkey_start.setKeySequence(QKeySequence(settings['hotkey_start']))
-                if 'hotkey_stop' in settings:
-                    self.hotkey_stop.setKeySequence(QKeySequence(settings['hotkey_stop']))
-                if 'hotkey_pause' in settings:
-                    self.hotkey_pause.setKeySequence(QKeySequence(settings['hotkey_pause']))
-                if 'hotkey_toggle' in settings:
-                    toggle_key = settings['hotkey_toggle']
-                    # 兼容旧配置：如果还是F12，自动升级为Ctrl+F12
-                    if toggle_key == 'F12':
-                        toggle_key = 'Ctrl+F12'
-                    self.hotkey_toggle.setKeySequence(QKeySequence(toggle_key))
-            except:
-                self.load_default_settings()
+                if not d_drive_available:
+                    ui_log.warning("保存的路径在D盘但D盘不存在或不可访问，切换到C盘")
+                    # 将D盘路径转换为C盘路径
+                    saved_path = saved_path.replace('D:\\', 'C:\\', 1)
+            output_path = saved_path
         else:
-            self.load_default_settings()
+            output_path = self.get_default_save_path()
+        
+        self.output_path_edit.setText(output_path)
+        
+        # 确保设置的路径存在
+        if output_path and not os.path.exists(output_path):
+            try:
+                os.makedirs(output_path)
+                ui_log.info("自动创建设置的保存目录: %s", output_path)
+            except Exception as e:
+                ui_log.warning("创建设置目录失败: %s", e)
+                # 如果创建失败，使用智能默认路径
+                fallback_path = self.get_default_save_path()
+                self.output_path_edit.setText(fallback_path)
+        self.video_format_combo.setCurrentText(settings['video_format'])
+        
+        # 帧率从数值转换为选项文本（配置中心已保证取值有效）
+        self.fps_combo.setCurrentText(f"{settings['fps']} FPS")
+        self.frame_rate_mode_combo.setCurrentIndex(1 if settings['vfr_enabled'] else 0)
+        self.max_output_combo.setCurrentIndex(self.max_output_combo.findData(settings['max_output_height']))
+        self.scale_algorithm_combo.setCurrentIndex(self.scale_algorithm_combo.findData(settings['scale_algorithm']))
+        self.proxy_height_combo.setCurrentIndex(self.proxy_height_combo.findData(settings['proxy_height']))
+        self.split_minutes_combo.setCurrentIndex(self.split_minutes_combo.findData(settings['split_minutes']))
+        self.split_size_combo.setCurrentIndex(self.split_size_combo.findData(settings['split_size_gb']))
+        self.timelapse_combo.setCurrentIndex(self.timelapse_combo.findData(settings['timelapse_interval']))
+        self.pip_corner_combo.setCurrentIndex(self.pip_corner_combo.findData(settings['pip_corner']))
+        self.pip_width_combo.setCurrentIndex(self.pip_width_combo.findData(settings['pip_width']))
+        self.pip_margin_combo.setCurrentIndex(self.pip_margin_combo.findData(settings['pip_margin']))
+        self.pip_shape_combo.setCurrentIndex(self.pip_shape_combo.findData(settings['pip_shape']))
+        
+        self.quality_combo.setCurrentText(settings['quality'])
+        self.audio_quality_combo.setCurrentText(settings['audio_quality'])
+        self.audio_only_combo.setCurrentIndex(max(0, self.audio_only_combo.findData(settings['audio_only_format'])))
+        self.screenshot_format_combo.setCurrentIndex(self.screenshot_format_combo.findData(settings['screenshot_format']))
+        self.burst_count_combo.setCurrentIndex(self.burst_count_combo.findData(settings['burst_count']))
+        self.burst_interval_combo.setCurrentIndex(self.burst_interval_combo.findData(settings['burst_interval']))
+        
+        self.show_cursor_check.setChecked(settings['show_cursor'])
+        self.record_mouse_region_check.setChecked(settings['record_mouse_region'])
+        mouse_region_index = self.mouse_region_combo.findData(
+            f"{settings['mouse_region_width']}x{settings['mouse_region_height']}")
+        self.mouse_region_combo.setCurrentIndex(max(0, mouse_region_index))
+        self.hide_main_window_check.setChecked(settings['hide_main_window'])
+        self.show_border_check.setChecked(settings['show_border'])
+        self.allow_click_region_check.setChecked(settings['allow_click_region'])
+        self.replay_enabled_check.setChecked(settings['replay_enabled'])
+        self.stream_enabled_check.setChecked(settings['stream_enabled'])
+        self.stream_url_edit.setText(settings['stream_url'])
+        # 保存的显示器已不存在时回到主显示器
+        self.capture_monitor_combo.setCurrentIndex(max(0, self.capture_monitor_combo.findData(settings['capture_monitor'])))
+        self.replay_seconds_combo.setCurrentIndex(self.replay_seconds_combo.findData(settings['replay_seconds']))
+        # 配置文件中手动填写的上限不在选项中时作为额外选项保留，保存设置时不会被改掉
+        if self.replay_max_mb_combo.findData(settings['replay_max_mb']) < 0:
+            self.replay_max_mb_combo.addItem(f"{settings['replay_max_mb']} MB", settings['replay_max_mb'])
+        self.replay_max_mb_combo.setCurrentIndex(self.replay_max_mb_combo.findData(settings['replay_max_mb']))
+        
+        self.hotkey_start.setKeySequence(QKeySequence(settings['hotkey_start']))
+        self.hotkey_stop.setKeySequence(QKeySequence(settings['hotkey_stop']))
+        self.hotkey_pause.setKeySequence(QKeySequence(settings['hotkey_pause']))
+        self.hotkey_toggle.setKeySequence(QKeySequence(settings['hotkey_toggle']))
+        self.hotkey_replay.setKeySequence(QKeySequence(settings['hotkey_replay']))
+        self.hotkey_screenshot.setKeySequence(QKeySequence(settings['hotkey_screenshot']))
+        self.hotkey_burst.setKeySequence(QKeySequence(settings['hotkey_burst']))
     
     def save_settings(self):
         """保存设置"""
@@ -7187,10 +12543,27 @@ class SettingsWindow(QWidget):
             'output_path': output_path,
             'video_format': self.video_format_combo.currentText(),
             'fps': fps_value,
+            'vfr_enabled': self.frame_rate_mode_combo.currentIndex() == 1,
+            'max_output_height': self.max_output_combo.currentData(),
+            'scale_algorithm': self.scale_algorithm_combo.currentData(),
+            'proxy_height': self.proxy_height_combo.currentData(),
+            'split_minutes': self.split_minutes_combo.currentData(),
+            'split_size_gb': self.split_size_combo.currentData(),
+            'timelapse_interval': self.timelapse_combo.currentData(),
+            'pip_corner': self.pip_corner_combo.currentData(),
+            'pip_width': self.pip_width_combo.currentData(),
+            'pip_margin': self.pip_margin_combo.currentData(),
+            'pip_shape': self.pip_shape_combo.currentData(),
             'quality': self.quality_combo.currentText(),
             'audio_quality': self.audio_quality_combo.currentText(),  # 保存音频质量设置
+            'audio_only_format': self.audio_only_combo.currentData(),
+            'screenshot_format': self.screenshot_format_combo.currentData(),
+            'burst_count': self.burst_count_combo.currentData(),
+            'burst_interval': self.burst_interval_combo.currentData(),
             'show_cursor': self.show_cursor_check.isChecked(),
             'record_mouse_region': self.record_mouse_region_check.isChecked(),
+            'mouse_region_width': int(self.mouse_region_combo.currentData().split('x')[0]),
+            'mouse_region_height': int(self.mouse_region_combo.currentData().split('x')[1]),
             'hide_main_window': self.hide_main_window_check.isChecked(),
             'show_border': self.show_border_check.isChecked(),
             'allow_click_region': self.allow_click_region_check.isChecked(),
@@ -7198,16 +12571,20 @@ class SettingsWindow(QWidget):
             'hotkey_stop': self.hotkey_stop.keySequence().toString(),
             'hotkey_pause': self.hotkey_pause.keySequence().toString(),
             'hotkey_toggle': self.hotkey_toggle.keySequence().toString(),
+            'hotkey_replay': self.hotkey_replay.keySequence().toString(),
+            'hotkey_screenshot': self.hotkey_screenshot.keySequence().toString(),
+            'hotkey_burst': self.hotkey_burst.keySequence().toString(),
+            'replay_enabled': self.replay_enabled_check.isChecked(),
+            'stream_enabled': self.stream_enabled_check.isChecked(),
+            'stream_url': self.stream_url_edit.text().strip(),
+            'capture_monitor': self.capture_monitor_combo.currentData(),
+            'replay_seconds': self.replay_seconds_combo.currentData(),
+            'replay_max_mb': self.replay_max_mb_combo.currentData(),
         }
         
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=4, ensure_ascii=False)
-            
-            # 通知主窗口重新注册快捷键
-            if hasattr(self, 'parent') and self.parent:
-                if hasattr(self.parent, 'register_global_hotkeys'):
-                    self.parent.register_global_hotkeys()
+            # 写入配置中心：订阅者（例如全局快捷键）立即生效，磁盘写入在后台防抖完成
+            self.config_store.update(settings)
             
             CustomMessageBox.show_message(self, '成功', '设置已保存！', 'information')
             self.close()
@@ -7237,6 +12614,13 @@ class SettingsWindow(QWidget):
 
 
 class TruePixelPerfectUI(QMainWindow):
+    replay_saved = pyqtSignal(str, int)  # 即时回放已保存，传递文件路径和文件大小
+    replay_save_failed = pyqtSignal(str)  # 即时回放保存失败，传递错误信息
+    scheduled_start_requested = pyqtSignal()  # 到达定时录制开始时间（计划线程发出）
+    scheduled_stop_requested = pyqtSignal(str)  # 满足自动停止条件，传递停止原因
+    screenshot_saved = pyqtSignal(list, float)  # 截图已保存，传递文件列表和最长单帧截取耗时（毫秒）
+    screenshot_failed = pyqtSignal(str)  # 截图失败，传递错误信息
+    
     def __init__(self, splash=None):
         super().__init__()
         
@@ -7398,6 +12782,36 @@ class TruePixelPerfectUI(QMainWindow):
         self.hotkey_listener = None  # 快捷键监听器
         self.hotkey_handlers = {}  # 快捷键处理函数字典
         
+        # 配置中心：快捷键配置变化时自动重新注册
+        self.config_store = get_config_store()
+        self.config_store.subscribe(
+            lambda changed: QTimer.singleShot(0, self.register_global_hotkeys),
+            keys=('hotkey_start', 'hotkey_stop', 'hotkey_pause', 'hotkey_toggle', 'hotkey_replay',
+                  'hotkey_screenshot', 'hotkey_burst')
+        )
+        
+        # 即时回放缓冲：开关或参数变化时重新启动
+        self.replay_buffer = None
+        self.replay_saved.connect(self.on_replay_saved)
+        self.replay_save_failed.connect(self.on_replay_save_failed)
+        
+        # 截图与连拍：截取和编码都在后台线程中完成，结果通过信号回到主线程
+        self.screenshot_service = ScreenshotService()
+        self.screenshot_saved.connect(self.on_screenshot_saved)
+        self.screenshot_failed.connect(self.on_screenshot_failed)
+        
+        # 定时录制：计划只对下一次录制生效，计划线程通过信号回到主线程按开始/停止按钮
+        self.recording_schedule = None  # ScheduleDialog 设置的计划
+        self.start_scheduler = None  # 等待开始时间的计划
+        self.recording_scheduler = None  # 当前录制的自动停止条件
+        self.scheduled_start_requested.connect(self.on_scheduled_start)
+        self.scheduled_stop_requested.connect(self.on_scheduled_stop)
+        self.config_store.subscribe(
+            lambda changed: QTimer.singleShot(0, self.update_replay_buffer),
+            keys=('replay_enabled', 'replay_seconds', 'replay_max_mb', 'fps', 'quality', 'show_cursor', 'vfr_enabled',
+                  'max_output_height', 'scale_algorithm')
+        )
+        
         # 更新启动信息
         if self.splash:
             self.splash.update_info('正在完成初始化...')
@@ -7406,6 +12820,9 @@ class TruePixelPerfectUI(QMainWindow):
         
         # 注册全局快捷键
         self.register_global_hotkeys()
+        
+        # 启动即时回放缓冲（如果已启用）
+        self.update_replay_buffer()
     
     def paintEvent(self, event):
         # 确保圆角正确绘制
@@ -8501,9 +13918,8 @@ foreach ($device in $devices) {
                 CustomMessageBox.show_message(self, '提示', '请先选择要录制的窗口！', 'warning')
                 return
             
-            # 获取设置选项
-            fps_text = self.settings_window.fps_combo.currentText() if hasattr(self, 'settings_window') and self.settings_window and hasattr(self.settings_window, 'fps_combo') else '30 FPS'
-            self.recording_fps = int(fps_text.split()[0])
+            # 获取设置选项（配置中心的内存数据，不读取文件）
+            self.recording_fps = self.config_store.get('fps')
             
             # 隐藏开始按钮，显示控制按钮
             start_button.hide()
@@ -8539,7 +13955,7 @@ foreach ($device in $devices) {
             self.timer.start(1000)  # 每秒更新一次
             
             # 如果设置了录制开始时隐藏主窗口
-            if hasattr(self, 'settings_window') and self.settings_window and hasattr(self.settings_window, 'hide_main_window_check') and self.settings_window.hide_main_window_check.isChecked():
+            if self.config_store.get('hide_main_window'):
                 self.hide()
             
             # 如果是窗口模式，启动窗口跟随
@@ -9221,6 +14637,11 @@ foreach ($device in $devices) {
         settings_action.triggered.connect(self.show_settings_window)
         menu.addAction(settings_action)
         
+        # 定时录制选项
+        schedule_action = QAction('定时录制', self)
+        schedule_action.triggered.connect(self.show_schedule_dialog)
+        menu.addAction(schedule_action)
+        
         # 关于选项
         about_action = QAction('关于', self)
         about_action.triggered.connect(self.show_about_window)
@@ -9248,6 +14669,72 @@ foreach ($device in $devices) {
             self.settings_window.raise_()
             self.settings_window.activateWindow()
     
+    def show_schedule_dialog(self):
+        """显示定时录制窗口，设置开始时间和自动停止条件"""
+        window_selected = self.recording_mode == 'window' and self.selected_window_handle is not None
+        dialog = ScheduleDialog(self.recording_schedule, window_selected, self)
+        dialog.exec_()
+        if not dialog.result:
+            return
+        if self.start_scheduler is not None:
+            self.start_scheduler.cancel()
+            self.start_scheduler = None
+        schedule = dialog.schedule
+        has_conditions = bool(schedule['max_duration'] or schedule['max_bytes'] or schedule['stop_with_window'])
+        self.recording_schedule = schedule if (schedule['start_at'] or has_conditions) else None
+        ui_log.info("定时录制计划: %s", self.recording_schedule)
+        if self.recording_schedule is None:
+            self._set_schedule_status('已取消定时录制')
+            return
+        if schedule['start_at'] and not self.recording:
+            self.start_scheduler = RecordingScheduler(start_at=schedule['start_at'],
+                                                      on_start=self.scheduled_start_requested.emit)
+            self.start_scheduler.arm_start()
+            start_text = datetime.fromtimestamp(schedule['start_at']).strftime('%m-%d %H:%M:%S')
+            self._set_schedule_status(f'将于 {start_text} 开始录制')
+        else:
+            self._set_schedule_status('下一次录制将按设定条件自动停止')
+    
+    def _set_schedule_status(self, text):
+        """在状态栏显示定时录制的提示"""
+        if hasattr(self, 'status_label') and self.status_label:
+            self.status_label.setText(text)
+            self.status_label.setStyleSheet(
+                "color: #60A5FA; "
+                "font-family: 'Microsoft YaHei'; "
+                "font-size: 12px; "
+                "font-weight: 500;"
+            )
+    
+    def on_scheduled_start(self):
+        """到达定时开始时间：和点击开始按钮相同"""
+        self.start_scheduler = None
+        self._trigger_start_recording()
+    
+    def on_scheduled_stop(self, reason):
+        """满足自动停止条件：和点击停止按钮相同，合并/收尾流程不变"""
+        ui_log.info("自动停止录制，原因: %s", reason)
+        self._trigger_stop_recording()
+        self._set_schedule_status(RecordingScheduler.REASONS.get(reason, '已自动停止录制') + '，录制已停止')
+    
+    def _attach_recording_scheduler(self, session):
+        """按定时录制计划监视本次录制的停止条件（计划只生效一次）"""
+        schedule = self.recording_schedule
+        self.recording_schedule = None
+        if schedule is None:
+            return
+        window_alive = None
+        hwnd = self.selected_window_handle
+        if schedule['stop_with_window'] and sys.platform == 'win32' and hwnd is not None:
+            window_alive = lambda: bool(user32.IsWindow(hwnd))
+        scheduler = RecordingScheduler(max_duration=schedule['max_duration'], max_bytes=schedule['max_bytes'],
+                                       window_alive=window_alive, on_stop=self.scheduled_stop_requested.emit)
+        if not scheduler.has_stop_conditions():
+            return
+        scheduler.attach(session)
+        self.recording_scheduler = scheduler
+        ui_log.info("本次录制的自动停止条件: %s", scheduler.summary())
+    
     def show_about_window(self):
         """显示关于窗口"""
         if self.about_window is None or not self.about_window.isVisible():
@@ -9569,6 +15056,14 @@ foreach ($device in $devices) {
             'Microsoft Text Input Application',  # 文本输入应用
         ]
         
+        # 虚拟桌面范围只查询一次（回调会对每个顶级窗口调用），副屏上的窗口同样保留
+        desktop = virtual_desktop_region(enumerate_monitors())
+        if desktop is None:
+            screen = QDesktopWidget().screenGeometry()
+            desktop = {'top': 0, 'left': 0, 'width': screen.width(), 'height': screen.height()}
+        desktop_right = desktop['left'] + desktop['width']
+        desktop_bottom = desktop['top'] + desktop['height']
+        
         # 定义回调函数
         def enum_windows_proc(hwnd, lParam):
             # 检查窗口句柄是否有效
@@ -9626,9 +15121,8 @@ foreach ($device in $devices) {
                 return True
             
             # 检查窗口是否在屏幕范围内（排除屏幕外的窗口）
-            screen = QDesktopWidget().screenGeometry()
-            if (rect.right < 0 or rect.bottom < 0 or 
-                rect.left > screen.width() or rect.top > screen.height()):
+            if (rect.right < desktop['left'] or rect.bottom < desktop['top'] or 
+                rect.left > desktop_right or rect.top > desktop_bottom):
                 return True
             
             # 检查窗口是否被其他窗口完全遮挡（简单检查：窗口是否在屏幕可见区域）
@@ -9688,18 +15182,16 @@ foreach ($device in $devices) {
                 pass
             
             # 检查窗口是否真正在屏幕上可见
-            screen = QDesktopWidget().screenGeometry()
-            
             # 如果窗口完全在屏幕外，排除它
-            if (rect.right <= 0 or rect.bottom <= 0 or 
-                rect.left >= screen.width() or rect.top >= screen.height()):
+            if (rect.right <= desktop['left'] or rect.bottom <= desktop['top'] or 
+                rect.left >= desktop_right or rect.top >= desktop_bottom):
                 return True
             
             # 检查窗口是否至少有一部分在屏幕可见区域内
-            visible_left = max(0, rect.left)
-            visible_top = max(0, rect.top)
-            visible_right = min(screen.width(), rect.right)
-            visible_bottom = min(screen.height(), rect.bottom)
+            visible_left = max(desktop['left'], rect.left)
+            visible_top = max(desktop['top'], rect.top)
+            visible_right = min(desktop_right, rect.right)
+            visible_bottom = min(desktop_bottom, rect.bottom)
             
             # 如果可见区域太小（小于窗口的20%），认为窗口不可见
             visible_width = visible_right - visible_left
@@ -9710,7 +15202,7 @@ foreach ($device in $devices) {
             # 检查窗口是否在任务栏中显示（通过检查窗口是否在任务栏区域）
             # 任务栏通常在屏幕底部，高度约40-50px
             taskbar_height = 50
-            if rect.top >= screen.height() - taskbar_height and rect.height() <= taskbar_height:
+            if rect.top >= desktop_bottom - taskbar_height and rect.height() <= taskbar_height:
                 return True
             
             # 额外检查：验证窗口是否真正可用
@@ -9908,7 +15400,10 @@ foreach ($device in $devices) {
         if not user32.IsWindow(self.selected_window_handle):
             self.stop_window_follow()
             self.selected_window_handle = None
-            if self.recording:
+            if self.recording_scheduler is not None and self.recording_scheduler.window_alive is not None:
+                # 设置了窗口关闭时停止录制：立即按停止条件处理
+                self.recording_scheduler.notify_window_closed()
+            elif self.recording:
                 CustomMessageBox.show_message(self, '提示', '选中的窗口已关闭，录制将继续使用最后的位置', 'warning')
             return
         
@@ -10083,10 +15578,7 @@ foreach ($device in $devices) {
         
         # 设置录制状态和设置选项
         is_recording = getattr(self, 'recording', False)
-        allow_move = False
-        if hasattr(self, 'settings_window') and self.settings_window:
-            if hasattr(self.settings_window, 'allow_click_region_check'):
-                allow_move = self.settings_window.allow_click_region_check.isChecked()
+        allow_move = self.config_store.get('allow_click_region')
         self.region_selector.set_recording_state(is_recording, allow_move)
         
         # 显示区域选择器 - 使用showFullScreen确保全屏覆盖所有显示器
@@ -10179,19 +15671,51 @@ foreach ($device in $devices) {
                 except:
                     pass
     
+    def _resolve_capture_region(self, settings):
+        """按当前录制模式确定截取区域，录制和截图共用
+
+        返回 (region, monitor_regions)；自定义模式下尚未选择区域时 region 为 None。
+        """
+        monitor_regions = []
+        if self.recording_mode == 'fullscreen':
+            # 全屏录制：按设置录制主显示器、指定显示器、整个虚拟桌面或每个显示器分别录制
+            monitor_regions = resolve_capture_regions(settings['capture_monitor'])
+            if monitor_regions:
+                region = dict(monitor_regions[0][1])
+            else:
+                screen = QDesktopWidget().screenGeometry()
+                region = {'top': 0, 'left': 0, 'width': screen.width(), 'height': screen.height()}
+            return region, monitor_regions
+        # 自定义区域
+        if not self.custom_region:
+            return None, monitor_regions
+        x, y, width, height = self.custom_region
+        # 将录制区域向内收缩2像素（虚线边框宽度），避免录制到虚线框
+        border_width = 2  # 虚线框的宽度
+        # 确保收缩后区域仍然有效（至少保留最小尺寸）
+        if width > border_width * 2 and height > border_width * 2:
+            region = {
+                'top': y + border_width,
+                'left': x + border_width,
+                'width': width - border_width * 2,
+                'height': height - border_width * 2
+            }
+        else:
+            # 如果区域太小，使用原始区域（不收缩）
+            region = {'top': y, 'left': x, 'width': width, 'height': height}
+            ui_log.warning("录制区域太小 (%sx%s)，无法收缩虚线框", width, height)
+        return region, monitor_regions
+    
     def start_screen_recording(self):
         """开始屏幕录制"""
         try:
+            # 录制参数取自配置中心的只读快照，开始录制时不读取配置文件
+            settings = self.config_store.snapshot()
+            
             # 获取输出路径（优先使用设置中的路径）
-            if hasattr(self, 'settings_window') and self.settings_window:
-                if hasattr(self.settings_window, 'output_path_edit'):
-                    output_dir = self.settings_window.output_path_edit.text()
-                    if output_dir and os.path.exists(output_dir):
-                        recordings_dir = output_dir
-                    else:
-                        recordings_dir = self.recordings_dir
-                else:
-                    recordings_dir = self.recordings_dir
+            output_dir = settings['output_path']
+            if output_dir and os.path.exists(output_dir):
+                recordings_dir = output_dir
             else:
                 recordings_dir = self.recordings_dir
             
@@ -10208,11 +15732,7 @@ foreach ($device in $devices) {
             
             # 生成文件名
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            video_format = 'mp4'
-            if hasattr(self, 'settings_window') and self.settings_window:
-                if hasattr(self.settings_window, 'video_format_combo'):
-                    format_text = self.settings_window.video_format_combo.currentText()
-                    video_format = format_text.lower().split()[0] if format_text else 'mp4'
+            video_format = settings['video_format'].lower()
             
             filename = f'recording_{timestamp}.{video_format}'
             filepath = os.path.join(recordings_dir, filename)
@@ -10220,46 +15740,15 @@ foreach ($device in $devices) {
             print(f"DEBUG: 文件保存路径: {filepath}")
             
             # 确定录制区域
-            if self.recording_mode == 'fullscreen':
-                # 全屏录制
-                screen = QDesktopWidget().screenGeometry()
-                region = {'top': 0, 'left': 0, 'width': screen.width(), 'height': screen.height()}
-            else:
-                # 自定义区域
-                if self.custom_region:
-                    x, y, width, height = self.custom_region
-                    # 将录制区域向内收缩2像素（虚线边框宽度），避免录制到虚线框
-                    border_width = 2  # 虚线框的宽度
-                    # 确保收缩后区域仍然有效（至少保留最小尺寸）
-                    if width > border_width * 2 and height > border_width * 2:
-                        region = {
-                            'top': y + border_width,
-                            'left': x + border_width,
-                            'width': width - border_width * 2,
-                            'height': height - border_width * 2
-                        }
-                    else:
-                        # 如果区域太小，使用原始区域（不收缩）
-                        region = {'top': y, 'left': x, 'width': width, 'height': height}
-                        print(f"DEBUG: 警告：录制区域太小 ({width}x{height})，无法收缩虚线框")
-                else:
-                    CustomMessageBox.show_message(self, '错误', '未选择自定义录制区域！', 'warning')
-                    return
+            region, monitor_regions = self._resolve_capture_region(settings)
+            if region is None:
+                CustomMessageBox.show_message(self, '错误', '未选择自定义录制区域！', 'warning')
+                return
             
             # 获取设置选项
-            quality = '高质量'
-            audio_quality = '高音质'
-            show_cursor = True
-            camera_device = None
-            camera_enabled = False
-            
-            if hasattr(self, 'settings_window') and self.settings_window:
-                if hasattr(self.settings_window, 'quality_combo'):
-                    quality = self.settings_window.quality_combo.currentText()
-                if hasattr(self.settings_window, 'audio_quality_combo'):
-                    audio_quality = self.settings_window.audio_quality_combo.currentText()
-                if hasattr(self.settings_window, 'show_cursor_check'):
-                    show_cursor = self.settings_window.show_cursor_check.isChecked()
+            quality = settings['quality']
+            audio_quality = settings['audio_quality']
+            show_cursor = settings['show_cursor']
             
             # 获取摄像头设备（只要摄像头预览窗口打开就自动启用录制）
             camera_device = None
@@ -10296,7 +15785,7 @@ foreach ($device in $devices) {
                 print(f"DEBUG: microphone_combo当前文本: {self.microphone_combo.currentText()}")
             
             # 创建录屏线程
-            self.recording_thread = RecordingThread(
+            session_kwargs = dict(
                 region=region,
                 filepath=filepath,
                 fps=self.recording_fps,
@@ -10308,30 +15797,48 @@ foreach ($device in $devices) {
                 audio_quality=audio_quality,
                 show_cursor=show_cursor,
                 camera_device=camera_device if camera_enabled else None,
-                camera_enabled=camera_enabled
+                camera_enabled=camera_enabled,
+                # 与预览窗口共用同一个摄像头采集，设备只打开一次
+                camera_index=self.camera_preview_window.camera_index if camera_enabled else None,
+                settings=settings
             )
+            if settings['audio_only_format']:
+                # 纯音频录制：不采集屏幕，录音时直接编码写入音频文件
+                self.recording_thread = RecordingThread(session=AudioOnlySession(**session_kwargs))
+            elif len(monitor_regions) > 1:
+                # 每个显示器单独录制：并行编码，共用一个录制时钟
+                self.recording_thread = RecordingThread(session=MonitorGroupSession(monitor_regions, **session_kwargs))
+            else:
+                self.recording_thread = RecordingThread(**session_kwargs)
             
             # 连接录制失败信号
             self.recording_thread.recording_failed.connect(self.on_recording_failed)
+            # 资源警告显示在状态栏
+            self.recording_thread.resource_warning.connect(self.on_resource_warning)
             
             # 隐藏区域选择器的关闭按钮并更新录制状态（虚线框仍然可见）
             if hasattr(self, 'region_selector') and self.region_selector:
                 self.region_selector.set_show_close_button(False)
-                # 获取设置选项：直接从config.json读取（配置文件是最终来源）
-                allow_move = self.get_allow_move_from_config()
+                # 获取设置选项：与录制参数使用同一份配置快照
+                allow_move = settings['allow_click_region']
                 print(f"DEBUG: 允许在录制过程中移动录制区域: {allow_move}")
                 # 设置录制状态（虚线框仍然显示，但录制区域已向内收缩，不会录制到虚线）
                 self.region_selector.set_recording_state(True, allow_move)
             
+            # 定时录制的停止条件按录制时钟检查，会话开始采集后才计时
+            self._attach_recording_scheduler(self.recording_thread.session)
             self.recording_thread.start()
             
             # 保存文件路径供后续使用
-            self.current_recording_filepath = filepath
+            self.current_recording_filepath = self.recording_thread.session.base_filepath  # 纯音频录制时扩展名不同
             
             print(f"DEBUG: 开始录制 - 模式: {self.recording_mode}, 区域: {region}, 文件: {filepath}")
             print(f"DEBUG: 文件将保存到: {recordings_dir}")
             
         except Exception as e:
+            if self.recording_scheduler is not None:
+                self.recording_scheduler.cancel()
+                self.recording_scheduler = None
             CustomMessageBox.show_message(self, '错误', f'开始录制失败: {str(e)}', 'critical')
             print(f"DEBUG: 录制失败: {e}")
             import traceback
@@ -10372,6 +15879,9 @@ foreach ($device in $devices) {
         """停止屏幕录制"""
         # 停止窗口跟随
         self.stop_window_follow()
+        if self.recording_scheduler is not None:
+            self.recording_scheduler.cancel()
+            self.recording_scheduler = None
         
         if self.recording_thread:
             # 更新状态栏显示处理中
@@ -10431,6 +15941,20 @@ foreach ($device in $devices) {
             
             print("DEBUG: 录制已停止，视频处理中...")
     
+    def on_resource_warning(self, kind, message):
+        """资源警告回调（在主线程中执行）"""
+        try:
+            if hasattr(self, 'status_label') and self.status_label:
+                self.status_label.setText(f'⚠ {message}')
+                self.status_label.setStyleSheet(
+                    "color: #F59E0B; "
+                    "font-family: 'Microsoft YaHei'; "
+                    "font-size: 12px; "
+                    "font-weight: 500;"
+                )
+        except Exception as e:
+            ui_log.warning("显示资源警告失败: %s", e)
+    
     def on_merge_progress(self, message, current, total):
         """合并进度回调（在主线程中执行）"""
         try:
@@ -10547,19 +16071,8 @@ foreach ($device in $devices) {
         return None
     
     def get_allow_move_from_config(self):
-        """介config.json读取是否允许在录制过程中移动录制区域"""
-        config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
-        config_file = os.path.join(config_dir, 'config.json')
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                allow_move = settings.get('allow_click_region', False)
-                print(f"DEBUG: 从config.json读取allow_click_region: {allow_move}")
-                return allow_move
-            except Exception as e:
-                print(f"DEBUG: 读取config.json失败: {e}")
-        return False
+        """读取是否允许在录制过程中移动录制区域（来自配置中心）"""
+        return self.config_store.get('allow_click_region', False)
     
     def register_global_hotkeys(self):
         """注册全局快捷键"""
@@ -10570,29 +16083,13 @@ foreach ($device in $devices) {
         # 停止旧的监听器（如果存在）
         self.unregister_global_hotkeys()
         
-        # 读取配置文件中的快捷键设置
-        config_dir = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
-        config_file = os.path.join(config_dir, 'config.json')
+        # 从配置中心读取快捷键设置
         hotkeys = {
-            'hotkey_start': 'F9',
-            'hotkey_stop': 'F10',
-            'hotkey_pause': 'F11',
-            'hotkey_toggle': 'Ctrl+F12'  # 默认改为Ctrl+F12
+            key: self.config_store.get(key)
+            for key in ('hotkey_start', 'hotkey_stop', 'hotkey_pause', 'hotkey_toggle', 'hotkey_replay',
+                        'hotkey_screenshot', 'hotkey_burst')
         }
         
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                hotkeys.update({
-                    'hotkey_start': settings.get('hotkey_start', 'F9'),
-                    'hotkey_stop': settings.get('hotkey_stop', 'F10'),
-                    'hotkey_pause': settings.get('hotkey_pause', 'F11'),
-                    'hotkey_toggle': settings.get('hotkey_toggle', 'Ctrl+F12')
-                })
-            except Exception as e:
-                print(f"DEBUG: 读取快捷键配置失败: {e}")
-        
         # 解析快捷键字符串并注册
         try:
             hotkey_dict = {}
@@ -10629,6 +16126,30 @@ foreach ($device in $devices) {
             else:
                 print(f"DEBUG: 警告：无法解析显示/隐藏窗口快捷键: {hotkeys['hotkey_toggle']}")
             
+            # 解析保存即时回放快捷键
+            replay_key = self._parse_hotkey(hotkeys['hotkey_replay'])
+            if replay_key:
+                hotkey_dict[replay_key] = self._on_hotkey_replay
+                ui_log.debug("解析保存即时回放快捷键: %s -> %s", hotkeys['hotkey_replay'], replay_key)
+            else:
+                ui_log.warning("无法解析保存即时回放快捷键: %s", hotkeys['hotkey_replay'])
+            
+            # 解析截图快捷键
+            screenshot_key = self._parse_hotkey(hotkeys['hotkey_screenshot'])
+            if screenshot_key:
+                hotkey_dict[screenshot_key] = self._on_hotkey_screenshot
+                ui_log.debug("解析截图快捷键: %s -> %s", hotkeys['hotkey_screenshot'], screenshot_key)
+            else:
+                ui_log.warning("无法解析截图快捷键: %s", hotkeys['hotkey_screenshot'])
+            
+            # 解析连拍快捷键
+            burst_key = self._parse_hotkey(hotkeys['hotkey_burst'])
+            if burst_key:
+                hotkey_dict[burst_key] = self._on_hotkey_burst
+                ui_log.debug("解析连拍快捷键: %s -> %s", hotkeys['hotkey_burst'], burst_key)
+            else:
+                ui_log.warning("无法解析连拍快捷键: %s", hotkeys['hotkey_burst'])
+            
             if hotkey_dict:
                 # 创建全局快捷键监听器
                 self.hotkey_listener = keyboard.GlobalHotKeys(hotkey_dict)
@@ -10709,6 +16230,18 @@ foreach ($device in $devices) {
         """显示/隐藏窗口快捷键处理"""
         QTimer.singleShot(0, self._trigger_toggle_window)
     
+    def _on_hotkey_replay(self):
+        """保存即时回放快捷键处理"""
+        QTimer.singleShot(0, self._trigger_save_replay)
+    
+    def _on_hotkey_screenshot(self):
+        """截图快捷键处理"""
+        QTimer.singleShot(0, self._trigger_screenshot)
+    
+    def _on_hotkey_burst(self):
+        """连拍快捷键处理"""
+        QTimer.singleShot(0, lambda: self._trigger_screenshot(burst=True))
+    
     def _trigger_start_recording(self):
         """触发开始录制（在主线程中执行）"""
         print("DEBUG: 快捷键触发开始录制")
@@ -10754,6 +16287,147 @@ foreach ($device in $devices) {
             self.raise_()
             self.activateWindow()
     
+    def update_replay_buffer(self):
+        """按配置启动或重新启动即时回放缓冲（全屏，仅画面）"""
+        self.stop_replay_buffer()
+        settings = self.config_store.snapshot()
+        if not settings['replay_enabled']:
+            return
+        try:
+            screen = QDesktopWidget().screenGeometry()
+            region = {'top': 0, 'left': 0, 'width': screen.width(), 'height': screen.height()}
+            self.replay_buffer = ReplayBuffer(
+                region,
+                seconds=settings['replay_seconds'],
+                max_mb=settings['replay_max_mb'],
+                fps=settings['fps'],
+                quality=settings['quality'],
+                show_cursor=settings['show_cursor'],
+                settings=settings
+            )
+            self.replay_buffer.recording_failed.connect(
+                lambda error_msg: self.replay_save_failed.emit(f'即时回放已停止：{error_msg}')
+            )
+            self.replay_buffer.start()
+            capture_log.info("即时回放缓冲已启动，时长: %s 秒", settings['replay_seconds'])
+        except Exception as e:
+            capture_log.exception("启动即时回放缓冲失败: %s", e)
+            self.replay_buffer = None
+    
+    def stop_replay_buffer(self):
+        """停止即时回放缓冲并删除缓存的片段"""
+        replay_buffer, self.replay_buffer = self.replay_buffer, None
+        if replay_buffer is not None:
+            try:
+                replay_buffer.stop()
+                capture_log.info("即时回放缓冲已停止")
+            except Exception as e:
+                capture_log.warning("停止即时回放缓冲失败: %s", e)
+    
+    def _trigger_save_replay(self):
+        """触发保存即时回放（在主线程中执行，拼接在后台线程中完成）"""
+        replay_buffer = self.replay_buffer
+        if replay_buffer is None or not replay_buffer.running:
+            ui_log.info("即时回放未启用，忽略保存回放快捷键")
+            return
+        output_dir = self.config_store.get('output_path')
+        if not output_dir or not os.path.exists(output_dir):
+            output_dir = self.recordings_dir
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filepath = os.path.join(output_dir, f'replay_{timestamp}.mp4')
+        
+        def save():
+            try:
+                saved_path, file_size = replay_buffer.save(filepath)
+                self.replay_saved.emit(saved_path, file_size)
+            except Exception as e:
+                capture_log.error("保存即时回放失败: %s", e)
+                self.replay_save_failed.emit(str(e))
+        
+        threading.Thread(target=save, daemon=True).start()
+    
+    def on_replay_saved(self, filepath, file_size):
+        """即时回放保存完成回调（在主线程中执行）"""
+        if hasattr(self, 'status_label') and self.status_label:
+            self.status_label.setText(f'已保存回放: {os.path.basename(filepath)} ({file_size / 1024 / 1024:.1f} MB)')
+            self.status_label.setStyleSheet(
+                "color: #9CA3AF; "
+                "font-family: 'Microsoft YaHei'; "
+                "font-size: 12px; "
+                "font-weight: 500;"
+            )
+    
+    def on_replay_save_failed(self, error_msg):
+        """即时回放保存失败回调（在主线程中执行）"""
+        self.on_resource_warning('replay', error_msg)
+    
+    def _screenshot_region(self, settings):
+        """截图区域：录制中截取会话当前的区域（跟随窗口时随窗口移动），否则按录制模式确定；
+        每个显示器分别录制时截取所有显示器的外接矩形"""
+        if self.recording and self.recording_thread is not None:
+            status = self.recording_thread.status()
+            if status.get('monitors'):
+                return virtual_desktop_region([monitor['region'] for monitor in status['monitors']])
+            if status.get('region'):
+                return status['region']
+        region, monitor_regions = self._resolve_capture_region(settings)
+        if len(monitor_regions) > 1:
+            return virtual_desktop_region([monitor_region for _, monitor_region in monitor_regions])
+        return region
+    
+    def _trigger_screenshot(self, burst=False):
+        """触发截图或连拍（在主线程中执行，截取和编码在后台线程中完成）"""
+        settings = self.config_store.snapshot()
+        region = self._screenshot_region(settings)
+        if region is None:
+            self.on_screenshot_failed('未选择自定义录制区域')
+            return
+        output_dir = settings['output_path']
+        if not output_dir or not os.path.exists(output_dir):
+            output_dir = self.recordings_dir
+        try:
+            future = self.screenshot_service.capture(
+                region, output_dir,
+                count=settings['burst_count'] if burst else 1,
+                interval=settings['burst_interval'],
+                image_format=settings['screenshot_format'],
+                quality=settings['screenshot_quality'],
+                show_cursor=settings['show_cursor'],
+                prefix='burst' if burst else 'screenshot'
+            )
+        except Exception as e:
+            self.on_screenshot_failed(str(e))
+            return
+        
+        def done(future):
+            # 在截图线程中回调，通过信号回到主线程
+            if future.exception() is not None:
+                self.screenshot_failed.emit(str(future.exception()))
+            else:
+                result = future.result()
+                self.screenshot_saved.emit(result['files'], max(result['grab_ms']))
+        
+        future.add_done_callback(done)
+    
+    def on_screenshot_saved(self, files, grab_ms):
+        """截图保存完成回调（在主线程中执行）"""
+        if hasattr(self, 'status_label') and self.status_label:
+            if len(files) > 1:
+                text = f'已保存连拍 {len(files)} 张: {os.path.basename(files[0])} 等'
+            else:
+                text = f'已保存截图: {os.path.basename(files[0])} ({grab_ms:.0f} ms)'
+            self.status_label.setText(text)
+            self.status_label.setStyleSheet(
+                "color: #9CA3AF; "
+                "font-family: 'Microsoft YaHei'; "
+                "font-size: 12px; "
+                "font-weight: 500;"
+            )
+    
+    def on_screenshot_failed(self, error_msg):
+        """截图失败回调（在主线程中执行）"""
+        self.on_resource_warning('screenshot', error_msg)
+    
     def closeEvent(self, event):
         """窗口关闭事件 - 关闭所有子窗口并清理资源"""
         # 如果正在录制，阻止关闭并提示用户
@@ -10827,9 +16501,15 @@ foreach ($device in $devices) {
                 import traceback
                 traceback.print_exc()
         
+        # 停止即时回放缓冲
+        self.stop_replay_buffer()
+        
         # 取消注册全局快捷键
         self.unregister_global_hotkeys()
         
+        # 把尚未落盘的配置立即写入
+        self.config_store.flush()
+        
         # 停止定时器
         if hasattr(self, 'timer') and self.timer:
             try:
@@ -10888,11 +16568,1004 @@ foreach ($device in $devices) {
                     "border-width: 3px;"
                 )
 
+def parse_region_argument(value):
+    """解析录制区域参数 'x,y,w,h'（或 [x, y, w, h]）为录制线程使用的区域字典"""
+    if isinstance(value, dict):
+        parts = [value.get('left'), value.get('top'), value.get('width'), value.get('height')]
+    elif isinstance(value, str):
+        parts = value.replace(' ', '').split(',')
+    else:
+        parts = list(value or [])
+    if len(parts) != 4:
+        raise ValueError(f"录制区域格式应为 x,y,w,h: {value!r}")
+    x, y, width, height = [int(float(part)) for part in parts]
+    if width <= 0 or height <= 0:
+        raise ValueError(f"录制区域宽高必须大于0: {value!r}")
+    return {'top': y, 'left': x, 'width': width, 'height': height}
+
+
+def parse_start_time_argument(value):
+    """解析定时开始时间：'HH:MM[:SS]'（今天，已过则为明天）或 'YYYY-MM-DD HH:MM[:SS]'，返回时间戳"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('T', ' ')
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            clock = datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+        start = datetime.combine(datetime.now().date(), clock)
+        if start.timestamp() <= time.time():
+            from datetime import timedelta
+            start += timedelta(days=1)
+        return start.timestamp()
+    raise ValueError(f"开始时间格式应为 HH:MM[:SS] 或 YYYY-MM-DD HH:MM[:SS]: {value!r}")
+
+
+def parse_size_argument(value):
+    """解析文件大小参数：字节数，或带 K/M/G 后缀（如 500M、2G），返回字节数"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    multiplier = units.get(text[-1:], 1)
+    if text[-1:] in units:
+        text = text[:-1]
+    size = int(float(text) * multiplier)
+    if size <= 0:
+        raise ValueError(f"文件大小必须大于0: {value!r}")
+    return size
+
+
+def find_window_alive_check(title):
+    """按标题查找窗口，返回检查窗口是否仍然存在的函数（仅 Windows）"""
+    if sys.platform != 'win32':
+        raise ValueError('按窗口关闭停止录制仅支持 Windows')
+    hwnd = user32.FindWindowW(None, title)
+    if not hwnd:
+        raise ValueError(f"未找到标题为 {title!r} 的窗口")
+    return lambda: bool(user32.IsWindow(hwnd))
+
+
+class RecordingController:
+    """录制控制器 - 管理一个 RecordingSession，供命令行与本地控制接口共用（不依赖Qt）"""
+    def __init__(self, config_store=None):
+        self.config_store = config_store or get_config_store()
+        self.session = None
+        self.scheduler = None  # 当前的定时开始/自动停止计划
+        self.screenshots = None  # 首次截图时创建 ScreenshotService
+        self.lock = threading.Lock()
+        self.finished = threading.Event()  # 最近一次会话已处理完成
+    
+    def _default_filepath(self, settings):
+        """与界面相同的命名规则：recording_时间戳.格式"""
+        output_dir = settings['output_path']
+        if not output_dir or not os.path.isdir(output_dir):
+            output_dir = os.getcwd()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(output_dir, f"recording_{timestamp}.{settings['video_format'].lower()}")
+    
+    def start(self, region, fps=None, duration=None, out=None, audio=False, microphone=False, stream=None,
+              max_size=None, start_at=None, stop_with_window=None, audio_only=None, timeout=30):
+        """开始录制，等待 FFmpeg 开始采集后返回状态（stream 为推流地址或 HLS 目录）
+        
+        duration（秒，不含暂停）、max_size（字节或 500M/2G）与 stop_with_window（窗口标题）为自动停止条件；
+        start_at 为将来的时间时只登记计划并立即返回，到时间后再开始录制。
+        audio_only 为 AAC/Opus/FLAC 时只录制声音（不需要区域，未指定音源时录制系统声音）。
+        """
+        if audio_only:
+            audio_only = {name.lower(): name for name in AudioOnlySession.FORMATS}.get(str(audio_only).lower())
+            if audio_only is None:
+                raise ValueError(f"纯音频格式应为 {'/'.join(AudioOnlySession.FORMATS)}")
+            if not (audio or microphone):
+                audio = True
+        region = parse_region_argument(region) if region is not None or not audio_only else None
+        max_bytes = parse_size_argument(max_size) if max_size else None
+        window_alive = find_window_alive_check(stop_with_window) if stop_with_window else None
+        start_time = parse_start_time_argument(start_at) if start_at else None
+        if start_time is not None and start_time > time.time():
+            with self.lock:
+                if self.scheduler is not None and self.scheduler.session is None and not self.scheduler.cancel_event.is_set():
+                    raise RuntimeError('已有定时录制计划')
+                if self.session is not None and not self.session.completion_future.done():
+                    raise RuntimeError('已有录制正在进行')
+                
+                def start_scheduled():
+                    try:
+                        self.start(region, fps=fps, duration=duration, out=out, audio=audio, microphone=microphone,
+                                   stream=stream, max_size=max_bytes, stop_with_window=stop_with_window,
+                                   audio_only=audio_only, timeout=timeout)
+                    except Exception:
+                        self.finished.set()  # 定时开始失败，不让等待中的命令行一直等下去
+                        raise
+                
+                scheduler = RecordingScheduler(start_at=start_time, on_start=start_scheduled)
+                self.scheduler = scheduler
+                self.finished.clear()
+            scheduler.arm_start()
+            capture_log.info("已登记定时录制: %s", scheduler.summary()['start_at'])
+            return {'state': 'scheduled', 'schedule': scheduler.summary()}
+        
+        with self.lock:
+            if self.session is not None and not self.session.completion_future.done():
+                raise RuntimeError('已有录制正在进行')
+            settings = self.config_store.snapshot()
+            if stream or audio_only:
+                from types import MappingProxyType
+                overrides = {}
+                if stream:
+                    overrides.update(stream_enabled=True, stream_url=stream)
+                if audio_only:
+                    overrides['audio_only_format'] = audio_only
+                settings = MappingProxyType(dict(settings, **overrides))
+            if fps is not None:
+                fps = int(fps)
+                if fps <= 0:
+                    raise ValueError(f"帧率必须大于0: {fps}")
+            else:
+                fps = settings['fps']
+            filepath = os.path.abspath(out) if out else self._default_filepath(settings)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            session_class = AudioOnlySession if settings['audio_only_format'] else RecordingSession
+            session = session_class(
+                region=region,
+                filepath=filepath,
+                fps=fps,
+                microphone_enabled=bool(microphone),
+                audio_enabled=bool(audio),
+                quality=settings['quality'],
+                audio_quality=settings['audio_quality'],
+                show_cursor=settings['show_cursor'],
+                settings=settings
+            )
+            self.session = session
+            self.finished.clear()
+            session.completion_future.add_done_callback(lambda _future: self.finished.set())
+            # 自动停止条件按录制时钟检查，满足时与 stop 命令走同一个停止流程
+            scheduler = RecordingScheduler(max_duration=duration, max_bytes=max_bytes, window_alive=window_alive,
+                                           on_stop=lambda reason: session.stop() if session.running else None)
+            self.scheduler = scheduler
+        scheduler.attach(session)
+        session.start().result(timeout=timeout)
+        return self.status()
+    
+    def _require_session(self):
+        if self.session is None:
+            raise RuntimeError('当前没有录制会话')
+        return self.session
+    
+    def stop(self, wait=False, timeout=None):
+        """停止录制；wait 为真时等待合并/混音完成并返回文件信息（尚未开始的定时录制直接取消）"""
+        scheduler = self.scheduler
+        if scheduler is not None and scheduler.session is None and scheduler.start_at:
+            scheduler.cancel()
+            self.finished.set()
+            capture_log.info("已取消定时录制")
+            return {'state': 'idle', 'cancelled': True, 'schedule': scheduler.summary()}
+        session = self._require_session()
+        future = session.stop() if session.running else session.completion_future
+        if not wait:
+            return session.status()
+        filepath, file_size = future.result(timeout=timeout)
+        result = session.status()
+        result.update({'filepath': filepath, 'size': file_size})
+        return result
+    
+    def pause(self):
+        session = self._require_session()
+        session.pause()
+        return session.status()
+    
+    def resume(self):
+        session = self._require_session()
+        session.resume()
+        return session.status()
+    
+    def update_region(self, region):
+        session = self._require_session()
+        session.update_region(parse_region_argument(region))
+        return session.status()
+    
+    def status(self):
+        scheduler = self.scheduler
+        if scheduler is not None and scheduler.session is None and scheduler.start_at:
+            status = {'state': 'idle' if scheduler.cancel_event.is_set() else 'scheduled'}
+        else:
+            status = self.session.status() if self.session is not None else {'state': 'idle'}
+        if scheduler is not None:
+            status['schedule'] = scheduler.summary()
+        return status
+    
+    def metrics(self):
+        return self.session.metrics() if self.session is not None else {'state': 'idle'}
+    
+    def screenshot(self, region=None, count=1, interval=None, image_format=None, out=None, timeout=60):
+        """截图或连拍（count > 1），返回文件列表与每帧截取耗时；录制中未指定区域时截取录制区域"""
+        settings = self.config_store.snapshot()
+        if region is not None:
+            region = parse_region_argument(region)
+        else:
+            session = self.session
+            region = session.status().get('region') if session is not None and session.running else None
+            if not region:
+                raise ValueError('截图需要区域 x,y,w,h（或在录制中截取录制区域）')
+        if image_format:
+            image_format = {name.lower(): name for name in ScreenshotService.FORMATS}.get(str(image_format).lower())
+            if image_format is None:
+                raise ValueError(f"截图格式应为 {'/'.join(ScreenshotService.FORMATS)}")
+        if out:
+            output_dir = os.path.abspath(out)
+        else:
+            output_dir = settings['output_path'] if settings['output_path'] and os.path.isdir(settings['output_path']) else os.getcwd()
+        with self.lock:
+            if self.screenshots is None:
+                self.screenshots = ScreenshotService()
+            screenshots = self.screenshots
+        future = screenshots.capture(
+            region, output_dir,
+            count=int(count or 1),
+            interval=settings['burst_interval'] if interval is None else float(interval),
+            image_format=image_format or settings['screenshot_format'],
+            quality=settings['screenshot_quality'],
+            show_cursor=settings['show_cursor'],
+            prefix='burst' if int(count or 1) > 1 else 'screenshot'
+        )
+        return future.result(timeout=timeout)
+    
+    def handle(self, request):
+        """处理一条控制命令，返回可序列化的响应"""
+        command = request.get('cmd')
+        try:
+            if command == 'ping':
+                result = {'pong': True}
+            elif command == 'start':
+                result = self.start(request.get('region'), fps=request.get('fps'), duration=request.get('duration'),
+                                    out=request.get('out'), audio=request.get('audio', False),
+                                    microphone=request.get('microphone', False), stream=request.get('stream'),
+                                    max_size=request.get('max_size'), start_at=request.get('start_at'),
+                                    stop_with_window=request.get('stop_with_window'),
+                                    audio_only=request.get('audio_only'))
+            elif command == 'stop':
+                result = self.stop(wait=request.get('wait', False), timeout=request.get('timeout'))
+            elif command == 'pause':
+                result = self.pause()
+            elif command == 'resume':
+                result = self.resume()
+            elif command == 'region':
+                result = self.update_region(request.get('region'))
+            elif command == 'status':
+                result = self.status()
+            elif command == 'metrics':
+                result = self.metrics()
+            elif command == 'screenshot':
+                result = self.screenshot(request.get('region'), count=request.get('count', 1),
+                                         interval=request.get('interval'), image_format=request.get('image_format'),
+                                         out=request.get('out'), timeout=request.get('timeout') or 60)
+            else:
+                return {'ok': False, 'error': f"未知命令: {command}"}
+            return {'ok': True, 'result': result}
+        except Exception as e:
+            control_log.warning("控制命令 %s 执行失败: %s", command, e)
+            return {'ok': False, 'error': str(e)}
+
+
+class RecordingControlServer:
+    """本地控制接口 - 每行一个JSON请求，返回一行JSON响应
+
+    支持 Unix 套接字的平台使用 control.sock，Windows 使用仅监听 127.0.0.1 的TCP端口并校验令牌；
+    连接方式写入 control.json 供客户端读取。
+    """
+    def __init__(self, controller, config_dir=None):
+        self.controller = controller
+        self.config_dir = config_dir or os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具')
+        self.endpoint_file = os.path.join(self.config_dir, 'control.json')
+        self.server_socket = None
+        self.socket_path = None
+        self.token = None
+        self.running = False
+    
+    def start(self):
+        """绑定端点并在后台线程中接受连接"""
+        os.makedirs(self.config_dir, exist_ok=True)
+        if hasattr(socket, 'AF_UNIX') and sys.platform != 'win32':
+            self.socket_path = os.path.join(self.config_dir, 'control.sock')
+            if os.path.exists(self.socket_path):
+                if self._endpoint_alive():
+                    raise RuntimeError('已有录制实例在监听控制接口')
+                os.remove(self.socket_path)
+            self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server_socket.bind(self.socket_path)
+            os.chmod(self.socket_path, 0o600)
+            endpoint = {'family': 'unix', 'path': self.socket_path}
+        else:
+            import secrets
+            if os.path.exists(self.endpoint_file) and self._endpoint_alive():
+                raise RuntimeError('已有录制实例在监听控制接口')
+            self.token = secrets.token_hex(16)
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.bind(('127.0.0.1', 0))
+            endpoint = {'family': 'tcp', 'host': '127.0.0.1', 'port': self.server_socket.getsockname()[1],
+                        'token': self.token}
+        self.server_socket.listen(4)
+        endpoint['pid'] = os.getpid()
+        with open(self.endpoint_file, 'w', encoding='utf-8') as f:
+            json.dump(endpoint, f)
+        self.running = True
+        threading.Thread(target=self._accept_loop, name='recording_control', daemon=True).start()
+        control_log.info("控制接口已启动: %s", endpoint.get('path') or endpoint.get('port'))
+        return endpoint
+    
+    def _endpoint_alive(self):
+        try:
+            send_control_command({'cmd': 'ping'}, timeout=1, endpoint_file=self.endpoint_file)
+            return True
+        except Exception:
+            return False
+    
+    def _accept_loop(self):
+        while self.running:
+            try:
+                connection, _address = self.server_socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+    
+    def _serve_client(self, connection):
+        try:
+            with connection, connection.makefile('rwb') as stream:
+                for line in stream:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line.decode('utf-8'))
+                        if not isinstance(request, dict):
+                            raise ValueError('请求必须是JSON对象')
+                    except ValueError as e:
+                        response = {'ok': False, 'error': f"无效请求: {e}"}
+                    else:
+                        if self.token is not None and request.get('token') != self.token:
+                            response = {'ok': False, 'error': '令牌无效'}
+                        else:
+                            response = self.controller.handle(request)
+                    stream.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+                    stream.flush()
+        except OSError as e:
+            control_log.info("控制连接已断开: %s", e)
+    
+    def close(self):
+        self.running = False
+        try:
+            if self.server_socket:
+                self.server_socket.close()
+        except OSError:
+            pass
+        for path in (self.socket_path, self.endpoint_file):
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def send_control_command(request, timeout=10, endpoint_file=None):
+    """向本地控制接口发送一条命令并返回响应"""
+    if endpoint_file is None:
+        endpoint_file = os.path.join(os.path.expanduser('~'), 'AppData', 'Local', '灵感录屏工具', 'control.json')
+    with open(endpoint_file, 'r', encoding='utf-8') as f:
+        endpoint = json.load(f)
+    if endpoint.get('family') == 'unix':
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = endpoint['path']
+    else:
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = (endpoint['host'], endpoint['port'])
+        request = dict(request, token=endpoint.get('token'))
+    client.settimeout(timeout)
+    with client:
+        client.connect(address)
+        client.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        with client.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise RuntimeError('控制接口未返回响应')
+    return json.loads(line.decode('utf-8'))
+
+
+class RecordingBenchmark:
+    """端到端基准测试 - 用 lavfi 合成画面与合成PCM驱动 RecordingSession 执行脚本化场景，输出JSON指标
+
+    场景：plain（连续录制）、pauses（20次暂停/恢复）、region_updates（50次区域更新）、
+    mic_toggle（录制中途关闭再开启麦克风）、static（大部分时间静止的画面，
+    分别以固定帧率和可变帧率录制，对比CPU与文件大小）、mouse_follow（60 FPS 下
+    固定区域与动态鼠标区域各录一次，合成指针绕圈移动，对比增加的CPU）、pip（合成摄像头
+    画面以圆形画中画叠加，与无摄像头录制对比，折算每帧合成耗时）、streaming（录制同时推流，
+    默认写入临时目录的 HLS 作为本地推流目标，可用 stream_target 指定本机 RTMP/SRT 服务器）、split（带暂停的
+    录制分别写成单个文件和每 1/SPLIT_PARTS 时长自动分段，对比停止到处理完成的耗时）。
+    """
+    SCENARIOS = ('plain', 'pauses', 'region_updates', 'mic_toggle', 'static', 'mouse_follow', 'pip', 'streaming',
+                 'split', 'timelapse')
+    SPLIT_PARTS = 4
+    TIMELAPSE_INTERVAL = 1.0  # 延时摄影场景：每秒采集一帧
+    MOUSE_FOLLOW_FPS = 60
+    MOUSE_ORBIT_SECONDS = 4.0  # 合成指针绕一圈的时间
+    PAUSE_COUNT = 20
+    REGION_UPDATE_COUNT = 50
+    SAMPLE_INTERVAL = 0.2
+    FRAME_TOLERANCE = 0.1  # 编码帧数允许超出 采集帧率 × 录制时长 的比例
+    FRAME_SLACK_SECONDS = 1.0  # 另外允许 FFmpeg 启动与收尾多编码的时长
+    # 大部分时间静止的合成画面：深色背景，每5秒左上角闪现0.5秒白块
+    STATIC_SOURCE = "color=c=0x1e1e1e,drawbox=x=0:y=0:w=iw/4:h=ih/4:color=white:t=fill:enable='lt(mod(t,5),0.5)'"
+    
+    def __init__(self, duration=60.0, source='testsrc2', fps=30, region=None, output_dir=None, keep_outputs=False,
+                 stream_target=None):
+        self.duration = float(duration)
+        self.stream_target = stream_target
+        self.source = source
+        self.fps = int(fps)
+        self.region = region or {'top': 0, 'left': 0, 'width': 1280, 'height': 720}
+        self.output_dir = output_dir
+        self.keep_outputs = keep_outputs
+    
+    def run(self, scenarios=None):
+        """依次执行场景，返回完整报告"""
+        import tempfile
+        import platform
+        output_dir = self.output_dir or tempfile.mkdtemp(prefix='recording_benchmark_')
+        report = {
+            'commit': self._git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'platform': sys.platform,
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+            },
+            'config': {
+                'duration': self.duration,
+                'source': self.source,
+                'fps': self.fps,
+                'region': self.region,
+            },
+            'scenarios': {},
+        }
+        for name in scenarios or self.SCENARIOS:
+            filepath = os.path.join(output_dir, f'benchmark_{name}.mp4')
+            capture_log.info("基准测试场景开始: %s", name)
+            try:
+                if name == 'static':
+                    report['scenarios'][name] = self._compare_frame_rate_modes(filepath)
+                elif name == 'mouse_follow':
+                    report['scenarios'][name] = self._compare_mouse_follow(filepath)
+                elif name == 'pip':
+                    report['scenarios'][name] = self._measure_pip_compositing(filepath)
+                elif name == 'streaming':
+                    report['scenarios'][name] = self._measure_streaming(filepath, output_dir)
+                elif name == 'split':
+                    report['scenarios'][name] = self._compare_split(filepath)
+                elif name == 'timelapse':
+                    report['scenarios'][name] = self._compare_timelapse(filepath)
+                else:
+                    report['scenarios'][name] = self.run_scenario(name, filepath)
+            except Exception as e:
+                capture_log.exception("基准测试场景 %s 失败: %s", name, e)
+                report['scenarios'][name] = {'error': str(e)}
+            finally:
+                if not self.keep_outputs and os.path.exists(filepath):
+                    try:
+                        os.remove(filepath)
+                    except OSError:
+                        pass
+        report['frame_check_failures'] = self.failed_frame_checks(report['scenarios'])
+        return report
+    
+    def run_scenario(self, name, filepath, overrides=None, fps=None, **session_kwargs):
+        """执行单个场景并返回指标（overrides 覆盖默认配置，fps 为空时使用基准帧率，
+        session_kwargs 传给 RecordingSession）"""
+        script = getattr(self, f'_script_{name}', None)
+        if script is None:
+            raise ValueError(f"未知场景: {name}")
+        from types import MappingProxyType
+        settings = MappingProxyType(dict(ConfigStore.defaults(), **(overrides or {})))
+        vfr = settings['vfr_enabled']
+        fps = fps or self.fps
+        session = RecordingSession(
+            region=dict(self.region),
+            filepath=filepath,
+            fps=fps,
+            microphone_enabled=(name == 'mic_toggle'),
+            audio_enabled=True,
+            microphone_device='synthetic' if name == 'mic_toggle' else None,
+            settings=settings,
+            capture_source=self.STATIC_SOURCE if name == 'static' else self.source,
+            audio_recorder_factory=lambda kind, device_name: SyntheticAudioRecorder(
+                frequency=440.0 if kind == 'system' else 880.0),
+            **session_kwargs
+        )
+        session.resource_sampler.interval = self.SAMPLE_INTERVAL
+        try:
+            start_time = time.perf_counter()
+            session.start().result(timeout=30)
+            start_latency = time.perf_counter() - start_time
+            
+            script(session, time.perf_counter())
+            
+            stop_time = time.perf_counter()
+            final_path, file_size = session.stop().result(timeout=max(120.0, self.duration * 2))
+            finalize_seconds = time.perf_counter() - stop_time
+        finally:
+            if session.running:
+                session.stop()
+        
+        resources = session.resource_sampler.summary()
+        if not resources['encoder_pids']:
+            # 没有采到编码器进程时CPU只包含本进程，对比结果没有意义
+            raise RuntimeError('资源采样中没有编码器进程，CPU 指标无效')
+        cpu_seconds = resources['cpu_seconds']
+        wall_seconds = stop_time - start_time
+        # 录制时钟从 FFmpeg 开始采集算起、停止时冻结；延时摄影换算为加速后的输出时长
+        recorded_seconds = session.elapsed_seconds() / session._timelapse_speedup()
+        metrics = {
+            'start_latency_ms': round(start_latency * 1000, 1),
+            'stop_to_finalized_ms': round(finalize_seconds * 1000, 1),
+            'wall_seconds': round(wall_seconds, 3),
+            'recorded_seconds': round(recorded_seconds, 3),
+            'cpu_seconds': cpu_seconds,
+            'cpu_percent': round(cpu_seconds / wall_seconds * 100, 1) if cpu_seconds is not None and wall_seconds > 0 else None,
+            'peak_rss_bytes': resources['peak_rss'],
+            'encoder_pids': resources['encoder_pids'],
+            'resource_warnings': resources['warnings'],
+            'file_size': file_size,
+            'segments': len(session.segment_list),
+            'trace_file': session.trace_file,
+            'fps': fps,
+            'vfr_enabled': vfr,
+            'mouse_follow': session.mouse_follower.summary() if session.mouse_follower is not None else None,
+            'pip': session.pip_summary(),
+            'stream': session.stream_relay.metrics() if session.stream_relay is not None else None,
+            'split': session.split_summary(),
+            'timelapse': session.timelapse_summary(),
+        }
+        metrics.update(session.frame_counts())
+        metrics.update(self._analyze_output(final_path, recorded_seconds, vfr, fps))
+        self._check_frame_count(metrics, vfr)
+        return metrics
+    
+    def _check_frame_count(self, metrics, vfr):
+        """编码帧数应接近 采集帧率 × 录制时长：明显偏多说明画面源没有按实时速度产生帧（其余指标不可信），
+        固定帧率下明显偏少说明编码跟不上（机器过载时正是要暴露的问题）；可变帧率下帧数少是预期的，只检查上限。
+        结果记为 frame_check（ok / too_many / too_few），不中断场景，其余指标照常保留"""
+        expected = metrics['frames_captured']
+        metrics['frames_expected'] = expected
+        metrics['frame_check'] = 'ok'
+        if not expected:
+            return
+        encoded = max(metrics.get('frames') or 0, metrics['frames_encoded'])
+        slack = expected / self.duration * self.FRAME_SLACK_SECONDS if self.duration else 0
+        if encoded > expected * (1 + self.FRAME_TOLERANCE) + max(3, slack):
+            metrics['frame_check'] = 'too_many'
+            metrics['frame_check_detail'] = f"编码帧数 {encoded} 远多于按实时速度应采集的 {expected} 帧，画面源没有按实时速度产生帧"
+        elif not vfr and (metrics.get('frames') or metrics['frames_encoded']) < expected * 0.5:
+            metrics['frame_check'] = 'too_few'
+            metrics['frame_check_detail'] = f"编码帧数 {metrics.get('frames') or metrics['frames_encoded']} 不到应采集的 {expected} 帧的一半"
+        if metrics['frame_check'] != 'ok':
+            capture_log.warning("帧数检查未通过: %s", metrics['frame_check_detail'])
+    
+    @classmethod
+    def failed_frame_checks(cls, metrics, prefix=''):
+        """场景指标（含嵌套的对照组）中帧数检查未通过的项，返回 ['场景.对照组', ...]"""
+        if not isinstance(metrics, dict):
+            return []
+        failed = [prefix] if metrics.get('frame_check') not in (None, 'ok') else []
+        for key, value in metrics.items():
+            if isinstance(value, dict):
+                failed += cls.failed_frame_checks(value, f'{prefix}.{key}' if prefix else key)
+        return failed
+    
+    def _compare_frame_rate_modes(self, filepath):
+        """静止画面分别以固定帧率和可变帧率录制，返回两者指标与节省比例"""
+        cfr = self.run_scenario('static', filepath, overrides={'vfr_enabled': False})
+        vfr = self.run_scenario('static', filepath, overrides={'vfr_enabled': True})
+        
+        def reduction(key):
+            before, after = cfr.get(key), vfr.get(key)
+            if not before or after is None:
+                return None
+            return round((1 - after / before) * 100, 1)
+        
+        return {
+            'cfr': cfr,
+            'vfr': vfr,
+            'frames_saved': vfr.get('frames_saved'),
+            'cpu_reduction_percent': reduction('cpu_seconds'),
+            'size_reduction_percent': reduction('file_size'),
+            'video_size_reduction_percent': reduction('video_bytes'),
+        }
+    
+    def _compare_mouse_follow(self, filepath):
+        """60 FPS 下用同样大小的视口（区域一半大小）分别录制静止指针和移动指针，返回两者指标与增加的CPU
+        （两次编码的画面大小相同，差值只包含指针轮询与裁剪位置的动态调整）"""
+        overrides = {
+            'record_mouse_region': True,
+            'mouse_region_width': self.region['width'] // 2,
+            'mouse_region_height': self.region['height'] // 2,
+        }
+        center = (self.region['left'] + self.region['width'] // 2, self.region['top'] + self.region['height'] // 2)
+        fixed = self.run_scenario('mouse_follow', filepath, overrides=overrides, fps=self.MOUSE_FOLLOW_FPS,
+                                  cursor_reader=lambda: center)
+        follow = self.run_scenario('mouse_follow', filepath, overrides=overrides, fps=self.MOUSE_FOLLOW_FPS,
+                                   cursor_reader=self._synthetic_cursor())
+        
+        added_cpu_seconds = None
+        added_cpu_percent = None
+        if fixed.get('cpu_seconds') is not None and follow.get('cpu_seconds') is not None:
+            added_cpu_seconds = round(follow['cpu_seconds'] - fixed['cpu_seconds'], 3)
+            added_cpu_percent = round(follow['cpu_percent'] - fixed['cpu_percent'], 1)
+        return {
+            'fixed': fixed,
+            'follow': follow,
+            'added_cpu_seconds': added_cpu_seconds,
+            'added_cpu_percent': added_cpu_percent,
+        }
+    
+    def _measure_pip_compositing(self, filepath):
+        """无摄像头与圆形画中画各录一次，CPU 差值按编码帧数折算为每帧合成耗时
+        （差值包含生成合成摄像头画面的开销，是合成耗时的上限）"""
+        plain = self.run_scenario('pip', filepath)
+        pip = self.run_scenario('pip', filepath, overrides={'pip_shape': 'circle'},
+                                camera_enabled=True, camera_device='synthetic', camera_source='testsrc')
+        
+        added_cpu_seconds = per_frame_ms = None
+        frames = pip.get('frames') or pip.get('frames_encoded')
+        if plain.get('cpu_seconds') is not None and pip.get('cpu_seconds') is not None:
+            added_cpu_seconds = round(pip['cpu_seconds'] - plain['cpu_seconds'], 3)
+            if frames:
+                per_frame_ms = round(added_cpu_seconds * 1000 / frames, 3)
+        return {
+            'plain': plain,
+            'pip': pip,
+            'added_cpu_seconds': added_cpu_seconds,
+            'compositing_ms_per_frame': per_frame_ms,
+        }
+    
+    def _measure_streaming(self, filepath, output_dir):
+        """录制同时推流：未指定目标时推送到临时目录的 HLS，返回录制指标与直播输出情况"""
+        target = self.stream_target or os.path.join(output_dir, 'benchmark_stream')
+        metrics = self.run_scenario('streaming', filepath,
+                                    overrides={'stream_enabled': True, 'stream_url': target})
+        stream = metrics.get('stream') or {}
+        result = {
+            'recording': metrics,
+            'target': target,
+            'bitrate_kbps': stream.get('bitrate_kbps'),
+            'bytes_sent': stream.get('bytes_sent'),
+            'bytes_dropped': stream.get('bytes_dropped'),
+            'reconnects': stream.get('reconnects'),
+        }
+        playlist = stream.get('playlist')
+        if playlist:
+            folder = os.path.dirname(playlist)
+            result['playlist_exists'] = os.path.exists(playlist)
+            result['hls_segments'] = len([n for n in os.listdir(folder) if n.endswith('.ts')]) \
+                if os.path.isdir(folder) else 0
+        return result
+    
+    def _compare_split(self, filepath):
+        """带暂停的录制分别写成单个文件和自动分段，返回两者指标与停止耗时的差值"""
+        single = self.run_scenario('split', filepath)
+        split_seconds = max(RecordingSession.SPLIT_MIN_SECONDS, self.duration / self.SPLIT_PARTS)
+        split = self.run_scenario('split', filepath, overrides={'split_minutes': split_seconds / 60})
+        if not self.keep_outputs:
+            import glob
+            stem, ext = os.path.splitext(filepath)
+            for part in glob.glob(glob.escape(stem) + '_part*' + ext):
+                try:
+                    os.remove(part)
+                except OSError:
+                    pass
+        
+        saved_ms = None
+        if single.get('stop_to_finalized_ms') is not None and split.get('stop_to_finalized_ms') is not None:
+            saved_ms = round(single['stop_to_finalized_ms'] - split['stop_to_finalized_ms'], 1)
+        return {
+            'single': single,
+            'split': split,
+            'stop_time_saved_ms': saved_ms,
+        }
+    
+    def _compare_timelapse(self, filepath):
+        """同样时长分别实时录制和延时摄影，返回两者指标、输出大小/CPU比例与体积估算的偏差"""
+        realtime = self.run_scenario('timelapse', filepath)
+        timelapse = self.run_scenario('timelapse', filepath, overrides={'timelapse_interval': self.TIMELAPSE_INTERVAL})
+        # recorded_seconds 是加速后的输出时长，换算回录制时长再估算
+        record_seconds = timelapse['recorded_seconds'] * self.TIMELAPSE_INTERVAL * self.fps
+        _, estimated_bytes = RecordingSession.timelapse_estimate(
+            self.TIMELAPSE_INTERVAL, self.fps, ConfigStore.defaults()['quality'], record_seconds,
+            pixels=self.region['width'] * self.region['height'])
+        size_ratio = cpu_ratio = None
+        if realtime.get('file_size') and timelapse.get('file_size') is not None:
+            size_ratio = round(timelapse['file_size'] / realtime['file_size'], 4)
+        if realtime.get('cpu_seconds') and timelapse.get('cpu_seconds') is not None:
+            cpu_ratio = round(timelapse['cpu_seconds'] / realtime['cpu_seconds'], 4)
+        return {
+            'realtime': realtime,
+            'timelapse': timelapse,
+            'size_ratio': size_ratio,
+            'cpu_ratio': cpu_ratio,
+            'estimated_bytes': estimated_bytes,
+            'estimate_ratio': round(estimated_bytes / timelapse['file_size'], 2) if timelapse.get('file_size') else None,
+        }
+    
+    def _synthetic_cursor(self):
+        """合成指针：在录制区域内绕椭圆移动，每圈 MOUSE_ORBIT_SECONDS 秒"""
+        region = self.region
+        started = time.perf_counter()
+        
+        def read():
+            angle = (time.perf_counter() - started) * 2 * math.pi / self.MOUSE_ORBIT_SECONDS
+            return (int(region['left'] + region['width'] * (0.5 + 0.4 * math.cos(angle))),
+                    int(region['top'] + region['height'] * (0.5 + 0.4 * math.sin(angle))))
+        return read
+    
+    def _wait_until(self, started, offset):
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _script_plain(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_pauses(self, session, started):
+        slot = self.duration / (self.PAUSE_COUNT + 1)
+        pause_length = min(0.5, slot / 4)
+        for i in range(self.PAUSE_COUNT):
+            self._wait_until(started, slot * (i + 0.5))
+            session.pause()
+            time.sleep(pause_length)
+            session.resume()
+        self._wait_until(started, self.duration)
+    
+    def _script_region_updates(self, session, started):
+        slot = self.duration / (self.REGION_UPDATE_COUNT + 1)
+        for i in range(self.REGION_UPDATE_COUNT):
+            self._wait_until(started, slot * (i + 1))
+            region = dict(self.region)
+            # 在原位置与偏移16像素之间交替
+            if i % 2 == 0:
+                region['left'] += 16
+                region['top'] += 16
+            session.update_region(region)
+        self._wait_until(started, self.duration)
+    
+    def _script_static(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_mouse_follow(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_pip(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_streaming(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_split(self, session, started):
+        self._script_pauses(session, started)
+    
+    def _script_timelapse(self, session, started):
+        self._wait_until(started, self.duration)
+    
+    def _script_mic_toggle(self, session, started):
+        self._wait_until(started, self.duration / 3)
+        session.set_microphone_enabled(False)
+        self._wait_until(started, self.duration * 2 / 3)
+        session.set_microphone_enabled(True)
+        self._wait_until(started, self.duration)
+    
+    def _analyze_output(self, filepath, recorded_duration, vfr=False, fps=None):
+        """用 ffprobe 统计丢帧数与音视频偏移（可变帧率下帧数少是预期的，不统计丢帧）"""
+        result = {'dropped_frames': None, 'av_offset_ms': None, 'av_duration_delta_ms': None}
+        try:
+            probe = subprocess.run(
+                ['ffprobe', '-v', 'error', '-count_packets', '-show_entries',
+                 'stream=codec_type,start_time,duration,nb_read_packets,bit_rate', '-of', 'json', filepath],
+                capture_output=True, text=True, timeout=120,
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+            )
+            streams = json.loads(probe.stdout or '{}').get('streams', [])
+        except Exception as e:
+            capture_log.warning("基准测试分析输出文件失败: %s", e)
+            return result
+        video = next((st for st in streams if st.get('codec_type') == 'video'), None)
+        audio = next((st for st in streams if st.get('codec_type') == 'audio'), None)
+        if video and video.get('nb_read_packets') is not None and recorded_duration:
+            frames = int(video['nb_read_packets'])
+            result['frames'] = frames
+            try:
+                # 视频流的字节数（文件大小还包含音频，静止画面时音频占大头）
+                result['video_bytes'] = int(int(video['bit_rate']) * float(video['duration']) / 8)
+            except (KeyError, TypeError, ValueError):
+                pass
+            if not vfr:
+                result['dropped_frames'] = max(0, int(round(recorded_duration * (fps or self.fps))) - frames)
+        if video and audio:
+            try:
+                result['av_offset_ms'] = round((float(audio['start_time']) - float(video['start_time'])) * 1000, 1)
+                result['av_duration_delta_ms'] = round((float(audio['duration']) - float(video['duration'])) * 1000, 1)
+            except (KeyError, TypeError, ValueError):
+                pass
+        return result
+    
+    def _git_commit(self):
+        try:
+            output = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+            )
+            return output.stdout.strip() or None
+        except Exception:
+            return None
+
+
+def run_command_line(argv):
+    """命令行模式：--record 无界面录制，--serve 仅启动控制接口，--ctl 向运行中的实例发送命令，--benchmark 基准测试，
+    --export 并行分块导出 GIF/WebM/MP4"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='pixel_perfect', description='灵感录屏工具 命令行/本地控制接口')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--record', action='store_true', help='无界面录制')
+    mode.add_argument('--serve', action='store_true', help='启动控制接口，等待 start 等命令')
+    mode.add_argument('--ctl', metavar='CMD', choices=['start', 'stop', 'pause', 'resume', 'region', 'status', 'metrics', 'screenshot',
+                                                 'ping'],
+                      help='向运行中的实例发送命令')
+    mode.add_argument('--benchmark', action='store_true', help='使用合成画面/音频源运行基准测试，输出JSON指标')
+    mode.add_argument('--export', metavar='FILE', help='把录像并行分块导出为 GIF/WebM/MP4，输出JSON结果')
+    parser.add_argument('--region', help='录制区域 x,y,w,h')
+    parser.add_argument('--fps', type=int, help='帧率（默认取设置）')
+    parser.add_argument('--duration', type=float, help='录制时长（秒，不含暂停）')
+    parser.add_argument('--out', help='输出文件路径')
+    parser.add_argument('--stream', help='同时推流：rtmp:// 或 srt:// 地址，或 HLS 输出目录')
+    parser.add_argument('--max-size', dest='max_size', help='文件达到该大小后自动停止（字节，或 500M、2G）')
+    parser.add_argument('--start-at', dest='start_at', help='定时开始：HH:MM[:SS] 或 "YYYY-MM-DD HH:MM[:SS]"')
+    parser.add_argument('--stop-with-window', dest='stop_with_window', help='指定标题的窗口关闭时自动停止（Windows）')
+    parser.add_argument('--audio-only', dest='audio_only', metavar='FORMAT', type=str.upper,
+                        choices=[name.upper() for name in AudioOnlySession.FORMATS],
+                        help='只录制声音，边录边写入 AAC/OPUS/FLAC 文件（不需要 --region）')
+    parser.add_argument('--count', type=int, help='--ctl screenshot 连拍张数（默认 1）')
+    parser.add_argument('--interval', type=float, help='--ctl screenshot 连拍间隔（秒，默认取设置）')
+    parser.add_argument('--image-format', dest='image_format', choices=list(ScreenshotService.FORMATS),
+                        help='--ctl screenshot 图片格式（默认取设置）')
+    parser.add_argument('--audio', action='store_true', help='录制系统音频')
+    parser.add_argument('--mic', action='store_true', help='录制麦克风')
+    parser.add_argument('--wait', action='store_true', help='--ctl stop 时等待处理完成')
+    parser.add_argument('--no-control', action='store_true', help='--record 时不启动控制接口')
+    parser.add_argument('--scenario', action='append', choices=RecordingBenchmark.SCENARIOS,
+                        help='--benchmark 场景（可重复，默认全部）')
+    parser.add_argument('--source', default='testsrc2', choices=['testsrc2', 'testsrc', 'mandelbrot'],
+                        help='--benchmark 合成画面源')
+    parser.add_argument('--report', help='--benchmark 报告输出文件（JSON）')
+    parser.add_argument('--export-format', dest='export_format', default='GIF', choices=list(ChunkedExporter.FORMATS),
+                        help='--export 输出格式（默认 GIF）')
+    parser.add_argument('--workers', type=int, help='--export 并行的 FFmpeg 进程数（默认按核心数）')
+    parser.add_argument('--baseline', action='store_true', help='--export 后再用单进程导出一次，报告实测加速比')
+    args = parser.parse_args(argv)
+    
+    if args.benchmark:
+        benchmark = RecordingBenchmark(
+            duration=args.duration or 60.0,
+            source=args.source,
+            fps=args.fps or 30,
+            region=parse_region_argument(args.region) if args.region else None,
+            stream_target=args.stream
+        )
+        report = benchmark.run(args.scenario)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                f.write(text)
+        print(text)
+        if report['frame_check_failures'] or any('error' in metrics for metrics in report['scenarios'].values()):
+            return 1
+        return 0
+    
+    if args.export:
+        exporter = ChunkedExporter(
+            args.export, args.export_format, output=args.out, workers=args.workers,
+            on_progress=lambda message, current, total: export_log.info("%s %s/%s", message, current, total)
+        )
+        try:
+            result = exporter.run(baseline=args.baseline)
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}, ensure_ascii=False))
+            return 1
+        print(json.dumps({'ok': True, 'result': result}, ensure_ascii=False))
+        return 0
+    
+    if args.ctl:
+        request = {'cmd': args.ctl}
+        for key in ('region', 'fps', 'duration', 'out', 'stream', 'max_size', 'start_at', 'stop_with_window',
+                    'audio_only', 'count', 'interval', 'image_format'):
+            if getattr(args, key) is not None:
+                request[key] = getattr(args, key)
+        if args.ctl == 'start':
+            request.update({'audio': args.audio, 'microphone': args.mic})
+        if args.wait:
+            request['wait'] = True
+        try:
+            response = send_control_command(request, timeout=None if args.wait else 60)
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}, ensure_ascii=False))
+            return 1
+        print(json.dumps(response, ensure_ascii=False))
+        return 0 if response.get('ok') else 1
+    
+    controller = RecordingController()
+    server = None
+    if args.serve or not args.no_control:
+        server = RecordingControlServer(controller)
+        try:
+            server.start()
+        except Exception as e:
+            control_log.error("控制接口启动失败: %s", e)
+            if args.serve:
+                return 1
+            server = None
+    
+    exit_code = 0
+    try:
+        if args.record:
+            if not args.region and not args.audio_only:
+                parser.error('--record 需要 --region x,y,w,h')
+            controller.start(args.region, fps=args.fps, duration=args.duration, out=args.out,
+                             audio=args.audio, microphone=args.mic, stream=args.stream, max_size=args.max_size,
+                             start_at=args.start_at, stop_with_window=args.stop_with_window,
+                             audio_only=args.audio_only)
+            # 等待定时开始、自动停止条件满足或控制接口发来 stop
+            while not controller.finished.wait(0.2):
+                pass
+        else:
+            # 控制接口模式：一直运行直到 Ctrl+C
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        control_log.info("收到中断，停止录制")
+        if controller.session is not None and controller.session.running:
+            controller.session.stop()
+    except Exception as e:
+        print(json.dumps({'ok': False, 'error': str(e)}, ensure_ascii=False))
+        exit_code = 1
+    finally:
+        if controller.session is not None and exit_code == 0:
+            try:
+                filepath, file_size = controller.session.completion_future.result()
+                result = controller.session.status()
+                result.update({'filepath': filepath, 'size': file_size})
+                print(json.dumps({'ok': True, 'result': result}, ensure_ascii=False))
+            except Exception as e:
+                print(json.dumps({'ok': False, 'error': str(e)}, ensure_ascii=False))
+                exit_code = 1
+        if server is not None:
+            server.close()
+    return exit_code
+
+
 if __name__ == '__main__':
     # 抑制OpenCV的警告信息
     import os
     os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'  # 只显示错误，不显示警告
     
+    # 初始化日志（级别由环境变量 LINGG_LOG_LEVEL 控制，如 "INFO,audio=DEBUG"）
+    setup_logging()
+    
+    # 命令行/控制接口模式不创建界面
+    if any(arg in ('--record', '--serve', '--ctl', '--benchmark', '--export') or arg.startswith(('--ctl=', '--export='))
+           for arg in sys.argv[1:]):
+        sys.exit(run_command_line(sys.argv[1:]))
+    
     # 创建应用程序实例
     app = QApplication(sys.argv)
     